@@ -45,6 +45,94 @@ double *phase;
 
 const unsigned long ACK_TIMEOUT = 60000; // Wait for 60 seconds
 
+// Link speed: the host can ask for a faster rate at the mode prompt ("BAUD <rate>", see negotiateBaud).
+// CRC-checked probe frames are exchanged at the new rate; any failure falls back to BASE_BAUD.
+const unsigned long BASE_BAUD = 115200;
+const unsigned long BAUD_RATES[] = {921600, 460800, 230400, 115200};
+const int NUM_BAUD_RATES = sizeof(BAUD_RATES) / sizeof(BAUD_RATES[0]);
+const int BAUD_PROBE_FRAMES = 16;
+const int BAUD_PROBE_LENGTH = 96;
+const unsigned long BAUD_SWITCH_DELAY = 100;    // ms for the host to follow a switch
+const unsigned long BAUD_LINK_TIMEOUT = 2000;   // ms to wait for the host's LINK reply
+const unsigned long BAUD_FALLBACK_DELAY = 1500; // ms before confirming a fallback (the host gives up after 1 s)
+
+// Coordinates visited by Modes 4, 5 and 6, packed as (x << 7) | y. Large enough for the full 128 x 128 array.
+#define MAX_COORD_LIST (128 * 128)
+uint16_t coordList[MAX_COORD_LIST];
+
+// Scan orders for the coordinate list
+#define SCAN_RASTER     0
+#define SCAN_SERPENTINE 1
+#define SCAN_GRAY       2
+#define SCAN_HILBERT    3
+int scanOrder = SCAN_RASTER;
+int8_t scanRankX[128];
+int8_t scanRankY[128];
+
+// MUX settling after an address change: base + per toggled address line, capped at the old fixed delay
+const unsigned long MUX_SETTLE_BASE_MS = 20;
+const unsigned long MUX_SETTLE_PER_LINE_MS = 15;
+const unsigned long MUX_SETTLE_MAX_MS = 200;
+const unsigned long DIAGONAL_SETTLE_MS = 100;   // Mode 3 moves two address lines per axis at every step
+
+// Repeated sweeps per coordinate (reduced to mean/std/median on the host)
+#define MAX_REPEATS 32
+int repeatCount = 1;
+
+// Kinetics (Mode 10): the same few electrodes swept over and over at a set cadence until the cycle count is
+// reached or the host sends STOP
+#define MAX_KINETICS_COORDS 64
+#define MAX_KINETICS_PERIOD_S 86400L
+#define MAX_KINETICS_CYCLES 1000000L
+bool stopRequested = false;
+
+// Settling cycles per frequency band ("S freq:cycles,..." profile from the host, see Mode 7).
+// Band b starts at point settlingBandStart[b]; a single band is the plain uniform setting.
+#define MAX_SETTLING_BANDS 8
+int numSettlingBands = 1;
+int settlingBandStart[MAX_SETTLING_BANDS] = {0};
+int settlingBandCycles[MAX_SETTLING_BANDS] = {0};
+
+// Mode 7 measures Rcal once per candidate, longest first
+const int SETTLING_CANDIDATES[] = {511, 255, 127, 63, 31, 15, 7, 3, 0};
+const int NUM_SETTLING_CANDIDATES = sizeof(SETTLING_CANDIDATES) / sizeof(SETTLING_CANDIDATES[0]);
+
+// Auto-ranging: output range / PGA steps ordered by signal level (excitation Vpp x PGA gain).
+// At equal level the x1 step comes last so it is preferred (less PGA noise).
+#define NUM_RANGE_STEPS 8
+const int RANGE_STEP_RANGE[NUM_RANGE_STEPS] = {4, 3, 4, 2, 3, 1, 2, 1};
+const int RANGE_STEP_PGA[NUM_RANGE_STEPS]   = {1, 1, 5, 1, 5, 1, 5, 5};
+
+// Raw DFT magnitude window: above it the ADC clips (wrong |Z|, "ovf"), below it the 12-bit ADC runs out of resolution
+const double RAW_MIN_MAGNITUDE = 1500.0;
+const double RAW_MAX_MAGNITUDE = 30000.0;
+const double RAW_TARGET_MAGNITUDE = 15000.0;  // Aim when picking a new step
+
+#define RANGE_CAL_NONE     0
+#define RANGE_CAL_OK       1
+#define RANGE_CAL_UNUSABLE 2
+
+bool autoRange = false;
+int excitationRange = 1;
+int pgaGain = 1;
+int baseRangeStep = 5;  // Step of the configured range/PGA (gain[]/phase[])
+double *rangeGain[NUM_RANGE_STEPS];
+double *rangePhase[NUM_RANGE_STEPS];
+byte rangeCalState[NUM_RANGE_STEPS];
+
+// Acquisition time of one sweep (see printSweepTiming)
+struct SweepTiming {
+  int points;
+  unsigned long waitTotal, waitMax, readTotal, readMax;
+};
+
+// Stages of the last framed sweep (see printStageTiming): acquisition incl. auto-ranging,
+// printing the measurement lines (serial transfer once the TX buffer is full), STORE_OK wait
+unsigned long lastAcquireMs = 0;
+unsigned long lastPrintMs = 0;
+unsigned long lastAckMs = 0;
+bool remeasureRequested = false; // The host answered the last sweep with REMEASURE instead of STORE_OK
+
 void setup() {
   // Disable Wi-Fi
   WiFi.disconnect(true);
@@ -73,6 +161,8 @@ void setup() {
   Serial.begin(115200);
   delay(2000); // Wait for serial communication to stabilize
   Serial.println("AD5933 Test Start");
+  printBoardId();
+  printBaudRates();
 
   // Initialize AD5933
   if (!(AD5933::reset() && AD5933::setInternalClock(true) &&
@@ -97,6 +187,110 @@ void flushSerialBuffer() {
   }
 }
 
+//
+// printBaudRates(): Tells the host which link speeds negotiateBaud() accepts
+//
+void printBaudRates() {
+  Serial.print("[INFO] Baud rates: "); // INFO
+  for (int i = 0; i < NUM_BAUD_RATES; i++) {
+    if (i > 0) Serial.print(",");
+    Serial.print(BAUD_RATES[i]);
+  }
+  Serial.println();
+}
+
+//
+// negotiateBaud(): Switches to rate, sends probe frames and keeps the rate only if the host
+// confirms it with an intact frame of its own; otherwise falls back to BASE_BAUD
+//
+void negotiateBaud(unsigned long rate) {
+  bool supported = false;
+  for (int i = 0; i < NUM_BAUD_RATES; i++) {
+    if (BAUD_RATES[i] == rate) supported = true;
+  }
+  if (!supported) {
+    Serial.println("[ERROR] Unsupported baud rate.");
+    return;
+  }
+  Serial.print("[INFO] Baud switch: "); // INFO
+  Serial.println(rate);
+  Serial.flush();
+  Serial.updateBaudRate(rate);
+  delay(BAUD_SWITCH_DELAY);
+
+  for (int seq = 0; seq < BAUD_PROBE_FRAMES; seq++) {
+    String payload = probePayload(seq);
+    Serial.print("PROBE ");
+    Serial.print(seq);
+    Serial.print(" ");
+    Serial.print(payload);
+    Serial.print(" ");
+    Serial.println(frameCrc32(payload.c_str(), payload.length()), HEX);
+  }
+  Serial.print("PROBE_END ");
+  Serial.println(BAUD_PROBE_FRAMES);
+
+  // Host answers "LINK OK <payload of frame BAUD_PROBE_FRAMES> <crc>" or "LINK FAIL"
+  bool linkOk = false;
+  unsigned long startTime = millis();
+  while (millis() - startTime < BAUD_LINK_TIMEOUT) {
+    if (Serial.available() > 0) {
+      String reply = Serial.readStringUntil('\n');
+      reply.trim();
+      if (reply.startsWith("LINK OK ")) {
+        int space = reply.indexOf(' ', 8);
+        if (space != -1) {
+          String payload = reply.substring(8, space);
+          unsigned long crc = strtoul(reply.substring(space + 1).c_str(), NULL, 16);
+          linkOk = strcmp(payload.c_str(), probePayload(BAUD_PROBE_FRAMES).c_str()) == 0 &&
+                   crc == frameCrc32(payload.c_str(), payload.length());
+        }
+      }
+      break;
+    }
+  }
+
+  if (!linkOk) {
+    delay(BAUD_FALLBACK_DELAY);
+    Serial.flush();
+    Serial.updateBaudRate(BASE_BAUD);
+    delay(BAUD_SWITCH_DELAY);
+    rate = BASE_BAUD;
+  }
+  Serial.print("[INFO] Baud rate set: "); // INFO
+  Serial.println(rate);
+}
+
+//
+// probePayload(): Printable characters of probe frame seq (xorshift32; the host generates the same)
+//
+String probePayload(int seq) {
+  uint32_t state = 0x9E3779B9u ^ ((uint32_t)(seq + 1) * 2654435761u);
+  String payload = "";
+  payload.reserve(BAUD_PROBE_LENGTH);
+  for (int i = 0; i < BAUD_PROBE_LENGTH; i++) {
+    state ^= state << 13;
+    state ^= state >> 17;
+    state ^= state << 5;
+    payload += (char)(0x21 + state % 94);
+  }
+  return payload;
+}
+
+//
+// frameCrc32(): CRC-32 (zlib polynomial) of a probe frame payload
+//
+uint32_t frameCrc32(const char *data, size_t length) {
+  uint32_t crc = 0xFFFFFFFFu;
+  for (size_t i = 0; i < length; i++) {
+    crc ^= (uint8_t)data[i];
+    for (int k = 0; k < 8; k++) {
+      crc = (crc >> 1) ^ (0xEDB88320u & (0u - (crc & 1u)));
+    }
+  }
+  return ~crc;
+}
+
 //
 // Mode Selection
 //
@@ -104,11 +298,18 @@ void ModeSelect() {
   int mychoice = 0;
   while (true) {
     // PROMPT: This line is detected by Python to wait for user input.
-    Serial.print("Set AD5933 Mode (0: Calibration, 1: COB Impedance Measurement, 2: Rcal Impedance Measurement, 3: Diagonal Sweep, 4: COB Range Sweep, 5: Range Step Sweep): ");
+    Serial.print("Set AD5933 Mode (0: Calibration, 1: COB Impedance Measurement, 2: Rcal Impedance Measurement, 3: Diagonal Sweep, 4: COB Range Sweep, 5: Range Step Sweep, 6: Coordinate List Sweep, 7: Settling Auto-Tune, 8: Multi-Group Scan, 9: Electrode Screening, 10: Kinetics): ");
     flushSerialBuffer();
     delay(10);
     while (Serial.available() == 0) { }
-    mychoice = Serial.readStringUntil('\n').toInt();
+    String choiceStr = Serial.readStringUntil('\n');
+    choiceStr.trim();
+    // The host can ask for another link speed here; the mode prompt follows again
+    if (choiceStr.startsWith("BAUD ")) {
+      negotiateBaud(strtoul(choiceStr.substring(5).c_str(), NULL, 10));
+      continue;
+    }
+    mychoice = choiceStr.toInt();
 
     // INFO: These lines are for information only and are not detected as prompts.
     if (mychoice == 0) {
@@ -135,39 +336,54 @@ void ModeSelect() {
       Serial.println("Starting COB Range Step Sweep (X/Y increment setting).");
       digitalWrite(MUX_SWITCH_ADG849, HIGH);
       impedanceMeasurementCOBRangeWithSteps();
+    } else if (mychoice == 6) {
+      Serial.println("Starting COB Coordinate List Sweep (host-supplied list).");
+      digitalWrite(MUX_SWITCH_ADG849, HIGH);
+      impedanceMeasurementCOBList();
+    } else if (mychoice == 7) {
+      Serial.println("Starting Settling Auto-Tune.");
+      digitalWrite(MUX_SWITCH_ADG849, LOW);
+      settlingAutoTune();
+    } else if (mychoice == 8) {
+      Serial.println("Starting Multi-Group Scan (host-scheduled segments).");
+      digitalWrite(MUX_SWITCH_ADG849, HIGH);
+      sweepMultiGroup();
+    } else if (mychoice == 9) {
+      Serial.println("Starting Electrode Screening (open/short check).");
+      digitalWrite(MUX_SWITCH_ADG849, HIGH);
+      screenElectrodes();
+    } else if (mychoice == 10) {
+      Serial.println("Starting Kinetics (time series of selected electrodes).");
+      digitalWrite(MUX_SWITCH_ADG849, HIGH);
+      impedanceMeasurementKinetics();
     } else {
-      Serial.println("Invalid input. Please enter 0, 1, 2, 3, 4, or 5.");
+      Serial.println("Invalid input. Please enter 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, or 10.");
     }
   }
 }
 
 void initialCalibration() {
   showSweepMenu(); // Input sweep settings
-  Serial.println("[INFO] Performing calibration."); // INFO
+  delete[] gain;
+  delete[] phase;
   gain = new double[numIncrements + 1];
   phase = new double[numIncrements + 1];
+  clearRangeCalibrations();
+
+  // The host keeps a calibration cache keyed by the sweep settings and can upload a matching one
+  if (selectCalibrationSource() == 1 && loadCachedCalibration(gain, phase, -1)) {
+    return;
+  }
+
+  Serial.println("[INFO] Performing calibration."); // INFO
+  printDieTemperature("[INFO] Calibration temperature: ", " C"); // INFO
 
   int *real = new int[numIncrements + 1];
   int *imag = new int[numIncrements + 1];
 
-  if (AD5933::calibrate(gain, phase, real, imag, refResist, numIncrements + 1)) {
+  if (calibrateSegments(gain, phase, real, imag)) {
     Serial.println("[INFO] Calibration complete!"); // INFO
-    Serial.println("=================================================================================================================================");
-    for (int i = 0; i <= numIncrements; i++) {
-      double magnitude = sqrt(pow(real[i], 2) + pow(imag[i], 2));
-      Serial.print("Cal Point ");
-      Serial.print(i);
-      Serial.print(": R=");
-      Serial.print(real[i]);
-      Serial.print(" / I=");
-      Serial.print(imag[i]);
-      Serial.print("\t |Z|=");
-      Serial.print(magnitude);
-      Serial.print("\t System Phase=");
-      Serial.print(phase[i]);
-      Serial.println(" degrees");
-    }
-    Serial.println("=================================================================================================================================");
+    printCalibrationPoints(real, imag, phase);
   } else {
     Serial.println("[ERROR] Calibration failed..."); // INFO
   }
@@ -176,6 +392,94 @@ void initialCalibration() {
   delete[] imag;
 }
 
+void printCalibrationPoints(int real[], int imag[], double phaseOut[]) {
+  Serial.println("=================================================================================================================================");
+  for (int i = 0; i <= numIncrements; i++) {
+    double magnitude = sqrt(pow(real[i], 2) + pow(imag[i], 2));
+    Serial.print("Cal Point ");
+    Serial.print(i);
+    Serial.print(": R=");
+    Serial.print(real[i]);
+    Serial.print(" / I=");
+    Serial.print(imag[i]);
+    Serial.print("\t |Z|=");
+    Serial.print(magnitude);
+    Serial.print("\t System Phase=");
+    Serial.print(phaseOut[i]);
+    Serial.println(" degrees");
+  }
+  Serial.println("=================================================================================================================================");
+}
+
+void printBoardId() {
+  uint64_t mac = ESP.getEfuseMac();
+  char boardId[13];
+  snprintf(boardId, sizeof(boardId), "%04X%08X", (uint16_t)(mac >> 32), (uint32_t)mac);
+  Serial.print("[INFO] Board ID: "); // INFO
+  Serial.println(boardId);
+}
+
+int selectCalibrationSource() {
+  while (true) {
+    // PROMPT
+    Serial.print("Select calibration source (0: Measure, 1: Load from host): ");
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    int source = Serial.readStringUntil('\n').toInt();
+    if (source == 0 || source == 1) return source;
+    Serial.println("[ERROR] Invalid input. Please enter 0 or 1.");
+  }
+}
+
+//
+// loadCachedCalibration(): Reads "CAL gain,phase;gain,phase;..." (one pair per frequency point) into gainOut[]/phaseOut[].
+// step >= 0 asks for the calibration of that auto-ranging step; an empty answer then means "measure it".
+//
+bool loadCachedCalibration(double *gainOut, double *phaseOut, int step) {
+  int numPoints = numIncrements + 1;
+  // PROMPT
+  Serial.print("Send cached calibration (");
+  Serial.print(numPoints);
+  Serial.print(" points");
+  if (step >= 0) {
+    Serial.print(", ");
+    printRangeStep(step);
+    Serial.print("; empty to measure");
+  }
+  Serial.print("): ");
+  flushSerialBuffer();
+  delay(10);
+  while (Serial.available() == 0) { }
+  String command = Serial.readStringUntil('\n');
+  command.trim();
+
+  if (step >= 0 && command.length() == 0) {
+    return false;
+  }
+  if (!command.startsWith("CAL ")) {
+    Serial.println("[ERROR] Invalid cached calibration. Performing calibration instead.");
+    return false;
+  }
+  int pos = 4;
+  for (int i = 0; i < numPoints; i++) {
+    int sep = command.indexOf(';', pos);
+    if (sep == -1) sep = command.length();
+    int comma = command.indexOf(',', pos);
+    if (comma == -1 || comma > sep) {
+      Serial.println("[ERROR] Cached calibration has too few points. Performing calibration instead.");
+      return false;
+    }
+    gainOut[i] = command.substring(pos, comma).toDouble();
+    phaseOut[i] = command.substring(comma + 1, sep).toDouble();
+    pos = sep + 1;
+  }
+  Serial.print("[INFO] Cached calibration loaded: "); // INFO
+  Serial.print(numPoints);
+  Serial.println(" points");
+  return true;
+}
+
 // 1. COB Single Position Sweep
 void impedanceMeasurementCOB() {
   setMuxGroup();
@@ -206,6 +510,18 @@ void impedanceMeasurementCOBRangeWithSteps() {
   sweepCOBRangeWithSteps();
 }
 
+// 6. COB Coordinate List Sweep
+void impedanceMeasurementCOBList() {
+  setMuxGroup();
+  sweepCOBCoordinateList();
+}
+
+// 10. Kinetics
+void impedanceMeasurementKinetics() {
+  setMuxGroup();
+  kineticsLoop();
+}
+
 //
 // User Input and Sweep Settings
 //
@@ -261,13 +577,23 @@ void showSweepMenu() {
   }
   // PROMPT: Input Settling Time Cycles
   while (true) {
-    Serial.print("Enter Settling Time Cycles (0~511): ");
+    Serial.print("Enter Settling Time Cycles (0~511, or S freq:cycles,... per band): ");
     flushSerialBuffer();
     delay(10);
     while (Serial.available() == 0) { }
-    int settlingTimeCycles = Serial.readStringUntil('\n').toInt();
+    String settlingInput = Serial.readStringUntil('\n');
+    settlingInput.trim();
+    if (settlingInput.startsWith("S ")) {
+      if (parseSettlingProfile(settlingInput)) {
+        printSettlingProfile();
+        break;
+      }
+      Serial.println("[ERROR] Invalid settling profile. Use S freq:cycles,... with cycles 0~511.");
+      continue;
+    }
+    int settlingTimeCycles = settlingInput.toInt();
     if (settlingTimeCycles >= 0 && settlingTimeCycles <= 511) {
-      ad5933.setSettlingCycles(settlingTimeCycles);
+      setUniformSettling(settlingTimeCycles);
       Serial.print("[INFO] Set Settling Time Cycles: "); // INFO
       Serial.println(settlingTimeCycles);
       break;
@@ -281,14 +607,15 @@ void showSweepMenu() {
     flushSerialBuffer();
     delay(10);
     while (Serial.available() == 0) { }
-    int excitationRange = Serial.readStringUntil('\n').toInt();
-    switch (excitationRange) {
+    int rangeInput = Serial.readStringUntil('\n').toInt();
+    switch (rangeInput) {
       case 1: ad5933.setRange(CTRL_OUTPUT_RANGE_1); Serial.println("[INFO] Set to 2 Vpp (Range 1)."); break;
       case 2: ad5933.setRange(CTRL_OUTPUT_RANGE_2); Serial.println("[INFO] Set to 1 Vpp (Range 2)."); break;
       case 3: ad5933.setRange(CTRL_OUTPUT_RANGE_3); Serial.println("[INFO] Set to 0.4 Vpp (Range 3)."); break;
       case 4: ad5933.setRange(CTRL_OUTPUT_RANGE_4); Serial.println("[INFO] Set to 0.2 Vpp (Range 4)."); break;
       default: Serial.println("[ERROR] Invalid input. Please select one from 1-4."); continue;
     }
+    excitationRange = rangeInput;
     break;
   }
   // PROMPT: Set PGA Control
@@ -300,6 +627,7 @@ void showSweepMenu() {
     int pgaControl = Serial.readStringUntil('\n').toInt();
     if (pgaControl == 1 || pgaControl == 5) {
       AD5933::setPGAGain(pgaControl == 1 ? PGA_GAIN_X1 : PGA_GAIN_X5);
+      pgaGain = pgaControl;
       Serial.print("[INFO] PGA Gain set to: x"); // INFO
       Serial.println(pgaControl);
       break;
@@ -307,6 +635,23 @@ void showSweepMenu() {
       Serial.println("[ERROR] Invalid input. Please enter 1 or 5.");
     }
   }
+  baseRangeStep = findRangeStep(excitationRange, pgaGain);
+  // PROMPT: Auto-ranging (re-measure clipped / low-signal points at another range and PGA gain)
+  while (true) {
+    Serial.print("Select auto-ranging (0: Off, 1: On): ");
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    int autoRangeInput = Serial.readStringUntil('\n').toInt();
+    if (autoRangeInput == 0 || autoRangeInput == 1) {
+      autoRange = (autoRangeInput == 1);
+      Serial.print("[INFO] Auto-ranging: "); // INFO
+      Serial.println(autoRange ? "On" : "Off");
+      break;
+    } else {
+      Serial.println("[ERROR] Invalid input. Please enter 0 or 1.");
+    }
+  }
   // PROMPT: Input Calibration Impedance
   while (true) {
     Serial.print("Enter Calibration Impedance (in Ohms, positive integer): ");
@@ -400,37 +745,19 @@ void getAddressInput() {
 }
 
 // Diagonal Sweep
+// Each diagonal point drives one address line per axis high (line i -> address bit 6 - i).
+// The sweeps are framed like the range modes (Current_Coord, SWEEP_START / SWEEP_DONE, STORE_OK),
+// so the host can tag every point with its coordinate and keep the two passes apart.
 void diagonalSweepPattern() {
-  const int X_AXIS_PINS[7] = {X_AXIS_ADDR_0, X_AXIS_ADDR_1, X_AXIS_ADDR_2, X_AXIS_ADDR_3, X_AXIS_ADDR_4, X_AXIS_ADDR_5, X_AXIS_ADDR_6};
-  const int Y_AXIS_PINS[7] = {Y_AXIS_ADDR_0, Y_AXIS_ADDR_1, Y_AXIS_ADDR_2, Y_AXIS_ADDR_3, Y_AXIS_ADDR_4, Y_AXIS_ADDR_5, Y_AXIS_ADDR_6};
-
-  Serial.println("[INFO] Starting forward diagonal sweep...");
-  for (int i = 0; i < 7; i++) {
-    for (int j = 0; j < 7; j++) {
-      digitalWrite(X_AXIS_PINS[j], i == j ? HIGH : LOW);
-      digitalWrite(Y_AXIS_PINS[j], i == j ? HIGH : LOW);
-    }
-    delay(100);
-    Serial.print("[INFO] Current X address: ");
-    for (int k = 0; k < 7; k++) Serial.print(digitalRead(X_AXIS_PINS[k]));
-    Serial.print(" | Y address: ");
-    for (int k = 0; k < 7; k++) Serial.print(digitalRead(Y_AXIS_PINS[k]));
-    Serial.println();
-    frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
-  }
-  Serial.println("[INFO] Starting reverse diagonal sweep...");
-  for (int i = 6; i >= 0; i--) {
-    for (int j = 0; j < 7; j++) {
-      digitalWrite(X_AXIS_PINS[j], i == j ? HIGH : LOW);
-      digitalWrite(Y_AXIS_PINS[j], i == j ? HIGH : LOW);
-    }
-    delay(100);
-    Serial.print("[INFO] Current X address: ");
-    for (int k = 0; k < 7; k++) Serial.print(digitalRead(X_AXIS_PINS[k]));
-    Serial.print(" | Y address: ");
-    for (int k = 0; k < 7; k++) Serial.print(digitalRead(Y_AXIS_PINS[k]));
-    Serial.println();
-    frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
+  for (int pass = 0; pass < 2; pass++) {
+    Serial.println(pass == 0 ? "[INFO] Starting forward diagonal sweep..." : "[INFO] Starting reverse diagonal sweep..."); // INFO
+    for (int k = 0; k < 7; k++) {
+      int i = (pass == 0) ? k : 6 - k;
+      int address = 1 << (6 - i);
+      setCoordinateAddress(address, address);
+      delay(DIAGONAL_SETTLE_MS);
+      sweepCoordinateWithAck(address, address, 1, DIAGONAL_SETTLE_MS);
+    }
   }
   Serial.println("[INFO] Diagonal sweep complete.");
 }
@@ -486,56 +813,15 @@ void sweepCOBRange() {
     else Serial.println("[INFO] Re-entering Y-axis range.");
   }
 
-  const int X_AXIS_PINS[7] = {X_AXIS_ADDR_0, X_AXIS_ADDR_1, X_AXIS_ADDR_2, X_AXIS_ADDR_3, X_AXIS_ADDR_4, X_AXIS_ADDR_5, X_AXIS_ADDR_6};
-  const int Y_AXIS_PINS[7] = {Y_AXIS_ADDR_0, Y_AXIS_ADDR_1, Y_AXIS_ADDR_2, Y_AXIS_ADDR_3, Y_AXIS_ADDR_4, Y_AXIS_ADDR_5, Y_AXIS_ADDR_6};
-
+  int count = 0;
   for (int x = xStart; x <= xEnd; x++) {
     for (int y = yStart; y <= yEnd; y++) {
-      for (int i = 0; i < 7; i++) { int bitVal = (x >> (6 - i)) & 1; digitalWrite(X_AXIS_PINS[i], bitVal ? HIGH : LOW); }
-      for (int i = 0; i < 7; i++) { int bitVal = (y >> (6 - i)) & 1; digitalWrite(Y_AXIS_PINS[i], bitVal ? HIGH : LOW); }
-      
-      Serial.print("Current_Coord->X=");
-      Serial.print(intToBinaryString(x));
-      Serial.print(",Y=");
-      Serial.println(intToBinaryString(y));
-
-      Serial.println("SWEEP_START");
-      frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
-      Serial.println("SWEEP_DONE");
-
-      unsigned long startTime = millis();
-      bool storeOKReceived = false;
-      while (millis() - startTime < ACK_TIMEOUT) {
-        if (Serial.available() > 0) {
-          String ackLine = Serial.readStringUntil('\n');
-          if (ackLine.indexOf("STORE_OK") != -1) {
-            storeOKReceived = true;
-            break;
-          }
-        }
-      }
-      if (!storeOKReceived) {
-        Serial.println("[ERROR] Data save failed. Retrying measurement.");
-        frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
-        Serial.println("SWEEP_DONE");
-        unsigned long retryStart = millis();
-        bool storeOKReceivedRetry = false;
-        while (millis() - retryStart < ACK_TIMEOUT) {
-          if (Serial.available() > 0) {
-            String ackLine2 = Serial.readStringUntil('\n');
-            if (ackLine2.indexOf("STORE_OK") != -1) {
-              storeOKReceivedRetry = true;
-              break;
-            }
-          }
-        }
-        if(!storeOKReceivedRetry) {
-          Serial.println("[ERROR] Retried data save failed. Moving to the next coordinate.");
-        }
-      }
-      delay(200);
+      coordList[count++] = (x << 7) | y;
     }
   }
+  selectScanOrder();
+  orderCoordinateList(count);
+  runCoordinateList(count);
   Serial.println("[INFO] COB range sweep complete.");
 }
 
@@ -603,9 +889,7 @@ void sweepCOBRangeWithSteps() {
     else { Serial.println("[INFO] Re-entering range."); }
   }
 
-  const int X_AXIS_PINS[7] = {X_AXIS_ADDR_0, X_AXIS_ADDR_1, X_AXIS_ADDR_2, X_AXIS_ADDR_3, X_AXIS_ADDR_4, X_AXIS_ADDR_5, X_AXIS_ADDR_6};
-  const int Y_AXIS_PINS[7] = {Y_AXIS_ADDR_0, Y_AXIS_ADDR_1, Y_AXIS_ADDR_2, Y_AXIS_ADDR_3, Y_AXIS_ADDR_4, Y_AXIS_ADDR_5, Y_AXIS_ADDR_6};
-
+  int count = 0;
   int xVal = xStart;
   while (true) {
     if (xVal > xEnd) xVal = xEnd;
@@ -613,37 +897,7 @@ void sweepCOBRangeWithSteps() {
     while (true) {
       if (yVal > yEnd) yVal = yEnd;
 
-      for (int i = 0; i < 7; i++) { int bitVal = (xVal >> (6 - i)) & 1; digitalWrite(X_AXIS_PINS[i], bitVal ? HIGH : LOW); }
-      for (int i = 0; i < 7; i++) { int bitVal = (yVal >> (6 - i)) & 1; digitalWrite(Y_AXIS_PINS[i], bitVal ? HIGH : LOW); }
-
-      Serial.print("Current_Coord->X="); Serial.print(intToBinaryString(xVal)); Serial.print(",Y="); Serial.println(intToBinaryString(yVal));
-      Serial.println("SWEEP_START");
-      frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
-      Serial.println("SWEEP_DONE");
-      
-      unsigned long startTime = millis();
-      bool storeOKReceived = false;
-      while (millis() - startTime < ACK_TIMEOUT) {
-        if (Serial.available() > 0) {
-          String ackLine = Serial.readStringUntil('\n');
-          if (ackLine.indexOf("STORE_OK") != -1) { storeOKReceived = true; break; }
-        }
-      }
-      if (!storeOKReceived) {
-        Serial.println("[ERROR] Data save failed. Retrying measurement.");
-        frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
-        Serial.println("SWEEP_DONE");
-        unsigned long retryStart = millis();
-        bool storeOKReceivedRetry = false;
-        while (millis() - retryStart < ACK_TIMEOUT) {
-          if (Serial.available() > 0) {
-            String ackLine2 = Serial.readStringUntil('\n');
-            if (ackLine2.indexOf("STORE_OK") != -1) { storeOKReceivedRetry = true; break; }
-          }
-        }
-        if(!storeOKReceivedRetry) { Serial.println("[ERROR] Retried data save failed. Moving to next coordinate."); }
-      }
-      delay(200);
+      coordList[count++] = (xVal << 7) | yVal;
 
       if (yVal == yEnd) break;
       yVal += yStep;
@@ -651,10 +905,620 @@ void sweepCOBRangeWithSteps() {
     if (xVal == xEnd) break;
     xVal += xStep;
   }
+  selectScanOrder();
+  orderCoordinateList(count);
+  runCoordinateList(count);
 
   Serial.println("[INFO] COB range step sweep complete.");
 }
 
+//
+// Coordinate List Sweep Function (Mode 6)
+//
+// The host sends the whole list in one line instead of answering 14 bit prompts per coordinate:
+//   L x,y;x,y;...                  explicit list (decimal 0~127), visited in the given order
+//   M xStart,yStart,width,height,h  bitmask of the rectangle as hex digits (MSB first),
+//                                  bit k = (x - xStart) * height + (y - yStart), visited in the selected scan order
+void sweepCOBCoordinateList() {
+  Serial.println("[INFO] Starting COB coordinate list sweep...");
+  String command;
+  int count = promptCoordinateList(command);
+
+  if (command.charAt(0) == 'M') {
+    selectScanOrder();
+    orderCoordinateList(count);
+  }
+  runCoordinateList(count);
+  Serial.println("[INFO] COB coordinate list sweep complete.");
+}
+
+//
+// promptCoordinateList(): Asks for a coordinate list until one parses into coordList; returns the count, command the
+// line received
+//
+int promptCoordinateList(String &command) {
+  int count = 0;
+  while (true) {
+    // PROMPT
+    Serial.print("Enter coordinate list (L x,y;x,y;... or M xStart,yStart,width,height,hexmask): ");
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    command = Serial.readStringUntil('\n');
+    command.trim();
+    count = parseCoordinateCommand(command);
+    if (count > 0) break;
+    Serial.println("[ERROR] Invalid coordinate list. Please re-enter.");
+  }
+
+  Serial.print("[INFO] Coordinate list received: ");
+  Serial.print(count);
+  Serial.println(" points");
+  return count;
+}
+
+//
+// Kinetics (Mode 10)
+//
+// Binding kinetics: the listed electrodes (at most MAX_KINETICS_COORDS) are swept in turn, one cycle every period
+// seconds (back to back with 0), until the cycle count is reached (0: no limit) or the host sends STOP. Every
+// sweep is framed as in the range modes and preceded by its time since the start of the run:
+//   Kinetics_Cycle->n  once per cycle
+//   Kinetics_Time->ms  before each coordinate's Current_Coord / SWEEP_START ... SWEEP_DONE
+void kineticsLoop() {
+  Serial.println("[INFO] Starting kinetics...");
+  String command;
+  int count = promptCoordinateList(command);
+  if (count > MAX_KINETICS_COORDS) {
+    Serial.print("[WARNING] Kinetics keeps the first ");
+    Serial.print(MAX_KINETICS_COORDS);
+    Serial.println(" coordinates.");
+    count = MAX_KINETICS_COORDS;
+  }
+  unsigned long periodMs = readKineticsNumber("Enter kinetics cycle period in seconds (0: back to back): ",
+                                              MAX_KINETICS_PERIOD_S) * 1000UL;
+  long cycles = readKineticsNumber("Enter kinetics cycles (0: until STOP): ", MAX_KINETICS_CYCLES);
+  Serial.print("[INFO] Kinetics: "); // INFO
+  Serial.print(count);
+  Serial.print(" electrodes, period ");
+  Serial.print(periodMs / 1000UL);
+  Serial.print(" s, ");
+  if (cycles > 0) {
+    Serial.print(cycles);
+    Serial.println(" cycles");
+  } else {
+    Serial.println("until STOP");
+  }
+
+  stopRequested = false;
+  unsigned long kineticsStart = millis();
+  long done = 0;
+  int prevX = -1, prevY = -1;
+  while ((cycles == 0 || done < cycles) && !stopRequested) {
+    unsigned long cycleStart = millis();
+    Serial.print("Kinetics_Cycle->");
+    Serial.println(done + 1);
+    for (int k = 0; k < count && !stopRequested; k++) {
+      int x = coordList[k] >> 7;
+      int y = coordList[k] & 0x7F;
+      int toggled = (prevX < 0) ? 14 : __builtin_popcount(x ^ prevX) + __builtin_popcount(y ^ prevY);
+      unsigned long settleMs = 0;
+      if (toggled > 0) {
+        setCoordinateAddress(x, y);
+        settleMs = muxSettleDelay(toggled);
+        delay(settleMs);
+      }
+      Serial.print("Kinetics_Time->");
+      Serial.println(millis() - kineticsStart);
+      sweepCoordinateWithAck(x, y, 1, settleMs);
+      prevX = x;
+      prevY = y;
+    }
+    done++;
+    // Wait for the next cycle, watching for STOP
+    while (!stopRequested && (cycles == 0 || done < cycles) && millis() - cycleStart < periodMs) {
+      if (Serial.available() > 0 && Serial.readStringUntil('\n').indexOf("STOP") != -1) {
+        stopRequested = true;
+      }
+    }
+  }
+  Serial.print("[INFO] Kinetics complete: "); // INFO
+  Serial.print(done);
+  Serial.print(" cycles in ");
+  Serial.print(millis() - kineticsStart);
+  Serial.println(" ms");
+}
+
+//
+// readKineticsNumber(): Asks for a whole number between 0 and maxValue
+//
+long readKineticsNumber(const char *prompt, long maxValue) {
+  while (true) {
+    // PROMPT
+    Serial.print(prompt);
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    String input = Serial.readStringUntil('\n');
+    input.trim();
+    long value = input.toInt();
+    if (input.length() > 0 && value >= 0 && value <= maxValue) {
+      return value;
+    }
+    Serial.print("[ERROR] Invalid input. Please enter a value between 0 and ");
+    Serial.print(maxValue);
+    Serial.println(".");
+  }
+}
+
+//
+// Multi-Group Scan (Mode 8)
+//
+// Targets in several MUX groups as one job. The host schedules them into one segment per group
+// and sends the segments one at a time, an empty line after the last:
+//   G group,order L x,y;...  or  G group,order M xStart,yStart,width,height,hexmask
+// order is the scan order of a mask (see selectScanOrder). Every segment switches the MUX
+// group and settles its first coordinate like the first of a list.
+void sweepMultiGroup() {
+  Serial.println("[INFO] Starting multi-group scan...");
+  selectRepeatCount();
+  int segments = 0;
+  long total = runGroupSegments(false, segments);
+  Serial.print("[INFO] Multi-group scan complete: "); // INFO
+  Serial.print(segments);
+  Serial.print(" segments, ");
+  Serial.print(total);
+  Serial.println(" points");
+}
+
+//
+// Electrode Screening (Mode 9)
+//
+// A quick open / short check before a full scan. The host sends the same group segments as for Mode 8, and every
+// coordinate is measured at the first and the last point of the calibrated sweep only (re-measured at another
+// range step when auto-ranging is on), one unframed line per point:
+//   Screen->X=0000101,Y=0000011 50.00kHz: R=.../I=...  |Z|=...  (printMeasurement format)
+// The host classifies the electrodes and leaves the open / shorted ones out of the following scans.
+void screenElectrodes() {
+  Serial.println("[INFO] Starting electrode screening...");
+  int segments = 0;
+  unsigned long screenStart = millis();
+  long total = runGroupSegments(true, segments);
+  Serial.print("[INFO] Electrode screening complete: "); // INFO
+  Serial.print(segments);
+  Serial.print(" segments, ");
+  Serial.print(total);
+  Serial.print(" points in ");
+  Serial.print(millis() - screenStart);
+  Serial.println(" ms");
+}
+
+//
+// runGroupSegments(): Reads "G group,order ..." segments until an empty line and visits (or screens) each one.
+// Returns the number of coordinates, segments the number of segments.
+//
+long runGroupSegments(bool screening, int &segments) {
+  long total = 0;
+  const char *names[4] = {"Raster", "Serpentine", "Gray-code", "Hilbert"};
+
+  while (true) {
+    // PROMPT
+    Serial.print("Enter group segment (G group,order L ... or M ...; empty to finish): ");
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    String command = Serial.readStringUntil('\n');
+    command.trim();
+    if (command.length() == 0) break;
+
+    // "G g,o " + coordinate command
+    int group = 0, order = -1, count = 0;
+    if (command.length() > 6 && command.charAt(0) == 'G' && command.charAt(1) == ' ' &&
+        command.charAt(3) == ',' && command.charAt(5) == ' ') {
+      group = command.charAt(2) - '0';
+      order = command.charAt(4) - '0';
+      if (group >= 1 && group <= 4 && order >= SCAN_RASTER && order <= SCAN_HILBERT) {
+        count = parseCoordinateCommand(command.substring(6));
+      }
+    }
+    if (count == 0) {
+      Serial.println("[ERROR] Invalid group segment. Please re-enter.");
+      continue;
+    }
+
+    Serial.print("[INFO] Group "); // INFO
+    Serial.print(group);
+    Serial.println(" selected");
+    applyMuxGroup(group);
+    Serial.print("[INFO] Group segment: "); // INFO
+    Serial.print(count);
+    Serial.print(" points, ");
+    if (command.charAt(6) == 'M') {
+      scanOrder = order;
+      orderCoordinateList(count);
+      Serial.println(names[scanOrder]);
+    } else {
+      Serial.println("as sent");
+    }
+    if (screening) {
+      screenCoordinateList(count);
+    } else {
+      visitCoordinateList(count);
+    }
+    segments++;
+    total += count;
+  }
+  return total;
+}
+
+//
+// screenCoordinateList(): Measures coordList[0..count) at the first and last sweep point, settling the MUX as in
+// visitCoordinateList()
+//
+void screenCoordinateList(int count) {
+  Serial.print("[INFO] Scan points: "); // INFO
+  Serial.println(count);
+  int screenPoints[2] = {0, numIncrements};
+  int numScreenPoints = (numIncrements > 0) ? 2 : 1;
+  int *real = new int[numIncrements + 1];
+  int *imag = new int[numIncrements + 1];
+  SweepTiming timing = {0, 0, 0, 0, 0};
+  int prevX = -1, prevY = -1;
+  for (int k = 0; k < count; k++) {
+    int x = coordList[k] >> 7;
+    int y = coordList[k] & 0x7F;
+    int toggled = (prevX < 0) ? 14 : __builtin_popcount(x ^ prevX) + __builtin_popcount(y ^ prevY);
+    setCoordinateAddress(x, y);
+    delay(muxSettleDelay(toggled));
+    for (int n = 0; n < numScreenPoints; n++) {
+      int p = screenPoints[n];
+      int step = screenPoint(p, real, imag, timing);
+      if (step < 0) {
+        Serial.println("[ERROR] Could not get raw frequency data...");
+        continue;
+      }
+      Serial.print("Screen->X=");
+      Serial.print(intToBinaryString(x));
+      Serial.print(",Y=");
+      Serial.print(intToBinaryString(y));
+      Serial.print(" ");
+      printMeasurement((startFreq + (long)p * frequencyUnit) / 1000.0, real[p], imag[p],
+                       rangeStepGain(step)[p], rangeStepPhase(step)[p]);
+    }
+    prevX = x;
+    prevY = y;
+  }
+  delete[] real;
+  delete[] imag;
+  if (!AD5933::setPowerMode(POWER_STANDBY)) {
+    Serial.println("[ERROR] Could not set to standby...");
+  }
+}
+
+//
+// screenPoint(): Measures one sweep point into real[point]/imag[point] at the configured step, with auto-ranging
+// on at the step that fits it. Returns the step it was measured at, -1 on error.
+//
+int screenPoint(int point, int real[], int imag[], SweepTiming &timing) {
+  int step = baseRangeStep;
+  if (!measureRangeSegment(step, point, point, real, imag, timing)) return -1;
+  for (int pass = 0; autoRange && pass < NUM_RANGE_STEPS; pass++) {
+    int target = targetRangeStep(step, real[point], imag[point]);
+    if (target == step) break;
+    if (!ensureRangeCalibration(target)) continue;  // Marked unusable: the next pass picks another step
+    if (!measureRangeSegment(target, point, point, real, imag, timing)) break;
+    step = target;
+  }
+  if (step != baseRangeStep) applyRangeStep(baseRangeStep);
+  return step;
+}
+
+//
+// parseCoordinateCommand(): Fills coordList from an L or M command, returns the point count (0 on error)
+//
+int parseCoordinateCommand(String command) {
+  if (command.length() < 3 || command.charAt(1) != ' ') return 0;
+  char kind = command.charAt(0);
+  String body = command.substring(2);
+  int count = 0;
+
+  if (kind == 'L') {
+    int pos = 0;
+    while (pos < (int)body.length()) {
+      int sep = body.indexOf(';', pos);
+      if (sep == -1) sep = body.length();
+      int comma = body.indexOf(',', pos);
+      if (comma == -1 || comma > sep) return 0;
+      int x = body.substring(pos, comma).toInt();
+      int y = body.substring(comma + 1, sep).toInt();
+      if (x < 0 || x > 127 || y < 0 || y > 127 || count >= MAX_COORD_LIST) return 0;
+      coordList[count++] = (x << 7) | y;
+      pos = sep + 1;
+    }
+    return count;
+  }
+
+  if (kind == 'M') {
+    int fields[4];
+    int pos = 0;
+    for (int f = 0; f < 4; f++) {
+      int comma = body.indexOf(',', pos);
+      if (comma == -1) return 0;
+      fields[f] = body.substring(pos, comma).toInt();
+      pos = comma + 1;
+    }
+    int xStart = fields[0], yStart = fields[1], width = fields[2], height = fields[3];
+    if (xStart < 0 || yStart < 0 || width < 1 || height < 1 ||
+        xStart + width > 128 || yStart + height > 128) return 0;
+    int numBits = width * height;
+    if ((int)body.length() - pos < (numBits + 3) / 4) return 0;
+    for (int k = 0; k < numBits; k++) {
+      char c = body.charAt(pos + k / 4);
+      int nibble;
+      if (c >= '0' && c <= '9') nibble = c - '0';
+      else if (c >= 'A' && c <= 'F') nibble = c - 'A' + 10;
+      else if (c >= 'a' && c <= 'f') nibble = c - 'a' + 10;
+      else return 0;
+      if ((nibble >> (3 - k % 4)) & 1) {
+        coordList[count++] = ((xStart + k / height) << 7) | (yStart + k % height);
+      }
+    }
+    return count;
+  }
+  return 0;
+}
+
+//
+// selectScanOrder(): Asks which order the coordinate list is visited in
+//
+void selectScanOrder() {
+  while (true) {
+    // PROMPT
+    Serial.print("Select scan order (0: Raster, 1: Serpentine, 2: Gray-code, 3: Hilbert): ");
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    int choice = Serial.readStringUntil('\n').toInt();
+    if (choice >= SCAN_RASTER && choice <= SCAN_HILBERT) {
+      scanOrder = choice;
+      break;
+    }
+    Serial.println("[ERROR] Invalid input. Please enter a value between 0 and 3.");
+  }
+  const char *names[4] = {"Raster", "Serpentine", "Gray-code", "Hilbert"};
+  Serial.print("[INFO] Scan order: "); // INFO
+  Serial.println(names[scanOrder]);
+}
+
+//
+// orderCoordinateList(): Sorts coordList[0..count) into the selected scan order
+//
+// Every distinct X (and Y) gets a rank along its axis: ascending for Raster/Serpentine/Hilbert,
+// Gray-code sequence order for Gray-code, so consecutive values differ in one address bit
+// whenever the range is an aligned power of two. Rows are then walked boustrophedon
+// (Serpentine, Gray-code) or along a Hilbert curve over the rank grid.
+//
+void orderCoordinateList(int count) {
+  bool presentX[128] = {false};
+  bool presentY[128] = {false};
+  for (int k = 0; k < count; k++) {
+    presentX[coordList[k] >> 7] = true;
+    presentY[coordList[k] & 0x7F] = true;
+  }
+  int rankX = 0, rankY = 0;
+  for (int i = 0; i < 128; i++) {
+    int value = (scanOrder == SCAN_GRAY) ? (i ^ (i >> 1)) : i;
+    scanRankX[value] = presentX[value] ? rankX++ : -1;
+    scanRankY[value] = presentY[value] ? rankY++ : -1;
+  }
+  qsort(coordList, count, sizeof(uint16_t), compareScanKey);
+}
+
+uint16_t scanKey(uint16_t coord) {
+  int rx = scanRankX[coord >> 7];
+  int ry = scanRankY[coord & 0x7F];
+  switch (scanOrder) {
+    case SCAN_SERPENTINE:
+    case SCAN_GRAY:
+      return rx * 128 + ((rx & 1) ? (127 - ry) : ry);
+    case SCAN_HILBERT:
+      return hilbertIndex(rx, ry);
+    default:
+      return rx * 128 + ry;
+  }
+}
+
+int compareScanKey(const void *a, const void *b) {
+  return (int)scanKey(*(const uint16_t *)a) - (int)scanKey(*(const uint16_t *)b);
+}
+
+//
+// hilbertIndex(): Position of (x, y) along the Hilbert curve filling the 128 x 128 grid
+//
+uint16_t hilbertIndex(int x, int y) {
+  uint16_t d = 0;
+  for (int s = 64; s > 0; s /= 2) {
+    int rx = (x & s) > 0;
+    int ry = (y & s) > 0;
+    d += s * s * ((3 * rx) ^ ry);
+    if (ry == 0) {
+      if (rx == 1) { x = 127 - x; y = 127 - y; }
+      int t = x; x = y; y = t;
+    }
+  }
+  return d;
+}
+
+//
+// runCoordinateList(): Asks for the repeat count, then visits coordList[0..count)
+//
+void runCoordinateList(int count) {
+  selectRepeatCount();
+  visitCoordinateList(count);
+}
+
+//
+// visitCoordinateList(): Visits coordList[0..count) in order, settling the MUX by how many address lines toggled
+//
+void visitCoordinateList(int count) {
+  Serial.print("[INFO] Scan points: "); // INFO
+  Serial.println(count);
+  int prevX = -1, prevY = -1;
+  for (int k = 0; k < count; k++) {
+    int x = coordList[k] >> 7;
+    int y = coordList[k] & 0x7F;
+    int toggled = (prevX < 0) ? 14 : __builtin_popcount(x ^ prevX) + __builtin_popcount(y ^ prevY);
+    setCoordinateAddress(x, y);
+    unsigned long settleMs = muxSettleDelay(toggled);
+    delay(settleMs);
+    sweepCoordinateWithAck(x, y, repeatCount, settleMs);
+    prevX = x;
+    prevY = y;
+  }
+}
+
+//
+// selectRepeatCount(): Asks how many sweeps to take at every coordinate
+//
+void selectRepeatCount() {
+  while (true) {
+    // PROMPT
+    Serial.print("Enter repeats per coordinate (1~32): ");
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    int repeats = Serial.readStringUntil('\n').toInt();
+    if (repeats >= 1 && repeats <= MAX_REPEATS) {
+      repeatCount = repeats;
+      break;
+    }
+    Serial.println("[ERROR] Invalid input. Please enter a value between 1 and 32.");
+  }
+  Serial.print("[INFO] Repeats per coordinate: "); // INFO
+  Serial.println(repeatCount);
+}
+
+//
+// muxSettleDelay(): Settling time in ms after toggling the given number of address lines
+//
+unsigned long muxSettleDelay(int toggledLines) {
+  unsigned long settle = MUX_SETTLE_BASE_MS + MUX_SETTLE_PER_LINE_MS * toggledLines;
+  return settle > MUX_SETTLE_MAX_MS ? MUX_SETTLE_MAX_MS : settle;
+}
+
+//
+// setCoordinateAddress(): Drives the 7-bit X/Y address lines (bit 6 on ADDR_0)
+//
+void setCoordinateAddress(int x, int y) {
+  const int X_AXIS_PINS[7] = {X_AXIS_ADDR_0, X_AXIS_ADDR_1, X_AXIS_ADDR_2, X_AXIS_ADDR_3, X_AXIS_ADDR_4, X_AXIS_ADDR_5, X_AXIS_ADDR_6};
+  const int Y_AXIS_PINS[7] = {Y_AXIS_ADDR_0, Y_AXIS_ADDR_1, Y_AXIS_ADDR_2, Y_AXIS_ADDR_3, Y_AXIS_ADDR_4, Y_AXIS_ADDR_5, Y_AXIS_ADDR_6};
+  for (int i = 0; i < 7; i++) { int bitVal = (x >> (6 - i)) & 1; digitalWrite(X_AXIS_PINS[i], bitVal ? HIGH : LOW); }
+  for (int i = 0; i < 7; i++) { int bitVal = (y >> (6 - i)) & 1; digitalWrite(Y_AXIS_PINS[i], bitVal ? HIGH : LOW); }
+}
+
+//
+// sweepCoordinateWithAck(): Runs framed sweeps at the selected coordinate, waiting for STORE_OK after each (one retry).
+// A REMEASURE answer retries at once, with the MUX still on the coordinate; without an answer the retry follows the timeout
+//
+void sweepCoordinateWithAck(int x, int y, int repeats, unsigned long settleMs) {
+  Serial.print("Current_Coord->X=");
+  Serial.print(intToBinaryString(x));
+  Serial.print(",Y=");
+  Serial.println(intToBinaryString(y));
+
+  for (int r = 1; r <= repeats; r++) {
+    if (repeats > 1) {
+      Serial.print("Repeat_Index->");
+      Serial.print(r);
+      Serial.print("/");
+      Serial.println(repeats);
+    }
+
+    Serial.println("SWEEP_START");
+    printDieTemperature("Temperature->", "");
+    frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
+    Serial.println("SWEEP_DONE");
+
+    bool stored = waitForStoreOK();
+    unsigned long ackMs = lastAckMs;
+    if (!stored) {
+      if (remeasureRequested) {
+        Serial.println("[INFO] Re-measuring at host request."); // INFO
+      } else {
+        Serial.println("[ERROR] Data save failed. Retrying measurement.");
+      }
+      Serial.println("SWEEP_START");
+      printDieTemperature("Temperature->", "");
+      frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
+      Serial.println("SWEEP_DONE");
+      if (!waitForStoreOK()) {
+        Serial.println("[ERROR] Retried data save failed. Moving to the next coordinate.");
+      }
+      ackMs += lastAckMs;
+    }
+    // Outside the SWEEP_START / SWEEP_DONE frame, so the host reads it after its STORE_OK
+    printStageTiming(r == 1 ? settleMs : 0, lastAcquireMs, lastPrintMs, ackMs);
+  }
+}
+
+//
+// printDieTemperature(): Samples the AD5933 die temperature (degrees C). Only between sweeps: it takes over the control register.
+// A failed read (no valid temperature within TEMP_VALID_TIMEOUT_US, or an I2C error) prints N/A
+//
+void printDieTemperature(const char *prefix, const char *suffix) {
+  double temperature;
+  Serial.print(prefix);
+  if (AD5933::readTemperature(&temperature)) {
+    Serial.print(temperature, 2);
+    Serial.println(suffix);
+  } else {
+    Serial.println("N/A");
+  }
+}
+
+//
+// printStageTiming(): Where the time of one framed sweep went on the board
+//
+void printStageTiming(unsigned long settleMs, unsigned long acquireMs, unsigned long printMs, unsigned long ackMs) {
+  Serial.print("[INFO] Stage timing: settle "); // INFO
+  Serial.print(settleMs);
+  Serial.print(" ms, acquire ");
+  Serial.print(acquireMs);
+  Serial.print(" ms, print ");
+  Serial.print(printMs);
+  Serial.print(" ms, ack ");
+  Serial.print(ackMs);
+  Serial.println(" ms");
+}
+
+//
+// waitForStoreOK(): Waits up to ACK_TIMEOUT for the host to confirm the sweep was stored (false on REMEASURE)
+//
+bool waitForStoreOK() {
+  unsigned long startTime = millis();
+  remeasureRequested = false;
+  while (millis() - startTime < ACK_TIMEOUT) {
+    if (Serial.available() > 0) {
+      String ackLine = Serial.readStringUntil('\n');
+      if (ackLine.indexOf("STORE_OK") != -1) {
+        lastAckMs = millis() - startTime;
+        return true;
+      }
+      if (ackLine.indexOf("REMEASURE") != -1) {
+        lastAckMs = millis() - startTime;
+        remeasureRequested = true;
+        return false;
+      }
+      // A kinetics STOP can arrive while a sweep waits for its STORE_OK
+      if (ackLine.indexOf("STOP") != -1) {
+        stopRequested = true;
+      }
+    }
+  }
+  lastAckMs = millis() - startTime;
+  return false;
+}
+
 //
 // readSingleAddress(): Function to read a 7-bit address and convert it to an integer
 //
@@ -720,6 +1584,13 @@ void setMuxGroup() {
       Serial.println("[ERROR] Invalid input. Please enter a value between 1 and 4.");
     }
   }
+  applyMuxGroup(group);
+}
+
+//
+// applyMuxGroup(): Drives the analog / digital MUX select lines of a group (1~4)
+//
+void applyMuxGroup(int group) {
   switch (group) {
     case 1: /* 00 */ digitalWrite(ANALOG_MUX_SWITCH_0, LOW); digitalWrite(ANALOG_MUX_SWITCH_1, LOW); digitalWrite(DIGITAL_MUX_SWITCH_0, LOW); digitalWrite(DIGITAL_MUX_SWITCH_1, LOW); break;
     case 2: /* 01 */ digitalWrite(ANALOG_MUX_SWITCH_0, HIGH); digitalWrite(ANALOG_MUX_SWITCH_1, LOW); digitalWrite(DIGITAL_MUX_SWITCH_0, HIGH); digitalWrite(DIGITAL_MUX_SWITCH_1, LOW); break;
@@ -733,61 +1604,480 @@ void setMuxGroup() {
 // Frequency Sweep (Outputs measurement results)
 //
 void frequencySweepRaw(int startFreq, int frequencyUnit, int numIncrements) {
-  int real, imag, i = 0;
+  int count = 0;
   double cfreq = startFreq / 1000.0;
 
-  if (!(AD5933::setPowerMode(POWER_STANDBY) &&
-        AD5933::setControlMode(CTRL_INIT_START_FREQ) &&
-        AD5933::setControlMode(CTRL_START_FREQ_SWEEP))) {
+  if (!startSweepSegment(0)) {
     Serial.println("[ERROR] Could not initialize frequency sweep...");
     return;
   }
 
   Serial.println("=================================================================================================================================");
 
-  while ((AD5933::readStatusRegister() & STATUS_SWEEP_DONE) != STATUS_SWEEP_DONE) {
-    if (!AD5933::getComplexData(&real, &imag)) {
-      Serial.println("[ERROR] Could not get raw frequency data...");
-      real = 0;
-      imag = 0;
+  int *real = new int[numIncrements + 1];
+  int *imag = new int[numIncrements + 1];
+  int *stepOf = new int[numIncrements + 1];
+  unsigned long sweepStart = millis();
+  SweepTiming timing = {0, 0, 0, 0, 0};
+
+  // One hardware sweep per settling band
+  for (int band = 0; band < numSettlingBands; band++) {
+    if (band > 0 && !startSweepSegment(band)) {
+      Serial.println("[ERROR] Could not initialize frequency sweep...");
+      break;
     }
+    count = acquirePoints(count, settlingBandLastPoint(band), real, imag, timing);
+  }
+  for (int i = 0; i < count; i++) {
+    stepOf[i] = baseRangeStep;
+  }
+  if (autoRange) {
+    autoRangeSweep(real, imag, stepOf, count, timing);
+  }
+  unsigned long printStart = millis();
+  lastAcquireMs = printStart - sweepStart;
 
-    double magnitude = sqrt(pow(real, 2) + pow(imag, 2));
-    double impedance = 1 / (magnitude * gain[i]); // Calculate calibrated impedance
-    double rawPhase = atan2(imag, real) * (180.0 / M_PI);
+  for (int i = 0; i < count; i++) {
+    printMeasurement(cfreq, real[i], imag[i], rangeStepGain(stepOf[i])[i], rangeStepPhase(stepOf[i])[i]);
+    cfreq += frequencyUnit / 1000.0;
+  }
+  lastPrintMs = millis() - printStart;
 
-    if (rawPhase < 0) { rawPhase += 360.0; }
-    double correctedPhase = rawPhase - phase[i];
+  Serial.println("Frequency sweep complete!");
+  printSweepTiming(timing.points, millis() - sweepStart, timing.waitTotal, timing.waitMax, timing.readTotal, timing.readMax);
+  Serial.println("=================================================================================================================================");
 
-    if (correctedPhase < -180.0) { correctedPhase += 360.0; } 
-    else if (correctedPhase >= 180.0) { correctedPhase -= 360.0; }
+  delete[] real;
+  delete[] imag;
+  delete[] stepOf;
 
-    double Rreal = impedance * cos(correctedPhase * M_PI / 180.0);
-    double Ximaginary = impedance * sin(correctedPhase * M_PI / 180.0);
+  if (!AD5933::setPowerMode(POWER_STANDBY)) {
+    Serial.println("[ERROR] Could not set to standby...");
+  }
+}
 
-    Serial.print(cfreq);
-    Serial.print("kHz: R=");
-    Serial.print(real);
-    Serial.print("/I=");
-    Serial.print(imag);
-    Serial.print("\t  |Z|=");
-    Serial.print(impedance);
-    Serial.print("\t  Phase=");
-    Serial.print(correctedPhase);
-    Serial.print(" degrees\t Resistance=");
-    Serial.print(Rreal);
-    Serial.print("\t Reactance=");
-    Serial.println(Ximaginary);
+//
+// acquirePoints(): Reads points i..lastPoint of the running hardware sweep into real[]/imag[], returns the next point.
+// Bounded by lastPoint in case SWEEP_DONE never comes.
+//
+int acquirePoints(int i, int lastPoint, int real[], int imag[], SweepTiming &timing) {
+  while (i <= lastPoint && (AD5933::readStatusRegister() & STATUS_SWEEP_DONE) != STATUS_SWEEP_DONE) {
+    if (!AD5933::getComplexData(&real[i], &imag[i])) {
+      Serial.println("[ERROR] Could not get raw frequency data...");
+      real[i] = 0;
+      imag[i] = 0;
+    }
+    timing.points++;
+    timing.waitTotal += AD5933::lastWaitMicros;
+    timing.readTotal += AD5933::lastReadMicros;
+    if (AD5933::lastWaitMicros > timing.waitMax) timing.waitMax = AD5933::lastWaitMicros;
+    if (AD5933::lastReadMicros > timing.readMax) timing.readMax = AD5933::lastReadMicros;
 
     i++;
-    cfreq += frequencyUnit / 1000.0;
     AD5933::setControlMode(CTRL_INCREMENT_FREQ);
   }
+  return i;
+}
 
-  Serial.println("Frequency sweep complete!");
-  Serial.println("=================================================================================================================================");
+//
+// printMeasurement(): One calibrated measurement line, with the gain factor / system phase of the step it was measured at
+//
+void printMeasurement(double cfreq, int real, int imag, double gainFactor, double systemPhase) {
+  double magnitude = sqrt(pow(real, 2) + pow(imag, 2));
+  double impedance = 1 / (magnitude * gainFactor); // Calculate calibrated impedance
+  double rawPhase = atan2(imag, real) * (180.0 / M_PI);
+
+  if (rawPhase < 0) { rawPhase += 360.0; }
+  double correctedPhase = rawPhase - systemPhase;
+
+  if (correctedPhase < -180.0) { correctedPhase += 360.0; } 
+  else if (correctedPhase >= 180.0) { correctedPhase -= 360.0; }
+
+  double Rreal = impedance * cos(correctedPhase * M_PI / 180.0);
+  double Ximaginary = impedance * sin(correctedPhase * M_PI / 180.0);
+
+  Serial.print(cfreq);
+  Serial.print("kHz: R=");
+  Serial.print(real);
+  Serial.print("/I=");
+  Serial.print(imag);
+  Serial.print("\t  |Z|=");
+  Serial.print(impedance);
+  Serial.print("\t  Phase=");
+  Serial.print(correctedPhase);
+  Serial.print(" degrees\t Resistance=");
+  Serial.print(Rreal);
+  Serial.print("\t Reactance=");
+  Serial.println(Ximaginary);
+}
 
-  if (!AD5933::setPowerMode(POWER_STANDBY)) {
-    Serial.println("[ERROR] Could not set to standby...");
+//
+// printSweepTiming(): Reports per-point acquisition time of the last sweep (wait for DATA_VALID + block read)
+//
+void printSweepTiming(int points, unsigned long totalMs, unsigned long waitTotal, unsigned long waitMax,
+                      unsigned long readTotal, unsigned long readMax) {
+  if (points == 0) return;
+  Serial.print("[INFO] Sweep timing: "); // INFO
+  Serial.print(points);
+  Serial.print(" points in ");
+  Serial.print(totalMs);
+  Serial.print(" ms (");
+  Serial.print(totalMs > 0 ? points * 1000.0 / totalMs : 0.0);
+  Serial.print(" points/s), wait avg ");
+  Serial.print(waitTotal / points);
+  Serial.print(" us max ");
+  Serial.print(waitMax);
+  Serial.print(" us, read avg ");
+  Serial.print(readTotal / points);
+  Serial.print(" us max ");
+  Serial.print(readMax);
+  Serial.println(" us");
+}
+
+//
+// Settling Bands (Mode 7 / settling profile)
+//
+void setUniformSettling(int cycles) {
+  numSettlingBands = 1;
+  settlingBandStart[0] = 0;
+  settlingBandCycles[0] = cycles;
+  ad5933.setSettlingCycles(cycles);
+}
+
+//
+// parseSettlingProfile(): Reads "S freq:cycles,freq:cycles,..." (ascending Hz) into the settling bands.
+// Each band starts at the first sweep point at or above its frequency; the first band always starts at point 0.
+//
+bool parseSettlingProfile(String command) {
+  int bandStart[MAX_SETTLING_BANDS];
+  int bandCycles[MAX_SETTLING_BANDS];
+  int count = 0;
+  int pos = 2;
+
+  while (pos < (int)command.length()) {
+    int sep = command.indexOf(',', pos);
+    if (sep == -1) sep = command.length();
+    int colon = command.indexOf(':', pos);
+    if (colon == -1 || colon > sep) return false;
+    long freq = command.substring(pos, colon).toInt();
+    int cycles = command.substring(colon + 1, sep).toInt();
+    if (cycles < 0 || cycles > 511) return false;
+
+    int point = 0;
+    if (freq > startFreq) point = (freq - startFreq + frequencyUnit - 1) / frequencyUnit;
+    if (point > numIncrements) break;  // Band lies beyond the sweep
+    if (count == 0) point = 0;
+    if (count > 0 && point < bandStart[count - 1]) return false;
+    if (count > 0 && point == bandStart[count - 1]) {
+      bandCycles[count - 1] = cycles;  // Narrower than one increment: the later band wins
+    } else {
+      if (count >= MAX_SETTLING_BANDS) return false;
+      bandStart[count] = point;
+      bandCycles[count] = cycles;
+      count++;
+    }
+    pos = sep + 1;
+  }
+  if (count == 0) return false;
+
+  numSettlingBands = count;
+  for (int b = 0; b < count; b++) {
+    settlingBandStart[b] = bandStart[b];
+    settlingBandCycles[b] = bandCycles[b];
+  }
+  return true;
+}
+
+void printSettlingProfile() {
+  Serial.print("[INFO] Settling profile: "); // INFO
+  for (int b = 0; b < numSettlingBands; b++) {
+    if (b > 0) Serial.print(", ");
+    Serial.print(startFreq + (long)settlingBandStart[b] * frequencyUnit);
+    Serial.print(" Hz:");
+    Serial.print(settlingBandCycles[b]);
+  }
+  Serial.println(" cycles");
+}
+
+int settlingBandLastPoint(int band) {
+  return (band + 1 < numSettlingBands) ? settlingBandStart[band + 1] - 1 : numIncrements;
+}
+
+//
+// startSweepSegment(): Programs the points and settling cycles of one band and starts its hardware sweep
+//
+bool startSweepSegment(int band) {
+  return startSweepPoints(settlingBandStart[band], settlingBandLastPoint(band), settlingBandCycles[band]);
+}
+
+bool startSweepPoints(int firstPoint, int lastPoint, int cycles) {
+  if (!(AD5933::setStartFrequency(startFreq + (unsigned long)firstPoint * frequencyUnit) &&
+        AD5933::setNumberIncrements(lastPoint - firstPoint) &&
+        ad5933.setSettlingCycles(cycles))) {
+    return false;
+  }
+  return AD5933::setPowerMode(POWER_STANDBY) &&
+         AD5933::setControlMode(CTRL_INIT_START_FREQ) &&
+         AD5933::setControlMode(CTRL_START_FREQ_SWEEP);
+}
+
+//
+// calibrateSegments(): AD5933::calibrate() band by band into the matching slices of gainOut[]/phaseOut[]
+//
+bool calibrateSegments(double *gainOut, double *phaseOut, int real[], int imag[]) {
+  for (int band = 0; band < numSettlingBands; band++) {
+    int firstPoint = settlingBandStart[band];
+    int count = settlingBandLastPoint(band) - firstPoint + 1;
+    if (!(AD5933::setStartFrequency(startFreq + (unsigned long)firstPoint * frequencyUnit) &&
+          AD5933::setNumberIncrements(count - 1) &&
+          ad5933.setSettlingCycles(settlingBandCycles[band]))) {
+      return false;
+    }
+    if (!AD5933::calibrate(gainOut + firstPoint, phaseOut + firstPoint, real + firstPoint, imag + firstPoint,
+                           refResist, count)) {
+      return false;
+    }
+  }
+  return true;
+}
+
+//
+// settlingAutoTune(): Mode 7. Sweeps Rcal once per candidate settling value (framed by Settling_Cycles->N);
+// the host finds where each frequency converges and answers with a per-band profile.
+//
+void settlingAutoTune() {
+  int savedBands = numSettlingBands;
+  int savedStart[MAX_SETTLING_BANDS];
+  int savedCycles[MAX_SETTLING_BANDS];
+  for (int b = 0; b < savedBands; b++) {
+    savedStart[b] = settlingBandStart[b];
+    savedCycles[b] = settlingBandCycles[b];
+  }
+
+  Serial.print("[INFO] Settling auto-tune: "); // INFO
+  Serial.print(NUM_SETTLING_CANDIDATES);
+  Serial.println(" candidates");
+  for (int c = 0; c < NUM_SETTLING_CANDIDATES; c++) {
+    numSettlingBands = 1;
+    settlingBandStart[0] = 0;
+    settlingBandCycles[0] = SETTLING_CANDIDATES[c];
+    Serial.print("Settling_Cycles->");
+    Serial.println(SETTLING_CANDIDATES[c]);
+    frequencySweepRaw(startFreq, frequencyUnit, numIncrements);
+  }
+  Serial.println("[INFO] Settling auto-tune complete.");
+
+  numSettlingBands = savedBands;
+  for (int b = 0; b < savedBands; b++) {
+    settlingBandStart[b] = savedStart[b];
+    settlingBandCycles[b] = savedCycles[b];
+  }
+
+  while (true) {
+    // PROMPT
+    Serial.print("Send settling profile (S freq:cycles,..., 0~511, or empty to keep): ");
+    flushSerialBuffer();
+    delay(10);
+    while (Serial.available() == 0) { }
+    String input = Serial.readStringUntil('\n');
+    input.trim();
+    if (input.length() == 0) {
+      Serial.println("[INFO] Settling profile unchanged.");
+      break;
+    }
+    if (input.startsWith("S ")) {
+      if (parseSettlingProfile(input)) {
+        printSettlingProfile();
+        break;
+      }
+    } else if (isDigit(input.charAt(0)) && input.toInt() <= 511) {
+      setUniformSettling(input.toInt());
+      Serial.print("[INFO] Set Settling Time Cycles: "); // INFO
+      Serial.println(input.toInt());
+      break;
+    }
+    Serial.println("[ERROR] Invalid settling profile. Use S freq:cycles,... with cycles 0~511.");
+  }
+}
+
+//
+// Auto-Ranging
+//
+double rangeStepLevel(int step) {
+  const double vpp[] = {2.0, 1.0, 0.4, 0.2};
+  return vpp[RANGE_STEP_RANGE[step] - 1] * RANGE_STEP_PGA[step];
+}
+
+int findRangeStep(int range, int pga) {
+  for (int step = 0; step < NUM_RANGE_STEPS; step++) {
+    if (RANGE_STEP_RANGE[step] == range && RANGE_STEP_PGA[step] == pga) return step;
+  }
+  return 0;
+}
+
+void printRangeStep(int step) {
+  Serial.print("Range ");
+  Serial.print(RANGE_STEP_RANGE[step]);
+  Serial.print(", PGA x");
+  Serial.print(RANGE_STEP_PGA[step]);
+}
+
+bool applyRangeStep(int step) {
+  const byte ranges[] = {CTRL_OUTPUT_RANGE_1, CTRL_OUTPUT_RANGE_2, CTRL_OUTPUT_RANGE_3, CTRL_OUTPUT_RANGE_4};
+  return ad5933.setRange(ranges[RANGE_STEP_RANGE[step] - 1]) &&
+         AD5933::setPGAGain(RANGE_STEP_PGA[step] == 1 ? PGA_GAIN_X1 : PGA_GAIN_X5);
+}
+
+double *rangeStepGain(int step) {
+  return (step == baseRangeStep) ? gain : rangeGain[step];
+}
+
+double *rangeStepPhase(int step) {
+  return (step == baseRangeStep) ? phase : rangePhase[step];
+}
+
+void clearRangeCalibrations() {
+  for (int step = 0; step < NUM_RANGE_STEPS; step++) {
+    delete[] rangeGain[step];
+    delete[] rangePhase[step];
+    rangeGain[step] = NULL;
+    rangePhase[step] = NULL;
+    rangeCalState[step] = RANGE_CAL_NONE;
+  }
+}
+
+//
+// ensureRangeCalibration(): Gain factors of a step other than the configured one, loaded from the host cache or
+// measured on Rcal on first use. A step where Rcal itself falls outside the raw window is not used.
+//
+bool ensureRangeCalibration(int step) {
+  if (step == baseRangeStep) return true;
+  if (rangeCalState[step] != RANGE_CAL_NONE) return rangeCalState[step] == RANGE_CAL_OK;
+
+  int numPoints = numIncrements + 1;
+  rangeGain[step] = new double[numPoints];
+  rangePhase[step] = new double[numPoints];
+  rangeCalState[step] = RANGE_CAL_UNUSABLE;
+
+  Serial.print("[INFO] Range calibration: "); // INFO
+  printRangeStep(step);
+  Serial.println();
+
+  bool loaded = loadCachedCalibration(rangeGain[step], rangePhase[step], step);
+  if (!loaded) {
+    int muxState = digitalRead(MUX_SWITCH_ADG849);
+    digitalWrite(MUX_SWITCH_ADG849, LOW);
+    Serial.println("[INFO] Performing calibration."); // INFO
+    printDieTemperature("[INFO] Calibration temperature: ", " C"); // INFO
+    int *real = new int[numPoints];
+    int *imag = new int[numPoints];
+    bool measured = applyRangeStep(step) && calibrateSegments(rangeGain[step], rangePhase[step], real, imag);
+    if (measured) {
+      Serial.println("[INFO] Calibration complete!"); // INFO
+      printCalibrationPoints(real, imag, rangePhase[step]);
+    } else {
+      Serial.println("[ERROR] Calibration failed...");
+    }
+    delete[] real;
+    delete[] imag;
+    digitalWrite(MUX_SWITCH_ADG849, muxState);
+    if (!measured) return false;
+  }
+
+  // Rcal magnitude back from the gain factor: gain = (1 / Rcal) / magnitude
+  for (int i = 0; i < numPoints; i++) {
+    double magnitude = 1.0 / (refResist * rangeGain[step][i]);
+    if (magnitude < RAW_MIN_MAGNITUDE || magnitude > RAW_MAX_MAGNITUDE) {
+      Serial.print("[WARNING] Rcal is outside the raw window at ");
+      printRangeStep(step);
+      Serial.println(". Step not used for auto-ranging.");
+      return false;
+    }
+  }
+  rangeCalState[step] = RANGE_CAL_OK;
+  return true;
+}
+
+//
+// targetRangeStep(): Step that should bring a point's raw magnitude into the window (its own step if it is inside
+// or no usable step is left). The magnitude of a clipped point is only a lower bound, so those only step down.
+//
+int targetRangeStep(int step, int real, int imag) {
+  double magnitude = sqrt(pow(real, 2) + pow(imag, 2));
+  bool tooHigh = magnitude > RAW_MAX_MAGNITUDE;
+  if (!tooHigh && magnitude >= RAW_MIN_MAGNITUDE) return step;
+  if (magnitude < 1.0) magnitude = 1.0;
+
+  double perLevel = magnitude / rangeStepLevel(step);
+  int fallback = step;
+  for (int s = NUM_RANGE_STEPS - 1; s >= 0; s--) {
+    if (tooHigh ? rangeStepLevel(s) >= rangeStepLevel(step) : rangeStepLevel(s) <= rangeStepLevel(step)) continue;
+    if (s != baseRangeStep && rangeCalState[s] == RANGE_CAL_UNUSABLE) continue;
+    if (perLevel * rangeStepLevel(s) <= RAW_TARGET_MAGNITUDE) return s;
+    fallback = s;  // Ends as the lowest step below / the nearest step above
+  }
+  return fallback;
+}
+
+//
+// measureRangeSegment(): Re-measures points first..last at a step (one hardware sweep per settling band)
+//
+bool measureRangeSegment(int step, int first, int last, int real[], int imag[], SweepTiming &timing) {
+  if (!applyRangeStep(step)) return false;
+  for (int band = 0; band < numSettlingBands; band++) {
+    int from = (settlingBandStart[band] > first) ? settlingBandStart[band] : first;
+    int to = (settlingBandLastPoint(band) < last) ? settlingBandLastPoint(band) : last;
+    if (from > to) continue;
+    if (!startSweepPoints(from, to, settlingBandCycles[band])) return false;
+    if (acquirePoints(from, to, real, imag, timing) <= to) return false;
+  }
+  return true;
+}
+
+//
+// autoRangeSweep(): Re-measures runs of out-of-window points at the step that fits them and stitches them into
+// real[]/imag[]; stepOf[] records the step of every point. Ends when nothing changes or after NUM_RANGE_STEPS passes.
+//
+void autoRangeSweep(int real[], int imag[], int stepOf[], int count, SweepTiming &timing) {
+  for (int pass = 0; pass < NUM_RANGE_STEPS; pass++) {
+    bool changed = false;
+    int i = 0;
+    while (i < count) {
+      int target = targetRangeStep(stepOf[i], real[i], imag[i]);
+      int last = i;
+      while (last + 1 < count && stepOf[last + 1] == stepOf[i] &&
+             targetRangeStep(stepOf[last + 1], real[last + 1], imag[last + 1]) == target) {
+        last++;
+      }
+      if (target != stepOf[i]) {
+        changed = true;  // Also when the step turns out unusable: the next pass picks another one
+        if (ensureRangeCalibration(target) && measureRangeSegment(target, i, last, real, imag, timing)) {
+          for (int k = i; k <= last; k++) stepOf[k] = target;
+          Serial.print("[INFO] Auto-range: "); // INFO
+          Serial.print(startFreq + (long)i * frequencyUnit);
+          Serial.print("-");
+          Serial.print(startFreq + (long)last * frequencyUnit);
+          Serial.print(" Hz (");
+          Serial.print(last - i + 1);
+          Serial.print(" points) at ");
+          printRangeStep(target);
+          Serial.println();
+        }
+      }
+      i = last + 1;
+    }
+    if (!changed) break;
+  }
+  applyRangeStep(baseRangeStep);
+
+  int outside = 0;
+  for (int i = 0; i < count; i++) {
+    double magnitude = sqrt(pow(real[i], 2) + pow(imag[i], 2));
+    if (magnitude < RAW_MIN_MAGNITUDE || magnitude > RAW_MAX_MAGNITUDE) outside++;
+  }
+  if (outside > 0) {
+    Serial.print("[WARNING] Auto-range: ");
+    Serial.print(outside);
+    Serial.println(" points still outside the raw window.");
   }
 }
\ No newline at end of file
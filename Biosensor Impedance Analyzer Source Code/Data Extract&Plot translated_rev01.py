@@ -4,41 +4,91 @@ import queue
 import time
 import sys
 import os
+import subprocess
 from prompt_toolkit import prompt
 from prompt_toolkit.patch_stdout import patch_stdout
 import pandas as pd
 import openpyxl
+import matplotlib
+# BIOSENSOR_REPLAY=<..._serial.log.gz> feeds a recorded session (biosensor_host.capture) back
+# through the same pipeline instead of the board, as fast as it can be processed
+replay_path = os.environ.get('BIOSENSOR_REPLAY')
+replaying = replay_path is not None
+# Headless (no display, or BIOSENSOR_HEADLESS=1): figures are rendered to report files
+# by a background process instead of opening windows that block acquisition
+headless = replaying or os.environ.get('BIOSENSOR_HEADLESS') == '1' or (sys.platform.startswith('linux') and not os.environ.get('DISPLAY'))
+if headless:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-import re
-from matplotlib import font_manager, rc
+from matplotlib import rc
 from matplotlib.ticker import ScalarFormatter
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, PatternFill, Alignment
+from biosensor_host.coordinates import parse_coordinate_spec, encode_coordinates, parse_target_spec, encode_group_segment
+from biosensor_host.scan_order import SCAN_ORDERS, scan_cost, schedule_targets, schedule_sequence, group_switches
+from biosensor_host.repeats import RepeatReducer, STATS_HEADERS
+from biosensor_host.columnar_store import ColumnarStore
+from biosensor_host.calibration_cache import CalibrationCache, calibration_rows, format_calibration_command
+from biosensor_host.calibration_history import CalibrationHistory, CalibrationDriftTracker
+from biosensor_host.thermal import TemperatureGainModel, compensate_rows, model_from_spec, model_spec
+from biosensor_host.settling import SettlingTuner, SettlingProfileStore, format_profile_command, parse_profile_line
+from biosensor_host.autorange import parse_range_prompt, range_settings, calibration_usable, raw_window_status
+from biosensor_host.impedance_plots import plot_impedance
+from biosensor_host.fitting import fit_headers, read_fit_csv, plot_parameter_maps
+from biosensor_host.reports import ReportWriter, resolve_font_family
+from biosensor_host.parsing import freq_hz, split_r_i, parse_calibration_line, measurement_row, measurement_row_bytes, parse_sweep_timing_line, parse_stage_timing_line, coord_label, coord_to_int, row_group, cell_value
+from biosensor_host.dialects import get_dialect
+from biosensor_host.capture import CaptureWriter, CapturingSerial, ReplaySerial
+from biosensor_host.serial_reader import LineReader
+from biosensor_host.metrics import StageMetrics, MetricsServer
+from biosensor_host.baud import BaudNegotiator, BASE_RATE
+from biosensor_host.diagonal import DRIFT_HEADERS, pass_drift, drift_rows, drift_summary
+from biosensor_host.screening import ElectrodeScreen, empty_skip_mask, update_skip_mask, split_targets, health_headers, health_rows, screening_summary
+from biosensor_host.baseline import BaselineStore, DeltaStore, DELTA_HEADERS, baseline_name, delta_rows, delta_summary, plot_delta_maps
+from biosensor_host.anomaly import AnomalyDetector, ANOMALY_HEADERS, anomaly_text
+from biosensor_host.kinetics import KineticsBuffer, KineticsArchive, KineticsLivePlot, DEFAULT_CAPACITY, DEFAULT_BIN_S, sweep_values
+from biosensor_host.session_archive import write_archive, ARCHIVE_EXTENSION
 
 # ------------------------
-# 0) Font and Serial Port Settings
+# 0) Font, Firmware Dialect and Serial Port Settings
 # ------------------------
-# This path is for a Korean font. It might not be necessary in an English environment.
-font_path = 'C:/Windows/Fonts/malgun.ttf' 
-try:
-    font_prop = font_manager.FontProperties(fname=font_path)
-    rc('font', family=font_prop.get_name())
-except Exception as e:
-    print(f"Font setting error: {e}")
-    # Fallback to a default font if the specified font is not found
-    rc('font', family='DejaVu Sans') 
+# Korean font (C:/Windows/Fonts/malgun.ttf) if present, else DejaVu Sans. The family name
+# is cached in the matplotlib cache directory, so the font file is only read once.
+font_family = resolve_font_family(cache_path=os.path.join(matplotlib.get_cachedir(), "biosensor_font.json"))
+rc('font', family=font_family)
 plt.rcParams['axes.unicode_minus'] = False
 
+# BIOSENSOR_DIALECT selects the firmware's message table (biosensor_host.dialects): english for
+# BoardProgram_translated.ino (default), korean for MainPCB.ino / MainPCBPython.ino
 try:
-    ser = serial.Serial('COM3', 115200, timeout=0.1)
-    time.sleep(0.1)
-    ser.reset_input_buffer()
-    ser.reset_output_buffer()
-    print("Successfully connected to the serial port.")
-except serial.SerialException as e:
-    print(f"Serial port error: {e}")
+    dialect = get_dialect(os.environ.get('BIOSENSOR_DIALECT', 'english'))
+except ValueError as e:
+    print(f"[ERROR] {e}")
     sys.exit(1)
 
+# BIOSENSOR_PORT overrides the port, e.g. the pty of biosensor_host.firmware_emulator
+serial_port = os.environ.get('BIOSENSOR_PORT', 'COM3')
+baud_rate = BASE_RATE
+if replaying:
+    # BIOSENSOR_REPLAY_SPEED paces the replay at that multiple of real time instead
+    try:
+        ser = ReplaySerial(replay_path, float(os.environ.get('BIOSENSOR_REPLAY_SPEED', 0)) or None)
+        dialect = get_dialect(os.environ.get('BIOSENSOR_DIALECT') or ser.header.get('dialect', 'english'))
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Cannot replay '{replay_path}': {e}")
+        sys.exit(1)
+    print(f"[INFO] Replaying '{replay_path}' ({ser.header.get('port')}, {dialect.name} firmware).")
+else:
+    try:
+        ser = serial.Serial(serial_port, baud_rate, timeout=0.1)
+        time.sleep(0.1)
+        ser.reset_input_buffer()
+        ser.reset_output_buffer()
+        print("Successfully connected to the serial port.")
+    except serial.SerialException as e:
+        print(f"Serial port error: {e}")
+        sys.exit(1)
+
 # ------------------------
 # 1) Global Variables and Excel Initialization
 # ------------------------
@@ -47,8 +97,15 @@ prompt_queue = queue.Queue()
 calibration_runs = []      # Stores information for each calibration run
 calibration_data = []      # Stores calibration data
 
-measurement_data = []      # Accumulates single sweep data (Modes 1, 2, 3) on success
-range_data = []            # Accumulates range sweep data (Modes 4, 5) on success
+measurement_data = []      # Accumulates single sweep data (Modes 1, 2) on success
+range_data = []            # Accumulates framed sweep data (Modes 3, 4, 5, 6, 8) on success
+                           # (Mode 10 kinetics sweeps go to the kinetics ring buffer instead)
+
+# Columns of a measurement row; every calibration run gets a block this wide
+HEADER_FIELDS = ['Freq (Hz)', 'R / I', '|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance', 'X', 'Y', 'Group', 'Temp (C)']
+
+# Measurement types that use the SWEEP_START/SWEEP_DONE + STORE_OK handshake
+RANGE_MEASUREMENT_TYPES = ['COB-diagonal', 'COB-range', 'COB-range-step', 'COB-list', 'COB-multi-group', 'COB-kinetics']
 
 current_mode = None
 xAddrStr = ""
@@ -61,9 +118,21 @@ currentCoord = None
 next_x = None
 next_y = None
 
+scan_order = None          # Scan order reported by the firmware for the current range sweep
+scan_sequence = []         # Coordinates (int X, int Y, group) in the order they were visited
+group_plan = None          # Multi-Group Scan (Mode 8) segments still to send, None outside a scan
+sweep_timings = []         # Per-sweep acquisition timing reported by the firmware ([INFO] Sweep timing)
+
+repeat_count = 1           # Sweeps per coordinate reported by the firmware
+current_repeat = 0
+repeat_reducer = None      # Collects the repeats of the current coordinate
+store_raw_repeats = False  # Also keep every raw repeat in the columnar store (.npz next to the workbook)
+raw_store = None
+ws_stats = None            # "Repeat Statistics" sheet, created on first use
+
 range_sweep_complete = threading.Event()
 
-save_directory = "C:/Users/Hyunseo/OneDrive/Desktop/Data"
+save_directory = os.environ.get('BIOSENSOR_DATA_DIR', "C:/Users/Hyunseo/OneDrive/Desktop/Data")
 base_filename = "measurement_data"
 file_extension = "xlsx"
 
@@ -77,6 +146,155 @@ def get_unique_filename(directory, base_name, extension):
 
 excel_filename = get_unique_filename(save_directory, base_filename, file_extension)
 
+# Headless reports: one file per sweep / fit in <workbook>_reports, plus a session PDF at exit
+report_formats = ['png', 'pdf']   # any of png, svg, pdf
+report_writer = None
+if headless:
+    session_name = os.path.splitext(os.path.basename(excel_filename))[0]
+    report_writer = ReportWriter(os.path.splitext(excel_filename)[0] + "_reports", report_formats,
+                                 session_name, font_family)
+    print(f"[INFO] Headless mode: reports are written to '{report_writer.directory}'.")
+
+# Raw capture: every line read from and written to the board, with monotonic timestamps, in
+# <workbook>_serial.log.gz; replay it with BIOSENSOR_REPLAY to re-run the session without the board
+capture_raw_stream = True
+if capture_raw_stream and not replaying:
+    capture_path = os.path.splitext(excel_filename)[0] + "_serial.log.gz"
+    ser = CapturingSerial(ser, CaptureWriter(capture_path, port=serial_port, baud=baud_rate, dialect=dialect.name))
+    print(f"[INFO] Capturing the serial stream to '{capture_path}'.")
+
+# read_from_port() takes its lines from a LineReader: the port is drained in bulk into one
+# reusable buffer instead of readline()'s byte-at-a-time reads, and measurement lines are
+# parsed from the raw bytes (biosensor_host.serial_reader). A replay already yields lines.
+reader = ser if replaying else LineReader(ser)
+
+# Session archive: at exit the workbook's values are also packed into <workbook>.bsa, integer
+# columns delta-encoded and compressed (biosensor_host.session_archive); a fraction of the
+# .xlsx size, loads in milliseconds and restores the same cell values
+archive_session = True
+archive_compressor = 'lzma'   # lzma, zlib or bz2
+
+# Stage metrics: latency histogram per pipeline stage (host and board-reported), served at
+# http://127.0.0.1:<metrics_port>/metrics and summarized when a sweep ends
+metrics_port = 9101        # None to disable the endpoint
+stage_metrics = StageMetrics()
+metrics_server = None
+if metrics_port:
+    try:
+        metrics_server = MetricsServer(stage_metrics, metrics_port)
+        print(f"[INFO] Stage metrics at {metrics_server.url}")
+    except OSError as e:
+        print(f"[WARNING] Stage metrics endpoint not started on port {metrics_port}: {e}")
+
+# Link speed: at a mode prompt the host negotiates the fastest rate the board offers that passes
+# the CRC-checked probe (biosensor_host.baud); repeated short sweeps step it down again
+negotiate_baud = True
+baud_negotiator = BaudNegotiator() if negotiate_baud and dialect.handshake and not replaying else None
+
+# Calibration cache: a matching, unexpired calibration is uploaded instead of re-measured
+reuse_cached_calibration = True
+calibration_cache = CalibrationCache(os.path.join(save_directory, "calibration_cache.json"))
+cal_settings = {}          # Sweep settings reported by the firmware ([INFO] Set ... lines)
+pending_cal_points = []    # Raw (R, I) of the calibration being received
+cached_cal_entry = None    # Cache entry chosen for upload
+
+# Calibration drift: every calibration is compared with the previous one of the same settings, and
+# the drift rate fitted over the history decides how long the cache may reuse a calibration
+track_calibration_drift = True
+# A replay keeps its history in memory; old sessions must not enter the drift fit twice
+calibration_history = CalibrationHistory(None if replaying else os.path.join(save_directory, "calibration_history.json"))
+calibration_tracker = CalibrationDriftTracker(calibration_history)
+
+# Die temperature: the firmware samples it at every calibration and at the start of every framed
+# sweep. Calibrations of the same settings at different temperatures form a temperature model
+# (biosensor_host.thermal) that moves each sweep to the gain predicted at its temperature, so a
+# warming board keeps measuring instead of being recalibrated
+compensate_temperature = True
+cal_temperature = None     # Die temperature of the calibration being received
+sweep_temperature = None   # Die temperature at the start of the current framed sweep
+last_temperature = None    # Latest die temperature reported
+thermal_model = None       # (TemperatureGainModel, calibration temperature, calibration points) in use
+temperature_warned = False
+auto_ranged_freqs = []     # (start Hz, end Hz) of the current sweep re-measured at another range step
+
+# Settling profiles: Mode 7 tunes settling cycles per frequency band; a stored profile answers the settling prompt
+use_settling_profile = True
+settling_profiles = SettlingProfileStore(os.path.join(save_directory, "settling_profiles.json"))
+settling_tuner = None      # Collects the Mode 7 sweeps
+tuned_settling_bands = None  # Result of the last Mode 7 run, sent back to the firmware
+
+# Auto-ranging: the firmware re-measures out-of-window segments at another output range / PGA gain
+use_auto_range = True
+auto_range_active = False  # Reported by the firmware ([INFO] Auto-ranging: On/Off)
+range_cal_settings = None  # Cache settings of the range-step calibration being received
+range_cal_entry = None     # Cache entry chosen for a range-step upload
+auto_range_segments = 0    # Segments re-measured during the current sweep(s)
+out_of_window = []         # Frequencies whose raw magnitude stayed outside the window
+
+# Equivalent-circuit fitting: each range sweep is kept as typed columns and fitted when it completes
+fit_model = 'r_cpe'        # 'randles', 'r_cpe' or None to skip fitting
+fit_workers = None         # Processes for the fit (None: all cores)
+sweep_store = None         # Columns of the current range sweep (.npz next to the workbook)
+range_sweep_number = 0
+ws_fit = None              # "Equivalent Circuit Fit" sheet, created on first use
+
+# Diagonal sweep (Mode 3): the forward and reverse passes go to separate stores, and the drift between
+# them is written to a sheet when the sweep completes
+diagonal_pass = None       # 'forward' / 'reverse' while a diagonal sweep runs
+diagonal_stores = {}       # pass -> ColumnarStore (.npz next to the workbook)
+diagonal_sweep_number = 0
+ws_drift = None            # "Diagonal Drift" sheet, created on first use
+
+# Electrode screening (Mode 9): open / shorted electrodes found by the screening pass are left out of
+# the coordinate lists of later Mode 6 / Mode 8 scans (biosensor_host.screening)
+use_screening_mask = True
+screen_open_ohms = None    # None: OPEN_FACTOR x the calibration impedance
+screen_short_ohms = None   # None: SHORT_FACTOR x the calibration impedance
+electrode_screen = None    # Collects the points of the running screening pass
+skip_mask = empty_skip_mask()
+screening_number = 0
+ws_health = None           # "Electrode Health" sheet, created on first use
+
+# Baselines: with a chip id set, every range sweep is either recorded as the chip's per-electrode
+# baseline (BIOSENSOR_BASELINE=record) or differenced against it as it arrives (compare), and the
+# |Z| / phase delta maps are drawn when the range sweep completes (biosensor_host.baseline).
+# A replay compares against the stored baseline but never records one
+chip_id = os.environ.get('BIOSENSOR_CHIP_ID')   # None: no baselines
+baseline_mode = os.environ.get('BIOSENSOR_BASELINE', 'compare')   # 'record' or 'compare'
+baseline_store = None      # BaselineStore of the chip and the current frequency grid
+delta_store = None         # Deltas of the current range sweep (.npz next to the workbook)
+delta_sweep_number = 0
+ws_delta = None            # "Baseline Delta" sheet, created on first use
+
+# Anomaly detection: every point of a framed sweep is checked as it is parsed (biosensor_host.anomaly).
+# A flagged sweep is answered with REMEASURE instead of STORE_OK, so the board sweeps the coordinate
+# again while the MUX is still on it; the retry is kept whatever it shows, its anomalies listed in a sheet
+detect_anomalies = True
+remeasure_anomalies = True
+anomaly_detector = AnomalyDetector()
+remeasure_pending = False  # The next sweep is the board's last try at this coordinate
+anomaly_counts = {'flagged': 0, 'remeasured': 0, 'kept': 0}
+ws_anomaly = None          # "Anomalies" sheet, created on first use
+
+# Kinetics (Mode 10): the board loops the selected electrodes until the set number of cycles or a STOP.
+# Every sweep goes to a fixed-size ring buffer per electrode (drawn live, saved as an .npz snapshot at
+# the end) and to a CSV archive averaged over kinetics_bin_s; the workbook only gets a summary row.
+# Closing the live plot window sends STOP (biosensor_host.kinetics)
+kinetics_capacity = DEFAULT_CAPACITY   # Sweeps kept per electrode
+kinetics_bin_s = DEFAULT_BIN_S         # Archive averaging window (s)
+kinetics_plot_freq = None  # Frequency (Hz) drawn over time, None: middle of the sweep
+kinetics_electrodes = None # Electrode count reported by the firmware
+kinetics_buffer = None
+kinetics_archive = None
+kinetics_plot = None
+kinetics_number = 0
+kinetics_time_ms = 0       # Board time of the sweep being received
+kinetics_stop_sent = False
+kinetics_update = threading.Event()
+kinetics_done = threading.Event()
+kinetics_snapshot = None   # Snapshot (.npz) of the finished run, for the main loop
+ws_kinetics = None         # "Kinetics" sheet, created on first use
+
 wb = openpyxl.Workbook()
 ws = wb.active
 ws.title = "Measurement Data"
@@ -89,17 +307,22 @@ actual_count = 0
 in_sweep = False
 temp_data = []
 
+def save_workbook():
+    # A replay writes the workbook once at exit
+    if not replaying:
+        wb.save(excel_filename)
+
 def initialize_new_calibration_run(run_number):
     global current_calibration_run
     run_number = current_calibration_run
-    start_col = 1 + 8 * run_number
+    start_col = 1 + len(HEADER_FIELDS) * run_number
     start_col_letter = get_column_letter(start_col)
     start_row = 1
     ws.cell(row=start_row, column=start_col, value="Set Calibration Impedance: ")
     cal_headers = ['Cal Point', 'R / I', '|Z|', 'System Phase']
     for i, header in enumerate(cal_headers):
         ws.cell(row=start_row + 1, column=start_col + i, value=header)
-    wb.save(excel_filename)
+    save_workbook()
     print(f"Calibration Run {run_number} initialized. Starting column: {start_col_letter}")
     calibration_runs.append({'run_number': run_number, 'start_col': start_col, 'data': []})
 
@@ -108,85 +331,10 @@ print(f"Excel file '{excel_filename}' has been created.")
 sweep_complete = threading.Event()
 
 # ------------------------
-# 2) Function to Identify Prompt Lines
-# ------------------------
-def is_prompt_line(line):
-    # These patterns must exactly match the prompts sent from the Arduino.
-    prompt_patterns = [
-        r"^Enter the start frequency",
-        r"^Enter the frequency increment",
-        r"^Enter the number of measurements",
-        r"^Enter Settling Time Cycles",
-        r"^Select Output Excitation Range",
-        r"^Select PGA Gain",
-        r"^Enter Calibration Impedance",
-        r"^Select MUX group",
-        r"^X Axis Address",
-        r"^Y Axis Address",
-        r"^Set AD5933 Mode",
-        r"^\s*Bit", # Matches "Bit" with any leading whitespace
-        r"^Is this range correct\? \(Y/N\)",
-        r"^Enter X-axis increment unit",
-        r"^Enter Y-axis increment unit"
-    ]
-    line_stripped = line.strip()
-    for pattern in prompt_patterns:
-        if re.search(pattern, line_stripped):
-            return True
-    return False
-
-# ------------------------
-# 3) Data Parsing/Processing Functions
+# 2) Data Parsing/Processing Functions
 # ------------------------
-def parse_calibration_line(line):
-    try:
-        pattern = r"Cal Point (\d+):\s+R=(-?\d+) / I=(-?\d+)\s+\|Z\|=([\d.]+)\s+System Phase=([\d.+-]+) degrees"
-        match = re.match(pattern, line)
-        if match:
-            cal_point = f"Cal Point {match.group(1)}"
-            r_i = f"R={match.group(2)} / I={match.group(3)}"
-            z = match.group(4)
-            phase = f"{match.group(5)} degrees"
-            return [cal_point, r_i, z, phase]
-        else:
-            return None
-    except Exception as e:
-        print(f"Calibration data parsing error: {e} - Line: {line}")
-        return None
-
-def parse_measurement_line(line):
-    # This function is modified to handle "ovf" (overflow) values from the Arduino.
-    try:
-        # Regex pattern that accepts either a floating point number or the string "ovf"
-        value_pattern = r"([-+]?\d+\.\d+|ovf)"
-        pattern = (
-            r"(\d+\.\d+)kHz:\s+R=(-?\d+)/I=(-?\d+)\s+"
-            rf"\|Z\|={value_pattern}\s+"
-            rf"Phase=([-+]?\d+\.\d+)\s+degrees\s+" # Phase usually doesn't overflow
-            rf"Resistance={value_pattern}\s+"
-            rf"Reactance={value_pattern}"
-        )
-        match = re.match(pattern, line)
-        if match:
-            freq_khz = float(match.group(1))
-            freq = f"{int(freq_khz * 1000)} Hz"
-            r_i = f"R={match.group(2)} / I={match.group(3)}"
-            
-            # Helper function to convert "ovf" to 0.0 or a large number, or parse float
-            def parse_value(v_str):
-                return 0.0 if v_str == 'ovf' else float(v_str)
-
-            impedance = parse_value(match.group(4))
-            phase = float(match.group(5)) # Phase is assumed to be a number
-            resistance = parse_value(match.group(6))
-            reactance = parse_value(match.group(7))
-            
-            return [freq, r_i, impedance, phase, resistance, reactance]
-        else:
-            return None
-    except (IndexError, ValueError) as e:
-        print(f"Measurement data parsing error: {e} - Line: {line}")
-        return None
+# parse_calibration_line() / measurement_row() live in biosensor_host.parsing; lines are
+# classified by the dialect's compiled dispatcher in read_from_port()
 
 def add_headers(current_run, headers):
     start_col = current_run['start_col']
@@ -199,16 +347,28 @@ def add_headers(current_run, headers):
         cell.fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
         cell.alignment = Alignment(horizontal='center', vertical='center')
     current_run['current_row'] += 1
-    wb.save(excel_filename)
+    save_workbook()
     print(f"Headers added: {headers}")
 
-HEADER_FIELDS = ['Freq (Hz)', 'R / I', '|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance', 'X', 'Y']
+
+# Excel label written when a measurement type starts ('start' events)
+START_LABELS = {
+    'Rcal': "Checking impedance at Rcal position.",
+    'COB': "Checking impedance of COB.",
+    'COB-range': "Starting COB Range Sweep (7-bit input).",
+    'COB-range-step': "Starting COB Range Step Sweep (X/Y increment setting).",
+    'COB-list': "Starting COB Coordinate List Sweep (host-supplied list).",
+    'COB-multi-group': "Starting Multi-Group Scan (host-scheduled segments).",
+    'COB-diagonal': "Starting Diagonal Sweep (forward and reverse passes).",
+    'COB-screening': "Starting Electrode Screening (open/short check).",
+    'COB-kinetics': "Starting Kinetics (time series of selected electrodes).",
+}
 
 # ------------------------
-# 4) Function to Plot Averages and Individual R/I by Frequency
+# 3) Function to Plot Averages and Individual R/I by Frequency
 # ------------------------
 def plot_average_by_frequency(data, mode_label=""):
-    cols = ['freq (Hz)', 'R / I', '|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance', 'X', 'Y']
+    cols = ['freq (Hz)', 'R / I', '|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance', 'X', 'Y', 'Group', 'Temp (C)']
     df = pd.DataFrame(data, columns=cols)
     if df.empty:
         print("No data to plot.")
@@ -219,7 +379,7 @@ def plot_average_by_frequency(data, mode_label=""):
     for col in ['|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance']:
         df[col] = pd.to_numeric(df[col], errors='coerce')
 
-    df['Coord'] = df.apply(lambda row: f"X={row['X']},Y={row['Y']}", axis=1)
+    df['Coord'] = df.apply(lambda row: coord_label(row['X'], row['Y'], row['Group']), axis=1)
     df_avg = df.groupby('Frequency', as_index=False)[['|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance']].mean()
 
     def extract_r_i(r_i_str):
@@ -282,6 +442,8 @@ def plot_average_by_frequency(data, mode_label=""):
         title_label = "COB Range Sweep"
     elif mode_label == '5':
         title_label = "COB Range Step Sweep"
+    elif mode_label == '6':
+        title_label = "COB Coordinate List Sweep"
     else:
         title_label = "Impedance"
         
@@ -290,10 +452,10 @@ def plot_average_by_frequency(data, mode_label=""):
     plt.show()
 
 # ------------------------
-# 5) Function to Plot Raw Data (Individual)
+# 4) Function to Plot Raw Data (Individual)
 # ------------------------
 def plot_data(data, mode_label=""):
-    cols = ['freq (Hz)', 'R / I', '|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance', 'X', 'Y']
+    cols = ['freq (Hz)', 'R / I', '|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance', 'X', 'Y', 'Group', 'Temp (C)']
     df = pd.DataFrame(data, columns=cols)
     if df.empty:
         print("No data to plot.")
@@ -311,7 +473,7 @@ def plot_data(data, mode_label=""):
 
     df[['R', 'I']] = df['R / I'].apply(lambda x: pd.Series(extract_r_i(x)))
     df = df.dropna(subset=['R','I'])
-    df['Coord'] = df.apply(lambda row: f"X={row['X']},Y={row['Y']}", axis=1)
+    df['Coord'] = df.apply(lambda row: coord_label(row['X'], row['Y'], row['Group']), axis=1)
 
     if mode_label == '2':
         suptitle = "Rcal Position Impedance Measurement Results"
@@ -321,6 +483,8 @@ def plot_data(data, mode_label=""):
         suptitle = "COB Range Sweep Results"
     elif mode_label == '5':
         suptitle = "COB Range Step Sweep Results"
+    elif mode_label == '6':
+        suptitle = "COB Coordinate List Sweep Results"
     else:
         suptitle = "Impedance Measurement Results"
 
@@ -383,7 +547,7 @@ def plot_data(data, mode_label=""):
     plt.show()
 
 # ------------------------
-# 6) Function to Write Temporary Data to Excel (for Range Sweep only)
+# 5) Function to Write Temporary Data to Excel (for Range Sweep only)
 # ------------------------
 def write_temp_data_to_excel(temp_data):
     global measurement_type, measurement_data, range_data
@@ -402,267 +566,1150 @@ def write_temp_data_to_excel(temp_data):
     for row_data in temp_data:
         measurement_row = current_run['current_row']
         for i, datum in enumerate(row_data):
-            ws.cell(row=measurement_row, column=start_col + i, value=datum)
+            ws.cell(row=measurement_row, column=start_col + i, value=cell_value(datum))
         current_run['current_row'] += 1
-        if measurement_type in ['COB-range', 'COB-range-step']:
+        if measurement_type in RANGE_MEASUREMENT_TYPES:
             range_data.append(row_data)
 
-    wb.save(excel_filename)
+    if measurement_type == 'COB-diagonal':
+        store_diagonal_sweep(temp_data)
+    elif fit_model and measurement_type in RANGE_MEASUREMENT_TYPES:
+        store_sweep_for_fit(temp_data)
+    if chip_id and measurement_type in RANGE_MEASUREMENT_TYPES:
+        apply_baseline(temp_data)
+
+    save_workbook()
     print(f"[INFO] Successfully wrote {len(temp_data)} items from temp_data to Excel.")
 
+def store_sweep_for_fit(temp_data):
+    global sweep_store, range_sweep_number
+    if sweep_store is None:
+        range_sweep_number += 1
+        sweep_store = ColumnarStore(os.path.splitext(excel_filename)[0] + f"_range_sweep_{range_sweep_number}.npz")
+    sweep_store.append_sweep(temp_data)
+
+def store_diagonal_sweep(temp_data):
+    global diagonal_sweep_number
+    if diagonal_pass is None:
+        return
+    if not diagonal_stores:
+        diagonal_sweep_number += 1
+    if diagonal_pass not in diagonal_stores:
+        diagonal_stores[diagonal_pass] = ColumnarStore(
+            os.path.splitext(excel_filename)[0] + f"_diagonal_{diagonal_sweep_number}_{diagonal_pass}.npz")
+    diagonal_stores[diagonal_pass].append_sweep(temp_data)
+
+def finish_diagonal_sweep():
+    # Save both passes and write the reverse - forward drift of every point
+    global ws_drift, diagonal_stores
+    stores, diagonal_stores = diagonal_stores, {}
+    for store in stores.values():
+        store.save()
+    if 'forward' not in stores or 'reverse' not in stores:
+        print("[WARNING] Diagonal sweep without both passes. No drift computed.")
+        return
+    try:
+        drift = pass_drift(stores['forward'].columns(), stores['reverse'].columns())
+    except ValueError as e:
+        print(f"[WARNING] Diagonal drift not computed: {e}")
+        return
+    if ws_drift is None:
+        ws_drift = wb.create_sheet("Diagonal Drift")
+    ws_drift.append(['Diagonal Sweep'] + DRIFT_HEADERS)
+    for cell in ws_drift[ws_drift.max_row]:
+        cell.font = Font(bold=True)
+    for row in drift_rows(drift, group=int(group_selected) if group_selected else "N/A"):
+        ws_drift.append([diagonal_sweep_number] + row)
+    save_workbook()
+    print(f"[INFO] Diagonal drift (reverse - forward pass) of {len(drift['x'])} coordinates:")
+    for summary_line in drift_summary(drift):
+        print(f"[INFO]   {summary_line}")
+
+def open_baseline():
+    # Baseline store of the chip for the frequency grid of the current settings, None if unknown
+    global baseline_store
+    grid = [cal_settings.get(key) for key in ('start_freq', 'freq_increment', 'num_increments')]
+    if None in grid:
+        return None
+    start_freq, freq_increment, num_increments = grid
+    name = baseline_name(chip_id, start_freq, freq_increment, num_increments + 1)
+    if baseline_store is not None and os.path.basename(baseline_store.path) == name:
+        return baseline_store
+    if baseline_store is not None:
+        baseline_store.flush()
+    recording = baseline_mode == 'record' and not replaying
+    baseline_store = BaselineStore(os.path.join(save_directory, "baselines"), chip_id, start_freq, freq_increment,
+                                   num_increments + 1, writable=recording)
+    if recording:
+        print(f"[INFO] Recording the baseline of chip {chip_id} to '{baseline_store.path}'.")
+    elif baseline_mode == 'record':
+        print(f"[INFO] Replay: the baseline of chip {chip_id} is not re-recorded.")
+    elif not baseline_store.exists():
+        print(f"[WARNING] No baseline of chip {chip_id} for {start_freq} Hz + {num_increments} x {freq_increment} Hz. "
+              "Record one with BIOSENSOR_BASELINE=record.")
+    else:
+        updated = baseline_store.info.get('updated')
+        recorded = time.strftime('%Y-%m-%d %H:%M', time.localtime(updated)) if updated else "unknown"
+        print(f"[INFO] Comparing against the baseline of chip {chip_id} "
+              f"({baseline_store.info.get('electrodes', 0)} electrodes, recorded {recorded}).")
+    return baseline_store
+
+def apply_baseline(temp_data):
+    # Record one coordinate's sweep as its baseline, or write its delta against the baseline
+    global delta_store, delta_sweep_number, ws_delta
+    x, y = coord_to_int(temp_data[0][6]), coord_to_int(temp_data[0][7])
+    store = open_baseline() if x is not None and y is not None else None
+    if store is None or not store.exists():
+        return
+    group = row_group(temp_data[0]) or 0
+    freqs = [freq_hz(row[0]) for row in temp_data]
+    impedance = [row[2] for row in temp_data]
+    phase = [row[3] for row in temp_data]
+    if store.writable:
+        store.record(group, x, y, freqs, impedance, phase)
+        return
+    if baseline_mode == 'record':
+        return
+    delta = store.delta(group, x, y, freqs, impedance, phase)
+    label = coord_label(temp_data[0][6], temp_data[0][7], group)
+    if delta is None:
+        print(f"[INFO] No baseline for {label}.")
+        return
+    if delta_store is None:
+        delta_sweep_number += 1
+        delta_store = DeltaStore(os.path.splitext(excel_filename)[0] + f"_baseline_delta_{delta_sweep_number}.npz")
+    delta_store.append(delta)
+    if ws_delta is None:
+        ws_delta = wb.create_sheet("Baseline Delta")
+        ws_delta.append(['Range Sweep'] + DELTA_HEADERS)
+        for cell in ws_delta[ws_delta.max_row]:
+            cell.font = Font(bold=True)
+    for row in delta_rows(delta):
+        ws_delta.append([delta_sweep_number] + row)
+    print(f"[INFO] Baseline delta {label}: {delta_summary(delta)}")
+
+def finish_baseline():
+    # Flush a recorded baseline; save and draw the delta maps of the range sweep
+    global delta_store
+    if baseline_store is not None and baseline_store.writable:
+        baseline_store.flush()
+        print(f"[INFO] Baseline of chip {chip_id}: {baseline_store.info['electrodes']} electrodes recorded.")
+    if delta_store is None:
+        return
+    store, delta_store = delta_store, None
+    store.save()
+    title = f"Delta against baseline, chip {chip_id}, range sweep {delta_sweep_number}"
+    if report_writer:
+        report_writer.submit_delta(store.path, title)
+    else:
+        plot_delta_maps(store.columns(), title=title)
+
+def finish_screening(summary_fields):
+    # Classify the screened electrodes, write them to the health sheet and update the skip mask
+    global electrode_screen, screening_number, ws_health
+    screen, electrode_screen = electrode_screen, None
+    if not screen:
+        print("[WARNING] Electrode screening produced no points.")
+        return
+    rcal = cal_settings.get('rcal')
+    if rcal is None and (screen_open_ohms is None or screen_short_ohms is None):
+        print("[WARNING] Calibration impedance unknown. Electrodes not classified.")
+        return
+    result = screen.classify(rcal, auto_ranged=auto_range_active, open_ohms=screen_open_ohms,
+                             short_ohms=screen_short_ohms)
+    update_skip_mask(skip_mask, result)
+    screening_number += 1
+    if ws_health is None:
+        ws_health = wb.create_sheet("Electrode Health")
+    ws_health.append(['Screening'] + health_headers(result['freq']))
+    for cell in ws_health[ws_health.max_row]:
+        cell.font = Font(bold=True)
+    for row in health_rows(result):
+        ws_health.append([screening_number] + row)
+    save_workbook()
+    segments, points, elapsed_ms = (int(field) for field in summary_fields)
+    counts, bad_lines = screening_summary(result)
+    print(f"[INFO] Electrode screening: {points} coordinates in {segments} segment(s), "
+          f"{elapsed_ms / 1000.0:.1f} s -> {counts}.")
+    for bad_line in bad_lines:
+        print(f"[INFO]   {bad_line}")
+    if use_screening_mask and (result['status'] != 'nominal').any():
+        print("[INFO] Open / shorted electrodes are skipped in the following coordinate list and multi-group scans.")
+
+def store_kinetics(temp_data):
+    # One kinetics sweep into the ring buffer and the archive
+    global kinetics_buffer, kinetics_archive, kinetics_number
+    if kinetics_buffer is not None and kinetics_archive is None:
+        # The run was already closed (interrupted)
+        return
+    freqs, impedance, phase = sweep_values(temp_data)
+    if kinetics_buffer is None:
+        kinetics_number += 1
+        path = os.path.splitext(excel_filename)[0] + f"_kinetics_{kinetics_number}.csv"
+        kinetics_buffer = KineticsBuffer(freqs, kinetics_electrodes or 1, kinetics_capacity)
+        kinetics_archive = KineticsArchive(path, freqs, kinetics_bin_s)
+        print(f"[INFO] Kinetics archive: '{path}' ({kinetics_bin_s:g} s bins), "
+              f"last {kinetics_capacity} sweeps per electrode kept for the plot.")
+    if len(freqs) != len(kinetics_buffer.freqs):
+        print(f"[WARNING] Kinetics sweep with {len(freqs)} points instead of {len(kinetics_buffer.freqs)}. Not stored.")
+        return
+    electrode = (int(group_selected) if group_selected else 0, int(currentCoord[0], 2), int(currentCoord[1], 2))
+    t = kinetics_time_ms / 1000.0
+    if not kinetics_buffer.append(electrode, t, impedance, phase):
+        print(f"[WARNING] Kinetics buffer holds {len(kinetics_buffer.electrodes)} electrodes. "
+              f"{coord_label(currentCoord[0], currentCoord[1], electrode[0])} not stored.")
+        return
+    kinetics_archive.add(electrode, t, impedance, phase)
+    kinetics_update.set()
+
+def finish_kinetics(summary_fields=None):
+    # Close the archive, save the ring buffer snapshot and write the run's summary row
+    global kinetics_archive, ws_kinetics
+    if kinetics_archive is None:
+        return None
+    archive, kinetics_archive = kinetics_archive, None
+    archive.close()
+    snapshot_path = os.path.splitext(archive.path)[0] + ".npz"
+    kinetics_buffer.save(snapshot_path)
+    sweeps = int(kinetics_buffer.count.sum())
+    if summary_fields:
+        cycles, elapsed_s = int(summary_fields[0]), int(summary_fields[1]) / 1000.0
+    else:
+        cycles, elapsed_s = "interrupted", kinetics_time_ms / 1000.0
+    if ws_kinetics is None:
+        ws_kinetics = wb.create_sheet("Kinetics")
+        ws_kinetics.append(['Kinetics Run', 'Cycles', 'Duration (s)', 'Electrodes', 'Sweeps', 'Archive',
+                            'Archive Rows', 'Snapshot'])
+        for cell in ws_kinetics[ws_kinetics.max_row]:
+            cell.font = Font(bold=True)
+    ws_kinetics.append([kinetics_number, cycles, elapsed_s, len(kinetics_buffer.electrodes), sweeps,
+                        os.path.basename(archive.path), archive.rows, os.path.basename(snapshot_path)])
+    save_workbook()
+    print(f"[INFO] Kinetics run {kinetics_number}: {sweeps} sweeps of {len(kinetics_buffer.electrodes)} electrode(s) "
+          f"in {elapsed_s:.1f} s, {archive.rows} archive rows in '{archive.path}'.")
+    return snapshot_path
+
+def poll_kinetics_plot():
+    # Keep the live plot responsive; closing it stops the run after the current cycle
+    global kinetics_stop_sent
+    if kinetics_plot is None or kinetics_stop_sent or kinetics_archive is None:
+        return
+    if kinetics_plot.is_open():
+        kinetics_plot.fig.canvas.flush_events()
+        return
+    kinetics_stop_sent = True
+    print("[INFO] Kinetics plot closed. Sending STOP (the current cycle finishes first).")
+    ser.write(b"STOP\n")
+
+def drop_screened(targets):
+    # (group, x, y) targets without the electrodes the screening marked open / shorted
+    if not use_screening_mask:
+        return targets
+    kept, skipped = split_targets(skip_mask, targets)
+    if skipped:
+        print(f"[INFO] Skipping {len(skipped)} screened-out electrode(s): "
+              + "; ".join(coord_label(f"{x:07b}", f"{y:07b}", group) for group, x, y in skipped[:10])
+              + (f" and {len(skipped) - 10} more" if len(skipped) > 10 else ""))
+    return kept
+
+def write_fit_results(model, results):
+    global ws_fit
+    if ws_fit is None:
+        ws_fit = wb.create_sheet("Equivalent Circuit Fit")
+    headers = ['Range Sweep', 'Model'] + fit_headers(model)
+    ws_fit.append(headers)
+    for cell in ws_fit[ws_fit.max_row]:
+        cell.font = Font(bold=True)
+    for result in results:
+        ws_fit.append([range_sweep_number, model] + [result[name] for name in fit_headers(model)])
+    save_workbook()
+
+def fit_range_sweep():
+    # The fit runs as a separate process: its worker pool re-imports the main module on
+    # Windows, which would reopen the serial port if it were started from this script
+    global sweep_store
+    if sweep_store is None:
+        return
+    store, sweep_store = sweep_store, None
+    store.save()
+    csv_path = os.path.splitext(store.path)[0] + f"_fit_{fit_model}.csv"
+    command = [sys.executable, '-m', 'biosensor_host.fitting', store.path, '--model', fit_model, '--csv', csv_path]
+    if fit_workers:
+        command += ['--workers', str(fit_workers)]
+    print(f"[INFO] Fitting the {fit_model} model to {store.num_sweeps} spectra.")
+    result = subprocess.run(command, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    output = (result.stdout + result.stderr).strip()
+    if output:
+        print(output)
+    if result.returncode != 0 or not os.path.exists(csv_path):
+        print("[ERROR] Equivalent-circuit fit failed.")
+        return
+    model, results = read_fit_csv(csv_path)
+    write_fit_results(model, results)
+    title = f"{model} fit, range sweep {range_sweep_number}"
+    if report_writer:
+        report_writer.submit_fit(csv_path, title)
+    else:
+        plot_parameter_maps(results, model, title=title)
+
+def schedule_group_scan(spec):
+    # Targets typed at the first group segment prompt -> segment commands; None if invalid
+    try:
+        targets = parse_target_spec(spec)
+    except (ValueError, OSError) as e:
+        print(f"[ERROR] Invalid target list: {e}")
+        print("[INFO] Examples: 'g1:0-15,0-15; g3:10,20'  'g2-4:0-127:8,0-127:8'  'g*:0-127,0-127'  '@targets.txt'")
+        return None
+    if measurement_type != 'COB-screening':
+        targets = drop_screened(targets)
+        if not targets:
+            print("[ERROR] Every target was screened out as open / shorted.")
+            return None
+    segments = schedule_targets(targets)
+    sequence = schedule_sequence(segments)
+    as_listed = [(x, y, group) for group, x, y in targets]
+    toggles, settle_ms = scan_cost(sequence)
+    listed_toggles, listed_settle_ms = scan_cost(as_listed)
+    print(f"[INFO] Scheduled {len(targets)} targets in {len(segments)} group segment(s): "
+          + ", ".join(f"group {group} {len(coords)} x {order}" for group, order, coords in segments))
+    print(f"[INFO] {group_switches(sequence)} group switches, {toggles} address-line toggles, "
+          f"{settle_ms / 1000.0:.1f} s MUX settling (as listed: {group_switches(as_listed)} switches, "
+          f"{listed_toggles} toggles, {listed_settle_ms / 1000.0:.1f} s).")
+    return [encode_group_segment(group, SCAN_ORDERS.index(order), coords) for group, order, coords in segments]
+
+def print_scan_summary():
+    # Address-line toggles and MUX settling spent on the sweep that just finished
+    global auto_range_segments
+    if not scan_sequence:
+        return
+    toggles, settle_ms = scan_cost(scan_sequence)
+    if auto_range_segments:
+        print(f"[INFO] Auto-ranging re-measured {auto_range_segments} segment(s).")
+    print(f"[INFO] Scan order {scan_order or 'as sent'}: {len(scan_sequence)} coordinates, "
+          f"{toggles} address-line toggles, {settle_ms / 1000.0:.1f} s MUX settling.")
+    if sweep_timings:
+        points = sum(t['points'] for t in sweep_timings)
+        total_ms = sum(t['total_ms'] for t in sweep_timings)
+        wait_us = sum(t['wait_avg_us'] * t['points'] for t in sweep_timings) / points
+        read_us = sum(t['read_avg_us'] * t['points'] for t in sweep_timings) / points
+        rate = points * 1000.0 / total_ms if total_ms else 0.0
+        print(f"[INFO] Acquisition: {points} points, {rate:.1f} points/s, "
+              f"wait avg {wait_us:.0f} us, read avg {read_us:.0f} us per point.")
+    sweep_timings.clear()
+    auto_range_segments = 0
+
+def write_repeat_statistics(stats_rows):
+    global ws_stats
+    if ws_stats is None:
+        ws_stats = wb.create_sheet("Repeat Statistics")
+        for i, header in enumerate(STATS_HEADERS):
+            cell = ws_stats.cell(row=1, column=1 + i, value=header)
+            cell.font = Font(bold=True)
+    for stats in stats_rows:
+        ws_stats.append([cell_value(value) for value in stats])
+
+def store_repeat(temp_data):
+    # Add one repeat of the current coordinate; only the reduced spectrum is written to Excel
+    global repeat_reducer, raw_store
+    if repeat_reducer is None:
+        repeat_reducer = RepeatReducer(repeat_count)
+    repeat_reducer.add_sweep(temp_data)
+    if store_raw_repeats:
+        if raw_store is None:
+            raw_store = ColumnarStore(os.path.splitext(excel_filename)[0] + "_raw_repeats.npz")
+        raw_store.append_sweep(temp_data, repeat=current_repeat)
+    if repeat_reducer.is_complete():
+        flush_repeats()
+
+def flush_repeats():
+    # Reduce whatever repeats were collected for the current coordinate (also partial sets)
+    global repeat_reducer
+    if repeat_reducer is None or len(repeat_reducer) == 0:
+        repeat_reducer = None
+        return
+    rows, stats_rows, rejected = repeat_reducer.reduce()
+    write_repeat_statistics(stats_rows)
+    write_temp_data_to_excel(rows)
+    if raw_store is not None:
+        raw_store.save()
+    kept = len(repeat_reducer) - len(rejected)
+    print(f"[INFO] Reduced {len(repeat_reducer)} repeats -> mean/std/median ({kept} kept"
+          + (f", rejected repeat(s) {rejected})" if rejected else ")"))
+    repeat_reducer = None
+
+def note_capture(kind, value):
+    # Host state a replay needs but the serial stream doesn't carry
+    if isinstance(ser, CapturingSerial):
+        ser.note(kind, value)
+
+def auto_answer(prompt_name, prompt_text):
+    # Answers prompts the host can decide on its own; None means ask the user
+    global cached_cal_entry, range_cal_entry, group_plan
+    if prompt_name == 'mode' and baud_negotiator:
+        request = baud_negotiator.request()
+        if request:
+            print(f"[INFO] Negotiating the serial link speed ({request}).")
+            return request
+    if prompt_name == 'group_segment' and group_plan is not None:
+        # The rest of the scheduled Multi-Group Scan, then an empty line to finish it
+        if group_plan:
+            return group_plan.pop(0)
+        group_plan = None
+        return ""
+    if prompt_name == 'auto_range':
+        return "1" if use_auto_range else "0"
+    range_step = parse_range_prompt(prompt_text) if prompt_name == 'send_cached_calibration' else None
+    if range_step:
+        range_cal_entry = None
+        if reuse_cached_calibration:
+            step_settings = range_settings(cal_settings, *range_step)
+            entry = calibration_cache.lookup(step_settings, max_age_s=calibration_max_age(step_settings))
+            if entry and calibration_usable(entry['points']):
+                range_cal_entry = entry
+                note_capture('cached_calibration', entry)
+                return format_calibration_command(entry['points'], entry['settings']['rcal'])
+        return ""
+    if reuse_cached_calibration and prompt_name == 'calibration_source':
+        max_age_s = calibration_max_age(cal_settings)
+        cached_cal_entry = calibration_cache.lookup(cal_settings, temperature=cache_temperature(cal_settings),
+                                                    max_age_s=max_age_s)
+        if cached_cal_entry:
+            age_min = (time.time() - cached_cal_entry['timestamp']) / 60.0
+            window = f", drift window {max_age_s / 3600.0:.1f} h" if max_age_s is not None else ""
+            print(f"[INFO] Reusing cached calibration ({age_min:.0f} min old{window}). Skipping calibration sweep.")
+            return "1"
+        if max_age_s is not None and calibration_cache.lookup(cal_settings):
+            print(f"[INFO] Cached calibration is past the drift window ({max_age_s / 3600.0:.1f} h). Recalibrating.")
+        return "0"
+    if prompt_name == 'send_cached_calibration' and cached_cal_entry:
+        note_capture('cached_calibration', cached_cal_entry)
+        return format_calibration_command(cached_cal_entry['points'], cached_cal_entry['settings']['rcal'])
+    if use_settling_profile and prompt_name == 'settling_cycles':
+        bands = settling_profiles.lookup(cal_settings)
+        if bands:
+            print(f"[INFO] Using tuned settling profile ({len(bands)} bands).")
+            return format_profile_command(bands)
+    if prompt_name == 'send_settling_profile' and tuned_settling_bands:
+        return format_profile_command(tuned_settling_bands)
+    return None
+
+def finish_settling_tune():
+    # Turn the Mode 7 sweeps into a band profile and keep it for these sweep settings
+    global settling_tuner, tuned_settling_bands
+    if settling_tuner is None:
+        return
+    bands, summary = settling_tuner.result()
+    if bands is None:
+        print("[WARNING] Settling auto-tune produced no usable sweeps.")
+    else:
+        tuned_settling_bands = bands
+        band_text = ", ".join(f"{freq} Hz: {cycles}" for freq, cycles in bands)
+        print(f"[INFO] Tuned settling cycles: {band_text}")
+        print(f"[INFO] Sweep time {summary['profile_time_s']:.2f} s vs {summary['uniform_time_s']:.2f} s uniform "
+              f"({summary['uniform_cycles']} cycles) and {summary['reference_time_s']:.2f} s at the reference.")
+        if not replaying and settling_profiles.store(cal_settings, bands, settling_tuner.mag_tol, settling_tuner.phase_tol_deg):
+            print("[INFO] Settling profile stored for these sweep settings.")
+    settling_tuner = None
+
+def calibration_max_age(settings):
+    # Drift-based reuse window for the cache (None: the cache's default age)
+    if not track_calibration_drift:
+        return None
+    return calibration_tracker.reuse_window_s(settings)
+
+def cache_temperature(settings):
+    # Die temperature the cache should check its entry against; None when the temperature model
+    # of these settings covers it (the sweeps are compensated instead)
+    if last_temperature is None or not compensate_temperature:
+        return last_temperature
+    runs = calibration_history.runs(settings)
+    if not runs:
+        return last_temperature
+    model = TemperatureGainModel([(run.get('temperature'), run['points']) for run in runs],
+                                 settings['rcal'], settings['start_freq'], settings['freq_increment'])
+    return None if model.covers(last_temperature) else last_temperature
+
+def set_active_calibration(settings, temperature, points):
+    # The firmware sweeps with this calibration from now on; the temperature model is built
+    # around it. A replay takes the model the live session noted (its history differs).
+    global thermal_model, temperature_warned
+    thermal_model = None
+    temperature_warned = False
+    if not compensate_temperature or temperature is None or replaying:
+        return
+    spec = model_spec(settings, calibration_history.runs(settings), temperature, points)
+    note_capture('temperature_model', spec)
+    thermal_model = model_from_spec(spec)
+    model = thermal_model[0]
+    if model.usable():
+        print(f"[INFO] Temperature model: {len(model.temperatures)} calibration temperatures, "
+              f"{model.temperatures[0]:.2f}-{model.temperatures[-1]:.2f} C.")
+
+def compensate_sweep(rows):
+    global thermal_model, temperature_warned
+    if not compensate_temperature or sweep_temperature is None:
+        return
+    if replaying and 'temperature_model' in ser.notes:
+        thermal_model = model_from_spec(ser.notes.pop('temperature_model'))
+    if thermal_model is None:
+        return
+    model, active_temperature, active_points = thermal_model
+    result = compensate_rows(rows, sweep_temperature, model, active_temperature, active_points, auto_ranged_freqs)
+    if result:
+        scale, shift = result
+        print(f"[INFO] Temperature compensation: {sweep_temperature:.2f} C vs calibration at {active_temperature:.2f} C "
+              f"-> |Z| x{scale:.5f}, phase {shift:+.3f} deg.")
+    elif not model.covers(sweep_temperature) and abs(sweep_temperature - active_temperature) >= 1.0 and not temperature_warned:
+        temperature_warned = True
+        span = (f"{model.temperatures[0]:.2f}-{model.temperatures[-1]:.2f} C" if len(model.temperatures)
+                else "no calibration temperatures")
+        print(f"[WARNING] Die temperature {sweep_temperature:.2f} C is {sweep_temperature - active_temperature:+.2f} C "
+              f"from the calibration and outside the temperature model ({span}). "
+              f"A calibration at this temperature extends it.")
+
+def report_calibration_drift(settings, points, temperature):
+    report = calibration_tracker.add_run(settings, points, temperature)
+    if report is None or not track_calibration_drift:
+        return
+    gain_freq, gain_pct = report['worst_gain']
+    phase_freq, phase_deg = report['worst_phase']
+    print(f"[INFO] Calibration drift since the previous run ({report['hours']:.1f} h): gain {gain_pct:+.3f}% at "
+          f"{gain_freq} Hz, system phase {phase_deg:+.3f} deg at {phase_freq} Hz "
+          f"({100.0 * report['load']:.0f}% of the tolerance).")
+    if report['alert']:
+        print(f"[WARNING] Calibration drift is beyond the tolerance (gain {calibration_tracker.gain_tol_pct}%, "
+              f"phase {calibration_tracker.phase_tol_deg} deg). Sweeps since the previous calibration may be off.")
+    if report['reuse_s'] is not None:
+        print(f"[INFO] At the fitted drift rate a calibration of these settings holds for "
+              f"{report['reuse_s'] / 3600.0:.1f} h; the calibration cache reuses it that long.")
+
+def write_cached_calibration(entry):
+    # Fill the calibration block from the cache, as if the Cal Point lines had been received
+    if not calibration_runs:
+        return
+    current_run = calibration_runs[-1]
+    start_col = current_run['start_col']
+    if 'current_row' not in current_run:
+        current_run['current_row'] = 3
+    cached_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['timestamp']))
+    ws.cell(row=current_run['current_row'], column=start_col, value=f"Cached calibration ({cached_at})")
+    current_run['current_row'] += 1
+    for cal_data in calibration_rows(entry['points'], entry['settings']['rcal']):
+        calibration_data.append(cal_data)
+        for i, data_item in enumerate(cal_data):
+            ws.cell(row=current_run['current_row'], column=start_col + i, value=data_item)
+        current_run['current_row'] += 1
+    save_workbook()
+
 # ------------------------
-# 7) Serial Reception Thread
+# 6) Serial Reception Thread
 # ------------------------
+def commit_sweep_block():
+    # One coordinate's sweep of a range mode is complete and its point count matches
+    if measurement_type == 'COB-kinetics':
+        store_kinetics(temp_data)
+    elif repeat_count > 1:
+        store_repeat(temp_data)
+    else:
+        write_temp_data_to_excel(temp_data)
+
+def record_anomalies(anomalies, action):
+    # One sheet row per anomalous point of temp_data
+    global ws_anomaly
+    if ws_anomaly is None:
+        ws_anomaly = wb.create_sheet("Anomalies")
+        ws_anomaly.append(ANOMALY_HEADERS)
+        for cell in ws_anomaly[ws_anomaly.max_row]:
+            cell.font = Font(bold=True)
+    for p, freq, kinds in anomalies:
+        row = temp_data[p]
+        ws_anomaly.append([row[6], row[7], row[8], freq, ", ".join(kinds), row[1], cell_value(row[2]), row[3], action])
+    save_workbook()
+
+def print_anomaly_summary():
+    if anomaly_counts['flagged']:
+        print(f"[INFO] Anomalies: {anomaly_counts['flagged']} sweep(s) flagged, {anomaly_counts['remeasured']} "
+              f"re-measured, {anomaly_counts['kept']} kept with anomalous points (see the Anomalies sheet).")
+    for key in anomaly_counts:
+        anomaly_counts[key] = 0
+
+def print_stage_summary():
+    for summary_line in stage_metrics.summary():
+        print(f"[INFO] {summary_line}")
+
+def wait_until_handled(event):
+    # A replay runs ahead of the main loop; hold the stream until the loop has taken the sweep
+    while replaying and event.is_set():
+        time.sleep(0.001)
+
 def read_from_port():
     global current_mode, xAddrStr, yAddrStr, calibration_impedance, group_selected
     global measurement_type, current_calibration_run, is_calibrating
     global currentCoord, next_x, next_y
     global expected_points, actual_count, in_sweep, temp_data
-
+    global scan_order, scan_sequence, sweep_timings
+    global repeat_count, current_repeat
+    global pending_cal_points
+    global settling_tuner
+    global range_cal_settings, auto_range_active, auto_range_segments
+    global group_plan, diagonal_pass, electrode_screen
+    global cal_temperature, sweep_temperature, last_temperature, auto_ranged_freqs
+    global remeasure_pending
+    global kinetics_electrodes, kinetics_buffer, kinetics_time_ms, kinetics_stop_sent, kinetics_snapshot
+
+    line_done = None       # When the previous line was handled (start of the wait for the next one)
+    after_prompt = False   # The next line waits on the user as well as the board
     while True:
         if not ser.is_open:
             print("Serial port is closed. Exiting data reception loop.")
             break
         try:
-            line = ser.readline().decode('utf-8', errors='ignore').strip()
-            if line:
-                # Handshaking process specifically for range sweep modes
-                if measurement_type in ['COB-range', 'COB-range-step']:
-                    if line == "SWEEP_START":
-                        print("[INFO] SWEEP_START detected -> Initializing temp_data, actual_count=0")
-                        temp_data = []
-                        actual_count = 0
-                        in_sweep = True
+            if baud_negotiator and baud_negotiator.expired():
+                print(f"[WARNING] Link check at {baud_negotiator.target} baud stalled. Back to {BASE_RATE} baud.")
+                ser.baudrate = BASE_RATE
+            if line_done is None:
+                line_done = time.perf_counter()
+            raw = reader.read_line()
+            if raw is None:
+                continue
+            line_received = time.perf_counter()
+            stage_metrics.observe('prompt_wait' if after_prompt else 'host_read', line_received - line_done)
+            line_done = None
+            after_prompt = False
+            if not raw:
+                continue
+            match = dialect.measurement.match(raw) if dialect.measurement else None
+            if match:
+                event, parsed = 'measurement', measurement_row_bytes(match.groups())
+            else:
+                line = str(raw, 'utf-8', 'ignore')
+                event, key, fields = dialect.classify(line)
+                if event == 'measurement':
+                    parsed = measurement_row(fields)
+            stage_metrics.observe('host_parse', time.perf_counter() - line_received)
+
+            # ---------------------------
+            # Measurement Data Parsing
+            # ---------------------------
+            if event == 'measurement':
+                print(str(raw, 'utf-8', 'ignore'))
+                if measurement_type == 'Settling-tune':
+                    if settling_tuner:
+                        real, imag = split_r_i(parsed[1])
+                        settling_tuner.add_point(freq_hz(parsed[0]), real, imag)
+                    continue
+                if raw_window_status(*split_r_i(parsed[1])):
+                    out_of_window.append(freq_hz(parsed[0]))
+                if currentCoord:
+                    parsed.append(currentCoord[0])
+                    parsed.append(currentCoord[1])
+                    parsed.append(int(group_selected) if group_selected else "N/A")
+                else:
+                    parsed.append("N/A")
+                    parsed.append("N/A")
+                    parsed.append("N/A")
+                parsed.append(sweep_temperature if in_sweep and sweep_temperature is not None else "N/A")
+                if measurement_type in RANGE_MEASUREMENT_TYPES:
+                    # Without the handshake every point belongs to the current coordinate's sweep
+                    if in_sweep or not dialect.handshake:
+                        actual_count += 1
+                        temp_data.append(parsed)
+                        if in_sweep and detect_anomalies:
+                            anomaly_detector.check(parsed)
+                else:
+                    measurement_data.append(parsed)
+                    if calibration_runs:
+                        current_run = calibration_runs[-1]
+                        start_col = current_run['start_col']
+                        if 'current_row' not in current_run:
+                            current_run['current_row'] = 3
+                        measurement_row_num = current_run['current_row']
+                        with stage_metrics.time('host_excel'):
+                            for i, datum in enumerate(parsed):
+                                ws.cell(row=measurement_row_num, column=start_col + i, value=cell_value(datum))
+                            current_run['current_row'] += 1
+                            save_workbook()
+                continue
+
+            # Handshaking process specifically for range sweep modes
+            if event == 'sweep_start' and measurement_type in RANGE_MEASUREMENT_TYPES:
+                print("[INFO] SWEEP_START detected -> Initializing temp_data, actual_count=0")
+                temp_data = []
+                actual_count = 0
+                in_sweep = True
+                sweep_temperature = None
+                auto_ranged_freqs = []
+                anomaly_detector.start_sweep((int(group_selected) if group_selected else 0, int(currentCoord[0], 2),
+                                              int(currentCoord[1], 2)) if currentCoord else None)
+                continue
+
+            if event == 'sweep_done' and measurement_type in RANGE_MEASUREMENT_TYPES:
+                print(f"[INFO] SWEEP_DONE detected. actual_count={actual_count} / expected_points={expected_points}")
+                in_sweep = False
+                anomalies = anomaly_detector.anomalies() if detect_anomalies else []
+                if expected_points is not None and actual_count == expected_points and anomalies:
+                    anomaly_counts['flagged'] += 1
+                    if remeasure_anomalies and not remeasure_pending:
+                        print(f"[WARNING] -> {len(anomalies)} anomalous point(s): {anomaly_text(anomalies)}. "
+                              "Sending REMEASURE.")
+                        record_anomalies(anomalies, 'Re-measured')
+                        anomaly_counts['remeasured'] += 1
+                        remeasure_pending = True
+                        ser.write(b"REMEASURE\n")
                         continue
+                    print(f"[WARNING] -> Keeping the sweep with {len(anomalies)} anomalous point(s): {anomaly_text(anomalies)}.")
+                    record_anomalies(anomalies, 'Kept')
+                    anomaly_counts['kept'] += 1
+                if expected_points is not None and actual_count == expected_points:
+                    remeasure_pending = False
+                    if repeat_count > 1:
+                        print(f"[INFO] -> Data count matches. Keeping repeat {current_repeat}/{repeat_count} and sending STORE_OK.")
+                    else:
+                        print("[INFO] -> Data count matches. Writing temp_data and sending STORE_OK.")
+                    with stage_metrics.time('host_excel'):
+                        compensate_sweep(temp_data)
+                        commit_sweep_block()
+                    with stage_metrics.time('host_ack'):
+                        ser.write(b"STORE_OK\n")
+                    if detect_anomalies:
+                        anomaly_detector.keep_sweep()
+                else:
+                    print("[WARNING] -> Data count mismatch. Discarding temp_data. Not sending STORE_OK (to trigger re-measurement).")
+                    # The board retries once after the timeout; a REMEASURE to the retry would lose the coordinate
+                    remeasure_pending = True
+                    if baud_negotiator:
+                        baud_negotiator.link_error()
+                continue
+
+            if event == 'screen':
+                print(line)
+                if electrode_screen is not None:
+                    electrode_screen.add_point(int(group_selected) if group_selected else 0, int(fields[0], 2),
+                                               int(fields[1], 2), measurement_row(fields[2:]))
+                continue
 
-                    if line == "SWEEP_DONE":
-                        print(f"[INFO] SWEEP_DONE detected. actual_count={actual_count} / expected_points={expected_points}")
-                        in_sweep = False
-                        if expected_points is not None and actual_count == expected_points:
-                            print("[INFO] -> Data count matches. Writing temp_data and sending STORE_OK.")
-                            write_temp_data_to_excel(temp_data)
-                            ser.write(b"STORE_OK\n")
-                        else:
-                            print("[WARNING] -> Data count mismatch. Discarding temp_data. Not sending STORE_OK (to trigger re-measurement).")
-                        continue
+            if event == 'screening_complete':
+                print(line)
+                finish_screening(fields)
+                print_stage_summary()
+                continue
 
-                # Existing logic
-                if "Starting Calibration." in line:
-                    if not is_calibrating:
-                        print("\n[INFO] Starting calibration. Initializing a new calibration run.\n")
-                        current_calibration_run += 1
-                        initialize_new_calibration_run(current_calibration_run)
-                        is_calibrating = False
-                        ser.reset_input_buffer()
-                        ser.reset_output_buffer()
-                    continue
+            if event == 'kinetics_info':
+                kinetics_electrodes = int(fields[0])
+                print(line)
+                continue
+
+            if event == 'kinetics_cycle':
+                # Sweep timings would grow with the run; the stage metrics cover it
+                sweep_timings = []
+                print(line)
+                continue
+
+            if event == 'kinetics_time':
+                kinetics_time_ms = int(fields[0])
+                continue
 
-                if "ESP-ROM" in line:
-                    print("\n[INFO] Device has been reset. Starting a new calibration run.\n")
+            if event == 'kinetics_complete':
+                print(line)
+                kinetics_snapshot = finish_kinetics(fields)
+                print_anomaly_summary()
+                print_stage_summary()
+                kinetics_done.set()
+                wait_until_handled(kinetics_done)
+                continue
+
+            if event == 'calibration_start':
+                range_cal_settings = None
+                if not is_calibrating:
+                    print("\n[INFO] Starting calibration. Initializing a new calibration run.\n")
                     current_calibration_run += 1
                     initialize_new_calibration_run(current_calibration_run)
-                    ser.reset_input_buffer()
+                    is_calibrating = False
+                    reader.reset_input_buffer()
                     ser.reset_output_buffer()
-                    continue
+                continue
+
+            if event == 'device_reset':
+                print("\n[INFO] Device has been reset. Starting a new calibration run.\n")
+                current_calibration_run += 1
+                initialize_new_calibration_run(current_calibration_run)
+                reader.reset_input_buffer()
+                ser.reset_output_buffer()
+                continue
+
+            if event == 'prompt':
+                after_prompt = True
+                prompt_queue.put((key, line))
+                if replaying:
+                    # The answer (mode, point count) decides how the lines after it are read
+                    prompt_queue.join()
+                continue
+
+            if event == 'baud_rates':
+                if baud_negotiator:
+                    baud_negotiator.set_supported(int(rate) for rate in fields[0].split(','))
+                print(line)
+                continue
 
-                if is_prompt_line(line):
-                    prompt_queue.put(line)
-                    continue
+            if event == 'baud_switch':
+                print(line)
+                if baud_negotiator:
+                    ser.baudrate = baud_negotiator.on_switch(int(fields[0]))
+                continue
+
+            if event == 'probe':
+                if baud_negotiator:
+                    baud_negotiator.on_probe(*fields)
+                continue
+
+            if event == 'probe_end':
+                if baud_negotiator:
+                    reply, fall_back = baud_negotiator.on_probe_end(fields[0])
+                    print(f"[INFO] Probe frames at {baud_negotiator.target} baud: {baud_negotiator.good} of {fields[0]} intact.")
+                    ser.write((reply + "\n").encode('utf-8'))
+                    if fall_back:
+                        ser.flush()
+                        ser.baudrate = BASE_RATE
+                continue
+
+            if event == 'baud_set':
+                print(line)
+                if baud_negotiator:
+                    rate = int(fields[0])
+                    if not baud_negotiator.on_rate_set(rate):
+                        print(f"[WARNING] Link check failed. Staying at {rate} baud.")
+                    ser.baudrate = rate
+                continue
+
+            if event == 'setting':
+                cal_settings[key] = fields[0] if key == 'board_id' else int(fields[0])
+                print(line)
+                continue
 
-                if "[INFO] Set Calibration Impedance" in line:
-                    parts = line.split(':')
-                    if len(parts) >= 2:
-                        calibration_impedance = parts[1].strip().split(' ')[0]
-                        if calibration_runs:
-                            current_run = calibration_runs[-1]
-                            start_col = current_run['start_col']
-                            ws.cell(row=1, column=start_col,
-                                    value=f"Set Calibration Impedance: {calibration_impedance} ohm")
-                            wb.save(excel_filename)
-                            print(line)
-                    continue
+            if event == 'calibration_performing':
+                pending_cal_points = []
+                cal_temperature = None
+                print(line)
+                continue
 
-                if line.startswith("Cal Point"):
-                    cal_data = parse_calibration_line(line)
-                    if cal_data and calibration_runs:
-                        calibration_data.append(cal_data)
-                        current_run = calibration_runs[-1]
-                        start_col = current_run['start_col']
-                        if 'current_row' not in current_run:
-                            current_run['current_row'] = 3
-                        for i, data_item in enumerate(cal_data):
-                            ws.cell(row=current_run['current_row'], column=start_col + i, value=data_item)
-                        current_run['current_row'] += 1
-                        wb.save(excel_filename)
-                        print("\t".join(map(str, cal_data)))
-                    continue
+            if event == 'calibration_temperature':
+                cal_temperature = last_temperature = None if fields[0] == 'N/A' else float(fields[0])
+                print(line)
+                continue
 
-                if "[INFO] Set X-axis Address" in line and "Y-axis Address" in line:
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        xAddrStr = parts[0].split(':')[-1].strip()
-                        yAddrStr = parts[1].split(':')[-1].strip()
-                        if calibration_runs:
-                            current_run = calibration_runs[-1]
-                            start_col = current_run['start_col']
-                            if 'current_row' not in current_run:
-                                current_run['current_row'] = 3
-                            row_num = current_run['current_row']
-                            ws.cell(row=row_num, column=start_col, value="Set Coordinates")
-                            ws.cell(row=row_num, column=start_col + 1, value=f"X={xAddrStr}")
-                            ws.cell(row=row_num, column=start_col + 2, value=f"Y={yAddrStr}")
-                            current_run['current_row'] += 1
-                            wb.save(excel_filename)
-                            print(line)
-                            if measurement_type in ['COB', 'Rcal', 'COB-diagonal']:
-                                currentCoord = (xAddrStr, yAddrStr)
-                    continue
+            if event == 'temperature':
+                sweep_temperature = last_temperature = None if fields[0] == 'N/A' else float(fields[0])
+                print(line)
+                continue
 
-                if "Checking impedance at Rcal position." in line:
-                    if calibration_runs:
-                        current_run = calibration_runs[-1]
-                        start_col = current_run['start_col']
-                        if 'current_row' not in current_run:
-                            current_run['current_row'] = 1
-                        current_run['current_row'] += 1
-                        ws.cell(row=current_run['current_row'], column=start_col, value="Checking impedance at Rcal position.")
-                        current_run['current_row'] += 1
-                        wb.save(excel_filename)
-                        print(line)
-                        measurement_type = 'Rcal'
-                        add_headers(current_run, HEADER_FIELDS)
-                    continue
+            if event == 'cached_calibration_loaded':
+                print(line)
+                entry = range_cal_entry if range_cal_settings else cached_cal_entry
+                if entry:
+                    write_cached_calibration(entry)
+                    if not range_cal_settings:
+                        set_active_calibration(entry['settings'], entry.get('temperature'), entry['points'])
+                range_cal_settings = None
+                continue
+
+            if event == 'calibration_failed':
+                range_cal_settings = None
+                print(line)
+                continue
 
-                if "Checking impedance of COB." in line:
-                    if calibration_runs:
-                        current_run = calibration_runs[-1]
-                        start_col = current_run['start_col']
-                        if 'current_row' not in current_run:
-                            current_run['current_row'] = 1
-                        current_run['current_row'] += 1
-                        ws.cell(row=current_run['current_row'], column=start_col, value="Checking impedance of COB.")
-                        current_run['current_row'] += 1
-                        wb.save(excel_filename)
-                        print(line)
-                        measurement_type = 'COB'
-                    continue
-                
-                if "Starting COB Range Sweep" in line:
-                    if calibration_runs:
-                        current_run = calibration_runs[-1]
-                        start_col = current_run['start_col']
-                        if 'current_row' not in current_run:
-                            current_run['current_row'] = 3
-                        current_run['current_row'] += 1
-                        ws.cell(row=current_run['current_row'], column=start_col,
-                                value="Starting COB Range Sweep (7-bit input).")
-                        current_run['current_row'] += 1
-                        wb.save(excel_filename)
-                        print(line)
-                        measurement_type = 'COB-range'
-                    continue
+            if event == 'range_calibration':
+                range_step = (int(fields[0]), int(fields[1]))
+                range_cal_settings = range_settings(cal_settings, *range_step)
+                print(line)
+                if calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    ws.cell(row=current_run['current_row'], column=start_col,
+                            value=f"Range calibration: Range {range_step[0]}, PGA x{range_step[1]}")
+                    current_run['current_row'] += 1
+                    save_workbook()
+                continue
+
+            if event == 'auto_ranging':
+                auto_range_active = fields[0] == "On"
+                print(line)
+                continue
 
-                if "Starting COB Range Step Sweep" in line:
-                    if calibration_runs:
-                        current_run = calibration_runs[-1]
-                        start_col = current_run['start_col']
-                        if 'current_row' not in current_run:
-                            current_run['current_row'] = 3
-                        current_run['current_row'] += 1
-                        ws.cell(row=current_run['current_row'], column=start_col, value="Starting COB Range Step Sweep (X/Y increment setting).")
-                        current_run['current_row'] += 1
-                        wb.save(excel_filename)
-                        print(line)
-                        measurement_type = 'COB-range-step'
-                    continue
+            if event == 'auto_range':
+                auto_range_segments += 1
+                auto_ranged_freqs.append((int(fields[0]), int(fields[1])))
+                print(line)
+                continue
+
+            if event == 'calibration_impedance':
+                calibration_impedance = fields[0]
+                if calibration_impedance.isdigit():
+                    cal_settings['rcal'] = int(calibration_impedance)
+                if calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    ws.cell(row=1, column=start_col,
+                            value=f"Set Calibration Impedance: {calibration_impedance} ohm")
+                    save_workbook()
+                    print(line)
+                continue
+
+            if event == 'cal_point':
+                cal_data = parse_calibration_line(line)
+                if cal_data:
+                    pending_cal_points.append(split_r_i(cal_data[1]))
+                    if len(pending_cal_points) == cal_settings.get('num_increments', -1) + 1:
+                        # A replayed calibration is old; it must not refresh the cache
+                        if not replaying and calibration_cache.store(range_cal_settings or cal_settings, pending_cal_points,
+                                                                     temperature=cal_temperature):
+                            print("[INFO] Calibration stored in the calibration cache.")
+                        report_calibration_drift(range_cal_settings or cal_settings, pending_cal_points, cal_temperature)
+                        if not range_cal_settings:
+                            set_active_calibration(cal_settings, cal_temperature, pending_cal_points)
+                        range_cal_settings = None
+                if cal_data and calibration_runs:
+                    calibration_data.append(cal_data)
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    for i, data_item in enumerate(cal_data):
+                        ws.cell(row=current_run['current_row'], column=start_col + i, value=data_item)
+                    current_run['current_row'] += 1
+                    save_workbook()
+                    print("\t".join(map(str, cal_data)))
+                continue
+
+            if event == 'addresses':
+                xAddrStr, yAddrStr = fields
+                if calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    row_num = current_run['current_row']
+                    ws.cell(row=row_num, column=start_col, value="Set Coordinates")
+                    ws.cell(row=row_num, column=start_col + 1, value=f"X={xAddrStr}")
+                    ws.cell(row=row_num, column=start_col + 2, value=f"Y={yAddrStr}")
+                    current_run['current_row'] += 1
+                    save_workbook()
+                    print(line)
+                    if measurement_type in ['COB', 'Rcal']:
+                        currentCoord = (xAddrStr, yAddrStr)
+                continue
+
+            if event == 'start':
+                # Rcal / COB checks and the range sweep modes announce themselves
+                if calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 1 if key in ['COB', 'Rcal'] else 3
+                    current_run['current_row'] += 1
+                    ws.cell(row=current_run['current_row'], column=start_col, value=START_LABELS[key])
+                    current_run['current_row'] += 1
+                    save_workbook()
+                    print(line)
+                    measurement_type = key
+                    stage_metrics.start_window()
+                    if key in RANGE_MEASUREMENT_TYPES:
+                        temp_data = []
+                        actual_count = 0
+                        scan_sequence = []
+                        # Modes that take repeats report them after the start line
+                        repeat_count = 1
+                        anomaly_detector.reset_neighbours()
+                    if key == 'COB-diagonal':
+                        diagonal_pass = None
+                        diagonal_stores.clear()
+                    if key in ['COB-multi-group', 'COB-screening']:
+                        group_plan = None
+                    if key == 'COB-screening':
+                        electrode_screen = ElectrodeScreen()
+                    if key == 'COB-kinetics':
+                        finish_kinetics()
+                        kinetics_electrodes = None
+                        kinetics_buffer = None
+                        kinetics_time_ms = 0
+                        kinetics_stop_sent = False
+                    if key == 'Rcal':
+                        add_headers(current_run, HEADER_FIELDS)
+                continue
+
+            if event == 'scan_order':
+                scan_order = fields[0].strip()
+                scan_sequence = []
+                sweep_timings = []
+                if calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    ws.cell(row=current_run['current_row'], column=start_col, value=f"Scan order: {scan_order}")
+                    current_run['current_row'] += 1
+                    save_workbook()
+                print(line)
+                continue
+
+            if event == 'diagonal_pass':
+                diagonal_pass = fields[0]
+                if calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    ws.cell(row=current_run['current_row'], column=start_col, value=f"Diagonal pass: {diagonal_pass}")
+                    current_run['current_row'] += 1
+                    save_workbook()
+                print(line)
+                continue
 
-                if "[INFO] Group" in line and "selected" in line:
-                    match_grp = re.search(r"Group\s+(\d+)\s+selected", line)
-                    if match_grp:
-                        group_selected = match_grp.group(1)
-                        if calibration_runs:
-                            current_run = calibration_runs[-1]
-                            start_col = current_run['start_col']
-                            if 'current_row' not in current_run:
-                                current_run['current_row'] = 3
-                            row_num = current_run['current_row']
-                            ws.cell(row=row_num, column=start_col, value=f"Group {group_selected} selected")
-                            current_run['current_row'] += 1
-                            wb.save(excel_filename)
-                            print(line)
-                            add_headers(current_run, HEADER_FIELDS)
-                    continue
+            if event == 'repeats':
+                repeat_count = int(fields[0])
+                current_repeat = 0
+                print(line)
+                continue
 
-                match_coord = re.search(r"Current_Coord->X=([\d]+),Y=([\d]+)", line)
-                if match_coord:
-                    next_x = match_coord.group(1)
-                    next_y = match_coord.group(2)
-                    print(line)
-                    if calibration_runs:
-                        current_run = calibration_runs[-1]
-                        start_col = current_run['start_col']
-                        if 'current_row' not in current_run:
-                            current_run['current_row'] = 3
-                        current_run['current_row'] += 1
-                        ws.cell(row=current_run['current_row'], column=start_col, value="Current Coordinates")
-                        ws.cell(row=current_run['current_row'], column=start_col + 1, value=f"X={next_x}")
-                        ws.cell(row=current_run['current_row'], column=start_col + 2, value=f"Y={next_y}")
-                        current_run['current_row'] += 1
-                        wb.save(excel_filename)
-                        currentCoord = (next_x, next_y)
-                        next_x = None
-                        next_y = None
-                    continue
+            if event == 'settling_start':
+                settling_tuner = SettlingTuner()
+                measurement_type = 'Settling-tune'
+                print(line)
+                continue
 
-                if "Frequency sweep complete!" in line:
-                    print(line)
-                    sweep_complete.set()
-                    continue
+            if event == 'settling_candidate':
+                if settling_tuner:
+                    settling_tuner.start_candidate(int(fields[0]))
+                print(line)
+                continue
 
-                if "[INFO] COB range sweep complete" in line:
-                    print(line)
-                    range_sweep_complete.set()
-                    continue
+            if event == 'settling_complete':
+                print(line)
+                finish_settling_tune()
+                continue
 
-                if "[INFO] COB range step sweep complete" in line:
+            if event == 'settling_profile':
+                settling_bands = parse_profile_line(line)
+                print(line)
+                if settling_bands and calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    ws.cell(row=current_run['current_row'], column=start_col, value="Settling profile")
+                    ws.cell(row=current_run['current_row'], column=start_col + 1,
+                            value=", ".join(f"{freq} Hz: {cycles}" for freq, cycles in settling_bands))
+                    current_run['current_row'] += 1
+                    save_workbook()
+                continue
+
+            if event == 'repeat_index':
+                current_repeat = int(fields[0])
+                remeasure_pending = False
+                continue
+
+            if event == 'group':
+                group_selected = fields[0]
+                if calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    row_num = current_run['current_row']
+                    ws.cell(row=row_num, column=start_col, value=f"Group {group_selected} selected")
+                    current_run['current_row'] += 1
+                    save_workbook()
                     print(line)
-                    range_sweep_complete.set()
+                    if measurement_type not in ['COB-screening', 'COB-kinetics']:
+                        add_headers(current_run, HEADER_FIELDS)
+                continue
+
+            if event == 'coord' or (event == 'coord_y' and next_x is not None):
+                # The Korean range build sends X and Y on separate lines
+                if event == 'coord':
+                    next_x, next_y = fields
+                else:
+                    next_y = fields[0]
+                print(line)
+                if next_y is None:
                     continue
+                flush_repeats()
+                remeasure_pending = False
+                if calibration_runs and measurement_type == 'COB-kinetics':
+                    # The electrodes come round every cycle; their sweeps don't go to the sheet
+                    currentCoord = (next_x, next_y)
+                    next_x = None
+                    next_y = None
+                elif calibration_runs:
+                    current_run = calibration_runs[-1]
+                    start_col = current_run['start_col']
+                    if 'current_row' not in current_run:
+                        current_run['current_row'] = 3
+                    current_run['current_row'] += 1
+                    ws.cell(row=current_run['current_row'], column=start_col, value="Current Coordinates")
+                    ws.cell(row=current_run['current_row'], column=start_col + 1, value=f"X={next_x}")
+                    ws.cell(row=current_run['current_row'], column=start_col + 2, value=f"Y={next_y}")
+                    current_run['current_row'] += 1
+                    save_workbook()
+                    currentCoord = (next_x, next_y)
+                    scan_sequence.append((int(next_x, 2), int(next_y, 2), group_selected))
+                    next_x = None
+                    next_y = None
+                continue
+
+            if event == 'sweep_timing':
+                timing = parse_sweep_timing_line(line)
+                if measurement_type in RANGE_MEASUREMENT_TYPES:
+                    sweep_timings.append(timing)
+                if timing:
+                    stage_metrics.observe('board_conversion', timing['wait_avg_us'] * timing['points'] / 1e6)
+                    stage_metrics.observe('board_i2c_read', timing['read_avg_us'] * timing['points'] / 1e6)
+                print(line)
+                continue
+
+            if event == 'stage_timing':
+                stages = parse_stage_timing_line(line)
+                if stages['settle_ms']:
+                    stage_metrics.observe('board_settle', stages['settle_ms'] / 1000.0)
+                stage_metrics.observe('board_acquire', stages['acquire_ms'] / 1000.0)
+                stage_metrics.observe('board_print', stages['print_ms'] / 1000.0)
+                stage_metrics.observe('board_ack_wait', stages['ack_ms'] / 1000.0)
+                print(line)
+                continue
 
-                # ---------------------------
-                # Measurement Data Parsing
-                # ---------------------------
+            if event == 'sweep_complete':
                 print(line)
-                parsed = parse_measurement_line(line)
-                if parsed:
-                    if measurement_type in ['COB-range', 'COB-range-step']:
-                        if in_sweep:
-                            actual_count += 1
-                            if currentCoord:
-                                parsed.append(currentCoord[0])
-                                parsed.append(currentCoord[1])
-                            else:
-                                parsed.append("N/A")
-                                parsed.append("N/A")
-                            temp_data.append(parsed)
-                    else:
-                        if currentCoord:
-                            parsed.append(currentCoord[0])
-                            parsed.append(currentCoord[1])
-                        else:
-                            parsed.append("N/A")
-                            parsed.append("N/A")
-                        measurement_data.append(parsed)
-                        if calibration_runs:
-                            current_run = calibration_runs[-1]
-                            start_col = current_run['start_col']
-                            if 'current_row' not in current_run:
-                                current_run['current_row'] = 3
-                            measurement_row = current_run['current_row']
-                            for i, datum in enumerate(parsed):
-                                ws.cell(row=measurement_row, column=start_col + i, value=datum)
-                            current_run['current_row'] += 1
-                            wb.save(excel_filename)
+                if measurement_type in RANGE_MEASUREMENT_TYPES and not dialect.handshake:
+                    # No SWEEP_DONE / STORE_OK: keep the sweep as received
+                    if expected_points is not None and actual_count != expected_points:
+                        print(f"[WARNING] -> {actual_count} of {expected_points} points received for this coordinate.")
+                    with stage_metrics.time('host_excel'):
+                        commit_sweep_block()
+                    temp_data = []
+                    actual_count = 0
+                if out_of_window:
+                    hint = "" if auto_range_active else " Enable auto-ranging to re-measure them."
+                    print(f"[WARNING] {len(out_of_window)} point(s) outside the raw window "
+                          f"({out_of_window[0]}-{out_of_window[-1]} Hz).{hint}")
+                    out_of_window.clear()
+                if measurement_type in ['COB', 'Rcal']:
+                    print_stage_summary()
+                sweep_complete.set()
+                wait_until_handled(sweep_complete)
+                continue
+
+            if event == 'range_complete':
+                print(line)
+                flush_repeats()
+                print_scan_summary()
+                print_anomaly_summary()
+                print_stage_summary()
+                range_sweep_complete.set()
+                wait_until_handled(range_sweep_complete)
+                continue
+
+            print(line)
 
         except serial.SerialException as e:
             # If the device is disconnected, this error is often raised.
@@ -675,19 +1722,35 @@ def read_from_port():
             break
 
 # ------------------------
-# 8) Main Loop (Program Entry Point)
+# 7) Main Loop (Program Entry Point)
 # ------------------------
 thread = threading.Thread(target=read_from_port, daemon=True)
+replay_started = time.perf_counter()
 thread.start()
 
 try:
     while True:
         if not prompt_queue.empty():
-            prompt_text = prompt_queue.get()
-            with patch_stdout():
-                user_input = prompt(prompt_text)
+            prompt_name, prompt_text = prompt_queue.get()
+            if replaying:
+                # The recorded answer, independent of today's caches
+                user_input = ser.next_answer()
+                if user_input is None:
+                    # The recorded session ended at this prompt
+                    break
+                if prompt_name == 'send_cached_calibration':
+                    # The cache entry the live session uploaded
+                    if parse_range_prompt(prompt_text):
+                        range_cal_entry = ser.notes.pop('cached_calibration', None)
+                    else:
+                        cached_cal_entry = ser.notes.pop('cached_calibration', None)
+            else:
+                user_input = auto_answer(prompt_name, prompt_text)
+            if user_input is None:
+                with patch_stdout():
+                    user_input = prompt(prompt_text)
             # When prompted for "Enter the number of measurements", set expected_points
-            if "Enter the number of measurements" in prompt_text:
+            if prompt_name == 'num_measurements':
                 try:
                     num_increments = int(user_input.strip())
                     if 1 <= num_increments <= 100:
@@ -697,9 +1760,37 @@ try:
                         print("[WARNING] Input is not in the range 1-100. The device will prompt for re-entry.")
                 except ValueError:
                     print("[WARNING] Failed to convert to integer.")
+            # The coordinate list is sent as a single line (L ... / M ...) instead of bit-by-bit prompts
+            if prompt_name == 'coordinate_list' and not replaying:
+                try:
+                    coords = parse_coordinate_spec(user_input)
+                except (ValueError, OSError) as e:
+                    print(f"[ERROR] Invalid coordinate list: {e}")
+                    print("[INFO] Examples: '10,20; 11,20'  '0-15,0-15'  '0-127:8,0-127:8'  '@coords.txt'")
+                    prompt_queue.put((prompt_name, prompt_text))
+                    prompt_queue.task_done()
+                    continue
+                group = int(group_selected) if group_selected else 0
+                coords = [(x, y) for _, x, y in drop_screened([(group, x, y) for x, y in coords])]
+                if not coords:
+                    print("[ERROR] Every coordinate was screened out as open / shorted.")
+                    prompt_queue.put((prompt_name, prompt_text))
+                    prompt_queue.task_done()
+                    continue
+                user_input = encode_coordinates(coords)
+                print(f"[INFO] Sending {len(coords)} coordinates in one message ({len(user_input)} bytes).")
+            # The first group segment prompt takes the whole target list; the scheduled segments
+            # are then sent one per prompt (auto_answer). An empty line finishes the scan.
+            if prompt_name == 'group_segment' and not replaying and group_plan is None and user_input.strip():
+                group_plan = schedule_group_scan(user_input)
+                if group_plan is None:
+                    prompt_queue.put((prompt_name, prompt_text))
+                    prompt_queue.task_done()
+                    continue
+                user_input = group_plan.pop(0)
             try:
                 ser.write((user_input.strip() + '\n').encode('utf-8'))
-                if "Set AD5933 Mode" in prompt_text:
+                if prompt_name == 'mode' and not user_input.strip().startswith('BAUD'):
                     current_mode = user_input.strip()
                     if current_mode == '1':
                         measurement_type = 'COB'
@@ -711,6 +1802,16 @@ try:
                         measurement_type = 'COB-range'
                     elif current_mode == '5':
                         measurement_type = 'COB-range-step'
+                    elif current_mode == '6':
+                        measurement_type = 'COB-list'
+                    elif current_mode == '7':
+                        measurement_type = 'Settling-tune'
+                    elif current_mode == '8':
+                        measurement_type = 'COB-multi-group'
+                    elif current_mode == '9':
+                        measurement_type = 'COB-screening'
+                    elif current_mode == '10':
+                        measurement_type = 'COB-kinetics'
                     elif current_mode == '0':
                         is_calibrating = True
                         current_calibration_run += 1
@@ -721,54 +1822,107 @@ try:
             except serial.SerialException as e:
                 print(f"Error sending data to serial port: {e}")
                 break
+            prompt_queue.task_done()
         elif sweep_complete.is_set():
-            # For single sweep modes (COB, Rcal, COB-diagonal), plot immediately
-            if measurement_type in ['COB', 'Rcal', 'COB-diagonal']:
-                print("\n[INFO] Single sweep complete - plotting data.\n")
-                plot_data(measurement_data, mode_label=current_mode)
+            # For single sweep modes (COB, Rcal), plot immediately
+            if measurement_type in ['COB', 'Rcal']:
+                if report_writer:
+                    report_writer.submit_sweep(measurement_data, f"{measurement_type} (Mode {current_mode})")
+                else:
+                    print("\n[INFO] Single sweep complete - plotting data.\n")
+                    plot_data(measurement_data, mode_label=current_mode)
                 measurement_data.clear()
                 currentCoord = None
             sweep_complete.clear()
         elif range_sweep_complete.is_set():
             # For range sweep modes, validate user input before plotting
-            if measurement_type in ['COB-range', 'COB-range-step']:
-                mode_map = {'COB-range': '4', 'COB-range-step': '5'}
+            if measurement_type in RANGE_MEASUREMENT_TYPES:
+                mode_map = {'COB-diagonal': '3', 'COB-range': '4', 'COB-range-step': '5', 'COB-list': '6', 'COB-multi-group': '8'}
                 mode_num = mode_map.get(measurement_type)
-                print(f"\n[INFO] {measurement_type} complete. Select plot option.\n")
+                if measurement_type == 'COB-diagonal':
+                    finish_diagonal_sweep()
+                elif fit_model:
+                    fit_range_sweep()
+                if chip_id:
+                    finish_baseline()
+                if report_writer:
+                    report_writer.submit_sweep(range_data, f"{measurement_type} (Mode {mode_num})")
+                else:
+                    print(f"\n[INFO] {measurement_type} complete. Select plot option.\n")
                 
-                while True:
-                    user_choice = prompt("Plotting options (avg/ind): ").strip().lower()
+                while not report_writer:
+                    user_choice = prompt("Plotting options (avg/ind/imp): ").strip().lower()
                     if user_choice == 'avg':
                         plot_average_by_frequency(range_data, mode_label=mode_num)
                         break
                     elif user_choice == 'ind':
                         plot_data(range_data, mode_label=mode_num)
                         break
+                    elif user_choice == 'imp':
+                        plot_impedance(range_data, title=f"{measurement_type} (Mode {mode_num})")
+                        break
                     else:
-                        print("[ERROR] Invalid input. Please enter 'avg' or 'ind'.")
+                        print("[ERROR] Invalid input. Please enter 'avg', 'ind' or 'imp'.")
 
                 range_data.clear()
                 currentCoord = None
             range_sweep_complete.clear()
+        elif kinetics_update.is_set():
+            # Redraw the live plot with the sweeps received since the last update
+            kinetics_update.clear()
+            if not report_writer and kinetics_buffer is not None:
+                if kinetics_plot is None:
+                    kinetics_plot = KineticsLivePlot(kinetics_buffer, title=f"Kinetics run {kinetics_number}",
+                                                     freq=kinetics_plot_freq)
+                if kinetics_plot.is_open():
+                    kinetics_plot.update()
+                poll_kinetics_plot()
+        elif kinetics_done.is_set():
+            if kinetics_snapshot and report_writer:
+                report_writer.submit_kinetics(kinetics_snapshot, f"Kinetics run {kinetics_number}")
+            elif kinetics_plot is not None and kinetics_plot.is_open():
+                print("\n[INFO] Kinetics complete. Close the plot window to continue.\n")
+                kinetics_plot.update()
+                plt.ioff()
+                plt.show()
+            kinetics_plot = None
+            kinetics_snapshot = None
+            currentCoord = None
+            kinetics_done.clear()
+        elif replaying and not thread.is_alive():
+            break
         else:
+            poll_kinetics_plot()
             time.sleep(0.01)
 except KeyboardInterrupt:
     print("\nExiting the program.")
+    if kinetics_archive is not None:
+        # Stop the board's loop and keep what the run recorded so far
+        try:
+            ser.write(b"STOP\n")
+        except Exception:
+            pass
+        finish_kinetics()
     if measurement_data or range_data:
         data_to_plot = range_data if range_data else measurement_data
         
         # Check if it was a range sweep to ask for plotting options
-        if measurement_type in ['COB-range', 'COB-range-step']:
+        if report_writer:
+            report_writer.submit_sweep(data_to_plot, f"{measurement_type} (Mode {current_mode}, interrupted)")
+        elif measurement_type in RANGE_MEASUREMENT_TYPES:
              while True:
-                user_choice = prompt("Select plot option before exiting (avg/ind): ").strip().lower()
+                user_choice = prompt("Select plot option before exiting (avg/ind/imp): ").strip().lower()
                 if user_choice == 'avg':
                     plot_average_by_frequency(data_to_plot, mode_label=current_mode)
                     break
                 elif user_choice == 'ind':
                     plot_data(data_to_plot, mode_label=current_mode)
                     break
+                elif user_choice == 'imp':
+                    plot_impedance(data_to_plot, title=f"{measurement_type} (Mode {current_mode})")
+                    break
                 else:
-                    print("[ERROR] Invalid input. Please enter 'avg' or 'ind'.")
+                    print("[ERROR] Invalid input. Please enter 'avg', 'ind' or 'imp'.")
         else: # For other modes, plot directly
             plot_data(data_to_plot, mode_label=current_mode)
             
@@ -776,9 +1930,24 @@ except KeyboardInterrupt:
     else:
         print("No measurement data to save.")
 finally:
+    if replaying:
+        print(f"[INFO] Replay finished: {ser.lines} lines ({ser.bytes} bytes) in {time.perf_counter() - replay_started:.2f} s.")
+    if baseline_store is not None:
+        baseline_store.flush()
+    if archive_session:
+        try:
+            archive_path = write_archive(wb, os.path.splitext(excel_filename)[0] + ARCHIVE_EXTENSION, archive_compressor)
+            print(f"[INFO] Session archive: '{archive_path}' ({os.path.getsize(archive_path) / 1e3:.0f} kB).")
+        except Exception as e:
+            print(f"[WARNING] Session archive not written: {e}")
     try:
         wb.save(excel_filename)
         wb.close()
         ser.close()
     except Exception as e:
         print(f"Error during exit: {e}")
+    if metrics_server:
+        metrics_server.close()
+    if report_writer:
+        print("[INFO] Waiting for the session report.")
+        report_writer.finish()
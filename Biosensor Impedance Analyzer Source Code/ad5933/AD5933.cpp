@@ -11,6 +11,10 @@
 #include "AD5933.h"
 #include <Math.h>
 
+unsigned long AD5933::dataTimeoutMicros = DATA_VALID_TIMEOUT_US;
+unsigned long AD5933::lastWaitMicros = 0;
+unsigned long AD5933::lastReadMicros = 0;
+
 /**
  * Request to read a byte from the AD5933.
  *
@@ -131,10 +135,20 @@ bool AD5933::enableTemperature(byte enable) {
  * @return The temperature in celcius, or -1 if fail.
  */
 double AD5933::getTemperature() {
-    // Set temperature mode
-    if (enableTemperature(TEMP_MEASURE)) {
-        // Wait for a valid temperature to be ready
-        while((readStatusRegister() & STATUS_TEMP_VALID) != STATUS_TEMP_VALID) ;
+    double temperature;
+    return readTemperature(&temperature) ? temperature : -1;
+}
+
+/**
+ * Read the temperature from the AD5933. Waits at most TEMP_VALID_TIMEOUT_US
+ * for a valid temperature, so a stuck status register can't hang the board.
+ *
+ * @param temperature Set to the temperature in celcius on success
+ * @return Success or failure
+ */
+bool AD5933::readTemperature(double *temperature) {
+    // Set temperature mode and wait for a valid temperature to be ready
+    if (enableTemperature(TEMP_MEASURE) && waitForStatus(STATUS_TEMP_VALID, TEMP_VALID_TIMEOUT_US)) {
 
         // Read raw temperature from temperature registers
         byte rawTemp[2];
@@ -150,13 +164,14 @@ double AD5933::getTemperature() {
             // datasheet. There is a different formula depending on the sign
             // bit, which is the 5th bit of the byte in TEMP_DATA_1.
             if ((rawTemp[0] & (1<<5)) == 0) {
-                return rawTempVal / 32.0;
+                *temperature = rawTempVal / 32.0;
             } else {
-                return (rawTempVal - 16384) / 32.0;
+                *temperature = (rawTempVal - 16384) / 32.0;
             }
+            return true;
         }
     }
-    return -1;
+    return false;
 }
 
 
@@ -446,41 +461,103 @@ int AD5933::readControlRegister() {
 //     }
 // }
 
-// 테스트
-bool AD5933::getComplexData(int *real, int *imag) {
-    // 데이터가 유효할 때까지 대기
-    while ((readStatusRegister() & STATUS_DATA_VALID) != STATUS_DATA_VALID) {
-        delay(5); // 지연 추가
+/**
+ * Read consecutive registers in one I2C transaction with the block read
+ * command (datasheet p29): set the address pointer, send BLOCK_READ with the
+ * byte count, then read the bytes after a repeated start.
+ *
+ * @param address Address of the first register
+ * @param values Array of at least count bytes for the register values
+ * @param count Number of registers to read
+ * @return Success or failure
+ */
+bool AD5933::blockRead(byte address, byte *values, byte count) {
+    Wire.beginTransmission(AD5933_ADDR);
+    Wire.write(ADDR_PTR);
+    Wire.write(address);
+    if (Wire.endTransmission() != I2C_RESULT_SUCCESS) {
+        return false;
     }
 
-    // 상태 레지스터 확인
-    if ((readStatusRegister() & STATUS_DATA_VALID) == STATUS_DATA_VALID) {
-        // 데이터 레지스터에서 실수와 허수 데이터 읽기
-        byte realComp[2];
-        byte imagComp[2];
-        if (getByte(REAL_DATA_1, &realComp[0]) &&
-            getByte(REAL_DATA_2, &realComp[1]) &&
-            getByte(IMAG_DATA_1, &imagComp[0]) &&
-            getByte(IMAG_DATA_2, &imagComp[1]))
-        {
-            *real = (int16_t)(((realComp[0] << 8) | realComp[1]) & 0xFFFF);
-            *imag = (int16_t)(((imagComp[0] << 8) | imagComp[1]) & 0xFFFF);
+    Wire.beginTransmission(AD5933_ADDR);
+    Wire.write(BLOCK_READ);
+    Wire.write(count);
+    if (Wire.endTransmission(false) != I2C_RESULT_SUCCESS) {
+        return false;
+    }
 
-            return true;
-        } else {
-            *real = 0;
-            *imag = 0;
-            return false;
-        }
-    } else {
-        Serial.println("Data not valid after waiting.");
-        *real = 0;
-        *imag = 0;
+    if (Wire.requestFrom(AD5933_ADDR, count) != count) {
+        return false;
+    }
+    for (byte k = 0; k < count; k++) {
+        values[k] = Wire.read();
+    }
+    return true;
+}
+
+/**
+ * Wait until all bits of mask are set in the status register. The address
+ * pointer is set once and the status register is then re-read with single
+ * byte reads, so each poll is one short transaction.
+ *
+ * @param mask Status bits to wait for
+ * @param timeoutMicros Give up after this many microseconds
+ * @return True if the bits were set before the timeout
+ */
+bool AD5933::waitForStatus(byte mask, unsigned long timeoutMicros) {
+    Wire.beginTransmission(AD5933_ADDR);
+    Wire.write(ADDR_PTR);
+    Wire.write(STATUS_REG);
+    if (Wire.endTransmission() != I2C_RESULT_SUCCESS) {
         return false;
     }
+
+    unsigned long start = micros();
+    do {
+        if (Wire.requestFrom(AD5933_ADDR, 1) == 1 && (Wire.read() & mask) == mask) {
+            return true;
+        }
+    } while (micros() - start < timeoutMicros);
+    return false;
 }
 
+/**
+ * Set how long getComplexData() waits for STATUS_DATA_VALID.
+ *
+ * @param timeoutMicros Timeout in microseconds
+ */
+void AD5933::setDataTimeout(unsigned long timeoutMicros) {
+    dataTimeoutMicros = timeoutMicros;
+}
 
+/**
+ * Get a raw complex number for a specific frequency measurement: waits for
+ * STATUS_DATA_VALID (bounded by the data timeout), then reads the four data
+ * registers with one block read. The time spent waiting and reading is kept
+ * in lastWaitMicros / lastReadMicros.
+ *
+ * @param real Pointer to an int that will contain the real component.
+ * @param imag Pointer to an int that will contain the imaginary component.
+ * @return Success or failure
+ */
+bool AD5933::getComplexData(int *real, int *imag) {
+    unsigned long start = micros();
+    bool valid = waitForStatus(STATUS_DATA_VALID, dataTimeoutMicros);
+    unsigned long ready = micros();
+    lastWaitMicros = ready - start;
+
+    byte data[4];
+    if (valid && blockRead(REAL_DATA_1, data, 4)) {
+        *real = (int16_t)(((data[0] << 8) | data[1]) & 0xFFFF);
+        *imag = (int16_t)(((data[2] << 8) | data[3]) & 0xFFFF);
+        lastReadMicros = micros() - ready;
+        return true;
+    }
+    lastReadMicros = micros() - ready;
+    *real = 0;
+    *imag = 0;
+    return false;
+}
 
 /**
  * Set the power level of the AD5933.
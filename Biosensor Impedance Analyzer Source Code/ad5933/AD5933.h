@@ -14,6 +14,7 @@
 // Device address and address pointer
 #define AD5933_ADDR     (0x0D)
 #define ADDR_PTR        (0xB0)
+#define BLOCK_READ      (0xA1)
 // Control Register
 #define CTRL_REG1       (0x80)
 #define CTRL_REG2       (0x81)
@@ -92,6 +93,10 @@
 #define STATUS_ERROR            (0xFF)
 // Frequency sweep parameters
 #define SWEEP_DELAY             (1)
+// Longest wait for STATUS_DATA_VALID: 2044 settling cycles at 1 kHz plus the DFT
+#define DATA_VALID_TIMEOUT_US   (2500000UL)
+// Longest wait for STATUS_TEMP_VALID: a temperature conversion takes about 800 us
+#define TEMP_VALID_TIMEOUT_US   (10000UL)
 
 /**
  * AD5933 Library class
@@ -105,6 +110,7 @@ class AD5933 {
         // Temperature measuring
         static bool enableTemperature(byte);
         static double getTemperature(void);
+        static bool readTemperature(double*);
 
         // Clock
         static bool setClockSource(byte);
@@ -129,6 +135,12 @@ class AD5933 {
 
         // Impedance data
         static bool getComplexData(int*, int*);
+        static void setDataTimeout(unsigned long);
+        static bool waitForStatus(byte, unsigned long);
+
+        // Timing of the last getComplexData() call in microseconds
+        static unsigned long lastWaitMicros;
+        static unsigned long lastReadMicros;
 
         // Set control mode register (CTRL_REG1)
         static bool setControlMode(byte);
@@ -150,10 +162,12 @@ class AD5933 {
         // I2C 테스트를 위해 private에서 public으로 옮김
         static int getByte(byte, byte*);
         static bool sendByte(byte, byte);
+        static bool blockRead(byte, byte*, byte);
     
     private:
         // Private data
         static const unsigned long clockSpeed = 16776000;
+        static unsigned long dataTimeoutMicros;
 
         
 };
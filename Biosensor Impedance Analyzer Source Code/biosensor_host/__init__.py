@@ -0,0 +1,3 @@
+# Host-side helpers shared by the data export scripts (Data Extract&Plot translated_rev01.py, ...).
+# The scripts are run from the "Biosensor Impedance Analyzer Source Code" directory, so this
+# package is importable as `biosensor_host`.
@@ -0,0 +1,568 @@
+import cmath
+import math
+import random
+import time
+
+# ------------------------
+# AD5933 register-level emulator
+# ------------------------
+# Emulates the register map, control-register commands and sweep state machine of the
+# AD5933 (datasheet p23-p28) behind an I2C-like interface, so sweep logic can be run and
+# benchmarked without the chip. AD5933Driver below is a line-by-line port of
+# ad5933/AD5933.cpp on top of it.
+#
+# Time is virtual: bus transactions, conversions and delays advance a VirtualClock. With a
+# finite time_scale the clock also sleeps in real time (1.0 = real speed, 10.0 = 10x faster),
+# with time_scale=None everything runs as fast as possible.
+
+# Register map (same names as AD5933.h)
+AD5933_ADDR = 0x0D
+ADDR_PTR = 0xB0
+BLOCK_WRITE = 0xA0
+BLOCK_READ = 0xA1
+CTRL_REG1 = 0x80
+CTRL_REG2 = 0x81
+START_FREQ_1 = 0x82
+INC_FREQ_1 = 0x85
+NUM_INC_1 = 0x88
+NUM_INC_2 = 0x89
+NUM_SCYCLES_1 = 0x8A
+NUM_SCYCLES_2 = 0x8B
+STATUS_REG = 0x8F
+TEMP_DATA_1 = 0x92
+TEMP_DATA_2 = 0x93
+REAL_DATA_1 = 0x94
+REAL_DATA_2 = 0x95
+IMAG_DATA_1 = 0x96
+IMAG_DATA_2 = 0x97
+
+# Control register commands (top nibble of CTRL_REG1)
+CTRL_NO_OPERATION = 0x00
+CTRL_INIT_START_FREQ = 0x10
+CTRL_START_FREQ_SWEEP = 0x20
+CTRL_INCREMENT_FREQ = 0x30
+CTRL_REPEAT_FREQ = 0x40
+CTRL_TEMP_MEASURE = 0x90
+CTRL_POWER_DOWN_MODE = 0xA0
+CTRL_STANDBY_MODE = 0xB0
+CTRL_RESET = 0x10
+CTRL_CLOCK_EXTERNAL = 0x08
+CTRL_PGA_GAIN_X1 = 0x01
+CTRL_PGA_GAIN_X5 = 0x00
+CTRL_OUTPUT_RANGE_1 = 0x00
+CTRL_OUTPUT_RANGE_2 = 0x06
+CTRL_OUTPUT_RANGE_3 = 0x04
+CTRL_OUTPUT_RANGE_4 = 0x02
+
+STATUS_TEMP_VALID = 0x01
+STATUS_DATA_VALID = 0x02
+STATUS_SWEEP_DONE = 0x04
+STATUS_ERROR = 0xFF
+
+CLOCK_SPEED = 16776000     # Internal oscillator (AD5933::clockSpeed)
+DFT_SAMPLES = 1024
+TEMP_CONVERSION_S = 800e-6
+DATA_VALID_TIMEOUT_US = 2500000
+TEMP_VALID_TIMEOUT_US = 10000
+ADC_FULL_SCALE = 32767.0   # DFT magnitude of a full-scale input; a clipped sine's fundamental stops growing here
+# Thermal drift of the analog chain around REFERENCE_TEMP_C: relative DFT magnitude and system
+# phase per degree C
+REFERENCE_TEMP_C = 25.0
+GAIN_TEMPCO = -300e-6
+PHASE_TEMPCO_DEG = 0.02
+
+# Output excitation amplitude (Vpp) per range bits D10-D9
+OUTPUT_RANGE_VPP = {
+    CTRL_OUTPUT_RANGE_1: 2.0,
+    CTRL_OUTPUT_RANGE_2: 1.0,
+    CTRL_OUTPUT_RANGE_3: 0.4,
+    CTRL_OUTPUT_RANGE_4: 0.2,
+}
+
+
+def default_transient_cycles(freq):
+    # Coupling/filter transients span more excitation cycles at low frequency
+    return 4.0 + 40.0 * math.sqrt(1000.0 / freq)
+
+
+# ------------------------
+# Impedance models: each returns a function freq_hz -> complex impedance (ohm)
+# ------------------------
+def resistor(r):
+    return lambda f: complex(r, 0.0)
+
+
+def series_rc(r, c):
+    return lambda f: complex(r, -1.0 / (2 * math.pi * f * c))
+
+
+def parallel_rc(r, c):
+    return lambda f: 1.0 / (1.0 / r + 1j * 2 * math.pi * f * c)
+
+
+def randles(rs, rct, cdl, sigma=0.0):
+    # Rs + (Cdl || (Rct + Zw)), Zw = sigma * (1 - j) / sqrt(w)
+    def z(f):
+        w = 2 * math.pi * f
+        faradaic = rct + (sigma * (1 - 1j) / math.sqrt(w) if sigma else 0.0)
+        return rs + 1.0 / (1j * w * cdl + 1.0 / faradaic)
+    return z
+
+
+def r_cpe(rs, rct, q, n):
+    # Rs + (Rct || CPE), Z_cpe = 1 / (Q (jw)^n)
+    def z(f):
+        w = 2 * math.pi * f
+        return rs + 1.0 / (1.0 / rct + q * (1j * w) ** n)
+    return z
+
+
+def warming(ambient=25.0, rise=10.0, tau_s=600.0):
+    # Die temperature of a board warming up after power-on: board time (s) -> degrees C
+    return lambda t: ambient + rise * (1.0 - math.exp(-t / tau_s))
+
+
+class VirtualClock:
+    def __init__(self, time_scale=None):
+        self.now = 0.0
+        self.time_scale = time_scale
+        self._real_start = time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        self.now += seconds
+        if self.time_scale:
+            # Sleep until real time catches up with virtual time, so short delays accumulate
+            lag = self.now / self.time_scale - (time.monotonic() - self._real_start)
+            if lag > 0:
+                time.sleep(lag)
+
+    def sync(self):
+        # Real time spent waiting (on the host, on a baud switch) passes on the board too, so it
+        # doesn't turn into a burst of catch-up without sleeps
+        if self.time_scale:
+            self.now = max(self.now, (time.monotonic() - self._real_start) * self.time_scale)
+
+    def millis(self):
+        return int(self.now * 1000)
+
+    def micros(self):
+        return int(self.now * 1e6)
+
+
+class AD5933Emulator:
+    def __init__(self, impedance=None, clock=None, rfb=100000.0, noise_counts=2.0,
+                 system_phase_deg=lambda f: 2.0 - 25.0 * f / 100000.0, temperature=25.0,
+                 i2c_hz=100000, seed=None, transient=0.05, transient_cycles=default_transient_cycles,
+                 gain_tempco=GAIN_TEMPCO, phase_tempco_deg=PHASE_TEMPCO_DEG, glitch_rate=0.0):
+        self.impedance = impedance or resistor(100000.0)  # freq -> complex, can be swapped at any time
+        self.clock = clock or VirtualClock()
+        self.rfb = rfb
+        self.noise_counts = noise_counts
+        self.system_phase_deg = system_phase_deg
+        self.transient = transient                  # Relative error left with no settling cycles
+        self.transient_cycles = transient_cycles    # freq -> decay constant in excitation cycles
+        self.temperature = temperature              # degrees C, or a function of the clock time
+        self.gain_tempco = gain_tempco
+        self.phase_tempco_deg = phase_tempco_deg
+        self.glitch_rate = glitch_rate              # Fraction of conversions that never set DATA_VALID
+        self.i2c_hz = i2c_hz
+        self.rng = random.Random(seed)
+        self.transactions = 0
+        self.bus_time = 0.0
+        self.power_on_reset()
+
+    def power_on_reset(self):
+        self.registers = {address: 0x00 for address in range(0x80, 0x98)}
+        self.registers[CTRL_REG1] = 0xA0   # Power-down mode after power-up
+        self.pointer = CTRL_REG1
+        self.state = 'power_down'
+        self.freq_index = 0
+        self.conversion_done_at = None
+        self.temp_done_at = None
+
+    # --- I2C bus interface (what Wire.h sees) ---
+    def _bus(self, num_bytes):
+        # START + address byte + data bytes (9 clocks each incl. ACK) + STOP
+        seconds = ((1 + num_bytes) * 9 + 2) / self.i2c_hz
+        self.transactions += 1
+        self.bus_time += seconds
+        self.clock.sleep(seconds)
+
+    def i2c_write(self, data):
+        self._bus(len(data))
+        command = data[0]
+        if command == ADDR_PTR:
+            self.pointer = data[1]
+        elif command == BLOCK_WRITE:
+            for offset, value in enumerate(data[2:2 + data[1]]):
+                self._write_register(self.pointer + offset, value)
+        elif command == BLOCK_READ:
+            pass  # The following read returns data[1] bytes starting at the pointer
+        elif len(data) >= 2:
+            self._write_register(command, data[1])
+        return 0  # I2C_RESULT_SUCCESS
+
+    def i2c_read(self, count):
+        self._bus(count)
+        self._update()
+        return [self.registers.get(self.pointer + k, 0x00) for k in range(count)]
+
+    # --- Convenience wrappers matching AD5933::sendByte / getByte ---
+    def send_byte(self, address, value):
+        return self.i2c_write([address, value]) == 0
+
+    def get_byte(self, address):
+        self.i2c_write([ADDR_PTR, address])
+        return self.i2c_read(1)[0]
+
+    def block_read(self, address, count):
+        self.i2c_write([ADDR_PTR, address])
+        self.i2c_write([BLOCK_READ, count])
+        return self.i2c_read(count)
+
+    # --- Chip state machine ---
+    def _write_register(self, address, value):
+        if address not in self.registers:
+            return
+        self._update()
+        value &= 0xFF
+        if address == CTRL_REG1:
+            self.registers[CTRL_REG1] = value
+            self._command(value & 0xF0)
+        elif address == CTRL_REG2:
+            self.registers[CTRL_REG2] = value & ~CTRL_RESET & 0xFF
+            if value & CTRL_RESET:
+                self.state = 'standby'
+                self.conversion_done_at = None
+                self.registers[STATUS_REG] &= ~(STATUS_DATA_VALID | STATUS_SWEEP_DONE) & 0xFF
+        elif address != STATUS_REG:
+            self.registers[address] = value
+
+    def _command(self, command):
+        status = self.registers[STATUS_REG]
+        if command == CTRL_INIT_START_FREQ:
+            self.state = 'excite'
+            self.freq_index = 0
+            self.conversion_done_at = None
+            self.registers[STATUS_REG] = status & ~(STATUS_DATA_VALID | STATUS_SWEEP_DONE) & 0xFF
+        elif command == CTRL_START_FREQ_SWEEP and self.state in ('excite', 'standby'):
+            self.state = 'sweep'
+            self.freq_index = 0
+            self._start_conversion()
+        elif command == CTRL_INCREMENT_FREQ and self.state == 'sweep':
+            if not status & STATUS_SWEEP_DONE:
+                self.freq_index += 1
+                self._start_conversion()
+        elif command == CTRL_REPEAT_FREQ and self.state == 'sweep':
+            if not status & STATUS_SWEEP_DONE:
+                self._start_conversion()
+        elif command == CTRL_TEMP_MEASURE:
+            self.registers[STATUS_REG] = status & ~STATUS_TEMP_VALID & 0xFF
+            self.temp_done_at = self.clock.now + TEMP_CONVERSION_S
+        elif command == CTRL_POWER_DOWN_MODE:
+            self.state = 'power_down'
+            self.conversion_done_at = None
+        elif command == CTRL_STANDBY_MODE:
+            self.state = 'standby'
+            self.conversion_done_at = None
+
+    def _start_conversion(self):
+        self.registers[STATUS_REG] &= ~STATUS_DATA_VALID & 0xFF
+        self.conversion_done_at = self.clock.now + self.conversion_time(self.current_frequency())
+
+    def _update(self):
+        now = self.clock.now
+        if self.conversion_done_at is not None and now >= self.conversion_done_at:
+            self.conversion_done_at = None
+            # A lost conversion never sets DATA_VALID: the driver times out waiting for it
+            if not (self.glitch_rate and self.rng.random() < self.glitch_rate):
+                real, imag = self.measure(self.current_frequency())
+                self._set_word(REAL_DATA_1, real)
+                self._set_word(IMAG_DATA_1, imag)
+                status = self.registers[STATUS_REG] | STATUS_DATA_VALID
+                if self.freq_index >= self.num_increments():
+                    status |= STATUS_SWEEP_DONE
+                self.registers[STATUS_REG] = status
+        if self.temp_done_at is not None and now >= self.temp_done_at:
+            self.temp_done_at = None
+            code = int(round(self.die_temperature() * 32)) & 0x3FFF
+            self.registers[TEMP_DATA_1] = (code >> 8) & 0xFF
+            self.registers[TEMP_DATA_2] = code & 0xFF
+            self.registers[STATUS_REG] |= STATUS_TEMP_VALID
+
+    def _set_word(self, address, value):
+        value &= 0xFFFF
+        self.registers[address] = value >> 8
+        self.registers[address + 1] = value & 0xFF
+
+    def _get_code(self, address, num_bytes):
+        code = 0
+        for k in range(num_bytes):
+            code = (code << 8) | self.registers[address + k]
+        return code
+
+    # --- Derived settings ---
+    def start_frequency(self):
+        return self._get_code(START_FREQ_1, 3) * (CLOCK_SPEED / 4.0) / 2 ** 27
+
+    def increment_frequency(self):
+        return self._get_code(INC_FREQ_1, 3) * (CLOCK_SPEED / 4.0) / 2 ** 27
+
+    def num_increments(self):
+        return ((self.registers[NUM_INC_1] & 0x01) << 8) | self.registers[NUM_INC_2]
+
+    def current_frequency(self):
+        return self.start_frequency() + self.freq_index * self.increment_frequency()
+
+    def settling_cycles(self):
+        high = self.registers[NUM_SCYCLES_1]
+        cycles = ((high & 0x01) << 8) | self.registers[NUM_SCYCLES_2]
+        multiplier = {0: 1, 1: 2, 3: 4}.get((high >> 1) & 0x03, 1)
+        return cycles * multiplier
+
+    def output_range_vpp(self):
+        return OUTPUT_RANGE_VPP[self.registers[CTRL_REG1] & 0x06]
+
+    def pga_gain(self):
+        return 1 if self.registers[CTRL_REG1] & CTRL_PGA_GAIN_X1 else 5
+
+    def conversion_time(self, freq):
+        settle = self.settling_cycles() / freq if freq > 0 else 0.0
+        return settle + DFT_SAMPLES * 16.0 / CLOCK_SPEED
+
+    # --- Signal model ---
+    def die_temperature(self):
+        if callable(self.temperature):
+            return self.temperature(self.clock.now)
+        return self.temperature
+
+    def measure(self, freq):
+        # DFT output for the current load: magnitude ~ excitation * PGA * Rfb / |Z|, plus the
+        # analog chain's system phase, Gaussian noise and ADC clipping.
+        z = self.impedance(max(freq, 1.0))
+        admittance = 1.0 / z if z != 0 else complex(1e12, 0.0)
+        magnitude = 4000.0 * self.output_range_vpp() * self.pga_gain() * self.rfb * abs(admittance)
+        angle = cmath.phase(admittance) + math.radians(self.system_phase_deg(freq))
+        warming = self.die_temperature() - REFERENCE_TEMP_C
+        magnitude *= 1.0 + self.gain_tempco * warming
+        angle += math.radians(self.phase_tempco_deg * warming)
+        # Start-up transient of the excitation/receive chain, decaying over the settling cycles
+        residual = self.transient * math.exp(-self.settling_cycles() / self.transient_cycles(max(freq, 1.0)))
+        magnitude *= 1.0 + residual
+        angle += math.radians(10.0) * residual
+        magnitude = min(magnitude, ADC_FULL_SCALE)
+        real = magnitude * math.cos(angle) + self.rng.gauss(0.0, self.noise_counts)
+        imag = magnitude * math.sin(angle) + self.rng.gauss(0.0, self.noise_counts)
+        return _clip16(real), _clip16(imag)
+
+
+def _clip16(value):
+    return max(-32768, min(32767, int(round(value))))
+
+
+def _to_int16(high, low):
+    value = (high << 8) | low
+    return value - 0x10000 if value & 0x8000 else value
+
+
+# ------------------------
+# Port of ad5933/AD5933.cpp over the emulated bus
+# ------------------------
+class AD5933Driver:
+    def __init__(self, chip):
+        self.chip = chip
+        self.clock = chip.clock
+        self.dataTimeoutMicros = DATA_VALID_TIMEOUT_US
+        self.lastWaitMicros = 0
+        self.lastReadMicros = 0
+
+    def delay(self, ms):
+        self.clock.sleep(ms / 1000.0)
+
+    def getByte(self, address):
+        # Returns (ok, value)
+        self.chip.i2c_write([ADDR_PTR, address])
+        return True, self.chip.i2c_read(1)[0]
+
+    def sendByte(self, address, value):
+        return self.chip.send_byte(address, value)
+
+    def setControlMode(self, mode):
+        ok, val = self.getByte(CTRL_REG1)
+        if not ok:
+            return False
+        val &= 0x0F
+        val |= mode
+        return self.sendByte(CTRL_REG1, val)
+
+    def reset(self):
+        ok, val = self.getByte(CTRL_REG2)
+        if not ok:
+            return False
+        return self.sendByte(CTRL_REG2, val | CTRL_RESET)
+
+    def enableTemperature(self, enable):
+        return self.setControlMode(CTRL_TEMP_MEASURE if enable else CTRL_NO_OPERATION)
+
+    def getTemperature(self):
+        ok, temperature = self.readTemperature()
+        return temperature if ok else -1
+
+    def readTemperature(self):
+        # Returns (ok, temperature); bounded wait for STATUS_TEMP_VALID
+        if self.enableTemperature(True) and self.waitForStatus(STATUS_TEMP_VALID, TEMP_VALID_TIMEOUT_US):
+            ok1, high = self.getByte(TEMP_DATA_1)
+            ok2, low = self.getByte(TEMP_DATA_2)
+            if ok1 and ok2:
+                raw = ((high << 8) | low) & 0x1FFF
+                return True, raw / 32.0 if (high & (1 << 5)) == 0 else (raw - 16384) / 32.0
+        return False, None
+
+    def setInternalClock(self, internal):
+        return self.sendByte(CTRL_REG2, 0x00 if internal else CTRL_CLOCK_EXTERNAL)
+
+    def setSettlingCycles(self, cycles):
+        high = (cycles >> 8) & 0xFF
+        low = cycles & 0xFF
+        if ((high & 0x7) >> 1) not in (0, 1, 3):
+            return False
+        if self.sendByte(NUM_SCYCLES_1, high) and self.sendByte(NUM_SCYCLES_2, low):
+            ok1, read_high = self.getByte(NUM_SCYCLES_1)
+            ok2, read_low = self.getByte(NUM_SCYCLES_2)
+            return ok1 and ok2 and read_high == high and read_low == low
+        return False
+
+    def _send_frequency(self, first_register, freq):
+        code = int((freq / (CLOCK_SPEED / 4.0)) * 2 ** 27)
+        if code > 0xFFFFFF:
+            return False
+        return (self.sendByte(first_register, (code >> 16) & 0xFF) and
+                self.sendByte(first_register + 1, (code >> 8) & 0xFF) and
+                self.sendByte(first_register + 2, code & 0xFF))
+
+    def setStartFrequency(self, start):
+        return self._send_frequency(START_FREQ_1, start)
+
+    def setIncrementFrequency(self, increment):
+        return self._send_frequency(INC_FREQ_1, increment)
+
+    def setNumberIncrements(self, num):
+        if num > 511:
+            return False
+        return self.sendByte(NUM_INC_1, (num >> 8) & 0xFF) and self.sendByte(NUM_INC_2, num & 0xFF)
+
+    def setPGAGain(self, gain):
+        ok, val = self.getByte(CTRL_REG1)
+        if not ok:
+            return False
+        val &= 0xFE
+        if gain in (CTRL_PGA_GAIN_X1, 1):
+            return self.sendByte(CTRL_REG1, val | CTRL_PGA_GAIN_X1)
+        if gain in (CTRL_PGA_GAIN_X5, 5):
+            return self.sendByte(CTRL_REG1, val | CTRL_PGA_GAIN_X5)
+        return False
+
+    def setRange(self, output_range):
+        ok, val = self.getByte(CTRL_REG1)
+        if not ok:
+            return False
+        val &= 0xF9
+        if output_range in (CTRL_OUTPUT_RANGE_2, CTRL_OUTPUT_RANGE_3, CTRL_OUTPUT_RANGE_4):
+            val |= output_range
+        return self.sendByte(CTRL_REG1, val)
+
+    def readRegister(self, register):
+        ok, val = self.getByte(register)
+        return val if ok else STATUS_ERROR
+
+    def readStatusRegister(self):
+        return self.readRegister(STATUS_REG)
+
+    def blockRead(self, address, count):
+        # Returns (ok, [values]): pointer write, BLOCK_READ + count, repeated-start read
+        self.chip.i2c_write([ADDR_PTR, address])
+        self.chip.i2c_write([BLOCK_READ, count])
+        return True, self.chip.i2c_read(count)
+
+    def waitForStatus(self, mask, timeout_us):
+        self.chip.i2c_write([ADDR_PTR, STATUS_REG])
+        start = self.clock.micros()
+        while True:
+            if (self.chip.i2c_read(1)[0] & mask) == mask:
+                return True
+            if self.clock.micros() - start >= timeout_us:
+                return False
+
+    def setDataTimeout(self, timeout_us):
+        self.dataTimeoutMicros = timeout_us
+
+    def getComplexData(self):
+        # Returns (ok, real, imag); bounded status polling + one block read, timing in lastWait/lastReadMicros
+        start = self.clock.micros()
+        valid = self.waitForStatus(STATUS_DATA_VALID, self.dataTimeoutMicros)
+        ready = self.clock.micros()
+        self.lastWaitMicros = ready - start
+        if valid:
+            ok, data = self.blockRead(REAL_DATA_1, 4)
+            if ok:
+                self.lastReadMicros = self.clock.micros() - ready
+                return True, _to_int16(data[0], data[1]), _to_int16(data[2], data[3])
+        self.lastReadMicros = self.clock.micros() - ready
+        return False, 0, 0
+
+    def getComplexDataLegacy(self):
+        # Previous AD5933::getComplexData (delay(5) polling, four getByte reads), kept for benchmarks
+        while (self.readStatusRegister() & STATUS_DATA_VALID) != STATUS_DATA_VALID:
+            self.delay(5)
+        if (self.readStatusRegister() & STATUS_DATA_VALID) == STATUS_DATA_VALID:
+            ok1, real_high = self.getByte(REAL_DATA_1)
+            ok2, real_low = self.getByte(REAL_DATA_2)
+            ok3, imag_high = self.getByte(IMAG_DATA_1)
+            ok4, imag_low = self.getByte(IMAG_DATA_2)
+            if ok1 and ok2 and ok3 and ok4:
+                return True, _to_int16(real_high, real_low), _to_int16(imag_high, imag_low)
+        return False, 0, 0
+
+    def setPowerMode(self, level):
+        return self.setControlMode(level)
+
+    def frequencySweep(self, n):
+        # Returns (ok, real[], imag[])
+        if not (self.setPowerMode(CTRL_STANDBY_MODE) and
+                self.setControlMode(CTRL_INIT_START_FREQ) and
+                self.setControlMode(CTRL_START_FREQ_SWEEP)):
+            return False, [], []
+        real, imag = [], []
+        while (self.readStatusRegister() & STATUS_SWEEP_DONE) != STATUS_SWEEP_DONE:
+            if len(real) >= n:
+                return False, real, imag
+            ok, r, i = self.getComplexData()
+            if not ok:
+                return False, real, imag
+            real.append(r)
+            imag.append(i)
+            self.setControlMode(CTRL_INCREMENT_FREQ)
+        return self.setPowerMode(CTRL_STANDBY_MODE), real, imag
+
+    def calibrate(self, ref, n):
+        # Returns (ok, gain[], phase[], real[], imag[]) like calibrate(gain, phase, real, imag, ref, n)
+        ok, real, imag = self.frequencySweep(n)
+        if not ok:
+            return False, [], [], real, imag
+        gain, phase = [], []
+        for r, i in zip(real, imag):
+            gain.append((1.0 / ref) / math.sqrt(r * r + i * i) if (r or i) else float('inf'))
+            raw_phase = math.degrees(math.atan2(i, r))
+            if r > 0 and i > 0:
+                phase.append(raw_phase)
+            elif r < 0 and i > 0:
+                phase.append(180 + raw_phase)
+            elif r < 0 and i < 0:
+                phase.append(180 + raw_phase)
+            elif r > 0 and i < 0:
+                phase.append(360 + raw_phase)
+            else:
+                phase.append(raw_phase)
+        return True, gain, phase, real, imag
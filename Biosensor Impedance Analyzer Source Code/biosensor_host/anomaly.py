@@ -0,0 +1,172 @@
+import math
+
+from biosensor_host.autorange import raw_window_status
+from biosensor_host.parsing import freq_hz, split_r_i
+from biosensor_host.repeats import wrap_degrees
+
+# ------------------------
+# Streaming anomaly detection
+# ------------------------
+# AnomalyDetector checks every point of a framed sweep as it is parsed, in O(1) per point:
+#   zero       raw R = I = 0: the firmware's stand-in for a failed getComplexData read
+#   ovf        |Z| printed as "ovf" / "inf" from a non-zero reading
+#   phase      phase jump from the previous point beyond PHASE_JUMP_DEG, or across +-180 degrees
+#   outlier    log|Z| off the expected value by more than OUTLIER_LIMIT spreads
+# The expected log|Z| at a frequency is the mean of the already measured 4-neighbours
+# (X +- 1, Y +- 1 in the same group) or, without any, the rolling mean of that frequency
+# over the previous sweeps. An electrode that differs from its neighbours over the whole
+# spectrum is not a glitch: the sweep's running offset from the expectation is subtracted, and
+# what is left is compared with the rolling spread of that frequency (exponentially weighted,
+# weight ALPHA, floored at MIN_SPREAD). The offset starts as the median of the first
+# OFFSET_SEED_POINTS residuals, so a glitch among them (often the AD5933's first point) can't
+# become the offset; those points are checked once the offset is set, the later ones as they
+# arrive, and the points that pass keep the running mean going. Only sweeps that are kept update the statistics, and
+# only with their clean points. Points outside the raw window (clipped, or too little signal
+# on an open electrode) are left to auto-ranging and screening: their phase and |Z| are
+# dominated by the ADC, so they are neither checked nor learned from.
+#
+# The host can answer a flagged sweep with REMEASURE instead of STORE_OK; the firmware then
+# sweeps the coordinate again at once, with the MUX still selected (one retry per sweep).
+
+PHASE_JUMP_DEG = 90.0
+OUTLIER_LIMIT = 8.0
+MIN_SPREAD = 0.02          # log|Z| (about 2%)
+ALPHA = 0.05
+WARMUP_SWEEPS = 3          # sweeps of a frequency before its spread is trusted
+OFFSET_SEED_POINTS = 3     # residuals whose median starts a sweep's offset
+ANOMALY_HEADERS = ['X', 'Y', 'Group', 'Freq (Hz)', 'Kind', 'R / I', '|Z|', 'Phase (Degrees)', 'Action']
+
+
+class FrequencyStats:
+    # Rolling mean of log|Z| and spread of the offset-corrected deviation at one frequency
+    __slots__ = ('mean', 'var', 'count')
+
+    def __init__(self):
+        self.mean = None
+        self.var = 0.0
+        self.count = 0
+
+    def spread(self):
+        return max(math.sqrt(self.var), MIN_SPREAD)
+
+    def update(self, log_z, deviation):
+        if self.mean is None:
+            self.mean = log_z
+        else:
+            self.mean += ALPHA * (log_z - self.mean)
+        if deviation is not None:
+            self.var += ALPHA * (deviation * deviation - self.var) if self.count else deviation * deviation
+            self.count += 1
+
+
+class AnomalyDetector:
+    def __init__(self, outlier_limit=OUTLIER_LIMIT, phase_jump_deg=PHASE_JUMP_DEG):
+        self.outlier_limit = outlier_limit
+        self.phase_jump_deg = phase_jump_deg
+        self.stats = {}        # freq -> FrequencyStats
+        self.neighbours = {}   # (group, x, y) -> {freq: log|Z|} of the kept sweeps
+        self.start_sweep(None)
+
+    def reset_neighbours(self):
+        # A new scan (or a new chip): the electrodes of the previous one are no reference
+        self.neighbours = {}
+
+    def start_sweep(self, coord):
+        # coord: (group, x, y), None when the sweep has no coordinate
+        self.coord = coord
+        self.points = []       # [freq, log|Z| or None, deviation or None, kinds]
+        self.offset = None
+        self.offset_count = 0
+        self.seed = []         # (point, residual) until the offset is set
+        self.last_phase = None
+
+    def expected(self, freq):
+        if self.coord is not None:
+            group, x, y = self.coord
+            values = [spectrum[freq] for spectrum in
+                      (self.neighbours.get((group, x + dx, y + dy)) for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)))
+                      if spectrum is not None and freq in spectrum]
+            if values:
+                return sum(values) / len(values)
+        stats = self.stats.get(freq)
+        return stats.mean if stats is not None else None
+
+    def is_outlier(self, freq, deviation):
+        stats = self.stats.get(freq)
+        return (stats is not None and stats.count >= WARMUP_SWEEPS
+                and abs(deviation) > self.outlier_limit * stats.spread())
+
+    def set_offset(self):
+        # Median of the seed residuals, then the seed points are checked against it
+        residuals = sorted(residual for _, residual in self.seed)
+        self.offset = residuals[len(residuals) // 2]
+        kept = []
+        for point, residual in self.seed:
+            point[2] = residual - self.offset
+            if self.is_outlier(point[0], point[2]):
+                point[3].append('outlier')
+            else:
+                kept.append(residual)
+        self.offset = sum(kept) / len(kept)
+        self.offset_count = len(kept)
+        self.seed = []
+
+    def check(self, row):
+        # row: measurement row (see biosensor_host.parsing); returns the anomaly kinds of the point
+        kinds = []
+        freq = freq_hz(row[0])
+        real, imag = split_r_i(row[1])
+        impedance, phase = row[2], row[3]
+        if real == 0 and imag == 0:
+            kinds.append('zero')
+        elif math.isnan(impedance):
+            kinds.append('ovf')
+        if kinds or raw_window_status(real, imag):
+            self.points.append([freq, None, None, kinds])
+            return kinds
+        if self.last_phase is not None:
+            if (abs(phase - self.last_phase) > 180.0
+                    or abs(wrap_degrees(phase - self.last_phase)) > self.phase_jump_deg):
+                kinds.append('phase')
+        log_z = math.log(impedance)
+        expected = self.expected(freq)
+        point = [freq, log_z, None, kinds]
+        self.points.append(point)
+        if expected is not None:
+            residual = log_z - expected
+            if self.offset is not None:
+                point[2] = residual - self.offset
+                if self.is_outlier(freq, point[2]):
+                    kinds.append('outlier')
+                if not kinds:
+                    self.offset_count += 1
+                    self.offset += (residual - self.offset) / self.offset_count
+            elif not kinds:
+                self.seed.append((point, residual))
+                if len(self.seed) == OFFSET_SEED_POINTS:
+                    self.set_offset()
+        if not kinds:
+            self.last_phase = phase
+        return kinds
+
+    def anomalies(self):
+        # [(point index, freq, kinds)] of the current sweep
+        return [(p, point[0], point[3]) for p, point in enumerate(self.points) if point[3]]
+
+    def keep_sweep(self):
+        # The sweep was stored: its clean points update the statistics and the neighbour map
+        spectrum = {}
+        for freq, log_z, deviation, kinds in self.points:
+            if kinds or log_z is None:
+                continue
+            self.stats.setdefault(freq, FrequencyStats()).update(log_z, deviation)
+            spectrum[freq] = log_z
+        if self.coord is not None and spectrum:
+            self.neighbours[self.coord] = spectrum
+
+
+def anomaly_text(anomalies, limit=4):
+    # "zero at 52000 Hz, outlier at 57000 Hz and 2 more"
+    parts = [f"{'/'.join(kinds)} at {freq} Hz" for _, freq, kinds in anomalies[:limit]]
+    more = f" and {len(anomalies) - limit} more" if len(anomalies) > limit else ""
+    return ", ".join(parts) + more
@@ -0,0 +1,79 @@
+import math
+import re
+
+# ------------------------
+# Auto-ranging (output range / PGA gain per frequency segment)
+# ------------------------
+# With auto-ranging on, the firmware re-measures runs of points whose raw DFT magnitude
+# |R + jI| lies outside [RAW_MIN_MAGNITUDE, RAW_MAX_MAGNITUDE] at another step of
+# RANGE_STEPS and stitches them into the sweep. Every step needs its own calibration: the
+# firmware asks for it with "Send cached calibration (N points, Range r, PGA xg; empty to
+# measure)" and measures Rcal when the host answers with an empty line.
+
+RANGE_STEPS = [(4, 1), (3, 1), (4, 5), (2, 1), (3, 5), (1, 1), (2, 5), (1, 5)]  # (range, PGA) by signal level
+RANGE_VPP = {1: 2.0, 2: 1.0, 3: 0.4, 4: 0.2}
+
+RAW_MIN_MAGNITUDE = 1500.0     # below: too few ADC counts for a stable |Z|
+RAW_MAX_MAGNITUDE = 30000.0    # above: the ADC clips and |Z| comes out wrong ("ovf" when it reads 0)
+RAW_TARGET_MAGNITUDE = 15000.0
+
+RANGE_CALIBRATION_PATTERN = re.compile(r"^\[INFO\] Range calibration: Range (\d), PGA x(\d)")
+RANGE_PROMPT_PATTERN = re.compile(r"Range (\d), PGA x(\d); empty to measure")
+AUTO_RANGE_PATTERN = re.compile(r"^\[INFO\] Auto-range: (\d+)-(\d+) Hz \((\d+) points\) at Range (\d), PGA x(\d)")
+
+
+def step_level(step):
+    output_range, pga = RANGE_STEPS[step]
+    return RANGE_VPP[output_range] * pga
+
+
+def find_step(output_range, pga):
+    return RANGE_STEPS.index((output_range, pga))
+
+
+def raw_magnitude(real, imag):
+    return math.sqrt(real * real + imag * imag)
+
+
+def raw_window_status(real, imag):
+    # 'high' (clipped), 'low' (too little signal) or None inside the window
+    magnitude = raw_magnitude(real, imag)
+    if magnitude > RAW_MAX_MAGNITUDE:
+        return 'high'
+    if magnitude < RAW_MIN_MAGNITUDE:
+        return 'low'
+    return None
+
+
+def parse_range_calibration_line(line):
+    match = RANGE_CALIBRATION_PATTERN.match(line)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def parse_range_prompt(prompt_text):
+    # (range, PGA) asked for by a range-step "Send cached calibration" prompt, None otherwise
+    match = RANGE_PROMPT_PATTERN.search(prompt_text)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def parse_auto_range_line(line):
+    match = AUTO_RANGE_PATTERN.match(line)
+    if not match:
+        return None
+    return {
+        'start_hz': int(match.group(1)),
+        'end_hz': int(match.group(2)),
+        'points': int(match.group(3)),
+        'output_range': int(match.group(4)),
+        'pga_gain': int(match.group(5)),
+    }
+
+
+def range_settings(settings, output_range, pga_gain):
+    # Calibration cache settings of another range step
+    return dict(settings, output_range=output_range, pga_gain=pga_gain)
+
+
+def calibration_usable(points):
+    # The firmware drops a step whose Rcal readings fall outside the window; don't upload those
+    return all(raw_window_status(real, imag) is None for real, imag in points)
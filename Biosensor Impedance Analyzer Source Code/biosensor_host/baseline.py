@@ -0,0 +1,226 @@
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from biosensor_host.coordinates import ADDRESS_MAX, GROUPS
+from biosensor_host.repeats import wrap_degrees
+
+# ------------------------
+# Per-electrode baselines and delta imaging
+# ------------------------
+# A baseline is the spectrum of every electrode of a chip before the analyte goes on.
+# BaselineStore keeps one per (chip id, frequency grid) as a directory of .npy files:
+#   impedance.npy  float32 (groups + 1, 128, 128, points)
+#   phase.npy      float32, same shape
+#   recorded.npy   bool (groups + 1, 128, 128), True for the electrodes with a baseline
+#   info.json      chip id, frequency grid, electrode count, when it was last recorded
+# (group 0 for sweeps without a known MUX group). The arrays are opened once with
+# np.load(mmap_mode=...), so looking up an electrode's baseline is a slice of the mapped file:
+# only the pages of the electrodes actually swept are read, whatever the size of the array.
+# A new store is created zero-filled (a sparse file); only recorded electrodes are valid, and
+# their spectrum is NaN where a point was off the grid or read as ovf.
+#
+# record() writes a sweep into the baseline; delta() differences a sweep against it per point:
+#   |Z| delta  |Z| - |Z| baseline (and relative to the baseline in %)
+#   phase delta  phase - phase baseline, wrapped to +-180 degrees
+# Points without a baseline (or read as ovf) come out as NaN. DeltaStore collects the deltas
+# of a range sweep for the "Baseline Delta" sheet and the delta maps.
+
+DELTA_HEADERS = ['X', 'Y', 'Group', 'Freq (Hz)', '|Z|', '|Z| Baseline', '|Z| Delta', '|Z| Delta (%)',
+                 'Phase (Degrees)', 'Phase Baseline', 'Phase Delta (Degrees)']
+DELTA_COLUMNS = ['group', 'x', 'y', 'freq', 'impedance', 'baseline_impedance', 'delta', 'delta_pct',
+                 'phase', 'baseline_phase', 'phase_delta']
+
+
+def baseline_name(chip_id, start_freq, freq_increment, points):
+    chip = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(chip_id))
+    return f"{chip}_{int(start_freq)}Hz_{int(freq_increment)}Hz_{int(points)}"
+
+
+class BaselineStore:
+    # writable False opens an existing baseline read-only (replays, comparisons)
+    def __init__(self, directory, chip_id, start_freq, freq_increment, points, writable=False):
+        self.path = os.path.join(directory, baseline_name(chip_id, start_freq, freq_increment, points))
+        self.start_freq = int(start_freq)
+        self.freq_increment = int(freq_increment)
+        self.points = int(points)
+        self.writable = writable
+        self.impedance = self.phase = None
+        self.recorded = None
+        self.info = {'chip_id': str(chip_id), 'start_freq': self.start_freq, 'freq_increment': self.freq_increment,
+                     'points': self.points, 'electrodes': 0, 'updated': None}
+        files = [os.path.join(self.path, name) for name in ("impedance.npy", "phase.npy")]
+        if all(os.path.exists(path) for path in files + [os.path.join(self.path, "recorded.npy")]):
+            mode = 'r+' if writable else 'r'
+            self.impedance, self.phase = (np.load(path, mmap_mode=mode) for path in files)
+            self.recorded = np.load(os.path.join(self.path, "recorded.npy"))
+            try:
+                with open(os.path.join(self.path, "info.json"), 'r', encoding='utf-8') as f:
+                    self.info.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        elif writable:
+            os.makedirs(self.path, exist_ok=True)
+            shape = (len(GROUPS) + 1, ADDRESS_MAX + 1, ADDRESS_MAX + 1, self.points)
+            self.impedance, self.phase = (np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+                                          for path in files)
+            self.recorded = np.zeros(shape[:-1], dtype=bool)
+            self._save_recorded()
+
+    def exists(self):
+        return self.impedance is not None
+
+    def point_index(self, freqs):
+        # Index of every frequency on the grid, -1 when it isn't on it
+        k = np.rint((np.asarray(freqs, dtype=np.float64) - self.start_freq) / self.freq_increment).astype(np.int64)
+        on_grid = (k >= 0) & (k < self.points) & (self.start_freq + k * self.freq_increment == np.asarray(freqs))
+        return np.where(on_grid, k, -1)
+
+    def record(self, group, x, y, freqs, impedance, phase):
+        k = self.point_index(freqs)
+        valid = k >= 0
+        if not self.recorded[group, x, y]:
+            # Only this electrode's pages: points the sweep doesn't cover stay NaN
+            self.impedance[group, x, y] = np.nan
+            self.phase[group, x, y] = np.nan
+            self.recorded[group, x, y] = True
+        self.impedance[group, x, y, k[valid]] = np.asarray(impedance, dtype=np.float64)[valid]
+        self.phase[group, x, y, k[valid]] = np.asarray(phase)[valid]
+
+    def delta(self, group, x, y, freqs, impedance, phase):
+        # {DELTA_COLUMNS: per-point arrays} of one sweep, None without a baseline for the electrode
+        if not self.recorded[group, x, y]:
+            return None
+        base_z = np.asarray(self.impedance[group, x, y], dtype=np.float64)
+        base_phase = np.asarray(self.phase[group, x, y], dtype=np.float64)
+        k = self.point_index(freqs)
+        impedance = np.asarray(impedance, dtype=np.float64)
+        phase = np.asarray(phase, dtype=np.float64)
+        base_z = np.where(k >= 0, base_z[k], np.nan)
+        base_phase = np.where(k >= 0, base_phase[k], np.nan)
+        n = len(k)
+        return {
+            'group': np.full(n, group), 'x': np.full(n, x), 'y': np.full(n, y),
+            'freq': np.asarray(freqs, dtype=np.float64),
+            'impedance': impedance, 'baseline_impedance': base_z,
+            'delta': impedance - base_z, 'delta_pct': 100.0 * (impedance - base_z) / base_z,
+            'phase': phase, 'baseline_phase': base_phase, 'phase_delta': wrap_degrees(phase - base_phase),
+        }
+
+    def electrodes(self):
+        return int(np.count_nonzero(self.recorded)) if self.exists() else 0
+
+    def _save_recorded(self):
+        tmp_path = os.path.join(self.path, "recorded.tmp.npy")
+        np.save(tmp_path, self.recorded)
+        os.replace(tmp_path, os.path.join(self.path, "recorded.npy"))
+
+    def flush(self):
+        if not (self.writable and self.exists()):
+            return
+        self.impedance.flush()
+        self.phase.flush()
+        self._save_recorded()
+        self.info['electrodes'] = self.electrodes()
+        self.info['updated'] = time.time()
+        tmp_path = os.path.join(self.path, "info.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.info, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.path, "info.json"))
+
+
+class DeltaStore:
+    # Deltas of one range sweep, saved as an .npz of DELTA_COLUMNS
+    def __init__(self, path):
+        self.path = path
+        self._chunks = {name: [] for name in DELTA_COLUMNS}
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._chunks['freq'])
+
+    def append(self, delta):
+        for name in DELTA_COLUMNS:
+            self._chunks[name].append(np.asarray(delta[name]))
+
+    def columns(self):
+        return {name: np.concatenate(chunks) if chunks else np.empty(0) for name, chunks in self._chunks.items()}
+
+    def save(self):
+        np.savez_compressed(self.path, **self.columns())
+
+
+def delta_rows(delta):
+    # Rows in the DELTA_HEADERS layout (NaN as empty cells)
+    rows = []
+    for p in range(len(delta['freq'])):
+        values = [None if np.isnan(delta[name][p]) else float(delta[name][p]) for name in DELTA_COLUMNS[4:]]
+        rows.append([f"{int(delta['x'][p]):07b}", f"{int(delta['y'][p]):07b}", int(delta['group'][p]) or "N/A",
+                     int(delta['freq'][p])] + values)
+    return rows
+
+
+def delta_summary(delta):
+    # Mean |Z| and phase delta over the sweep, and the largest |Z| delta
+    pct = delta['delta_pct']
+    if np.isnan(pct).all():
+        return "no points on the baseline grid"
+    worst = int(np.nanargmax(np.abs(pct)))
+    return (f"|Z| {np.nanmean(pct):+.2f}% (max {pct[worst]:+.2f}% at {int(delta['freq'][worst])} Hz), "
+            f"phase {np.nanmean(delta['phase_delta']):+.2f} deg")
+
+
+def delta_maps(columns):
+    # {group: (xs, ys, {'delta_pct', 'phase_delta'}: 2D arrays [y, x])}, each electrode's mean
+    # over its frequency points, NaN where an electrode was not swept
+    maps = {}
+    keys = (columns['group'].astype(np.int64) * 128 + columns['x'].astype(np.int64)) * 128 + columns['y'].astype(np.int64)
+    unique, index = np.unique(keys, return_inverse=True)
+    counts = np.bincount(index, weights=~np.isnan(columns['delta_pct']), minlength=len(unique))
+    means = {}
+    for name in ('delta_pct', 'phase_delta'):
+        values = columns[name]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[name] = np.bincount(index, weights=np.nan_to_num(values), minlength=len(unique)) / counts
+    groups, xs_all, ys_all = unique // (128 * 128), unique // 128 % 128, unique % 128
+    for group in np.unique(groups):
+        in_group = groups == group
+        xs, ys = np.unique(xs_all[in_group]), np.unique(ys_all[in_group])
+        grids = {}
+        for name, mean in means.items():
+            grid = np.full((len(ys), len(xs)), np.nan)
+            grid[np.searchsorted(ys, ys_all[in_group]), np.searchsorted(xs, xs_all[in_group])] = mean[in_group]
+            grids[name] = grid
+        maps[int(group)] = (xs, ys, grids)
+    return maps
+
+
+def delta_map_figure(columns, title=""):
+    import matplotlib.pyplot as plt
+
+    # One row per MUX group: mean |Z| delta (%) and phase delta of every electrode, centered on zero
+    maps = delta_maps(columns)
+    fig, axs = plt.subplots(max(len(maps), 1), 2, figsize=(9, 4 * max(len(maps), 1)), squeeze=False)
+    labels = {'delta_pct': '|Z| delta (%)', 'phase_delta': 'Phase delta (degrees)'}
+    for (group, (xs, ys, grids)), row_axs in zip(maps.items(), axs):
+        for ax, name in zip(row_axs, labels):
+            grid = grids[name]
+            limit = np.nanmax(np.abs(grid)) if np.isfinite(grid).any() else 1.0
+            image = ax.pcolormesh(xs, ys, grid, shading='nearest', cmap='RdBu_r', vmin=-limit, vmax=limit)
+            fig.colorbar(image, ax=ax)
+            ax.set_title(labels[name])
+            ax.set_xlabel('X')
+            ax.set_ylabel(f"Group {group}: Y" if group else 'Y')
+            ax.set_aspect('equal')
+    fig.suptitle(title or "Delta against baseline")
+    fig.tight_layout()
+    return fig
+
+
+def plot_delta_maps(columns, title=""):
+    import matplotlib.pyplot as plt
+
+    delta_map_figure(columns, title)
+    plt.show()
@@ -0,0 +1,176 @@
+import time
+import zlib
+
+# ------------------------
+# Serial baud rate negotiation
+# ------------------------
+# BoardProgram_translated.ino starts at 115200 and lists the rates it can switch to at boot
+# ("[INFO] Baud rates: 921600,460800,230400,115200"). At a mode prompt the host may answer
+# "BAUD <rate>" instead of a mode:
+#   board: "[INFO] Baud switch: <rate>", waits for the UART to drain, switches
+#   host:  switches after reading that line
+#   board: PROBE_FRAMES x "PROBE <seq> <payload> <crc32 hex>", then "PROBE_END <count>"
+#   host:  "LINK OK <payload of seq count> <crc32 hex>" if at most MAX_PROBE_ERRORS frames were
+#          bad or missing, else "LINK FAIL" and back to 115200
+#   board: "[INFO] Baud rate set: <rate>" at the new rate if the host's frame checks out,
+#          else back to 115200, FALLBACK_DELAY_S later, "[INFO] Baud rate set: 115200"
+# and the mode prompt comes again. A side that hears nothing in time falls back to 115200 on
+# its own, so both always end at the same rate. Payloads are printable ASCII (the alphabet
+# of the protocol) from a xorshift32 generator both sides run; the CRC is zlib's CRC-32.
+#
+# BaudNegotiator is the host side. It tries RATES from the fastest; a failed rate is not
+# tried again. Sweeps whose point count comes up short at a raised rate count as link
+# errors; beyond LINK_ERROR_LIMIT the next mode prompt drops to the next lower rate.
+
+BASE_RATE = 115200
+RATES = [921600, 460800, 230400]
+PROBE_FRAMES = 16
+PROBE_LENGTH = 96          # about one measurement line
+MAX_PROBE_ERRORS = 0
+LINK_ERROR_LIMIT = 3
+HOST_TIMEOUT_S = 1.0       # without progress the host falls back to BASE_RATE
+FALLBACK_DELAY_S = 1.5     # board side; longer than HOST_TIMEOUT_S
+
+
+def probe_payload(seq, length=PROBE_LENGTH):
+    state = (0x9E3779B9 ^ ((seq + 1) * 2654435761)) & 0xFFFFFFFF
+    chars = []
+    for _ in range(length):
+        state ^= (state << 13) & 0xFFFFFFFF
+        state ^= state >> 17
+        state ^= (state << 5) & 0xFFFFFFFF
+        chars.append(chr(0x21 + state % 94))
+    return "".join(chars)
+
+
+def frame_crc(text):
+    return zlib.crc32(text.encode('ascii', errors='replace'))
+
+
+def probe_frame(seq):
+    payload = probe_payload(seq)
+    return f"PROBE {seq} {payload} {frame_crc(payload):X}"
+
+
+def link_reply(ok, count):
+    if not ok:
+        return "LINK FAIL"
+    payload = probe_payload(count)
+    return f"LINK OK {payload} {frame_crc(payload):X}"
+
+
+def check_link_reply(reply, count):
+    # Board side: the host's frame arrived intact
+    parts = reply.strip().split(" ")
+    if len(parts) != 4 or parts[:2] != ["LINK", "OK"]:
+        return False
+    try:
+        crc = int(parts[3], 16)
+    except ValueError:
+        return False
+    return parts[2] == probe_payload(count) and crc == frame_crc(parts[2])
+
+
+class BaudNegotiator:
+    def __init__(self, rates=RATES, base_rate=BASE_RATE, max_probe_errors=MAX_PROBE_ERRORS,
+                 link_error_limit=LINK_ERROR_LIMIT, timeout_s=HOST_TIMEOUT_S):
+        self.base_rate = base_rate
+        self.wanted = sorted(rates, reverse=True)
+        self.supported = None        # from the board's "[INFO] Baud rates" line
+        self.max_probe_errors = max_probe_errors
+        self.link_error_limit = link_error_limit
+        self.timeout_s = timeout_s
+        self.rate = base_rate
+        self.target = None
+        self.state = None            # None, 'requested', 'probing', 'confirming'
+        self.deadline = None
+        self.good = self.bad = 0
+        self.link_errors = 0
+        self.history = []            # (rate, ok, good frames, bad frames)
+
+    def set_supported(self, rates):
+        self.supported = set(rates)
+
+    def request(self):
+        # "BAUD <rate>" to send at a mode prompt, or None
+        if self.state == 'requested':
+            # The board answered with the mode prompt again: it did not take the command
+            self.fail()
+        if self.state is not None or self.supported is None:
+            return None
+        if self.rate == self.base_rate:
+            options = [rate for rate in self.wanted if rate in self.supported and rate > self.base_rate]
+        elif self.link_errors > self.link_error_limit:
+            # Too many link errors: one step down, or back to the base rate
+            if self.rate in self.wanted:
+                self.wanted.remove(self.rate)
+            options = [rate for rate in self.wanted if rate in self.supported and rate < self.rate] or [self.base_rate]
+        else:
+            return None
+        if not options:
+            return None
+        self.target = options[0]
+        self.state = 'requested'
+        return f"BAUD {self.target}"
+
+    def busy(self):
+        return self.state in ('probing', 'confirming')
+
+    def on_switch(self, rate):
+        # Board switched; the host follows. Returns the rate to set.
+        self.target = rate
+        self.state = 'probing'
+        self.good = self.bad = 0
+        self.deadline = time.monotonic() + self.timeout_s
+        return rate
+
+    def on_probe(self, seq, payload, crc_hex):
+        try:
+            ok = payload == probe_payload(int(seq)) and int(crc_hex, 16) == frame_crc(payload)
+        except ValueError:
+            ok = False
+        if ok:
+            self.good += 1
+        else:
+            self.bad += 1
+        self.deadline = time.monotonic() + self.timeout_s
+
+    def on_probe_end(self, count):
+        # (reply line, True when the host must go back to the base rate after sending it)
+        errors = max(int(count) - self.good, self.bad)
+        ok = errors <= self.max_probe_errors
+        self.history.append((self.target, ok, self.good, self.bad))
+        self.state = 'confirming'
+        self.deadline = time.monotonic() + self.timeout_s
+        return link_reply(ok, int(count)), not ok
+
+    def expired(self):
+        # The exchange stalled at the new rate: go back to the base rate and wait for the
+        # board's confirmation there
+        if self.busy() and self.deadline is not None and time.monotonic() > self.deadline:
+            if self.state == 'probing':
+                self.history.append((self.target, False, self.good, self.bad))
+            self.state = 'confirming'
+            self.deadline = None
+            return True
+        return False
+
+    def on_rate_set(self, rate):
+        ok = rate == self.target
+        self.rate = rate
+        self.state = None
+        self.deadline = None
+        self.link_errors = 0
+        if not ok:
+            self.fail()
+        return ok
+
+    def fail(self):
+        if self.target in self.wanted:
+            self.wanted.remove(self.target)
+        self.state = None
+        self.target = None
+
+    def link_error(self):
+        if self.rate != self.base_rate:
+            self.link_errors += 1
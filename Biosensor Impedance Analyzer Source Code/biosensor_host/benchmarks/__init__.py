@@ -0,0 +1,2 @@
+# Benchmarks for the host tools. Run from the "Biosensor Impedance Analyzer Source Code" directory:
+#   python -m biosensor_host.benchmarks.<name>
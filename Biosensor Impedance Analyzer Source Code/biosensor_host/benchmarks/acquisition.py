@@ -0,0 +1,65 @@
+import argparse
+
+from biosensor_host.ad5933_emulator import (AD5933Driver, AD5933Emulator, CTRL_INCREMENT_FREQ,
+                                            CTRL_INIT_START_FREQ, CTRL_STANDBY_MODE, CTRL_START_FREQ_SWEEP,
+                                            STATUS_SWEEP_DONE)
+
+# ------------------------
+# Per-point acquisition speed of AD5933::getComplexData
+# ------------------------
+# Runs the same sweep on the register emulator with the previous implementation
+# (delay(5) polling, status re-read, four single-byte reads) and the block-read one
+# (bounded status polling, one 4-byte block read), checks both return identical data
+# and reports points/s, I2C transactions and bus time per point.
+
+
+def run_sweep(method, start_hz, increment_hz, points, settling_cycles, i2c_hz):
+    chip = AD5933Emulator(noise_counts=0.0, i2c_hz=i2c_hz)
+    driver = AD5933Driver(chip)
+    driver.reset()
+    driver.setInternalClock(True)
+    driver.setStartFrequency(start_hz)
+    driver.setIncrementFrequency(increment_hz)
+    driver.setNumberIncrements(points - 1)
+    driver.setPGAGain(1)
+    driver.setSettlingCycles(settling_cycles)
+    get_complex_data = getattr(driver, method)
+
+    driver.setPowerMode(CTRL_STANDBY_MODE)
+    driver.setControlMode(CTRL_INIT_START_FREQ)
+    driver.setControlMode(CTRL_START_FREQ_SWEEP)
+    start_time, start_transactions, start_bus = chip.clock.now, chip.transactions, chip.bus_time
+    data = []
+    while (driver.readStatusRegister() & STATUS_SWEEP_DONE) != STATUS_SWEEP_DONE and len(data) < points:
+        ok, real, imag = get_complex_data()
+        data.append((real, imag))
+        driver.setControlMode(CTRL_INCREMENT_FREQ)
+    elapsed = chip.clock.now - start_time
+    n = len(data)
+    return data, n / elapsed, (chip.transactions - start_transactions) / n, (chip.bus_time - start_bus) / n * 1e6
+
+
+def run(start_hz, increment_hz, points, settling_list, i2c_list):
+    print(f"Sweep: {points} points from {start_hz} Hz, step {increment_hz} Hz")
+    print(f"{'I2C':>8}{'Settling':>10}  {'Method':<22}{'Points/s':>10}{'I2C txn/pt':>12}{'Bus us/pt':>11}{'Speedup':>9}")
+    for i2c_hz in i2c_list:
+        for settling in settling_list:
+            legacy = run_sweep('getComplexDataLegacy', start_hz, increment_hz, points, settling, i2c_hz)
+            fast = run_sweep('getComplexData', start_hz, increment_hz, points, settling, i2c_hz)
+            if legacy[0] != fast[0]:
+                raise RuntimeError(f"Block read returned different data (I2C {i2c_hz} Hz, settling {settling})")
+            for name, result in (('polled + 4 x getByte', legacy), ('block read', fast)):
+                speedup = f"{result[1] / legacy[1]:.2f}x"
+                print(f"{i2c_hz // 1000:>6}k{settling:>10}  {name:<22}{result[1]:>10.1f}{result[2]:>12.1f}"
+                      f"{result[3]:>11.0f}{speedup:>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare getComplexData implementations on the AD5933 emulator.")
+    parser.add_argument('--start', type=int, default=50000, help="start frequency (Hz)")
+    parser.add_argument('--increment', type=int, default=1000, help="frequency increment (Hz)")
+    parser.add_argument('--points', type=int, default=21)
+    parser.add_argument('--settling', type=int, nargs='+', default=[15, 100, 511])
+    parser.add_argument('--i2c', type=int, nargs='+', default=[100000, 400000], help="I2C clock (Hz)")
+    args = parser.parse_args()
+    run(args.start, args.increment, args.points, args.settling, args.i2c)
@@ -0,0 +1,142 @@
+import argparse
+import time
+
+import serial
+
+from biosensor_host.ad5933_emulator import AD5933Emulator, VirtualClock, resistor, series_rc
+from biosensor_host.autorange import raw_window_status
+from biosensor_host.firmware_emulator import FirmwareEmulator, PtyLink
+from biosensor_host.parsing import freq_hz, parse_measurement_line, split_r_i
+
+# ------------------------
+# Auto-ranging vs. fixed range and manual re-runs on a wide-dynamic-range sample
+# ------------------------
+# The emulated board measures a series RC whose |Z| spans about two decades over the sweep
+# (Mode 1, 2 Vpp / x1 with a 100 kOhm Rcal). Compared are:
+#   fixed range   one sweep at the configured range (clipped / low-signal points kept)
+#   manual        what the operator did before: recalibrate and repeat the whole sweep at
+#                 every range the sample needs, then pick points by hand
+#   auto-range    one sweep with auto-ranging; the first one also measures the extra range
+#                 calibrations, later sweeps reuse them
+# Times are emulated board seconds; error is the max |Z| deviation from the model.
+
+PROMPTS = [
+    ("Enter the start frequency", lambda o: str(o['start_khz'])),
+    ("Enter the frequency increment", lambda o: str(o['increment'])),
+    ("Enter the number of measurements", lambda o: str(o['points'] - 1)),
+    ("Enter Settling Time Cycles", lambda o: "15"),
+    ("Select Output Excitation Range", lambda o: str(o['range'])),
+    ("Select PGA Gain", lambda o: str(o['pga'])),
+    ("Select auto-ranging", lambda o: "1" if o['auto'] else "0"),
+    ("Enter Calibration Impedance", lambda o: "100000"),
+    ("Select calibration source", lambda o: "0"),
+    ("Send cached calibration", lambda o: ""),
+    ("Select MUX group", lambda o: "1"),
+    ("X Axis Address", lambda o: "0"),
+    ("Y Axis Address", lambda o: "0"),
+]
+
+
+class Session:
+    # Emulated board on a pty, prompts answered from PROMPTS
+    def __init__(self, sample, options):
+        self.options = options
+        self.link = PtyLink()
+        chip = AD5933Emulator(clock=VirtualClock(), noise_counts=2.0, seed=1)
+        load = lambda group, x, y, adg849: sample if adg849 else resistor(100000.0)
+        self.board = FirmwareEmulator(self.link, chip=chip, load=load, boot_banner=False).start()
+        self.ser = serial.Serial(self.link.port_name, 115200, timeout=0.05)
+        self.buffer = b""
+
+    def run_until_mode_prompt(self):
+        # Lines printed until the next "Set AD5933 Mode" prompt
+        lines = []
+        deadline = time.monotonic() + 120
+        while time.monotonic() < deadline:
+            self.buffer += self.ser.read(self.ser.in_waiting or 1)
+            *complete, self.buffer = self.buffer.split(b"\n")
+            lines += [raw.decode('utf-8', errors='ignore').strip() for raw in complete]
+            text = self.buffer.decode('utf-8', errors='ignore')
+            if not text.endswith("): "):  # every prompt ends in "): "; "(1: 2 Vpp, 2: " is a partial chunk
+                continue
+            if text.startswith("Set AD5933 Mode"):
+                self.buffer = b""
+                return lines
+            for prefix, answer in PROMPTS:
+                if text.startswith(prefix):
+                    self.buffer = b""
+                    self.ser.write(f"{answer(self.options)}\n".encode())
+                    break
+        raise TimeoutError("board did not return to the mode prompt")
+
+    def sweep(self):
+        # Mode 1 at X=0, Y=0: (lines, emulated seconds)
+        start = self.board.clock.now
+        self.ser.write(b"1\n")
+        lines = self.run_until_mode_prompt()
+        return lines, self.board.clock.now - start
+
+    def close(self):
+        self.ser.close()
+        self.link.close()
+
+
+def evaluate(lines, sample):
+    # (points, points outside the raw window, max relative |Z| error)
+    points = outside = 0
+    worst = 0.0
+    for line in lines:
+        parsed = parse_measurement_line(line)
+        if not parsed:
+            continue
+        points += 1
+        if raw_window_status(*split_r_i(parsed[1])):
+            outside += 1
+        truth = abs(sample(freq_hz(parsed[0])))
+        worst = max(worst, abs(parsed[2] / truth - 1.0) if parsed[2] else 1.0)
+    return points, outside, worst
+
+
+def run(start_khz, increment, points, r_ohm, c_farad):
+    sample = series_rc(r_ohm, c_farad)
+    freqs = [start_khz * 1000 + k * increment for k in range(points)]
+    options = {'start_khz': start_khz, 'increment': increment, 'points': points, 'range': 1, 'pga': 1}
+    print(f"Sample: {r_ohm:.0f} Ohm + {c_farad * 1e12:.0f} pF, |Z| {abs(sample(freqs[-1])) / 1000:.0f} k - "
+          f"{abs(sample(freqs[0])) / 1000:.0f} kOhm over {freqs[0]}-{freqs[-1]} Hz ({points} points)")
+    print(f"{'Method':<28}{'Board time (s)':>15}{'Outside window':>16}{'Max |Z| error':>15}")
+
+    fixed = Session(sample, dict(options, auto=False))
+    calibration_s = fixed.board.clock.now
+    fixed.run_until_mode_prompt()
+    calibration_s = fixed.board.clock.now - calibration_s
+    lines, sweep_s = fixed.sweep()
+    n, outside, worst = evaluate(lines, sample)
+    print(f"{'fixed range (Range 1, x1)':<28}{sweep_s:>15.2f}{outside:>16}{worst * 100:>14.2f}%")
+    fixed.close()
+
+    auto = Session(sample, dict(options, auto=True))
+    auto.run_until_mode_prompt()
+    lines, first_s = auto.sweep()
+    steps = {line.split(" at ")[-1] for line in lines if line.startswith("[INFO] Auto-range:")}
+    n, outside, worst = evaluate(lines, sample)
+    lines, next_s = auto.sweep()
+    n, outside_next, worst_next = evaluate(lines, sample)
+    auto.close()
+
+    # Before: the whole sweep again (with its own calibration) for every other range the sample needed
+    manual_s = sweep_s + len(steps) * (calibration_s + sweep_s)
+    print(f"{'manual re-runs (' + str(len(steps) + 1) + ' ranges)':<28}{manual_s:>15.2f}{'-':>16}{'-':>15}")
+    print(f"{'auto-range, first sweep':<28}{first_s:>15.2f}{outside:>16}{worst * 100:>14.2f}%")
+    print(f"{'auto-range, later sweeps':<28}{next_s:>15.2f}{outside_next:>16}{worst_next * 100:>14.2f}%")
+    print(f"Extra ranges used: {', '.join(sorted(steps)) or 'none'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Auto-ranging on the firmware emulator.")
+    parser.add_argument('--start', type=int, default=5, help="start frequency (kHz)")
+    parser.add_argument('--increment', type=int, default=1000, help="frequency increment (Hz)")
+    parser.add_argument('--points', type=int, default=96)
+    parser.add_argument('--r', type=float, default=1000.0, help="series resistance (Ohm)")
+    parser.add_argument('--c', type=float, default=100e-12, help="series capacitance (F)")
+    args = parser.parse_args()
+    run(args.start, args.increment, args.points, args.r, args.c)
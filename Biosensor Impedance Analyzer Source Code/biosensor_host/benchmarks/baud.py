@@ -0,0 +1,148 @@
+import argparse
+import time
+
+import serial
+
+from biosensor_host.baud import BASE_RATE, BaudNegotiator
+from biosensor_host.benchmarks.host_pipeline import ANSWERS
+from biosensor_host.coordinates import encode_coordinates, parse_coordinate_spec
+from biosensor_host.dialects import get_dialect
+from biosensor_host.firmware_emulator import FirmwareEmulator, PtyLink
+from biosensor_host.parsing import parse_measurement_line
+
+# ------------------------
+# Serial throughput at the negotiated baud rate
+# ------------------------
+# The same Mode 6 session as host_pipeline, run three times against the firmware emulator on a
+# pty at real board speed: at 115200, after negotiating the fastest rate on a clean link, and
+# on a link that drops bytes above 460800 (the negotiation has to fall back). The pty itself
+# has no speed; the emulator paces the board's output at its baud rate and garbles it when the
+# host's rate differs, so the numbers follow the serial time of the lines.
+#
+#   python -m biosensor_host.benchmarks.baud --points 0-3,0-3
+
+NOISY_ERROR_RATE = 5e-3
+SWEEP_POINTS = int(dict(ANSWERS)["Enter the number of measurements"]) + 1
+
+
+def noisy_link(baud):
+    return NOISY_ERROR_RATE if baud > 460800 else 0.0
+
+
+def run_session(spec, repeats, time_scale, negotiate, link_error_rate=None):
+    link = PtyLink()
+    board = FirmwareEmulator(link, time_scale=time_scale or None, boot_banner=False,
+                             link_error_rate=link_error_rate).start()
+    ser = serial.Serial(link.port_name, BASE_RATE, timeout=0.05)
+    dialect = get_dialect('english')
+    negotiator = BaudNegotiator() if negotiate else None
+    command = encode_coordinates(parse_coordinate_spec(spec))
+    answers = ANSWERS + [("Enter repeats per coordinate", str(repeats)), ("Enter coordinate list", command)]
+
+    buffer = b""
+    sweeps = points = lines = short_sweeps = 0
+    sweep_points = 0
+    started = None
+    while True:
+        if negotiator and negotiator.expired():
+            ser.baudrate = BASE_RATE
+        buffer += ser.read(ser.in_waiting or 1)
+        *complete, buffer = buffer.split(b"\n")
+        for raw in complete:
+            line = raw.decode('utf-8', errors='ignore').strip()
+            lines += 1
+            if line == "SWEEP_START":
+                sweep_points = 0
+            elif line == "SWEEP_DONE":
+                ser.write(b"STORE_OK\n")
+                sweeps += 1
+                points += sweep_points
+                if sweep_points != SWEEP_POINTS:
+                    short_sweeps += 1
+            elif parse_measurement_line(line):
+                sweep_points += 1
+            elif negotiator:
+                event, _, fields = dialect.classify(line)
+                if event == 'baud_rates':
+                    negotiator.set_supported(int(rate) for rate in fields[0].split(','))
+                elif event == 'baud_switch':
+                    ser.baudrate = negotiator.on_switch(int(fields[0]))
+                elif event == 'probe':
+                    negotiator.on_probe(*fields)
+                elif event == 'probe_end':
+                    reply, fall_back = negotiator.on_probe_end(fields[0])
+                    ser.write((reply + "\n").encode())
+                    if fall_back:
+                        ser.flush()
+                        ser.baudrate = BASE_RATE
+                elif event == 'baud_set':
+                    negotiator.on_rate_set(int(fields[0]))
+                    ser.baudrate = int(fields[0])
+        text = buffer.decode('utf-8', errors='ignore')
+        if not text.endswith("): "):
+            continue
+        if text.startswith("Set AD5933 Mode"):
+            buffer = b""
+            if started is not None:
+                break
+            request = negotiator.request() if negotiator else None
+            if request:
+                ser.write((request + "\n").encode())
+                continue
+            started = time.perf_counter()
+            ser.write(b"6\n")
+            continue
+        for prefix, answer in answers:
+            if text.startswith(prefix):
+                buffer = b""
+                ser.write(f"{answer}\n".encode())
+                break
+
+    elapsed = time.perf_counter() - started
+    result = {
+        'rate': ser.baudrate,
+        'history': negotiator.history if negotiator else [],
+        'sweeps': sweeps,
+        'short_sweeps': short_sweeps,
+        'points': points,
+        'lines': lines,
+        'elapsed': elapsed,
+        'bytes': board.serial.bytes_sent,
+    }
+    ser.close()
+    link.close()
+    return result
+
+
+def run(spec, repeats, time_scale):
+    print(f"Coordinates: {spec}, {repeats} repeat(s), time scale {time_scale or 'max'}")
+    cases = [
+        ("115200 (no negotiation)", False, None),
+        ("negotiated, clean link", True, None),
+        (f"negotiated, {NOISY_ERROR_RATE:g} byte errors above 460800", True, noisy_link),
+    ]
+    base = None
+    for name, negotiate, error_rate in cases:
+        start = time.perf_counter()
+        result = run_session(spec, repeats, time_scale, negotiate, error_rate)
+        session = time.perf_counter() - start
+        tried = ", ".join(f"{rate} {'ok' if ok else 'failed'} ({good} good / {bad} bad frames)"
+                          for rate, ok, good, bad in result['history'])
+        if base is None:
+            base = result['elapsed']
+        print(f"{name}:")
+        if tried:
+            print(f"  negotiation: {tried}")
+        print(f"  link rate {result['rate']}: {result['points']} points in {result['sweeps']} sweeps "
+              f"({result['short_sweeps']} short), {result['elapsed']:.2f} s -> "
+              f"{result['points'] / result['elapsed']:.0f} points/s, {result['lines'] / result['elapsed']:.0f} lines/s, "
+              f"{base / result['elapsed']:.2f}x vs 115200 (session incl. setup {session:.2f} s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep throughput at 115200 vs the negotiated baud rate.")
+    parser.add_argument('--points', default='0-3,0-3', help="coordinate spec (see biosensor_host.coordinates)")
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--time-scale', type=float, default=1.0, help="1.0 = real board speed, 0 = as fast as possible")
+    args = parser.parse_args()
+    run(args.points, args.repeats, args.time_scale)
@@ -0,0 +1,85 @@
+import argparse
+import os
+import tempfile
+import time
+
+from biosensor_host.capture import CaptureWriter, CapturingSerial, ReplaySerial
+from biosensor_host.dialects import get_dialect
+from biosensor_host.parsing import measurement_row
+
+# ------------------------
+# Raw serial capture overhead and replay throughput
+# ------------------------
+# A stand-in port returns firmware measurement lines from memory, so the timing is the host's
+# readline() path alone: bare, through CapturingSerial, and from a ReplaySerial of the
+# resulting log (which also classifies and parses each line, as read_from_port() does).
+
+
+class LinePort:
+    def __init__(self, lines):
+        self.lines = lines
+        self.index = 0
+
+    def readline(self):
+        line = self.lines[self.index % len(self.lines)]
+        self.index += 1
+        return line
+
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        pass
+
+
+def measurement_lines(points):
+    # Format of BoardProgram_translated.ino
+    return [f"{50.0 + k:.2f}kHz: R={12775 - k}/I={30176 + k}\t  |Z|={4931.14 + k:.2f}\t  Phase=77.32 degrees"
+            f"\t Resistance={1082.29 + k:.2f}\t Reactance={4810.90:.2f}\r\n".encode() for k in range(points)]
+
+
+def run(lines, points):
+    source = measurement_lines(points)
+    port = LinePort(source)
+    t0 = time.perf_counter()
+    for _ in range(lines):
+        port.readline()
+    bare = (time.perf_counter() - t0) / lines
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench_serial.log.gz")
+        ser = CapturingSerial(LinePort(source), CaptureWriter(path, port="bench", baud=115200, dialect='english'))
+        t0 = time.perf_counter()
+        for _ in range(lines):
+            ser.readline()
+        captured = (time.perf_counter() - t0) / lines
+        ser.close()
+        size = os.path.getsize(path)
+
+        dialect = get_dialect('english')
+        replay = ReplaySerial(path)
+        t0 = time.perf_counter()
+        while True:
+            line = replay.readline()
+            if not line:
+                break
+            event, _, fields = dialect.classify(line.decode('utf-8', errors='ignore').strip())
+            if event == 'measurement':
+                measurement_row(fields)
+        replay_time = time.perf_counter() - t0
+
+    raw = sum(len(line) for line in source) * lines / len(source)
+    print(f"{lines} lines, {raw / 1e6:.1f} MB raw -> {size / 1e6:.2f} MB capture ({raw / size:.1f}x)")
+    print(f"readline() bare:      {bare * 1e6:8.2f} us/line")
+    print(f"readline() captured:  {captured * 1e6:8.2f} us/line (+{(captured - bare) * 1e6:.2f} us; "
+          f"a line takes ~{raw / lines / 11520 * 1e6:.0f} us at 115200 baud)")
+    print(f"replay + parse:       {replay_time / replay.lines * 1e6:8.2f} us/line, "
+          f"{replay.lines / replay_time:,.0f} lines/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cost of capturing the serial stream, speed of replaying it.")
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--points', type=int, default=101, help="distinct lines (one sweep)")
+    args = parser.parse_args()
+    run(args.lines, args.points)
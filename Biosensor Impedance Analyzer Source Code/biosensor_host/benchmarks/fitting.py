@@ -0,0 +1,87 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+from biosensor_host.columnar_store import ColumnarStore
+from biosensor_host.fitting import MODELS, RETRY_RMSE, fit_spectra, model_impedance, spectra_from_columns
+from biosensor_host.parsing import format_measurement_row
+
+# ------------------------
+# Equivalent-circuit fitting throughput on a synthetic range sweep
+# ------------------------
+# Builds a grid of R-CPE spectra whose parameters vary smoothly over the array (plus a
+# "spot" of higher Rct), adds complex noise, stores them like the host does and fits
+# them cold (initial guess for every spectrum), warm-started in one process, and
+# warm-started over a process pool. Errors are relative to the true parameters.
+
+
+def true_parameters(x, y, size):
+    u, v = x / max(size - 1, 1), y / max(size - 1, 1)
+    spot = math.exp(-((u - 0.6) ** 2 + (v - 0.4) ** 2) / 0.02)
+    return [200.0 + 200.0 * u, 20000.0 * (1.0 + 2.0 * v + 3.0 * spot), 2e-9 * (1.0 + u), 0.8 + 0.1 * v]
+
+
+def build_columns(size, freqs, noise, seed=1):
+    rng = np.random.default_rng(seed)
+    store = ColumnarStore(os.devnull)
+    truth = {}
+    for y in range(size):
+        for x in range(size):
+            params = true_parameters(x, y, size)
+            truth[(x, y)] = params
+            z = model_impedance('r_cpe', params, freqs)
+            z = z * (1.0 + noise * (rng.standard_normal(len(z)) + 1j * rng.standard_normal(len(z))))
+            rows = []
+            for f, value in zip(freqs, z):
+                # Firmware convention: admittance phase, reactance of the opposite sign
+                phase = -math.degrees(math.atan2(value.imag, value.real))
+                rows.append(format_measurement_row(f, 0, 0, abs(value), phase, value.real, -value.imag,
+                                                   format(x, '07b'), format(y, '07b')))
+            store.append_sweep(rows)
+    return store.columns(), truth
+
+
+def errors(results, truth, names):
+    relative = {name: [] for name in names}
+    for r in results:
+        for k, name in enumerate(names):
+            relative[name].append(abs(r[name] / truth[(r['x'], r['y'])][k] - 1.0))
+    return {name: np.array(values) for name, values in relative.items()}
+
+
+def run(size, points, noise, workers):
+    freqs = np.linspace(1000.0, 100000.0, points).round()
+    columns, truth = build_columns(size, freqs, noise)
+    spectra = spectra_from_columns(columns)
+    names = MODELS['r_cpe']
+    print(f"Spectra: {len(spectra)} ({size}x{size}), {points} points 1-100 kHz, noise {noise * 100:.1f}%, "
+          f"{workers} worker(s) on {os.cpu_count()} core(s)")
+    print(f"{'Method':<24}{'Time (s)':>10}{'Spectra/s':>11}{'Iter/spectrum':>15}{'Failed':>8}"
+          + "".join(f"{'p95 ' + name:>11}" for name in names))
+    cases = [
+        ("cold start, 1 process", dict(workers=1, warm_start=False)),
+        ("warm start, 1 process", dict(workers=1, warm_start=True)),
+        (f"warm start, {workers} processes", dict(workers=workers, warm_start=True)),
+    ]
+    for name, options in cases:
+        t0 = time.perf_counter()
+        results = fit_spectra(spectra, 'r_cpe', **options)
+        elapsed = time.perf_counter() - t0
+        failed = sum(1 for r in results if not r['converged'] or r['rmse'] > RETRY_RMSE)
+        iterations = np.mean([r['iterations'] for r in results])
+        err = errors(results, truth, names)
+        print(f"{name:<24}{elapsed:>10.2f}{len(results) / elapsed:>11.0f}{iterations:>15.1f}{failed:>8}"
+              + "".join(f"{np.percentile(err[p], 95) * 100:>10.2f}%" for p in names))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Batched equivalent-circuit fitting on synthetic spectra.")
+    parser.add_argument('--size', type=int, default=40, help="grid size (size x size coordinates)")
+    parser.add_argument('--points', type=int, default=96)
+    parser.add_argument('--noise', type=float, default=0.005, help="relative complex noise")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run(args.size, args.points, args.noise, args.workers)
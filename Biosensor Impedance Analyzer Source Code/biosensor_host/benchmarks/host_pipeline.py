@@ -0,0 +1,95 @@
+import argparse
+import time
+
+import serial
+
+from biosensor_host.coordinates import encode_coordinates, parse_coordinate_spec
+from biosensor_host.firmware_emulator import FirmwareEmulator, PtyLink
+from biosensor_host.parsing import parse_measurement_line
+
+# ------------------------
+# Host pipeline load test against the firmware emulator
+# ------------------------
+# Runs the emulated board on a pty and drives it like the host script does: prompts
+# are answered from ANSWERS, measurement lines are parsed and every framed sweep is
+# acknowledged with STORE_OK. Reports throughput of the whole serial -> parse path.
+#
+#   python -m biosensor_host.benchmarks.host_pipeline --points 0-15,0-15 --time-scale 0
+
+ANSWERS = [
+    ("Enter the start frequency", "50"),
+    ("Enter the frequency increment", "1000"),
+    ("Enter the number of measurements", "20"),
+    ("Enter Settling Time Cycles", "15"),
+    ("Select Output Excitation Range", "1"),
+    ("Select PGA Gain", "1"),
+    ("Select auto-ranging", "0"),
+    ("Enter Calibration Impedance", "100000"),
+    ("Select calibration source", "0"),
+    ("Select MUX group", "1"),
+    ("Select scan order", "0"),
+]
+
+
+def run(spec, repeats, time_scale, baud):
+    link = PtyLink()
+    board = FirmwareEmulator(link, time_scale=time_scale or None, baud=baud, boot_banner=False).start()
+    ser = serial.Serial(link.port_name, baud, timeout=0.05)
+    command = encode_coordinates(parse_coordinate_spec(spec))
+    answers = ANSWERS + [("Enter repeats per coordinate", str(repeats)), ("Enter coordinate list", command)]
+
+    buffer = b""
+    mode_prompts = 0
+    sweeps = points = lines = 0
+    sweep_points = 0
+    started = None
+    while True:
+        buffer += ser.read(ser.in_waiting or 1)
+        *complete, buffer = buffer.split(b"\n")
+        for raw in complete:
+            line = raw.decode('utf-8', errors='ignore').strip()
+            lines += 1
+            if line == "SWEEP_START":
+                sweep_points = 0
+            elif line == "SWEEP_DONE":
+                ser.write(b"STORE_OK\n")
+                sweeps += 1
+                points += sweep_points
+            elif parse_measurement_line(line):
+                sweep_points += 1
+        text = buffer.decode('utf-8', errors='ignore')
+        if not text.endswith("): "):  # every prompt ends in "): "; "(1: 2 Vpp, 2: " is a partial chunk
+            continue
+        if text.startswith("Set AD5933 Mode"):
+            buffer = b""
+            mode_prompts += 1
+            if mode_prompts == 2:
+                break
+            started = time.perf_counter()
+            ser.write(b"6\n")
+            continue
+        # Only known prompts are answered
+        for prefix, answer in answers:
+            if text.startswith(prefix):
+                buffer = b""
+                ser.write(f"{answer}\n".encode())
+                break
+
+    elapsed = time.perf_counter() - started
+    print(f"Coordinates: {spec} ({sweeps // repeats} points x {repeats} repeats), time scale {time_scale or 'max'}")
+    print(f"Sweeps: {sweeps}, measurement points: {points}, lines: {lines}")
+    print(f"Wall time: {elapsed:.2f} s -> {points / elapsed:.0f} points/s, {lines / elapsed:.0f} lines/s")
+    print(f"Emulated board time: {board.clock.now:.2f} s")
+    print(f"Serial bytes from board: {board.serial.bytes_sent}, AD5933 transactions: {board.chip.transactions}")
+    ser.close()
+    link.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load-test the host serial pipeline against the firmware emulator.")
+    parser.add_argument('--points', default='0-7,0-7', help="coordinate spec (see biosensor_host.coordinates)")
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--time-scale', type=float, default=0.0, help="1.0 = real board speed, 0 = as fast as possible")
+    parser.add_argument('--baud', type=int, default=115200)
+    args = parser.parse_args()
+    run(args.points, args.repeats, args.time_scale, args.baud)
@@ -0,0 +1,100 @@
+import argparse
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from biosensor_host.fitting import model_impedance
+from biosensor_host.impedance_plots import impedance_figure, point_arrays, point_arrays_from_columns
+from biosensor_host.parsing import format_measurement_row
+
+# ------------------------
+# Nyquist / Bode rendering time for large range sweeps
+# ------------------------
+# Synthetic R-CPE spectra on an N x N grid, rendered off-screen (Agg). "per-coordinate
+# scatter" draws every coordinate as its own scatter series on four axes, as plot_data()
+# does; "decimated" is biosensor_host.impedance_plots (density image + envelope). The
+# zoom column is one redraw after narrowing the Bode frequency range.
+
+
+def synthetic_columns(size, points, seed=1):
+    rng = np.random.default_rng(seed)
+    freqs = np.geomspace(1000.0, 100000.0, points).round()
+    n = size * size
+    x, y = np.divmod(np.arange(n), size)
+    rct = 20000.0 * (1.0 + 2.0 * rng.random(n))
+    q = 2e-9 * (1.0 + rng.random(n))
+    z = np.array([model_impedance('r_cpe', [200.0, r, c, 0.85], freqs) for r, c in zip(rct, q)])
+    z *= 1.0 + 0.005 * (rng.standard_normal(z.shape) + 1j * rng.standard_normal(z.shape))
+    return {
+        'x': np.repeat(x, points).astype(np.int16),
+        'y': np.repeat(y, points).astype(np.int16),
+        'freq': np.tile(freqs, n).astype(np.int32),
+        'impedance': np.abs(z).ravel(),
+        'resistance': z.real.ravel(),
+        'reactance': -z.imag.ravel(),   # firmware convention
+    }
+
+
+def rows_from_columns(columns):
+    return [format_measurement_row(f, 0, 0, m, 0.0, r, x, format(int(cx), '07b'), format(int(cy), '07b'))
+            for f, m, r, x, cx, cy in zip(columns['freq'], columns['impedance'], columns['resistance'],
+                                          columns['reactance'], columns['x'], columns['y'])]
+
+
+def scatter_figure(points):
+    labels, coord, freqs, z = points
+    fig, axs = plt.subplots(2, 2, figsize=(15, 10))
+    for k in range(len(labels)):
+        mask = coord == k
+        axs[0, 0].scatter(freqs[mask], z.real[mask], marker='o')
+        axs[0, 0].scatter(freqs[mask], z.imag[mask], marker='x')
+        axs[0, 1].scatter(freqs[mask], np.abs(z[mask]), marker='s')
+        axs[1, 0].scatter(freqs[mask], np.degrees(np.angle(z[mask])), marker='^')
+        axs[1, 1].scatter(freqs[mask], z.real[mask], marker='D')
+        axs[1, 1].scatter(freqs[mask], -z.imag[mask], marker='v')
+    return fig
+
+
+def timed_render(build, points):
+    t0 = time.perf_counter()
+    fig = build(points)
+    fig.canvas.draw()
+    first = time.perf_counter() - t0
+    ax = fig.axes[1]
+    t0 = time.perf_counter()
+    ax.set_xlim(5000.0, 20000.0) if ax.get_xscale() == 'log' else ax.set_xlim(*ax.get_xlim())
+    fig.canvas.draw()
+    zoom = time.perf_counter() - t0
+    plt.close(fig)
+    return first, zoom
+
+
+def run(sizes, scatter_limit, points):
+    print(f"{'Coordinates':>12}{'Points':>10}  {'Method':<24}{'Prepare (s)':>12}{'Render (s)':>12}{'Zoom (s)':>10}")
+    for size in sizes:
+        columns = synthetic_columns(size, points)
+        n = size * size
+        if n <= scatter_limit:
+            rows = rows_from_columns(columns)
+            t0 = time.perf_counter()
+            points_rows = point_arrays(rows)
+            prepare = time.perf_counter() - t0
+            first, zoom = timed_render(scatter_figure, points_rows)
+            print(f"{n:>12}{len(points_rows[2]):>10}  {'per-coordinate scatter':<24}{prepare:>12.2f}{first:>12.2f}{'-':>10}")
+        t0 = time.perf_counter()
+        arrays = point_arrays_from_columns(columns)
+        prepare = time.perf_counter() - t0
+        first, zoom = timed_render(impedance_figure, arrays)
+        print(f"{n:>12}{len(arrays[2]):>10}  {'decimated':<24}{prepare:>12.2f}{first:>12.2f}{zoom:>10.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Nyquist / Bode rendering time on synthetic range sweeps.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 32, 128], help="grid sizes (N x N)")
+    parser.add_argument('--scatter-limit', type=int, default=1024, help="largest sweep drawn per coordinate")
+    parser.add_argument('--points', type=int, default=96)
+    args = parser.parse_args()
+    run(args.sizes, args.scatter_limit, args.points)
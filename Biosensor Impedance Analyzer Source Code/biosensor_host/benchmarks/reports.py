@@ -0,0 +1,56 @@
+import argparse
+import os
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from biosensor_host.benchmarks.plotting import rows_from_columns, synthetic_columns
+from biosensor_host.impedance_plots import impedance_figure, point_arrays
+from biosensor_host.reports import ReportWriter
+
+# ------------------------
+# Host time spent on figures per sweep: inline rendering vs the report worker
+# ------------------------
+# "inline" renders and saves every sweep in the acquisition process, as a headless
+# plot_data() would have to; "report worker" is ReportWriter.submit_sweep(), which only
+# writes the .npz and hands the job over. The worker's own time until the session report
+# is written is listed separately (it overlaps acquisition in the host).
+
+
+def run(sweeps, size, points, formats):
+    rows = rows_from_columns(synthetic_columns(size, points))
+    with tempfile.TemporaryDirectory() as directory:
+        t0 = time.perf_counter()
+        for k in range(sweeps):
+            fig = impedance_figure(point_arrays(rows), f"sweep {k}")
+            for fmt in formats:
+                fig.savefig(os.path.join(directory, f"inline_{k}.{fmt}"))
+            plt.close(fig)
+        inline = (time.perf_counter() - t0) / sweeps
+
+        writer = ReportWriter(os.path.join(directory, "reports"), formats, "benchmark")
+        blocking = 0.0
+        t0 = time.perf_counter()
+        for k in range(sweeps):
+            t1 = time.perf_counter()
+            writer.submit_sweep(rows, f"sweep {k}")
+            blocking += time.perf_counter() - t1
+        writer.finish()
+        total = time.perf_counter() - t0
+    print(f"{sweeps} sweeps, {size * size} coordinates x {points} points, formats {','.join(formats)}")
+    print(f"{'Method':<16}{'Host time/sweep (s)':>22}{'Until session report (s)':>26}")
+    print(f"{'inline':<16}{inline:>22.3f}{'-':>26}")
+    print(f"{'report worker':<16}{blocking / sweeps:>22.3f}{total:>26.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Host blocking time of headless report export.")
+    parser.add_argument('--sweeps', type=int, default=5)
+    parser.add_argument('--size', type=int, default=16, help="grid size (N x N)")
+    parser.add_argument('--points', type=int, default=96)
+    parser.add_argument('--formats', default="png,pdf")
+    args = parser.parse_args()
+    run(args.sweeps, args.size, args.points, args.formats.split(","))
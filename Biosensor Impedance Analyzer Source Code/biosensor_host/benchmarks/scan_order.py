@@ -0,0 +1,46 @@
+import argparse
+
+from biosensor_host.coordinates import parse_coordinate_spec
+from biosensor_host.scan_order import SCAN_ORDERS, order_coordinates, scan_cost
+
+# ------------------------
+# Total sweep time per scan order
+# ------------------------
+# Compares the old firmware behaviour (raster order, fixed delay(200) per coordinate)
+# with each scan order using the toggle-scaled MUX settling of runCoordinateList().
+# Sweep time per coordinate is a parameter; the default is a 21-point sweep at
+# 115200 baud with STORE_OK round trip.
+
+LEGACY_DELAY_MS = 200
+
+DEFAULT_PATTERNS = [
+    '0-127,0-127',
+    '0-15,0-15',
+    '40-59,10-29',
+    '0-127:8,0-127:8',
+    '3-100:7,5-90:3',
+]
+
+
+def run(patterns, sweep_ms):
+    print(f"Sweep time per coordinate: {sweep_ms:.0f} ms")
+    print(f"{'Pattern':<18}{'Points':>8}  {'Order':<12}{'Toggles':>10}{'Settle (s)':>12}{'Total (s)':>11}{'vs legacy':>11}")
+    for pattern in patterns:
+        coords = parse_coordinate_spec(pattern)
+        legacy_total = len(coords) * (sweep_ms + LEGACY_DELAY_MS) / 1000.0
+        print(f"{pattern:<18}{len(coords):>8}  {'legacy':<12}{'-':>10}{len(coords) * LEGACY_DELAY_MS / 1000.0:>12.1f}{legacy_total:>11.1f}{'1.00x':>11}")
+        for order in SCAN_ORDERS:
+            sequence = order_coordinates(coords, order)
+            toggles, settle_ms = scan_cost(sequence)
+            total = (len(coords) * sweep_ms + settle_ms) / 1000.0
+            print(f"{'':<18}{'':>8}  {order:<12}{toggles:>10}{settle_ms / 1000.0:>12.1f}{total:>11.1f}{legacy_total / total:>10.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare total range sweep time per scan order.")
+    parser.add_argument('patterns', nargs='*', default=DEFAULT_PATTERNS,
+                        help="coordinate specs as accepted by the coordinate list prompt")
+    parser.add_argument('--sweep-ms', type=float, default=450.0,
+                        help="time for one framed frequency sweep incl. STORE_OK (ms)")
+    args = parser.parse_args()
+    run(args.patterns, args.sweep_ms)
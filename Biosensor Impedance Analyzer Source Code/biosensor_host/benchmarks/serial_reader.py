@@ -0,0 +1,94 @@
+import argparse
+import threading
+import time
+
+import serial
+
+from biosensor_host.benchmarks.capture import measurement_lines
+from biosensor_host.dialects import get_dialect
+from biosensor_host.firmware_emulator import PtyLink
+from biosensor_host.parsing import measurement_row, measurement_row_bytes
+from biosensor_host.serial_reader import LineReader
+
+# ------------------------
+# Serial line reader throughput over a pty
+# ------------------------
+# A thread writes measurement lines into a pty as fast as it takes them; the host end is
+# opened with pyserial like the real port and read until every line is in, two ways:
+#   readline   ser.readline(), decode, strip, Dialect.classify(), measurement_row()
+#              (read_from_port() before LineReader)
+#   bulk       LineReader.read_line(), Dialect.measurement over the bytes,
+#              measurement_row_bytes()
+# Both parse every line to the same rows (checked). Reads counts the reads of the port
+# (readline() makes one per byte). The pty has no baud rate, so this is the host's own
+# ceiling; the last column compares it with the line rate of a real link.
+#
+#   python -m biosensor_host.benchmarks.serial_reader --lines 20000
+
+
+def write_lines(link, data, chunk):
+    for i in range(0, len(data), chunk):
+        link.write(data[i:i + chunk])
+
+
+def read_readline(ser, dialect, lines):
+    rows = []
+    while len(rows) < lines:
+        raw = ser.readline()
+        if not raw:
+            continue
+        line = raw.decode('utf-8', errors='ignore').strip()
+        event, _, fields = dialect.classify(line)
+        if event == 'measurement':
+            rows.append(measurement_row(fields))
+    return rows, None
+
+
+def read_bulk(ser, dialect, lines):
+    reader = LineReader(ser)
+    rows = []
+    while len(rows) < lines:
+        raw = reader.read_line()
+        if not raw:
+            continue
+        match = dialect.measurement.match(raw)
+        if match:
+            rows.append(measurement_row_bytes(match.groups()))
+    return rows, reader.reads
+
+
+def run(lines, points, chunk, baud):
+    dialect = get_dialect('english')
+    source = measurement_lines(points)
+    data = b"".join(source[k % len(source)] for k in range(lines))
+    line_time = len(data) / lines * 10 / baud
+    expected = None
+    print(f"{lines} lines, {len(data) / 1e6:.1f} MB, written in {chunk} byte chunks")
+    print(f"{'Reader':<10}{'Time':>9}{'us/line':>9}{'Lines/s':>11}{'Reads':>9}  vs {baud} baud")
+    for name, read in (('readline', read_readline), ('bulk', read_bulk)):
+        link = PtyLink()
+        ser = serial.Serial(link.port_name, baud, timeout=0.1)
+        writer = threading.Thread(target=write_lines, args=(link, data, chunk), daemon=True)
+        t0 = time.perf_counter()
+        writer.start()
+        rows, reads = read(ser, dialect, lines)
+        elapsed = time.perf_counter() - t0
+        writer.join()
+        ser.close()
+        link.close()
+        if expected is None:
+            expected = rows
+        elif rows != expected:
+            print(f"[WARNING] {name} parsed different rows")
+        print(f"{name:<10}{elapsed:>8.2f}s{elapsed / lines * 1e6:>9.2f}{lines / elapsed:>11,.0f}"
+              f"{reads if reads is not None else len(data):>9}  {line_time * lines / elapsed:.0f}x the link")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Throughput of readline() against the bulk LineReader on a pty.")
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--points', type=int, default=101, help="distinct lines (one sweep)")
+    parser.add_argument('--chunk', type=int, default=4096, help="bytes per write into the pty")
+    parser.add_argument('--baud', type=int, default=921600, help="link rate to compare with")
+    args = parser.parse_args()
+    run(args.lines, args.points, args.chunk, args.baud)
@@ -0,0 +1,77 @@
+import argparse
+import glob
+import os
+import time
+
+from biosensor_host.session_archive import (COMPRESSORS, archive_rows, decode_session, encode_session,
+                                            workbook_values)
+
+# ------------------------
+# Session archive size and load speed against the workbook
+# ------------------------
+# For each session workbook: its size and the time openpyxl takes to load its values, against
+# the archive of every compressor: size, time to pack, time to load the point columns, and
+# the time to also rebuild the measurement rows (Rows, the speedup is against that). Every
+# archive is checked to give back the workbook's values.
+#
+#   python -m biosensor_host.benchmarks.session_archive C:/Users/.../Data/measurement_data_*.xlsx
+
+
+def cell_values(sheets):
+    # {(sheet, row, column): value} of the non-empty cells
+    return {(name, r + 1, c + 1): value for name, rows in sheets.items()
+            for r, row in enumerate(rows) for c, value in enumerate(row) if value is not None}
+
+
+def archive_values(archive):
+    values = {(name, row, col): value for name, cells in archive['cells'].items() for row, col, value in cells}
+    for row, col, cells in archive_rows(archive):
+        for i, value in enumerate(cells):
+            if value is not None:
+                values[(archive['measurement_sheet'], row, col + i)] = value
+    return values
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def run(paths, compressors, repeat):
+    print(f"{'Session':<28}{'Format':<8}{'Size':>11}{'Ratio':>8}{'Pack':>9}{'Load':>10}{'Rows':>10}{'Speedup':>9}"
+          "  Lossless")
+    for path in paths:
+        sheets, xlsx_load = best_time(lambda: workbook_values(path), repeat)
+        size = os.path.getsize(path)
+        expected = cell_values(sheets)
+        name = os.path.basename(path)[:27]
+        print(f"{name:<28}{'xlsx':<8}{size / 1e3:>9.0f}kB{'':>8}{'':>9}{xlsx_load * 1e3:>8.0f}ms")
+        for compressor in compressors:
+            data, pack = best_time(lambda: encode_session(sheets, compressor), repeat)
+            archive, load = best_time(lambda: decode_session(data), repeat)
+            _, rows = best_time(lambda: archive_rows(archive), repeat)
+            lossless = archive_values(archive) == expected
+            print(f"{'':<28}{compressor:<8}{len(data) / 1e3:>9.0f}kB{size / len(data):>7.1f}x{pack * 1e3:>7.0f}ms"
+                  f"{load * 1e3:>8.1f}ms{(load + rows) * 1e3:>8.1f}ms{xlsx_load / (load + rows):>8.0f}x"
+                  f"  {'yes' if lossless else 'NO'}")
+        print(f"{'':<28}{archive['header']['sweeps']} sweeps, {archive['header']['points']} points, "
+              f"{archive['header']['cells']} other cells")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare session archives with the .xlsx workbooks.")
+    parser.add_argument('sessions', nargs='*', help="session workbooks (default: measurement_data*.xlsx "
+                                                    "in BIOSENSOR_DATA_DIR)")
+    parser.add_argument('--compressors', nargs='+', choices=sorted(COMPRESSORS), default=['lzma', 'zlib', 'bz2'])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per timing (best is shown)")
+    args = parser.parse_args()
+    paths = args.sessions or sorted(glob.glob(os.path.join(os.environ.get('BIOSENSOR_DATA_DIR', '.'),
+                                                           "measurement_data*.xlsx")))
+    if not paths:
+        parser.error("no session workbooks given or found")
+    run(paths, args.compressors, args.repeat)
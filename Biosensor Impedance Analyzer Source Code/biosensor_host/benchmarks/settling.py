@@ -0,0 +1,82 @@
+import argparse
+
+from biosensor_host.ad5933_emulator import AD5933Driver, AD5933Emulator, VirtualClock, randles
+from biosensor_host.settling import (DEFAULT_MAG_TOL, DEFAULT_PHASE_TOL_DEG, TUNE_CANDIDATES, SettlingTuner,
+                                     profile_cycles)
+
+# ------------------------
+# Sweep time and accuracy of a tuned settling profile
+# ------------------------
+# Runs the Mode 7 ladder on the emulated Rcal, builds the band profile with
+# biosensor_host.settling, then sweeps a Randles cell with the profile (one hardware
+# sweep per band, as frequencySweepRaw() does) and with uniform settings. Error is the
+# deviation of the raw DFT magnitude from a transient-free chip.
+
+
+def make_driver(load, transient=0.05):
+    chip = AD5933Emulator(impedance=load, clock=VirtualClock(), noise_counts=0.0, transient=transient)
+    driver = AD5933Driver(chip)
+    driver.reset()
+    driver.setInternalClock(True)
+    driver.setPGAGain(1)
+    return chip, driver
+
+
+def segmented_sweep(chip, driver, start, increment, points, bands):
+    # bands: [(first point, cycles), ...]; returns (raw points, virtual seconds)
+    t0 = chip.clock.now
+    data = []
+    for b, (first, cycles) in enumerate(bands):
+        last = bands[b + 1][0] - 1 if b + 1 < len(bands) else points - 1
+        driver.setStartFrequency(start + first * increment)
+        driver.setIncrementFrequency(increment)
+        driver.setNumberIncrements(last - first)
+        driver.setSettlingCycles(cycles)
+        ok, real, imag = driver.frequencySweep(last - first + 1)
+        data += list(zip(real, imag))
+    return data, chip.clock.now - t0
+
+
+def max_error(data, truth):
+    return max(abs(abs(complex(*d)) / abs(complex(*t)) - 1.0) for d, t in zip(data, truth))
+
+
+def run(start, increment, points, mag_tol, phase_tol_deg):
+    freqs = [start + k * increment for k in range(points)]
+    rcal = lambda f: complex(100000.0, 0.0)
+    cell = randles(rs=200.0, rct=40000.0, cdl=2e-9)
+
+    chip, driver = make_driver(rcal)
+    tuner = SettlingTuner(mag_tol, phase_tol_deg)
+    for cycles in TUNE_CANDIDATES:
+        tuner.start_candidate(cycles)
+        data, _ = segmented_sweep(chip, driver, start, increment, points, [(0, cycles)])
+        for freq, (real, imag) in zip(freqs, data):
+            tuner.add_point(freq, real, imag)
+    bands, summary = tuner.result()
+    band_points = [(freqs.index(freq), cycles) for freq, cycles in bands]
+    print(f"Sweep: {points} points, {start}-{freqs[-1]} Hz; tolerance {mag_tol * 100:.2f}% / {phase_tol_deg} deg")
+    print("Profile: " + ", ".join(f"{freq} Hz:{cycles}" for freq, cycles in bands))
+
+    chip, driver = make_driver(cell, transient=0.0)
+    truth, _ = segmented_sweep(chip, driver, start, increment, points, [(0, 0)])
+    cases = [(f"uniform {c}", [(0, c)]) for c in (511, summary['uniform_cycles'], 15)]
+    cases.insert(1, ("tuned profile", band_points))
+    print(f"{'Settling':<16}{'Sweep (s)':>10}{'Max |Z| error':>15}")
+    for name, case_bands in cases:
+        chip, driver = make_driver(cell)
+        data, elapsed = segmented_sweep(chip, driver, start, increment, points, case_bands)
+        print(f"{name:<16}{elapsed:>10.3f}{max_error(data, truth) * 100:>14.3f}%")
+    cycles = profile_cycles(freqs, bands)
+    print(f"Settling time share of the tuned sweep: {sum(c / f for c, f in zip(cycles, freqs)):.3f} s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tune settling cycles per band on the AD5933 emulator.")
+    parser.add_argument('--start', type=int, default=1000, help="start frequency (Hz)")
+    parser.add_argument('--increment', type=int, default=1000, help="frequency increment (Hz)")
+    parser.add_argument('--points', type=int, default=100)
+    parser.add_argument('--mag-tol', type=float, default=DEFAULT_MAG_TOL)
+    parser.add_argument('--phase-tol', type=float, default=DEFAULT_PHASE_TOL_DEG)
+    args = parser.parse_args()
+    run(args.start, args.increment, args.points, args.mag_tol, args.phase_tol)
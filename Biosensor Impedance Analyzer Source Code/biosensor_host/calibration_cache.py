@@ -0,0 +1,143 @@
+import json
+import math
+import os
+import re
+import time
+
+# ------------------------
+# Persistent calibration cache
+# ------------------------
+# Calibrations are keyed by everything that changes the AD5933 gain factor:
+# (start frequency, increment, count, output range, PGA gain, Rcal, board id).
+# Entries hold the raw R/I of every "Cal Point" line, so gain factor and system phase
+# are recomputed exactly as AD5933::calibrate() does instead of from the 2-decimal
+# |Z| / phase printed by the firmware.
+
+KEY_FIELDS = ['start_freq', 'freq_increment', 'num_increments', 'output_range', 'pga_gain', 'rcal', 'board_id']
+
+DEFAULT_MAX_AGE_S = 8 * 3600     # Recalibrate at least once per working day
+DEFAULT_MAX_TEMP_DELTA = 5.0     # degrees C between calibration and measurement
+
+# English firmware (BoardProgram_translated.ino) lines that report the sweep settings
+SETTING_PATTERNS = [
+    ('start_freq', re.compile(r"^\[INFO\] Set start frequency:\s*(\d+)\s*Hz")),
+    ('freq_increment', re.compile(r"^\[INFO\] Set frequency increment:\s*(\d+)\s*Hz")),
+    ('num_increments', re.compile(r"^\[INFO\] Set number of measurements:\s*(\d+)")),
+    ('output_range', re.compile(r"^\[INFO\] Set to .*\(Range (\d)\)")),
+    ('pga_gain', re.compile(r"^\[INFO\] PGA Gain set to: x(\d)")),
+    ('rcal', re.compile(r"^\[INFO\] Set Calibration Impedance:\s*(\d+)")),
+    ('board_id', re.compile(r"^\[INFO\] Board ID:\s*(\S+)")),
+]
+
+
+def parse_setting_line(line):
+    # Returns (field, value) for a settings line, None otherwise
+    for field, pattern in SETTING_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            value = match.group(1)
+            return field, (value if field == 'board_id' else int(value))
+    return None
+
+
+def calibration_key(settings):
+    if any(settings.get(field) is None for field in KEY_FIELDS if field != 'board_id'):
+        return None
+    return "|".join(str(settings.get(field) or 'unknown') for field in KEY_FIELDS)
+
+
+def gain_phase(points, rcal):
+    # Same arithmetic as AD5933::calibrate(gain, phase, real, imag, ref, n)
+    gains = []
+    phases = []
+    for real, imag in points:
+        gains.append((1.0 / rcal) / math.sqrt(real * real + imag * imag))
+        raw_phase = math.degrees(math.atan2(imag, real))
+        if real > 0 and imag > 0:
+            phases.append(raw_phase)
+        elif real < 0 and imag > 0:
+            phases.append(180 + raw_phase)
+        elif real < 0 and imag < 0:
+            phases.append(180 + raw_phase)
+        elif real > 0 and imag < 0:
+            phases.append(360 + raw_phase)
+        else:
+            phases.append(raw_phase)
+    return gains, phases
+
+
+def format_calibration_command(points, rcal):
+    # Single-line upload for the firmware's "Send cached calibration" prompt
+    gains, phases = gain_phase(points, rcal)
+    return "CAL " + ";".join(f"{g:.9e},{p:.6f}" for g, p in zip(gains, phases))
+
+
+def calibration_rows(points, rcal):
+    # Rows in the layout of parse_calibration_line(), for the workbook
+    _, phases = gain_phase(points, rcal)
+    rows = []
+    for i, ((real, imag), phase) in enumerate(zip(points, phases)):
+        rows.append([f"Cal Point {i}", f"R={real} / I={imag}",
+                     f"{math.sqrt(real * real + imag * imag):.2f}", f"{phase:.2f} degrees"])
+    return rows
+
+
+class CalibrationCache:
+    def __init__(self, path, max_age_s=DEFAULT_MAX_AGE_S, max_temp_delta=DEFAULT_MAX_TEMP_DELTA):
+        self.path = path
+        self.max_age_s = max_age_s
+        self.max_temp_delta = max_temp_delta
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Could not read calibration cache '{path}': {e}")
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def store(self, settings, points, temperature=None, now=None):
+        key = calibration_key(settings)
+        if key is None:
+            return None
+        if len(points) != settings['num_increments'] + 1:
+            print(f"[WARNING] Calibration has {len(points)} points, expected {settings['num_increments'] + 1}. Not cached.")
+            return None
+        entry = {
+            'settings': {field: settings.get(field) for field in KEY_FIELDS},
+            'points': [list(p) for p in points],
+            'timestamp': time.time() if now is None else now,
+            'temperature': temperature,
+        }
+        self.entries[key] = entry
+        self.save()
+        return entry
+
+    def lookup(self, settings, temperature=None, now=None, max_age_s=None):
+        # Valid entry for these settings, or None when missing / expired. max_age_s overrides
+        # the default age (e.g. the drift-based window of biosensor_host.calibration_history)
+        key = calibration_key(settings)
+        entry = self.entries.get(key) if key else None
+        if entry is None:
+            return None
+        if self.expiry_reason(entry, temperature, now, max_age_s):
+            return None
+        return entry
+
+    def expiry_reason(self, entry, temperature=None, now=None, max_age_s=None):
+        max_age_s = self.max_age_s if max_age_s is None else max_age_s
+        age = (time.time() if now is None else now) - entry['timestamp']
+        if age > max_age_s:
+            return f"older than {max_age_s / 3600:.1f} h"
+        if temperature is not None and entry.get('temperature') is not None:
+            if abs(temperature - entry['temperature']) > self.max_temp_delta:
+                return f"temperature changed by more than {self.max_temp_delta} C"
+        return None
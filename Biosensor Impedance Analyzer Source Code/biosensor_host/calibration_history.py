@@ -0,0 +1,181 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from biosensor_host.calibration_cache import calibration_key, gain_phase
+from biosensor_host.repeats import wrap_degrees
+
+# ------------------------
+# Calibration history and drift tracking
+# ------------------------
+# CalibrationHistory keeps the last HISTORY_LENGTH calibrations of every calibration key
+# (biosensor_host.calibration_cache: sweep settings, output range, PGA gain, Rcal, board)
+# with their raw R/I points and time, in a JSON file next to the calibration cache.
+#
+# CalibrationDriftTracker compares every new calibration with the previous one of the same
+# key, per frequency point:
+#   gain drift    100 * (gain_new / gain_prev - 1) in %
+#   phase drift   system phase difference in degrees
+# and alerts when either exceeds its tolerance. The alert has hysteresis: once raised it
+# only clears when the drift is back below (1 - HYSTERESIS) x tolerance, so a key that sits
+# at the tolerance doesn't flip on every run.
+#
+# From the last few calibrations it also fits a drift rate per frequency point (least
+# squares against time). reuse_window_s() turns the fastest rate into the time until the
+# drift reaches the tolerance: the calibration cache may then reuse a calibration for
+# longer than its default age when the system is stable, and recalibrates sooner when it
+# drifts. With fewer than MIN_RUNS_FOR_RATE runs (or scattered drift that no line explains)
+# the cache keeps its default age.
+
+HISTORY_LENGTH = 20
+GAIN_TOLERANCE_PCT = 0.5
+PHASE_TOLERANCE_DEG = 0.5
+HYSTERESIS = 0.2
+MIN_RUNS_FOR_RATE = 3
+RATE_RUNS = 6                    # calibrations the drift rate is fitted to
+MIN_REUSE_S = 15 * 60
+MAX_REUSE_S = 7 * 24 * 3600
+
+
+def calibration_freqs(settings, count):
+    return settings['start_freq'] + settings['freq_increment'] * np.arange(count)
+
+
+def run_arrays(runs, rcal):
+    # (timestamps, gains, phases): gains / phases (runs, points)
+    gains, phases = zip(*(gain_phase(run['points'], rcal) for run in runs))
+    return (np.array([run['timestamp'] for run in runs], dtype=np.float64),
+            np.array(gains, dtype=np.float64), np.array(phases, dtype=np.float64))
+
+
+def calibration_drift(previous_points, points, rcal):
+    # Per-frequency (gain drift %, phase drift deg) of points against previous_points
+    _, gains, phases = run_arrays([{'points': previous_points, 'timestamp': 0},
+                                   {'points': points, 'timestamp': 0}], rcal)
+    return 100.0 * (gains[1] / gains[0] - 1.0), wrap_degrees(phases[1] - phases[0])
+
+
+class CalibrationHistory:
+    # path None keeps the history in memory only (replays)
+    def __init__(self, path=None, length=HISTORY_LENGTH):
+        self.path = path
+        self.length = length
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Could not read calibration history '{path}': {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def runs(self, settings):
+        key = calibration_key(settings)
+        return self.entries.get(key, []) if key else []
+
+    def add(self, settings, points, temperature=None, now=None):
+        key = calibration_key(settings)
+        if key is None:
+            return None
+        run = {
+            'points': [list(p) for p in points],
+            'timestamp': time.time() if now is None else now,
+            'temperature': temperature,
+        }
+        runs = self.entries.setdefault(key, [])
+        runs.append(run)
+        del runs[:-self.length]
+        self.save()
+        return run
+
+
+class CalibrationDriftTracker:
+    def __init__(self, history, gain_tol_pct=GAIN_TOLERANCE_PCT, phase_tol_deg=PHASE_TOLERANCE_DEG,
+                 hysteresis=HYSTERESIS):
+        self.history = history
+        self.gain_tol_pct = gain_tol_pct
+        self.phase_tol_deg = phase_tol_deg
+        self.hysteresis = hysteresis
+        self.alerting = set()    # keys whose last drift raised the alert
+
+    def add_run(self, settings, points, temperature=None, now=None):
+        # Stores the calibration; returns its drift report against the previous run of the
+        # same key, or None for the first one
+        key = calibration_key(settings)
+        if key is None or len(points) != settings['num_increments'] + 1:
+            return None
+        previous = self.history.runs(settings)
+        previous = previous[-1] if previous else None
+        run = self.history.add(settings, points, temperature, now)
+        if previous is None or len(previous['points']) != len(points):
+            return None
+        gain_pct, phase_deg = calibration_drift(previous['points'], points, settings['rcal'])
+        freqs = calibration_freqs(settings, len(points))
+        worst_gain = int(np.argmax(np.abs(gain_pct)))
+        worst_phase = int(np.argmax(np.abs(phase_deg)))
+        # Share of the tolerance used by the worst point; the alert clears below 1 - hysteresis
+        load = max(abs(gain_pct[worst_gain]) / self.gain_tol_pct, abs(phase_deg[worst_phase]) / self.phase_tol_deg)
+        if load > 1.0:
+            self.alerting.add(key)
+        elif load < 1.0 - self.hysteresis:
+            self.alerting.discard(key)
+        return {
+            'hours': (run['timestamp'] - previous['timestamp']) / 3600.0,
+            'freqs': freqs,
+            'gain_pct': gain_pct,
+            'phase_deg': phase_deg,
+            'worst_gain': (int(freqs[worst_gain]), float(gain_pct[worst_gain])),
+            'worst_phase': (int(freqs[worst_phase]), float(phase_deg[worst_phase])),
+            'load': float(load),
+            'alert': key in self.alerting,
+            'reuse_s': self.reuse_window_s(settings),
+        }
+
+    def drift_rates(self, settings):
+        # Fitted drift per hour of every point, (gain %/h, phase deg/h), and the residual
+        # scatter of the fit in units of the tolerance; None without enough history
+        runs = [run for run in self.history.runs(settings)[-RATE_RUNS:]
+                if len(run['points']) == settings['num_increments'] + 1]
+        if len(runs) < MIN_RUNS_FOR_RATE:
+            return None
+        timestamps, gains, phases = run_arrays(runs, settings['rcal'])
+        hours = (timestamps - timestamps[-1]) / 3600.0
+        if np.ptp(hours) <= 0:
+            return None
+        # Drift of each run against the newest one, so gain and phase share the tolerance scale
+        gain_pct = 100.0 * (gains / gains[-1] - 1.0)
+        phase_deg = wrap_degrees(phases - phases[-1])
+        (gain_rate, gain_offset), gain_res, _, _, _ = np.polyfit(hours, gain_pct, 1, full=True)
+        (phase_rate, phase_offset), phase_res, _, _, _ = np.polyfit(hours, phase_deg, 1, full=True)
+        scatter = max(np.sqrt(np.max(gain_res, initial=0.0) / len(runs)) / self.gain_tol_pct,
+                      np.sqrt(np.max(phase_res, initial=0.0) / len(runs)) / self.phase_tol_deg)
+        return gain_rate, phase_rate, scatter
+
+    def reuse_window_s(self, settings):
+        # How long a calibration of these settings stays within tolerance at the fitted drift
+        # rate; None when the history can't tell (the cache then uses its default age)
+        rates = self.drift_rates(settings)
+        if rates is None:
+            return None
+        gain_rate, phase_rate, scatter = rates
+        if scatter >= 1.0 - self.hysteresis:
+            # Run-to-run scatter alone uses up the tolerance: no extension, recalibrate often
+            return MIN_REUSE_S
+        per_hour = max(np.max(np.abs(gain_rate)) / self.gain_tol_pct, np.max(np.abs(phase_rate)) / self.phase_tol_deg)
+        if per_hour <= 0:
+            return MAX_REUSE_S
+        # The part of the tolerance the scatter doesn't use is left for the trend
+        window_s = 3600.0 * (1.0 - scatter) / per_hour
+        return float(min(max(window_s, MIN_REUSE_S), MAX_REUSE_S))
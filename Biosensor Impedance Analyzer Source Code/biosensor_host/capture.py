@@ -0,0 +1,220 @@
+import argparse
+import gzip
+import json
+import struct
+import threading
+import time
+
+# ------------------------
+# Raw serial capture and replay
+# ------------------------
+# CaptureWriter records everything the host reads from and writes to the board, each chunk
+# with its monotonic time since the start of the capture, in a gzip file:
+#   b"BIOSENSOR-CAPTURE 1\n", one JSON header line, then records of
+#   <direction:u8 (0 = received, 1 = sent, 2 = note)> <t_ns:u64> <length:u32> <bytes>
+# Notes are JSON objects the host adds for state the stream itself doesn't carry (e.g. the
+# cache entry behind an uploaded calibration).
+# CapturingSerial wraps the pyserial port; every line the host reads (readline(), or a line
+# of biosensor_host.serial_reader.LineReader) is one record, so a replay splits the stream
+# exactly as the live run did (including the partial prompt lines returned on timeout). Records are buffered and compressed at level 1; the gzip stream is
+# sync-flushed every FLUSH_BYTES / FLUSH_INTERVAL_S, so a crash loses at most that much.
+#
+# ReplaySerial plays a capture back to the host script in place of the port, as fast as
+# possible (or at `speed` x real time); the sent records supply the prompt answers.
+#
+#   python -m biosensor_host.capture dump measurement_data_serial.log.gz
+
+MAGIC = b"BIOSENSOR-CAPTURE 1\n"
+RECORD = struct.Struct('<BQI')
+RECEIVED, SENT, NOTE = 0, 1, 2
+
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL_S = 1.0
+
+
+class CaptureWriter:
+    def __init__(self, path, **header):
+        self.path = path
+        self.file = gzip.open(path, 'wb', compresslevel=1)
+        self.file.write(MAGIC)
+        header['started'] = time.time()
+        self.file.write(json.dumps(header).encode() + b"\n")
+        self.start_ns = time.monotonic_ns()
+        self.buffer = bytearray()
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.records = 0
+
+    def record(self, direction, data):
+        with self.lock:
+            if self.file is None:
+                return
+            self.buffer += RECORD.pack(direction, time.monotonic_ns() - self.start_ns, len(data))
+            self.buffer += data
+            self.records += 1
+            if len(self.buffer) >= FLUSH_BYTES or time.monotonic() - self.last_flush >= FLUSH_INTERVAL_S:
+                self._flush()
+
+    def _flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if self.file is None:
+                return
+            self._flush()
+            self.file.close()
+            self.file = None
+
+
+class CapturingSerial:
+    # pyserial port that records what passes through readline() / write(); a LineReader on
+    # top reads the port in bulk and records its lines through record_received()
+    def __init__(self, port, writer):
+        self.port = port
+        self.writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+    @property
+    def baudrate(self):
+        return self.port.baudrate
+
+    @baudrate.setter
+    def baudrate(self, rate):
+        self.port.baudrate = rate
+
+    def readline(self):
+        data = self.port.readline()
+        if data:
+            self.writer.record(RECEIVED, data)
+        return data
+
+    def record_received(self, data):
+        self.writer.record(RECEIVED, data)
+
+    def write(self, data):
+        self.writer.record(SENT, data)
+        return self.port.write(data)
+
+    def note(self, kind, value):
+        self.writer.record(NOTE, json.dumps({kind: value}).encode())
+
+    def close(self):
+        self.writer.close()
+        self.port.close()
+
+
+def read_capture(path):
+    # (header, records) where records yields (direction, t_ns, data). A log cut off by a
+    # crash ends at its last complete record.
+    f = gzip.open(path, 'rb')
+    if f.readline() != MAGIC:
+        f.close()
+        raise ValueError(f"'{path}' is not a serial capture")
+    header = json.loads(f.readline())
+
+    def records():
+        with f:
+            try:
+                while True:
+                    head = f.read(RECORD.size)
+                    if len(head) < RECORD.size:
+                        return
+                    direction, t_ns, length = RECORD.unpack(head)
+                    data = f.read(length)
+                    if len(data) < length:
+                        return
+                    yield direction, t_ns, data
+            except (EOFError, OSError) as e:
+                print(f"[WARNING] Capture '{path}' is truncated: {e}")
+
+    return header, records()
+
+
+class ReplaySerial:
+    # Stand-in for the serial port: readline() returns the received records in order,
+    # write() is dropped. is_open turns False at the end of the log.
+    # next_answer() returns the recorded answers in order; notes recorded before an answer are
+    # in self.notes by kind.
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+        self.header, self._received = read_capture(path)
+        _, self._sent = read_capture(path)
+        self.notes = {}
+        self.baudrate = self.header.get('baud')
+        self.is_open = True
+        self.lines = 0
+        self.bytes = 0
+        self.start_ns = None
+
+    def readline(self):
+        for direction, t_ns, data in self._received:
+            if direction != RECEIVED:
+                continue
+            if self.speed:
+                if self.start_ns is None:
+                    self.start_ns = time.monotonic_ns() - int(t_ns / self.speed)
+                delay = (self.start_ns + t_ns / self.speed - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+            self.lines += 1
+            self.bytes += len(data)
+            return data
+        self.is_open = False
+        return b""
+
+    def read_line(self):
+        # LineReader.read_line() of the capture: the next line stripped, None at the end
+        data = self.readline()
+        return data.strip() if data else None
+
+    def next_answer(self):
+        # Next line the host sent other than the lines the reader thread writes itself
+        # (STORE_OK acknowledgements, baud link replies); None at the end
+        for direction, _, data in self._sent:
+            if direction == NOTE:
+                self.notes.update(json.loads(data))
+            elif direction == SENT and data.strip() != b"STORE_OK" and not data.startswith(b"LINK "):
+                return data.decode('utf-8', errors='ignore').strip()
+        return None
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def dump(path):
+    header, records = read_capture(path)
+    started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header['started']))
+    print(f"# {path}: started {started}, " + ", ".join(f"{k}={v}" for k, v in header.items() if k != 'started'))
+    for direction, t_ns, data in records:
+        print(f"{t_ns / 1e9:12.6f} {'<>#'[direction]} {data!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a raw serial capture.")
+    parser.add_argument('command', choices=['dump'])
+    parser.add_argument('path')
+    args = parser.parse_args()
+    dump(args.path)
+
+
+if __name__ == '__main__':
+    main()
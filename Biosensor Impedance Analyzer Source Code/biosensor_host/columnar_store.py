@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+
+from biosensor_host.parsing import coord_to_int, measurement_row_values, row_group, row_temperature
+
+# ------------------------
+# Columnar store for raw sweeps
+# ------------------------
+# Keeps every measurement point as typed columns instead of text cells and writes them
+# to a compressed .npz next to the workbook. One row per (sweep, frequency point).
+
+COLUMNS = {
+    'sweep': np.int32,       # running sweep number within the store
+    'x': np.int16,           # -1 when the coordinate is unknown
+    'y': np.int16,
+    'group': np.int8,        # MUX group 1~4, 0 when unknown
+    'repeat': np.int16,      # 1-based repeat index, 0 when not repeated
+    'temperature': np.float32,  # AD5933 die temperature (C) at the start of the sweep, NaN when unknown
+    'freq': np.int32,        # Hz
+    'real': np.int16,        # raw AD5933 data registers
+    'imag': np.int16,
+    'impedance': np.float64,
+    'phase': np.float64,
+    'resistance': np.float64,
+    'reactance': np.float64,
+}
+
+
+class ColumnarStore:
+    def __init__(self, path):
+        self.path = path
+        self.num_sweeps = 0
+        self._chunks = {name: [] for name in COLUMNS}
+
+    def append_sweep(self, rows, repeat=0):
+        # rows: measurement rows of one sweep (see biosensor_host.parsing)
+        if not rows:
+            return
+        values = np.array([measurement_row_values(row) for row in rows], dtype=np.float64)
+        n = len(rows)
+        x = coord_to_int(rows[0][6])
+        y = coord_to_int(rows[0][7])
+        group = row_group(rows[0])
+        temperature = row_temperature(rows[0])
+        columns = {
+            'sweep': np.full(n, self.num_sweeps),
+            'x': np.full(n, -1 if x is None else x),
+            'y': np.full(n, -1 if y is None else y),
+            'group': np.full(n, group or 0),
+            'repeat': np.full(n, repeat),
+            'temperature': np.full(n, np.nan if temperature is None else temperature),
+            'freq': values[:, 0],
+            'real': values[:, 1],
+            'imag': values[:, 2],
+            'impedance': values[:, 3],
+            'phase': values[:, 4],
+            'resistance': values[:, 5],
+            'reactance': values[:, 6],
+        }
+        for name, dtype in COLUMNS.items():
+            self._chunks[name].append(columns[name].astype(dtype))
+        self.num_sweeps += 1
+
+    def columns(self):
+        return {name: (np.concatenate(chunks) if chunks else np.empty(0, dtype=COLUMNS[name]))
+                for name, chunks in self._chunks.items()}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(self.path, **self.columns())
+
+
+def load_columns(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
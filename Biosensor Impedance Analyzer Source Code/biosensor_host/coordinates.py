@@ -0,0 +1,160 @@
+import os
+import re
+
+# ------------------------
+# Coordinate lists for the firmware's Coordinate List Sweep (Mode 6)
+# ------------------------
+# The firmware accepts the whole batch in one line:
+#   L x,y;x,y;...                    explicit list, visited in the given order
+#   M xStart,yStart,width,height,hex  rectangle bitmask, visited x-major / y-minor
+# Addresses are decimal 0~127 on the wire; the firmware still reports every
+# coordinate as a 7-bit binary string in "Current_Coord->X=...,Y=...".
+#
+# The Multi-Group Scan (Mode 8) takes one segment per MUX group, each on its own line:
+#   G group,order L ... / G group,order M ...   order = scan order index for the mask
+
+ADDRESS_MAX = 127
+GROUPS = [1, 2, 3, 4]
+TARGET_PATTERN = re.compile(r"[gG](\*|[1-4](?:-[1-4])?):(.+)")
+
+
+def _parse_axis(text):
+    # "5", "5-9" or "5-9:2" (inclusive range with step)
+    text = text.strip()
+    step = 1
+    if ':' in text:
+        text, step_str = text.split(':', 1)
+        step = int(step_str)
+        if step < 1:
+            raise ValueError(f"Step must be positive: {step_str}")
+    if '-' in text:
+        start_str, end_str = text.split('-', 1)
+        start, end = int(start_str), int(end_str)
+    else:
+        start = end = int(text)
+    for value in (start, end):
+        if not 0 <= value <= ADDRESS_MAX:
+            raise ValueError(f"Address out of range 0~{ADDRESS_MAX}: {value}")
+    if start > end:
+        raise ValueError(f"Start address is greater than end address: {text}")
+    values = list(range(start, end + 1, step))
+    if values[-1] != end:
+        values.append(end)  # boundaries included, same as Mode 5
+    return values
+
+
+def parse_coordinate_spec(text):
+    # User input for the coordinate list prompt. Entries are separated by ';' or whitespace:
+    #   "10,20; 11,20"     single coordinates (decimal, or 7-bit binary with a 0b prefix)
+    #   "0-15,0-15"        every coordinate in the rectangle
+    #   "0-127:8,0-127:8"  ranges with a step
+    #   "@coords.txt"      one entry per line from a file ('#' starts a comment)
+    text = _read_spec(text)
+    coords = []
+    seen = set()
+    for entry in text.replace(';', ' ').split():
+        if ',' not in entry:
+            raise ValueError(f"Expected 'x,y': {entry}")
+        x_text, y_text = entry.split(',', 1)
+        x_text = str(int(x_text, 2)) if x_text.lower().startswith('0b') else x_text
+        y_text = str(int(y_text, 2)) if y_text.lower().startswith('0b') else y_text
+        for x in _parse_axis(x_text):
+            for y in _parse_axis(y_text):
+                if (x, y) not in seen:
+                    seen.add((x, y))
+                    coords.append((x, y))
+    if not coords:
+        raise ValueError("No coordinates given.")
+    return coords
+
+
+def _read_spec(text):
+    # "@file": one entry per line ('#' starts a comment)
+    text = text.strip()
+    if text.startswith('@'):
+        path = os.path.expanduser(text[1:].strip())
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.split('#', 1)[0] for line in f]
+        text = ';'.join(lines)
+    return text
+
+
+def parse_target_spec(text):
+    # Targets of the Multi-Group Scan: coordinate entries (as in parse_coordinate_spec) with
+    # their MUX group in front, separated by ';' or whitespace:
+    #   "g1:0-15,0-15; g3:10,20"   groups 1 and 3
+    #   "g2-4:0-127:8,0-127:8"     the same coordinates in groups 2, 3 and 4
+    #   "g*:0-127,0-127"           the whole array in every group
+    #   "@targets.txt"             one entry per line from a file
+    # Returns (group, x, y) in the given order, duplicates dropped.
+    targets = []
+    seen = set()
+    for entry in _read_spec(text).replace(';', ' ').split():
+        match = TARGET_PATTERN.fullmatch(entry)
+        if not match:
+            raise ValueError(f"Expected 'g<group>:x,y': {entry}")
+        if match.group(1) == '*':
+            groups = GROUPS
+        else:
+            first, _, last = match.group(1).partition('-')
+            groups = list(range(int(first), int(last or first) + 1))
+            if not groups:
+                raise ValueError(f"Start group is greater than end group: {match.group(1)}")
+        coords = parse_coordinate_spec(match.group(2))
+        for group in groups:
+            for x, y in coords:
+                if (group, x, y) not in seen:
+                    seen.add((group, x, y))
+                    targets.append((group, x, y))
+    if not targets:
+        raise ValueError("No targets given.")
+    return targets
+
+
+def encode_coordinate_list(coords):
+    return "L " + ";".join(f"{x},{y}" for x, y in coords)
+
+
+def encode_coordinate_mask(coords):
+    xs = [x for x, _ in coords]
+    ys = [y for _, y in coords]
+    x_start, y_start = min(xs), min(ys)
+    width = max(xs) - x_start + 1
+    height = max(ys) - y_start + 1
+    num_bits = width * height
+    bits = bytearray((num_bits + 3) // 4 * 4)
+    for x, y in coords:
+        bits[(x - x_start) * height + (y - y_start)] = 1
+    hex_digits = []
+    for k in range(0, len(bits), 4):
+        nibble = (bits[k] << 3) | (bits[k + 1] << 2) | (bits[k + 2] << 1) | bits[k + 3]
+        hex_digits.append("0123456789ABCDEF"[nibble])
+    return f"M {x_start},{y_start},{width},{height}," + "".join(hex_digits)
+
+
+def mask_order(coords):
+    # Order in which the firmware visits a mask (x-major, y-minor)
+    return sorted(set(coords))
+
+
+def encode_coordinates(coords, keep_order=True):
+    # Pick the shorter wire format. A mask always visits in raster order, so it is
+    # only used when the caller does not need the list order preserved.
+    as_list = encode_coordinate_list(coords)
+    if keep_order and list(coords) != mask_order(coords):
+        return as_list
+    as_mask = encode_coordinate_mask(coords)
+    return as_mask if len(as_mask) < len(as_list) else as_list
+
+
+def encode_group_segment(group, order_index, sequence):
+    # One Mode 8 segment. The firmware visits a mask in the segment's scan order, which is
+    # the order the scheduler computed the sequence in, so the shorter format always works.
+    as_list = encode_coordinate_list(sequence)
+    as_mask = encode_coordinate_mask(sequence)
+    return f"G {group},{order_index} " + (as_mask if len(as_mask) < len(as_list) else as_list)
+
+
+def to_binary_string(value):
+    # Same format as intToBinaryString() in the firmware
+    return format(value, '07b')
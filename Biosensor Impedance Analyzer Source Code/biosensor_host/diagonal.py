@@ -0,0 +1,91 @@
+import numpy as np
+
+from biosensor_host.repeats import wrap_degrees
+
+# ------------------------
+# Diagonal sweep passes (Mode 3)
+# ------------------------
+# Mode 3 sweeps the seven diagonal points forward (address line 0 -> 6) and back (6 -> 0).
+# The host keeps each pass in its own columnar store (biosensor_host.columnar_store);
+# pass_drift() lines the two passes up by coordinate and takes reverse - forward for every
+# quantity and frequency point in one array operation. The reverse pass ends where the
+# forward pass started, so line 0 shows the drift over the whole run, line 6 over one sweep.
+
+PASSES = ['forward', 'reverse']
+QUANTITIES = ['impedance', 'phase', 'resistance', 'reactance']
+
+DRIFT_HEADERS = ['X', 'Y', 'Group', 'Freq (Hz)', '|Z| Forward', '|Z| Reverse', '|Z| Drift', '|Z| Drift (%)',
+                 'Phase Drift (Degrees)', 'Resistance Drift', 'Reactance Drift']
+
+
+def pass_spectra(columns):
+    # One pass's columns -> (keys, freqs, values): keys = x * 128 + y per sweep, sorted,
+    # values (quantities, sweeps, points) in the same order
+    sweep_ids = np.unique(columns['sweep'])
+    if len(sweep_ids) == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0), np.empty((len(QUANTITIES), 0, 0))
+    points, rest = divmod(len(columns['sweep']), len(sweep_ids))
+    if rest:
+        raise ValueError("Sweeps of a diagonal pass have different point counts")
+    keys = (columns['x'].astype(np.int32) * 128 + columns['y']).reshape(-1, points)[:, 0]
+    order = np.argsort(keys, kind='stable')
+    values = np.stack([columns[name].reshape(-1, points)[order] for name in QUANTITIES])
+    return keys[order], columns['freq'][:points], values
+
+
+def pass_drift(forward, reverse):
+    # Columns of the two passes -> drift of the coordinates both passes reached:
+    # {'x', 'y', 'freq', 'forward', 'reverse', 'delta'} with delta (quantities, coords, points)
+    forward_keys, freqs, forward_values = pass_spectra(forward)
+    reverse_keys, reverse_freqs, reverse_values = pass_spectra(reverse)
+    if len(freqs) != len(reverse_freqs) or not np.array_equal(freqs, reverse_freqs):
+        raise ValueError("Forward and reverse passes were swept at different frequencies")
+    keys, forward_index, reverse_index = np.intersect1d(forward_keys, reverse_keys, return_indices=True)
+    forward_values = forward_values[:, forward_index]
+    reverse_values = reverse_values[:, reverse_index]
+    delta = reverse_values - forward_values
+    delta[QUANTITIES.index('phase')] = wrap_degrees(delta[QUANTITIES.index('phase')])
+    return {
+        'x': keys // 128,
+        'y': keys % 128,
+        'freq': freqs,
+        'forward': forward_values,
+        'reverse': reverse_values,
+        'delta': delta,
+    }
+
+
+def drift_percent(drift):
+    # |Z| drift relative to the forward pass, (coords, points)
+    impedance = QUANTITIES.index('impedance')
+    forward = drift['forward'][impedance]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(forward != 0, 100.0 * drift['delta'][impedance] / forward, np.nan)
+
+
+def drift_rows(drift, group="N/A"):
+    # Rows in the DRIFT_HEADERS layout, one per (coordinate, frequency)
+    # (the phase, resistance and reactance columns follow the order of QUANTITIES)
+    percent = drift_percent(drift)
+    impedance = QUANTITIES.index('impedance')
+    rows = []
+    for c, (x, y) in enumerate(zip(drift['x'], drift['y'])):
+        for p, freq in enumerate(drift['freq']):
+            delta = drift['delta'][:, c, p].tolist()
+            rows.append([f"{int(x):07b}", f"{int(y):07b}", group, int(freq),
+                         float(drift['forward'][impedance, c, p]), float(drift['reverse'][impedance, c, p]),
+                         delta[impedance], float(percent[c, p])]
+                        + [delta[QUANTITIES.index(name)] for name in QUANTITIES[1:]])
+    return rows
+
+
+def drift_summary(drift):
+    # One line per coordinate: largest |Z| and phase drift over the sweep
+    percent = np.abs(drift_percent(drift))
+    phase = np.abs(drift['delta'][QUANTITIES.index('phase')])
+    lines = []
+    for c, (x, y) in enumerate(zip(drift['x'], drift['y'])):
+        p = int(np.nanargmax(percent[c])) if np.isfinite(percent[c]).any() else 0
+        lines.append(f"X={int(x):07b},Y={int(y):07b}: max |Z| drift {percent[c, p]:.3f}% at "
+                     f"{int(drift['freq'][p])} Hz, max phase drift {phase[c].max():.3f} deg")
+    return lines
@@ -0,0 +1,190 @@
+import re
+
+from biosensor_host.autorange import AUTO_RANGE_PATTERN, RANGE_CALIBRATION_PATTERN
+from biosensor_host.parsing import MEASUREMENT_PATTERN, STAGE_TIMING_PATTERN, SWEEP_TIMING_PATTERN
+from biosensor_host.settling import CANDIDATE_PATTERN, PROFILE_PATTERN
+
+# ------------------------
+# Firmware message dialects
+# ------------------------
+# The host engine (Data Extract&Plot translated_rev01.py) reacts to events, not to firmware
+# strings. A dialect is an ordered table of (event, key, pattern) for one firmware:
+#   english - BoardProgram_translated.ino
+#   korean  - MainPCB.ino / MainPCBPython.ino and the range-sweep build the rev03 script was
+#             written for
+# Patterns are matched at the start of the (stripped) line; ".*?" marks messages that may
+# appear anywhere in it. The first matching row wins. 'key' names the prompt, setting or
+# measurement type; the pattern's groups are returned as the event fields.
+#
+# Dialect() compiles a whole table into one alternation, so every line is classified with a
+# single regex match instead of a chain of substring and regex checks. Measurement lines,
+# by far the most frequent, are the first alternative and come back already split;
+# Dialect.measurement is that alternative over bytes, so the host can match them on the raw
+# line (it wins whenever it matches) and decode only the other lines for classify().
+
+ENGLISH = [
+    ('measurement', None, MEASUREMENT_PATTERN.pattern),
+    ('sweep_start', None, r"SWEEP_START$"),
+    ('sweep_done', None, r"SWEEP_DONE$"),
+    ('calibration_start', None, r".*?Starting Calibration\."),
+    ('device_reset', None, r".*?ESP-ROM"),
+    ('prompt', 'start_frequency', r"Enter the start frequency"),
+    ('prompt', 'frequency_increment', r"Enter the frequency increment"),
+    ('prompt', 'num_measurements', r"Enter the number of measurements"),
+    ('prompt', 'settling_cycles', r"Enter Settling Time Cycles"),
+    ('prompt', 'output_range', r"Select Output Excitation Range"),
+    ('prompt', 'pga_gain', r"Select PGA Gain"),
+    ('prompt', 'auto_range', r"Select auto-ranging"),
+    ('prompt', 'calibration_impedance', r"Enter Calibration Impedance"),
+    ('prompt', 'mux_group', r"Select MUX group"),
+    ('prompt', 'x_address', r"X Axis Address"),
+    ('prompt', 'y_address', r"Y Axis Address"),
+    ('prompt', 'mode', r"Set AD5933 Mode"),
+    ('prompt', 'bit', r"\s*Bit"),
+    ('prompt', 'confirm_range', r"Is this range correct\? \(Y/N\)"),
+    ('prompt', 'x_increment', r"Enter X-axis increment unit"),
+    ('prompt', 'y_increment', r"Enter Y-axis increment unit"),
+    ('prompt', 'coordinate_list', r"Enter coordinate list"),
+    ('prompt', 'scan_order', r"Select scan order"),
+    ('prompt', 'repeats', r"Enter repeats per coordinate"),
+    ('prompt', 'group_segment', r"Enter group segment"),
+    ('prompt', 'calibration_source', r"Select calibration source"),
+    ('prompt', 'send_cached_calibration', r"Send cached calibration"),
+    ('prompt', 'send_settling_profile', r"Send settling profile"),
+    ('prompt', 'kinetics_period', r"Enter kinetics cycle period"),
+    ('prompt', 'kinetics_cycles', r"Enter kinetics cycles"),
+    ('probe', None, r"PROBE (\d+) (\S+) ([0-9A-F]+)$"),
+    ('probe_end', None, r"PROBE_END (\d+)"),
+    ('baud_rates', None, r"\[INFO\] Baud rates:\s*([\d,]+)"),
+    ('baud_switch', None, r"\[INFO\] Baud switch:\s*(\d+)"),
+    ('baud_set', None, r"\[INFO\] Baud rate set:\s*(\d+)"),
+    ('calibration_impedance', None, r"\[INFO\] Set Calibration Impedance:\s*(\S+)"),
+    ('setting', 'start_freq', r"\[INFO\] Set start frequency:\s*(\d+)\s*Hz"),
+    ('setting', 'freq_increment', r"\[INFO\] Set frequency increment:\s*(\d+)\s*Hz"),
+    ('setting', 'num_increments', r"\[INFO\] Set number of measurements:\s*(\d+)"),
+    ('setting', 'output_range', r"\[INFO\] Set to .*\(Range (\d)\)"),
+    ('setting', 'pga_gain', r"\[INFO\] PGA Gain set to: x(\d)"),
+    ('setting', 'board_id', r"\[INFO\] Board ID:\s*(\S+)"),
+    ('calibration_performing', None, r".*?\[INFO\] Performing calibration\."),
+    # N/A: the firmware could not read the die temperature
+    ('calibration_temperature', None, r"\[INFO\] Calibration temperature:\s*(-?[\d.]+|N/A)"),
+    ('temperature', None, r"Temperature->(-?[\d.]+|N/A)"),
+    ('cached_calibration_loaded', None, r".*?\[INFO\] Cached calibration loaded"),
+    ('calibration_failed', None, r".*?\[ERROR\] Calibration failed"),
+    ('range_calibration', None, RANGE_CALIBRATION_PATTERN.pattern.lstrip('^')),
+    ('auto_ranging', None, r"\[INFO\] Auto-ranging:\s*(\S+)"),
+    ('auto_range', None, AUTO_RANGE_PATTERN.pattern.lstrip('^')),
+    ('cal_point', None, r"Cal Point"),
+    ('addresses', None, r".*?\[INFO\] Set X-axis Address\s*:\s*([^,]*?)\s*,.*?Y-axis Address\s*:\s*(\S*)"),
+    ('start', 'Rcal', r".*?Checking impedance at Rcal position\."),
+    ('start', 'COB', r".*?Checking impedance of COB\."),
+    ('start', 'COB-range', r".*?Starting COB Range Sweep"),
+    ('start', 'COB-range-step', r".*?Starting COB Range Step Sweep"),
+    ('start', 'COB-list', r".*?Starting COB Coordinate List Sweep"),
+    ('start', 'COB-multi-group', r".*?Starting Multi-Group Scan"),
+    ('start', 'COB-diagonal', r".*?Starting Diagonal Sweep"),
+    ('start', 'COB-screening', r".*?Starting Electrode Screening"),
+    ('screen', None, rf"Screen->X=(\d+),Y=(\d+)\s+{MEASUREMENT_PATTERN.pattern}"),
+    ('screening_complete', None, r".*?\[INFO\] Electrode screening complete: (\d+) segments, (\d+) points in (\d+) ms"),
+    ('start', 'COB-kinetics', r".*?Starting Kinetics"),
+    ('kinetics_info', None, r".*?\[INFO\] Kinetics: (\d+) electrodes"),
+    ('kinetics_cycle', None, r"Kinetics_Cycle->(\d+)"),
+    ('kinetics_time', None, r"Kinetics_Time->(\d+)"),
+    ('kinetics_complete', None, r".*?\[INFO\] Kinetics complete: (\d+) cycles in (\d+) ms"),
+    ('diagonal_pass', None, r".*?\[INFO\] Starting (forward|reverse) diagonal sweep"),
+    ('scan_order', None, r"\[INFO\] Scan order:\s*(.*)"),
+    ('repeats', None, r"\[INFO\] Repeats per coordinate:\s*(\d+)"),
+    ('settling_start', None, r".*?Starting Settling Auto-Tune"),
+    ('settling_candidate', None, CANDIDATE_PATTERN.pattern.lstrip('^')),
+    ('settling_complete', None, r".*?\[INFO\] Settling auto-tune complete"),
+    ('settling_profile', None, PROFILE_PATTERN.pattern.lstrip('^')),
+    ('repeat_index', None, r"Repeat_Index->(\d+)/(\d+)"),
+    ('group', None, r".*?\[INFO\] Group\s+(\d+)\s+selected"),
+    ('coord', None, r".*?Current_Coord->X=(\d+),Y=(\d+)"),
+    ('sweep_timing', None, SWEEP_TIMING_PATTERN.pattern),
+    ('stage_timing', None, STAGE_TIMING_PATTERN.pattern),
+    ('sweep_complete', None, r".*?Frequency sweep complete!"),
+    ('range_complete', None, r".*?\[INFO\] COB range sweep complete"),
+    ('range_complete', None, r".*?\[INFO\] COB range step sweep complete"),
+    ('range_complete', None, r".*?\[INFO\] COB coordinate list sweep complete"),
+    ('range_complete', None, r".*?\[INFO\] Multi-group scan complete"),
+    ('range_complete', None, r".*?\[INFO\] Diagonal sweep complete"),
+]
+
+KOREAN = [
+    ('measurement', None, MEASUREMENT_PATTERN.pattern),
+    ('calibration_start', None, r".*?캘리브레이션을 시작합니다\."),
+    ('device_reset', None, r".*?ESP-ROM"),
+    ('prompt', 'start_frequency', r"시작 주파수를 입력하세요"),
+    ('prompt', 'frequency_increment', r"주파수 증가량을 입력하세요"),
+    ('prompt', 'num_measurements', r"측정 횟수를 입력하세요"),
+    ('prompt', 'settling_cycles', r"Settling Time Cycles를 입력하세요"),
+    ('prompt', 'output_range', r"Output Excitation Range를 선택하세요"),
+    ('prompt', 'pga_gain', r"PGA Gain을 선택하세요"),
+    ('prompt', 'calibration_impedance', r"Calibration Impedance를 입력하세요"),
+    ('prompt', 'mux_group', r"MUX 그룹을 선택하세요"),
+    ('prompt', 'x_address', r"X Axis Address"),
+    ('prompt', 'y_address', r"Y Axis Address"),
+    ('prompt', 'mode', r"AD5933 모드 설정"),
+    ('prompt', 'bit', r"Bit"),
+    ('prompt', 'confirm_range', r"이 범위가 맞습니까\? \(Y/N\)"),
+    ('calibration_impedance', None, r".*?설정된 Calibration Impedance\s*:\s*(\S+)"),
+    ('setting', 'start_freq', r"설정된 시작 주파수:\s*(\d+)\s*Hz"),
+    ('setting', 'freq_increment', r"설정된 주파수 증가량:\s*(\d+)\s*Hz"),
+    ('setting', 'num_increments', r"설정된 측정 횟수:\s*(\d+)"),
+    ('setting', 'output_range', r"[\d.]+ Vpp \(Range (\d)\)"),
+    ('setting', 'pga_gain', r"PGA Gain: x(\d)"),
+    ('calibration_performing', None, r"캘리브레이션을 진행합니다\."),
+    ('calibration_failed', None, r"캘리브레이션 실패"),
+    ('cal_point', None, r"Cal Point"),
+    ('addresses', None, r".*?설정된 X축 Address\s*:\s*([^,]*?)\s*,.*?Y축 Address\s*:\s*(\S*)"),
+    ('start', 'Rcal', r".*?Rcal 위치의 임피던스를 체크합니다\."),
+    ('start', 'COB', r".*?COB의 임피던스를 체크합니다\."),
+    ('start', 'COB-range', r".*?COB 범위 스윕 \(7비트 입력 방식\)을 시작합니다\."),
+    ('group', None, r".*?그룹\s+(\d+)\s+선택"),
+    # The range build prints the coordinate as "현재 좌표: X = ..." and "Y = ..." on two lines
+    ('coord', None, r".*?현재 좌표:\s*X\s*=\s*(\d+)(?:\s*,?\s*Y\s*=\s*(\d+))?"),
+    ('coord_y', None, r"\s*Y\s*=\s*(\d+)"),
+    ('sweep_complete', None, r".*?Frequency sweep complete!"),
+    ('range_complete', None, r".*?COB 범위 스윕 완료\."),
+]
+
+
+class Dialect:
+    def __init__(self, name, table, handshake):
+        # handshake: the firmware frames range sweeps with SWEEP_START / SWEEP_DONE and
+        # waits for STORE_OK; without it every coordinate's sweep is taken as it comes
+        self.name = name
+        self.handshake = handshake
+        self.rows = {}
+        alternatives = []
+        group = 1
+        for event, key, pattern in table:
+            groups = re.compile(pattern).groups
+            self.rows[group] = (event, key, group, group + groups)
+            alternatives.append(f"({pattern})")
+            group += groups + 1
+        self.pattern = re.compile("|".join(alternatives))
+        self.measurement = re.compile(table[0][2].encode()) if table[0][0] == 'measurement' else None
+
+    def classify(self, line):
+        # (event, key, fields) of a stripped line; (None, None, ()) if nothing matches
+        match = self.pattern.match(line)
+        if match is None:
+            return None, None, ()
+        # The row's own group closes after the groups inside it, so it is the last index
+        event, key, first, last = self.rows[match.lastindex]
+        return event, key, match.groups()[first:last]
+
+
+DIALECTS = {
+    'english': Dialect('english', ENGLISH, handshake=True),
+    'korean': Dialect('korean', KOREAN, handshake=False),
+}
+
+
+def get_dialect(name):
+    try:
+        return DIALECTS[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown firmware dialect '{name}' (choose from {', '.join(DIALECTS)})")
@@ -0,0 +1,1286 @@
+import math
+import os
+import pty
+import random
+import termios
+import threading
+import time
+import tty
+import zlib
+
+from biosensor_host.ad5933_emulator import (AD5933Driver, AD5933Emulator, VirtualClock, randles, resistor,
+                                            CTRL_INIT_START_FREQ, CTRL_START_FREQ_SWEEP, CTRL_INCREMENT_FREQ,
+                                            CTRL_STANDBY_MODE, CTRL_OUTPUT_RANGE_1, CTRL_OUTPUT_RANGE_2,
+                                            CTRL_OUTPUT_RANGE_3, CTRL_OUTPUT_RANGE_4, STATUS_SWEEP_DONE)
+from biosensor_host.autorange import (RANGE_STEPS, RAW_MAX_MAGNITUDE, RAW_MIN_MAGNITUDE, RAW_TARGET_MAGNITUDE,
+                                      find_step, raw_magnitude, step_level)
+from biosensor_host.baud import BASE_RATE, FALLBACK_DELAY_S, PROBE_FRAMES, check_link_reply, probe_frame
+from biosensor_host.scan_order import SCAN_ORDERS, order_coordinates, settle_delay_ms, toggled_lines
+
+# ------------------------
+# Firmware protocol emulator (BoardProgram_translated.ino)
+# ------------------------
+# Speaks the same serial dialect as the English firmware -- prompts, [INFO] lines,
+# Current_Coord / SWEEP_START / SWEEP_DONE framing and the STORE_OK handshake -- on top of
+# the AD5933 emulator, so the host scripts can be driven without a board:
+#
+#   link = PtyLink()                      # host opens link.port_name with pyserial
+#   FirmwareEmulator(link, time_scale=None).start()
+#
+# Which impedance the AD5933 sees follows the MUX state: Rcal when MUX_SWITCH_ADG849 is
+# LOW, otherwise load(group, x, y). Timing (I2C, conversions, delay(), serial bytes at
+# the baud rate) runs on a VirtualClock; time_scale=1.0 is real speed, None is as fast
+# as possible.
+#
+# The pty carries bytes at any speed, so the link checks the rate the host configured on its
+# end: while it differs from the board's (during a baud switch) every byte arrives garbled,
+# as on a UART. link_error_rate(baud) adds random byte errors to what the board sends.
+
+SEPARATOR = "=" * 129
+SEPARATOR_SHORT = "=" * 69
+ACK_TIMEOUT_S = 60.0
+BAUD_RATES = [921600, 460800, 230400, 115200]
+BAUD_SWITCH_DELAY_S = 0.1
+BAUD_LINK_TIMEOUT_S = 2.0
+STRING_TIMEOUT_S = 1.0   # Stream::readStringUntil default timeout
+MAX_REPEATS = 32
+MAX_KINETICS_COORDS = 64
+MAX_KINETICS_PERIOD_S = 86400
+MAX_KINETICS_CYCLES = 1000000
+DIAGONAL_SETTLE_MS = 100
+MAX_SETTLING_BANDS = 8
+SETTLING_CANDIDATES = [511, 255, 127, 63, 31, 15, 7, 3, 0]
+OUTPUT_RANGES = {1: CTRL_OUTPUT_RANGE_1, 2: CTRL_OUTPUT_RANGE_2, 3: CTRL_OUTPUT_RANGE_3, 4: CTRL_OUTPUT_RANGE_4}
+
+
+def arduino_float(value, digits=2):
+    # Print::printFloat()
+    if math.isnan(value):
+        return "nan"
+    if math.isinf(value):
+        return "inf"
+    if value > 4294967040.0 or value < -4294967040.0:
+        return "ovf"
+    return f"{value:.{digits}f}"
+
+
+def to_int(text):
+    # String::toInt() (atol): leading integer, 0 when there is none
+    text = text.strip()
+    digits = ""
+    for k, c in enumerate(text):
+        if c.isdigit() or (k == 0 and c in "+-"):
+            digits += c
+        else:
+            break
+    try:
+        return int(digits)
+    except ValueError:
+        return 0
+
+
+def to_binary_string(value):
+    return format(value, '07b')
+
+
+class LinkClosed(Exception):
+    pass
+
+
+TERMIOS_RATES = {getattr(termios, f"B{rate}"): rate for rate in [9600, 19200, 38400, 57600] + BAUD_RATES
+                 if hasattr(termios, f"B{rate}")}
+
+
+def garble(data, rng, error_rate=1.0):
+    # Bytes as a UART at the wrong rate (or on a noisy line) delivers them
+    return bytes(rng.randrange(256) if rng.random() < error_rate else b for b in data)
+
+
+class PtyLink:
+    # Emulator end of a pseudo-terminal pair; the host opens port_name like a COM port
+    def __init__(self):
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_name = os.ttyname(self.slave_fd)
+
+    def read(self, size=4096):
+        try:
+            return os.read(self.master_fd, size)
+        except OSError:
+            return b""
+
+    def host_baud(self):
+        # Output speed the host set on its end of the pty (pyserial's baudrate)
+        try:
+            speed = termios.tcgetattr(self.slave_fd)[5]
+        except termios.error:
+            return None
+        return TERMIOS_RATES.get(speed)
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.master_fd, view)
+            view = view[written:]
+
+    def close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class EmulatedSerial:
+    # The firmware's view of the link: Serial.print/println/available/read/readStringUntil
+    def __init__(self, link, clock, baud=115200, link_error_rate=None, seed=0):
+        self.link = link
+        self.clock = clock
+        self.baud = baud
+        self.link_error_rate = link_error_rate
+        self.rng = random.Random(seed)
+        self.bytes_sent = 0
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+        self._closed = False
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self):
+        while True:
+            data = self.link.read()
+            with self._cond:
+                if not data:
+                    self._closed = True
+                    self._cond.notify_all()
+                    return
+                if not self._rate_matches():
+                    data = garble(data, self.rng)
+                self._rx.extend(data)
+                self._cond.notify_all()
+
+    def _rate_matches(self):
+        host_baud = getattr(self.link, 'host_baud', lambda: None)()
+        return host_baud is None or host_baud == self.baud
+
+    def update_baud_rate(self, baud):
+        self.baud = baud
+
+    def print(self, value=""):
+        data = str(value).encode('utf-8')
+        if not self._rate_matches():
+            data = garble(data, self.rng)
+        elif self.link_error_rate:
+            data = garble(data, self.rng, self.link_error_rate(self.baud))
+        try:
+            self.link.write(data)
+        except OSError:
+            raise LinkClosed()
+        self.bytes_sent += len(data)
+        self.clock.sleep(len(data) * 10.0 / self.baud)  # 8N1 on the wire
+
+    def println(self, value=""):
+        self.print(f"{value}\r\n")
+
+    def available(self):
+        with self._cond:
+            return len(self._rx)
+
+    def flush_input(self):
+        with self._cond:
+            self._rx.clear()
+
+    def wait_available(self, timeout=None):
+        # while (Serial.available() == 0) { }
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._rx:
+                if self._closed:
+                    raise LinkClosed()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.clock.sync()
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.5)
+        self.clock.sync()
+        return True
+
+    def read_char(self):
+        self.wait_available()
+        with self._cond:
+            c = chr(self._rx[0])
+            del self._rx[0]
+            return c
+
+    def read_string_until(self, terminator='\n'):
+        # Returns what arrived before the terminator or the 1 s stream timeout
+        term = ord(terminator)
+        deadline = time.monotonic() + STRING_TIMEOUT_S
+        with self._cond:
+            while term not in self._rx:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+            end = self._rx.find(term)
+            if end == -1:
+                data = bytes(self._rx)
+                self._rx.clear()
+            else:
+                data = bytes(self._rx[:end])
+                del self._rx[:end + 1]
+        self.clock.sync()
+        return data.decode('utf-8', errors='ignore')
+
+
+def default_load(rcal_ohm=100000.0, open_fraction=0.0, short_fraction=0.0):
+    # Rcal resistor on the calibration position, a Randles cell per electrode on the COB.
+    # Parameters vary deterministically per (group, X, Y); a fraction of electrodes can be
+    # made open (1 GOhm) or shorted (10 Ohm).
+    def load(group, x, y, adg849):
+        if not adg849:
+            return resistor(rcal_ohm)
+        h = zlib.crc32(f"{group},{x},{y}".encode()) / 0xFFFFFFFF
+        if h < open_fraction:
+            return resistor(1e9)
+        if h > 1.0 - short_fraction:
+            return resistor(10.0)
+        return randles(rs=150.0 + 100.0 * h, rct=20000.0 + 60000.0 * h, cdl=(1.0 + 4.0 * h) * 1e-9)
+    return load
+
+
+class FirmwareEmulator:
+    def __init__(self, link, chip=None, load=None, time_scale=None, baud=115200,
+                 board_id="E5D4C3B2A1F0", boot_banner=True, link_error_rate=None, temperature=25.0):
+        # temperature: die temperature in degrees C, or a function of the board time (see warming())
+        self.clock = chip.clock if chip else VirtualClock(time_scale)
+        self.chip = chip or AD5933Emulator(clock=self.clock, temperature=temperature)
+        self.ad5933 = AD5933Driver(self.chip)
+        self.serial = EmulatedSerial(link, self.clock, baud, link_error_rate)
+        self.load = load or default_load()
+        self.board_id = board_id
+        self.boot_banner = boot_banner
+
+        # Initial Values (same as the sketch)
+        self.start_freq = 50000
+        self.frequency_unit = 1000
+        self.num_increments = 20
+        self.ref_resist = 100000
+        self.gain = []
+        self.phase = []
+
+        # Pin state
+        self.x_address = 0
+        self.y_address = 0
+        self.group = 1
+        self.adg849 = False
+
+        self.scan_order = 0
+        self.repeat_count = 1
+        self.settling_bands = [(0, 0)]   # (first point, cycles) per band
+        self.auto_range = False
+        self.excitation_range = 1
+        self.pga_gain = 1
+        self.base_range_step = find_step(1, 1)
+        self.range_calibrations = {}     # step -> (gain, phase), None when the step is unusable
+        self.sweeps = 0
+        self.last_acquire_ms = 0         # printStageTiming() inputs of the last framed sweep
+        self.last_print_ms = 0
+        self.last_ack_ms = 0
+        self.remeasure_requested = False
+        self.stop_requested = False
+        self.thread = None
+
+    # --- Pins ---
+    def _apply_load(self):
+        self.chip.impedance = self.load(self.group, self.x_address, self.y_address, self.adg849)
+
+    def set_adg849(self, high):
+        self.adg849 = high
+        self._apply_load()
+
+    def set_coordinate_address(self, x, y):
+        self.x_address, self.y_address = x, y
+        self._apply_load()
+
+    def delay(self, ms):
+        self.clock.sleep(ms / 1000.0)
+
+    # --- Main program ---
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.setup()
+            while True:
+                self.mode_select()
+        except LinkClosed:
+            pass
+
+    def setup(self):
+        s = self.serial
+        if self.boot_banner:
+            s.println("ESP-ROM:esp32s3-20210327")
+        self.delay(2000)
+        s.println("AD5933 Test Start")
+        s.println(f"[INFO] Board ID: {self.board_id}")
+        s.println(f"[INFO] Baud rates: {','.join(map(str, BAUD_RATES))}")
+        a = self.ad5933
+        if not (a.reset() and a.setInternalClock(True) and a.setStartFrequency(self.start_freq) and
+                a.setIncrementFrequency(self.frequency_unit) and
+                a.setNumberIncrements(self.num_increments) and a.setPGAGain(1)):
+            s.println("FAILED in initialization!")
+            raise LinkClosed()
+        self.set_adg849(False)
+        self.initial_calibration()
+
+    # On the board the tail of a prompt is still in the UART TX buffer when flushSerialBuffer()
+    # runs, so the host cannot answer before the flush. The pty write is instant, so flush first.
+    def prompt(self, text, flush=True):
+        if flush:
+            self.serial.flush_input()
+        self.serial.print(text)
+        self.delay(10)
+        self.serial.wait_available()
+        return self.serial.read_string_until('\n')
+
+    def prompt_char(self, text):
+        self.serial.flush_input()
+        self.serial.print(text)
+        self.serial.wait_available()
+        c = self.serial.read_char()
+        self.serial.flush_input()
+        return c
+
+    def mode_select(self):
+        s = self.serial
+        answer = self.prompt(
+            "Set AD5933 Mode (0: Calibration, 1: COB Impedance Measurement, 2: Rcal Impedance Measurement, "
+            "3: Diagonal Sweep, 4: COB Range Sweep, 5: Range Step Sweep, 6: Coordinate List Sweep, 7: Settling Auto-Tune, 8: Multi-Group Scan, "
+            "9: Electrode Screening, 10: Kinetics): ").strip()
+        if answer.startswith("BAUD "):
+            self.negotiate_baud(to_int(answer[5:]))
+            return
+        choice = to_int(answer)
+        if choice == 0:
+            s.println("Starting Calibration.")
+            self.set_adg849(False)
+            self.initial_calibration()
+        elif choice == 1:
+            s.println("Checking impedance of COB.")
+            self.set_adg849(True)
+            self.set_mux_group()
+            self.get_address_input()
+            self.frequency_sweep_raw()
+        elif choice == 2:
+            s.println("Checking impedance at Rcal position.")
+            self.set_adg849(False)
+            self.frequency_sweep_raw()
+        elif choice == 3:
+            s.println("Starting Diagonal Sweep.")
+            self.set_adg849(True)
+            self.set_mux_group()
+            self.diagonal_sweep_pattern()
+        elif choice == 4:
+            s.println("Starting COB Range Sweep (7-bit input method).")
+            self.set_adg849(True)
+            self.set_mux_group()
+            self.sweep_cob_range()
+        elif choice == 5:
+            s.println("Starting COB Range Step Sweep (X/Y increment setting).")
+            self.set_adg849(True)
+            self.set_mux_group()
+            self.sweep_cob_range_with_steps()
+        elif choice == 6:
+            s.println("Starting COB Coordinate List Sweep (host-supplied list).")
+            self.set_adg849(True)
+            self.set_mux_group()
+            self.sweep_cob_coordinate_list()
+        elif choice == 7:
+            s.println("Starting Settling Auto-Tune.")
+            self.set_adg849(False)
+            self.settling_auto_tune()
+        elif choice == 8:
+            s.println("Starting Multi-Group Scan (host-scheduled segments).")
+            self.set_adg849(True)
+            self.sweep_multi_group()
+        elif choice == 9:
+            s.println("Starting Electrode Screening (open/short check).")
+            self.set_adg849(True)
+            self.screen_electrodes()
+        elif choice == 10:
+            s.println("Starting Kinetics (time series of selected electrodes).")
+            self.set_adg849(True)
+            self.set_mux_group()
+            self.kinetics_loop()
+        else:
+            s.println("Invalid input. Please enter 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, or 10.")
+
+    def negotiate_baud(self, rate):
+        # negotiateBaud(); the waits on the host are real time
+        s = self.serial
+        if rate not in BAUD_RATES:
+            s.println("[ERROR] Unsupported baud rate.")
+            return
+        s.println(f"[INFO] Baud switch: {rate}")
+        s.update_baud_rate(rate)
+        time.sleep(BAUD_SWITCH_DELAY_S)
+        for seq in range(PROBE_FRAMES):
+            s.println(probe_frame(seq))
+        s.println(f"PROBE_END {PROBE_FRAMES}")
+        link_ok = False
+        if s.wait_available(timeout=BAUD_LINK_TIMEOUT_S):
+            link_ok = check_link_reply(s.read_string_until('\n'), PROBE_FRAMES)
+        if not link_ok:
+            time.sleep(FALLBACK_DELAY_S)
+            s.update_baud_rate(BASE_RATE)
+            time.sleep(BAUD_SWITCH_DELAY_S)
+            rate = BASE_RATE
+        self.clock.sync()
+        s.println(f"[INFO] Baud rate set: {rate}")
+
+    # --- Calibration ---
+    def initial_calibration(self):
+        s = self.serial
+        self.show_sweep_menu()
+        self.range_calibrations = {}
+        if self.select_calibration_source() == 1:
+            cached = self.load_cached_calibration()
+            if cached:
+                self.gain, self.phase = cached
+                return
+        s.println("[INFO] Performing calibration.")
+        self.print_die_temperature("[INFO] Calibration temperature: ", " C")
+        ok, self.gain, self.phase, real, imag = self.calibrate_segments()
+        if ok:
+            s.println("[INFO] Calibration complete!")
+            self.print_calibration_points(real, imag, self.phase)
+        else:
+            s.println("[ERROR] Calibration failed...")
+
+    def print_calibration_points(self, real, imag, phase):
+        s = self.serial
+        s.println(SEPARATOR)
+        for i in range(self.num_increments + 1):
+            magnitude = math.sqrt(real[i] ** 2 + imag[i] ** 2)
+            s.println(f"Cal Point {i}: R={real[i]} / I={imag[i]}\t |Z|={arduino_float(magnitude)}"
+                      f"\t System Phase={arduino_float(phase[i])} degrees")
+        s.println(SEPARATOR)
+
+    def select_calibration_source(self):
+        while True:
+            source = to_int(self.prompt("Select calibration source (0: Measure, 1: Load from host): "))
+            if source in (0, 1):
+                return source
+            self.serial.println("[ERROR] Invalid input. Please enter 0 or 1.")
+
+    def load_cached_calibration(self, step=None):
+        # Returns (gain, phase) or None; for a range step an empty answer means "measure it"
+        s = self.serial
+        n = self.num_increments + 1
+        if step is None:
+            command = self.prompt(f"Send cached calibration ({n} points): ").strip()
+        else:
+            command = self.prompt(f"Send cached calibration ({n} points, {self.range_step_text(step)}; "
+                                  "empty to measure): ").strip()
+            if not command:
+                return None
+        if not command.startswith("CAL "):
+            s.println("[ERROR] Invalid cached calibration. Performing calibration instead.")
+            return None
+        pairs = [p for p in command[4:].split(';') if p]
+        if len(pairs) < n or any(',' not in p for p in pairs[:n]):
+            s.println("[ERROR] Cached calibration has too few points. Performing calibration instead.")
+            return None
+        gain = [float(p.split(',')[0]) for p in pairs[:n]]
+        phase = [float(p.split(',')[1]) for p in pairs[:n]]
+        s.println(f"[INFO] Cached calibration loaded: {n} points")
+        return gain, phase
+
+    def show_sweep_menu(self):
+        s = self.serial
+        a = self.ad5933
+        while True:
+            value = to_int(self.prompt("Enter the start frequency (1~100 kHz): "))
+            if 1 <= value <= 100:
+                self.start_freq = value * 1000
+                s.println(f"[INFO] Set start frequency: {self.start_freq} Hz")
+                break
+            s.println("[ERROR] Invalid input. Please enter a value between 1 and 100 kHz.")
+        while True:
+            value = to_int(self.prompt("Enter the frequency increment (1~10000 Hz): "))
+            if 1 <= value <= 10000:
+                self.frequency_unit = value
+                s.println(f"[INFO] Set frequency increment: {value} Hz")
+                break
+            s.println("[ERROR] Invalid input. Please enter a value between 1 and 10000 Hz.")
+        while True:
+            value = to_int(self.prompt("Enter the number of measurements (1~100): "))
+            if 1 <= value <= 100:
+                self.num_increments = value
+                s.println(f"[INFO] Set number of measurements: {value} times")
+                break
+            s.println("[ERROR] Invalid input. Please enter a value between 1 and 100.")
+        while True:
+            text = self.prompt("Enter Settling Time Cycles (0~511, or S freq:cycles,... per band): ").strip()
+            if text.startswith("S "):
+                bands = self.parse_settling_profile(text)
+                if bands:
+                    self.settling_bands = bands
+                    self.print_settling_profile()
+                    break
+                s.println("[ERROR] Invalid settling profile. Use S freq:cycles,... with cycles 0~511.")
+                continue
+            value = to_int(text)
+            if 0 <= value <= 511:
+                self.set_uniform_settling(value)
+                s.println(f"[INFO] Set Settling Time Cycles: {value}")
+                break
+            s.println("[ERROR] Invalid input. Please enter a value between 0 and 511.")
+        ranges = {1: (CTRL_OUTPUT_RANGE_1, "2 Vpp"), 2: (CTRL_OUTPUT_RANGE_2, "1 Vpp"),
+                  3: (CTRL_OUTPUT_RANGE_3, "0.4 Vpp"), 4: (CTRL_OUTPUT_RANGE_4, "0.2 Vpp")}
+        while True:
+            value = to_int(self.prompt(
+                "Select Output Excitation Range (1: 2 Vpp, 2: 1 Vpp, 3: 0.4 Vpp, 4: 0.2 Vpp): "))
+            if value in ranges:
+                a.setRange(ranges[value][0])
+                s.println(f"[INFO] Set to {ranges[value][1]} (Range {value}).")
+                self.excitation_range = value
+                break
+            s.println("[ERROR] Invalid input. Please select one from 1-4.")
+        while True:
+            value = to_int(self.prompt("Select PGA Gain (1 or 5): "))
+            if value in (1, 5):
+                a.setPGAGain(value)
+                self.pga_gain = value
+                s.println(f"[INFO] PGA Gain set to: x{value}")
+                break
+            s.println("[ERROR] Invalid input. Please enter 1 or 5.")
+        self.base_range_step = find_step(self.excitation_range, self.pga_gain)
+        while True:
+            value = to_int(self.prompt("Select auto-ranging (0: Off, 1: On): "))
+            if value in (0, 1):
+                self.auto_range = value == 1
+                s.println(f"[INFO] Auto-ranging: {'On' if self.auto_range else 'Off'}")
+                break
+            s.println("[ERROR] Invalid input. Please enter 0 or 1.")
+        while True:
+            value = to_int(self.prompt("Enter Calibration Impedance (in Ohms, positive integer): "))
+            if value > 0:
+                self.ref_resist = value
+                s.println(f"[INFO] Set Calibration Impedance: {value} ohm")
+                break
+            s.println("[ERROR] Invalid input. Please enter a valid Calibration Impedance value.")
+        if not (a.setStartFrequency(self.start_freq) and a.setIncrementFrequency(self.frequency_unit) and
+                a.setNumberIncrements(self.num_increments)):
+            s.println("[ERROR] Failed to set frequency sweep.")
+        else:
+            s.println("[INFO] Frequency sweep settings complete.")
+
+    # --- Settling bands ---
+    def set_uniform_settling(self, cycles):
+        self.settling_bands = [(0, cycles)]
+        self.ad5933.setSettlingCycles(cycles)
+
+    def parse_settling_profile(self, command):
+        # parseSettlingProfile(): list of (first point, cycles), None on error
+        bands = []
+        for entry in command[2:].split(','):
+            if ':' not in entry:
+                return None
+            freq, cycles = to_int(entry.split(':')[0]), to_int(entry.split(':')[1])
+            if not 0 <= cycles <= 511:
+                return None
+            point = 0
+            if freq > self.start_freq:
+                point = (freq - self.start_freq + self.frequency_unit - 1) // self.frequency_unit
+            if point > self.num_increments:
+                break
+            if not bands:
+                point = 0
+            elif point < bands[-1][0]:
+                return None
+            if bands and point == bands[-1][0]:
+                bands[-1] = (point, cycles)
+            elif len(bands) >= MAX_SETTLING_BANDS:
+                return None
+            else:
+                bands.append((point, cycles))
+        return bands or None
+
+    def print_settling_profile(self):
+        entries = [f"{self.start_freq + first * self.frequency_unit} Hz:{cycles}" for first, cycles in self.settling_bands]
+        self.serial.println(f"[INFO] Settling profile: {', '.join(entries)} cycles")
+
+    def band_last_point(self, band):
+        if band + 1 < len(self.settling_bands):
+            return self.settling_bands[band + 1][0] - 1
+        return self.num_increments
+
+    def program_points(self, first, last, cycles):
+        a = self.ad5933
+        return (a.setStartFrequency(self.start_freq + first * self.frequency_unit) and
+                a.setNumberIncrements(last - first) and a.setSettlingCycles(cycles))
+
+    def program_segment(self, band):
+        first, cycles = self.settling_bands[band]
+        return self.program_points(first, self.band_last_point(band), cycles)
+
+    def start_sweep_points(self, first, last, cycles):
+        a = self.ad5933
+        return (self.program_points(first, last, cycles) and a.setPowerMode(CTRL_STANDBY_MODE) and
+                a.setControlMode(CTRL_INIT_START_FREQ) and a.setControlMode(CTRL_START_FREQ_SWEEP))
+
+    def start_sweep_segment(self, band):
+        first, cycles = self.settling_bands[band]
+        return self.start_sweep_points(first, self.band_last_point(band), cycles)
+
+    def calibrate_segments(self):
+        gain, phase, real, imag = [], [], [], []
+        for band in range(len(self.settling_bands)):
+            count = self.band_last_point(band) - self.settling_bands[band][0] + 1
+            if not self.program_segment(band):
+                return False, gain, phase, real, imag
+            ok, g, p, r, i = self.ad5933.calibrate(self.ref_resist, count)
+            if not ok:
+                return False, gain, phase, real, imag
+            gain += g
+            phase += p
+            real += r
+            imag += i
+        return True, gain, phase, real, imag
+
+    def settling_auto_tune(self):
+        s = self.serial
+        saved = list(self.settling_bands)
+        s.println(f"[INFO] Settling auto-tune: {len(SETTLING_CANDIDATES)} candidates")
+        for cycles in SETTLING_CANDIDATES:
+            self.settling_bands = [(0, cycles)]
+            s.println(f"Settling_Cycles->{cycles}")
+            self.frequency_sweep_raw()
+        s.println("[INFO] Settling auto-tune complete.")
+        self.settling_bands = saved
+        while True:
+            text = self.prompt("Send settling profile (S freq:cycles,..., 0~511, or empty to keep): ").strip()
+            if not text:
+                s.println("[INFO] Settling profile unchanged.")
+                return
+            if text.startswith("S "):
+                bands = self.parse_settling_profile(text)
+                if bands:
+                    self.settling_bands = bands
+                    self.print_settling_profile()
+                    return
+            elif text[0].isdigit() and to_int(text) <= 511:
+                self.set_uniform_settling(to_int(text))
+                s.println(f"[INFO] Set Settling Time Cycles: {to_int(text)}")
+                return
+            s.println("[ERROR] Invalid settling profile. Use S freq:cycles,... with cycles 0~511.")
+
+    # --- Addressing ---
+    def set_mux_group(self):
+        s = self.serial
+        while True:
+            group = to_int(self.prompt("Select MUX group (1, 2, 3, 4): "))
+            if 1 <= group <= 4:
+                s.println(f"[INFO] Group {group} selected")
+                break
+            s.println("[ERROR] Invalid input. Please enter a value between 1 and 4.")
+        self.apply_mux_group(group)
+
+    def apply_mux_group(self, group):
+        self.group = group
+        self._apply_load()
+        self.serial.println("[INFO] MUX switches have been set.")
+
+    def get_address_input(self):
+        s = self.serial
+        addresses = []
+        for axis in ("X", "Y"):
+            s.println(f"Instructions: Enter {axis}-axis Address (7 digits, each bit as 0 or 1):")
+            bits = ""
+            for i in range(7):
+                while True:
+                    s.print(f"{axis} Axis Address {i} (0 or 1): ")
+                    self.serial.wait_available()
+                    c = self.serial.read_char()
+                    self.serial.flush_input()
+                    if c in "01":
+                        bits += c
+                        break
+                    s.println("[ERROR] Invalid input. Enter 0 or 1.")
+                    self.serial.flush_input()
+            addresses.append(bits)
+        self.set_coordinate_address(int(addresses[0], 2), int(addresses[1], 2))
+        s.println(f"[INFO] Set X-axis Address : {addresses[0]}, Y-axis Address : {addresses[1]}")
+
+    def read_single_address(self, instructions):
+        s = self.serial
+        s.println(instructions)
+        bits = ""
+        for i in range(7):
+            while True:
+                c = self.prompt_char(f"  Bit {i} (0 or 1): ")
+                if c in "01":
+                    bits += c
+                    break
+                s.println("  [ERROR] Invalid input. Please enter 0 or 1.")
+        s.println(f"[INFO] Address entered: {bits}")
+        return int(bits, 2)
+
+    def confirm(self):
+        c = self.prompt_char("Is this range correct? (Y/N): ")
+        self.serial.println(c)
+        return c in "Yy"
+
+    def read_axis_range(self, axis):
+        start = self.read_single_address(f"Instructions: Enter {axis}-axis start address (7-bit binary):")
+        end = self.read_single_address(f"Instructions: Enter {axis}-axis end address (7-bit binary):")
+        return start, end
+
+    def read_step(self, axis):
+        while True:
+            self.serial.flush_input()
+            self.serial.print(f"Enter {axis}-axis increment unit (1~127): ")
+            self.serial.wait_available()
+            step = to_int(self.serial.read_string_until('\n'))
+            if 1 <= step <= 127:
+                return step
+            self.serial.println("[ERROR] Invalid input. Please enter a value between 1 and 127.")
+
+    # --- Sweeps ---
+    def diagonal_sweep_pattern(self):
+        s = self.serial
+        for forward in (True, False):
+            s.println(f"[INFO] Starting {'forward' if forward else 'reverse'} diagonal sweep...")
+            for k in range(7):
+                address = 1 << (6 - (k if forward else 6 - k))
+                self.set_coordinate_address(address, address)
+                self.delay(DIAGONAL_SETTLE_MS)
+                self.sweep_coordinate_with_ack(address, address, 1, DIAGONAL_SETTLE_MS)
+        s.println("[INFO] Diagonal sweep complete.")
+
+    def sweep_cob_range(self):
+        s = self.serial
+        s.println("[INFO] Starting COB range sweep (fixed step size of 1)...")
+        for axis in ("X", "Y"):
+            while True:
+                start, end = self.read_axis_range(axis)
+                if start > end:
+                    s.println(f"[ERROR] {axis}-axis start address is greater than end address. Please re-enter.")
+                    continue
+                s.println(f"[INFO] Entered {axis}-axis range: Start = {to_binary_string(start)}, "
+                          f"End = {to_binary_string(end)}")
+                if self.confirm():
+                    break
+                s.println(f"[INFO] Re-entering {axis}-axis range.")
+            if axis == "X":
+                x_start, x_end = start, end
+            else:
+                y_start, y_end = start, end
+        coords = [(x, y) for x in range(x_start, x_end + 1) for y in range(y_start, y_end + 1)]
+        self.select_scan_order()
+        self.run_coordinate_list(order_coordinates(coords, SCAN_ORDERS[self.scan_order]))
+        s.println("[INFO] COB range sweep complete.")
+
+    def sweep_cob_range_with_steps(self):
+        s = self.serial
+        s.println("[INFO] Starting COB range sweep (step increment mode, boundaries included)...")
+        while True:
+            x_start, x_end = self.read_axis_range("X")
+            if x_start > x_end:
+                s.println("[ERROR] X-axis start address is greater than end address. Please re-enter.")
+                continue
+            s.println(f"[INFO] Entered X-axis range: Start = {to_binary_string(x_start)}, End = {to_binary_string(x_end)}")
+            x_step = self.read_step("X")
+            s.println()
+            y_start, y_end = self.read_axis_range("Y")
+            if y_start > y_end:
+                s.println("[ERROR] Y-axis start address is greater than end address. Please re-enter.")
+                continue
+            s.println(f"[INFO] Entered Y-axis range: Start = {to_binary_string(y_start)}, End = {to_binary_string(y_end)}")
+            y_step = self.read_step("Y")
+            s.println(SEPARATOR_SHORT)
+            s.println(f"X-axis range: Start={to_binary_string(x_start)}, End={to_binary_string(x_end)}, Increment={x_step}")
+            s.println(f"Y-axis range: Start={to_binary_string(y_start)}, End={to_binary_string(y_end)}, Increment={y_step}")
+            s.println(SEPARATOR_SHORT)
+            if self.confirm():
+                break
+            s.println("[INFO] Re-entering range.")
+        coords = [(x, y) for x in _stepped(x_start, x_end, x_step) for y in _stepped(y_start, y_end, y_step)]
+        self.select_scan_order()
+        self.run_coordinate_list(order_coordinates(coords, SCAN_ORDERS[self.scan_order]))
+        s.println("[INFO] COB range step sweep complete.")
+
+    def sweep_cob_coordinate_list(self):
+        s = self.serial
+        s.println("[INFO] Starting COB coordinate list sweep...")
+        command, coords = self.prompt_coordinate_list()
+        if command.startswith("M"):
+            self.select_scan_order()
+            coords = order_coordinates(coords, SCAN_ORDERS[self.scan_order])
+        self.run_coordinate_list(coords)
+        s.println("[INFO] COB coordinate list sweep complete.")
+
+    def prompt_coordinate_list(self):
+        # promptCoordinateList(): (command, coordinates)
+        s = self.serial
+        while True:
+            command = self.prompt(
+                "Enter coordinate list (L x,y;x,y;... or M xStart,yStart,width,height,hexmask): ").strip()
+            coords = parse_coordinate_command(command)
+            if coords:
+                break
+            s.println("[ERROR] Invalid coordinate list. Please re-enter.")
+        s.println(f"[INFO] Coordinate list received: {len(coords)} points")
+        return command, coords
+
+    def kinetics_loop(self):
+        # kineticsLoop(): Mode 10, the listed coordinates once per period until the cycle count or STOP
+        s = self.serial
+        s.println("[INFO] Starting kinetics...")
+        _, coords = self.prompt_coordinate_list()
+        if len(coords) > MAX_KINETICS_COORDS:
+            s.println(f"[WARNING] Kinetics keeps the first {MAX_KINETICS_COORDS} coordinates.")
+            coords = coords[:MAX_KINETICS_COORDS]
+        period_ms = self.read_kinetics_number("Enter kinetics cycle period in seconds (0: back to back): ",
+                                              MAX_KINETICS_PERIOD_S) * 1000
+        cycles = self.read_kinetics_number("Enter kinetics cycles (0: until STOP): ", MAX_KINETICS_CYCLES)
+        s.println(f"[INFO] Kinetics: {len(coords)} electrodes, period {period_ms // 1000} s, "
+                  + (f"{cycles} cycles" if cycles > 0 else "until STOP"))
+        self.stop_requested = False
+        start = self.clock.millis()
+        done = 0
+        prev = None
+        while (cycles == 0 or done < cycles) and not self.stop_requested:
+            cycle_start = self.clock.millis()
+            s.println(f"Kinetics_Cycle->{done + 1}")
+            for coord in coords:
+                if self.stop_requested:
+                    break
+                toggled = toggled_lines(prev, coord)
+                settle_ms = 0
+                if toggled:
+                    self.set_coordinate_address(*coord)
+                    settle_ms = settle_delay_ms(toggled)
+                    self.delay(settle_ms)
+                s.println(f"Kinetics_Time->{self.clock.millis() - start}")
+                self.sweep_coordinate_with_ack(*coord, 1, settle_ms)
+                prev = coord
+            done += 1
+            # Virtual time: wait in 10 ms steps so the clock moves on
+            while (not self.stop_requested and (cycles == 0 or done < cycles)
+                   and self.clock.millis() - cycle_start < period_ms):
+                if s.available() and "STOP" in s.read_string_until('\n'):
+                    self.stop_requested = True
+                self.delay(10)
+        s.println(f"[INFO] Kinetics complete: {done} cycles in {self.clock.millis() - start} ms")
+
+    def read_kinetics_number(self, text, max_value):
+        while True:
+            answer = self.prompt(text).strip()
+            value = to_int(answer)
+            if answer and 0 <= value <= max_value:
+                return value
+            self.serial.println(f"[ERROR] Invalid input. Please enter a value between 0 and {max_value}.")
+
+    def sweep_multi_group(self):
+        # sweepMultiGroup(): one "G group,order L|M ..." segment per prompt, empty line to finish
+        s = self.serial
+        s.println("[INFO] Starting multi-group scan...")
+        self.select_repeat_count()
+        segments, total = self.run_group_segments(screening=False)
+        s.println(f"[INFO] Multi-group scan complete: {segments} segments, {total} points")
+
+    def screen_electrodes(self):
+        # screenElectrodes(): Mode 9, the Mode 8 segments at two sweep points per coordinate
+        s = self.serial
+        s.println("[INFO] Starting electrode screening...")
+        start = self.clock.millis()
+        segments, total = self.run_group_segments(screening=True)
+        s.println(f"[INFO] Electrode screening complete: {segments} segments, {total} points in "
+                  f"{self.clock.millis() - start} ms")
+
+    def run_group_segments(self, screening):
+        # runGroupSegments(): returns (segments, coordinates)
+        s = self.serial
+        segments = total = 0
+        while True:
+            command = self.prompt("Enter group segment (G group,order L ... or M ...; empty to finish): ").strip()
+            if not command:
+                break
+            coords = None
+            if len(command) > 6 and command[:2] == "G " and command[3] == "," and command[5] == " ":
+                group, order = ord(command[2]) - ord("0"), ord(command[4]) - ord("0")
+                if 1 <= group <= 4 and 0 <= order <= 3:
+                    coords = parse_coordinate_command(command[6:])
+            if not coords:
+                s.println("[ERROR] Invalid group segment. Please re-enter.")
+                continue
+            s.println(f"[INFO] Group {group} selected")
+            self.apply_mux_group(group)
+            if command[6] == "M":
+                self.scan_order = order
+                coords = order_coordinates(coords, SCAN_ORDERS[order])
+                s.println(f"[INFO] Group segment: {len(coords)} points, {SCAN_ORDERS[order]}")
+            else:
+                s.println(f"[INFO] Group segment: {len(coords)} points, as sent")
+            if screening:
+                self.screen_coordinate_list(coords)
+            else:
+                self.visit_coordinate_list(coords)
+            segments += 1
+            total += len(coords)
+        return segments, total
+
+    def screen_coordinate_list(self, coords):
+        s = self.serial
+        s.println(f"[INFO] Scan points: {len(coords)}")
+        points = [0, self.num_increments] if self.num_increments > 0 else [0]
+        real, imag = [0] * (self.num_increments + 1), [0] * (self.num_increments + 1)
+        waits, reads = [], []
+        prev = None
+        for coord in coords:
+            toggled = toggled_lines(prev, coord)
+            self.set_coordinate_address(*coord)
+            self.delay(settle_delay_ms(toggled))
+            for p in points:
+                step = self.screen_point(p, real, imag, waits, reads)
+                if step is None:
+                    s.println("[ERROR] Could not get raw frequency data...")
+                    continue
+                gain, phase = self.range_step_calibration(step)
+                cfreq = (self.start_freq + p * self.frequency_unit) / 1000.0
+                s.println(f"Screen->X={to_binary_string(coord[0])},Y={to_binary_string(coord[1])} "
+                          + self.format_measurement(cfreq, real[p], imag[p], p, gain, phase))
+            prev = coord
+        if not self.ad5933.setPowerMode(CTRL_STANDBY_MODE):
+            s.println("[ERROR] Could not set to standby...")
+
+    def screen_point(self, point, real, imag, waits, reads):
+        # screenPoint(): the step the point was measured at, None on error
+        step = self.base_range_step
+        if not self.measure_range_segment(step, point, point, real, imag, waits, reads):
+            return None
+        for _ in range(len(RANGE_STEPS) if self.auto_range else 0):
+            target = self.target_range_step(step, real[point], imag[point])
+            if target == step:
+                break
+            if not self.ensure_range_calibration(target):
+                continue
+            if not self.measure_range_segment(target, point, point, real, imag, waits, reads):
+                break
+            step = target
+        if step != self.base_range_step:
+            self.apply_range_step(self.base_range_step)
+        return step
+
+    def select_scan_order(self):
+        while True:
+            choice = to_int(self.prompt("Select scan order (0: Raster, 1: Serpentine, 2: Gray-code, 3: Hilbert): "))
+            if 0 <= choice <= 3:
+                self.scan_order = choice
+                break
+            self.serial.println("[ERROR] Invalid input. Please enter a value between 0 and 3.")
+        self.serial.println(f"[INFO] Scan order: {SCAN_ORDERS[self.scan_order]}")
+
+    def select_repeat_count(self):
+        while True:
+            repeats = to_int(self.prompt("Enter repeats per coordinate (1~32): "))
+            if 1 <= repeats <= MAX_REPEATS:
+                self.repeat_count = repeats
+                break
+            self.serial.println("[ERROR] Invalid input. Please enter a value between 1 and 32.")
+        self.serial.println(f"[INFO] Repeats per coordinate: {self.repeat_count}")
+
+    def run_coordinate_list(self, coords):
+        self.select_repeat_count()
+        self.visit_coordinate_list(coords)
+
+    def visit_coordinate_list(self, coords):
+        self.serial.println(f"[INFO] Scan points: {len(coords)}")
+        prev = None
+        for coord in coords:
+            toggled = toggled_lines(prev, coord)
+            self.set_coordinate_address(*coord)
+            settle_ms = settle_delay_ms(toggled)
+            self.delay(settle_ms)
+            self.sweep_coordinate_with_ack(*coord, self.repeat_count, settle_ms)
+            prev = coord
+
+    def sweep_coordinate_with_ack(self, x, y, repeats, settle_ms):
+        s = self.serial
+        s.println(f"Current_Coord->X={to_binary_string(x)},Y={to_binary_string(y)}")
+        for r in range(1, repeats + 1):
+            if repeats > 1:
+                s.println(f"Repeat_Index->{r}/{repeats}")
+            s.println("SWEEP_START")
+            self.print_die_temperature("Temperature->", "")
+            self.frequency_sweep_raw()
+            s.println("SWEEP_DONE")
+            stored = self.wait_for_store_ok()
+            ack_ms = self.last_ack_ms
+            if not stored:
+                if self.remeasure_requested:
+                    s.println("[INFO] Re-measuring at host request.")
+                else:
+                    s.println("[ERROR] Data save failed. Retrying measurement.")
+                s.println("SWEEP_START")
+                self.print_die_temperature("Temperature->", "")
+                self.frequency_sweep_raw()
+                s.println("SWEEP_DONE")
+                if not self.wait_for_store_ok():
+                    s.println("[ERROR] Retried data save failed. Moving to the next coordinate.")
+                ack_ms += self.last_ack_ms
+            s.println(f"[INFO] Stage timing: settle {settle_ms if r == 1 else 0} ms, acquire {self.last_acquire_ms} ms, "
+                      f"print {self.last_print_ms} ms, ack {ack_ms} ms")
+
+    def print_die_temperature(self, prefix, suffix):
+        ok, temperature = self.ad5933.readTemperature()
+        self.serial.println(f"{prefix}{temperature:.2f}{suffix}" if ok else f"{prefix}N/A")
+
+    def wait_for_store_ok(self):
+        # Real-time timeout: the host runs at wall-clock speed whatever the time scale
+        start = time.monotonic()
+        deadline = start + ACK_TIMEOUT_S
+        stored = False
+        self.remeasure_requested = False
+        while time.monotonic() < deadline:
+            if not self.serial.wait_available(timeout=deadline - time.monotonic()):
+                break
+            ack_line = self.serial.read_string_until('\n')
+            if "STORE_OK" in ack_line:
+                stored = True
+                break
+            if "REMEASURE" in ack_line:
+                self.remeasure_requested = True
+                break
+            if "STOP" in ack_line:
+                self.stop_requested = True
+        self.last_ack_ms = int((time.monotonic() - start) * 1000)
+        return stored
+
+    def frequency_sweep_raw(self):
+        s = self.serial
+        a = self.ad5933
+        cfreq = self.start_freq / 1000.0
+        if not self.start_sweep_segment(0):
+            s.println("[ERROR] Could not initialize frequency sweep...")
+            return
+        s.println(SEPARATOR)
+        n = self.num_increments + 1
+        real, imag = [0] * n, [0] * n
+        count = 0
+        sweep_start = self.clock.millis()
+        waits, reads = [], []
+        for band in range(len(self.settling_bands)):
+            if band > 0 and not self.start_sweep_segment(band):
+                s.println("[ERROR] Could not initialize frequency sweep...")
+                break
+            count = self.acquire_points(count, self.band_last_point(band), real, imag, waits, reads)
+        step_of = [self.base_range_step] * count
+        if self.auto_range:
+            self.auto_range_sweep(real, imag, step_of, count, waits, reads)
+        print_start = self.clock.millis()
+        self.last_acquire_ms = print_start - sweep_start
+        for i in range(count):
+            gain, phase = self.range_step_calibration(step_of[i])
+            s.println(self.format_measurement(cfreq, real[i], imag[i], i, gain, phase))
+            cfreq += self.frequency_unit / 1000.0
+        self.last_print_ms = self.clock.millis() - print_start
+        s.println("Frequency sweep complete!")
+        if waits:
+            points = len(waits)
+            total_ms = self.clock.millis() - sweep_start
+            rate = points * 1000.0 / total_ms if total_ms else 0.0
+            s.println(f"[INFO] Sweep timing: {points} points in {total_ms} ms ({arduino_float(rate)} points/s), "
+                      f"wait avg {sum(waits) // points} us max {max(waits)} us, "
+                      f"read avg {sum(reads) // points} us max {max(reads)} us")
+        s.println(SEPARATOR)
+        if not a.setPowerMode(CTRL_STANDBY_MODE):
+            s.println("[ERROR] Could not set to standby...")
+        self.sweeps += 1
+
+    def acquire_points(self, i, last_point, real, imag, waits, reads):
+        # acquirePoints(): returns the next point
+        s = self.serial
+        a = self.ad5933
+        while i <= last_point and (a.readStatusRegister() & STATUS_SWEEP_DONE) != STATUS_SWEEP_DONE:
+            ok, real[i], imag[i] = a.getComplexData()
+            if not ok:
+                s.println("[ERROR] Could not get raw frequency data...")
+                real[i], imag[i] = 0, 0
+            waits.append(a.lastWaitMicros)
+            reads.append(a.lastReadMicros)
+            i += 1
+            a.setControlMode(CTRL_INCREMENT_FREQ)
+        return i
+
+    # --- Auto-ranging ---
+    def range_step_text(self, step):
+        return f"Range {RANGE_STEPS[step][0]}, PGA x{RANGE_STEPS[step][1]}"
+
+    def apply_range_step(self, step):
+        output_range, pga = RANGE_STEPS[step]
+        return self.ad5933.setRange(OUTPUT_RANGES[output_range]) and self.ad5933.setPGAGain(pga)
+
+    def range_step_calibration(self, step):
+        if step == self.base_range_step:
+            return self.gain, self.phase
+        return self.range_calibrations[step]
+
+    def ensure_range_calibration(self, step):
+        s = self.serial
+        if step == self.base_range_step:
+            return True
+        if step in self.range_calibrations:
+            return self.range_calibrations[step] is not None
+        self.range_calibrations[step] = None
+        s.println(f"[INFO] Range calibration: {self.range_step_text(step)}")
+        calibration = self.load_cached_calibration(step)
+        if calibration is None:
+            adg849 = self.adg849
+            self.set_adg849(False)
+            s.println("[INFO] Performing calibration.")
+            self.print_die_temperature("[INFO] Calibration temperature: ", " C")
+            ok = self.apply_range_step(step)
+            if ok:
+                ok, gain, phase, real, imag = self.calibrate_segments()
+            if ok:
+                s.println("[INFO] Calibration complete!")
+                self.print_calibration_points(real, imag, phase)
+                calibration = (gain, phase)
+            else:
+                s.println("[ERROR] Calibration failed...")
+            self.set_adg849(adg849)
+            if calibration is None:
+                return False
+        for g in calibration[0]:
+            magnitude = 1.0 / (self.ref_resist * g) if g else math.inf
+            if not RAW_MIN_MAGNITUDE <= magnitude <= RAW_MAX_MAGNITUDE:
+                s.println(f"[WARNING] Rcal is outside the raw window at {self.range_step_text(step)}. "
+                          "Step not used for auto-ranging.")
+                return False
+        self.range_calibrations[step] = calibration
+        return True
+
+    def target_range_step(self, step, real, imag):
+        magnitude = raw_magnitude(real, imag)
+        too_high = magnitude > RAW_MAX_MAGNITUDE
+        if not too_high and magnitude >= RAW_MIN_MAGNITUDE:
+            return step
+        per_level = max(magnitude, 1.0) / step_level(step)
+        fallback = step
+        for s in range(len(RANGE_STEPS) - 1, -1, -1):
+            if (step_level(s) >= step_level(step)) if too_high else (step_level(s) <= step_level(step)):
+                continue
+            if s != self.base_range_step and s in self.range_calibrations and self.range_calibrations[s] is None:
+                continue
+            if per_level * step_level(s) <= RAW_TARGET_MAGNITUDE:
+                return s
+            fallback = s
+        return fallback
+
+    def measure_range_segment(self, step, first, last, real, imag, waits, reads):
+        if not self.apply_range_step(step):
+            return False
+        for band in range(len(self.settling_bands)):
+            lo = max(first, self.settling_bands[band][0])
+            hi = min(last, self.band_last_point(band))
+            if lo > hi:
+                continue
+            if not self.start_sweep_points(lo, hi, self.settling_bands[band][1]):
+                return False
+            if self.acquire_points(lo, hi, real, imag, waits, reads) <= hi:
+                return False
+        return True
+
+    def auto_range_sweep(self, real, imag, step_of, count, waits, reads):
+        s = self.serial
+        for _ in range(len(RANGE_STEPS)):
+            changed = False
+            i = 0
+            while i < count:
+                target = self.target_range_step(step_of[i], real[i], imag[i])
+                last = i
+                while (last + 1 < count and step_of[last + 1] == step_of[i] and
+                       self.target_range_step(step_of[last + 1], real[last + 1], imag[last + 1]) == target):
+                    last += 1
+                if target != step_of[i]:
+                    changed = True
+                    if (self.ensure_range_calibration(target) and
+                            self.measure_range_segment(target, i, last, real, imag, waits, reads)):
+                        step_of[i:last + 1] = [target] * (last - i + 1)
+                        s.println(f"[INFO] Auto-range: {self.start_freq + i * self.frequency_unit}-"
+                                  f"{self.start_freq + last * self.frequency_unit} Hz ({last - i + 1} points) "
+                                  f"at {self.range_step_text(target)}")
+                i = last + 1
+            if not changed:
+                break
+        self.apply_range_step(self.base_range_step)
+        outside = sum(1 for k in range(count)
+                      if not RAW_MIN_MAGNITUDE <= raw_magnitude(real[k], imag[k]) <= RAW_MAX_MAGNITUDE)
+        if outside:
+            s.println(f"[WARNING] Auto-range: {outside} points still outside the raw window.")
+
+    def format_measurement(self, cfreq, real, imag, i, gains, phases):
+        gain = gains[min(i, len(gains) - 1)] if gains else 0.0
+        magnitude = math.sqrt(real ** 2 + imag ** 2)
+        impedance = 1.0 / (magnitude * gain) if magnitude * gain else math.inf
+        raw_phase = math.degrees(math.atan2(imag, real))
+        if raw_phase < 0:
+            raw_phase += 360.0
+        corrected = raw_phase - (phases[min(i, len(phases) - 1)] if phases else 0.0)
+        if corrected < -180.0:
+            corrected += 360.0
+        elif corrected >= 180.0:
+            corrected -= 360.0
+        if math.isinf(impedance):
+            r_real = x_imag = math.inf
+        else:
+            r_real = impedance * math.cos(math.radians(corrected))
+            x_imag = impedance * math.sin(math.radians(corrected))
+        return (f"{arduino_float(cfreq)}kHz: R={real}/I={imag}\t  |Z|={arduino_float(impedance)}"
+                f"\t  Phase={arduino_float(corrected)} degrees\t Resistance={arduino_float(r_real)}"
+                f"\t Reactance={arduino_float(x_imag)}")
+
+
+def _stepped(start, end, step):
+    # Mode 5 axis values: start, start + step, ..., clamped to and including end
+    values = []
+    value = start
+    while True:
+        value = min(value, end)
+        values.append(value)
+        if value == end:
+            return values
+        value += step
+
+
+def parse_coordinate_command(command):
+    # Python port of parseCoordinateCommand(); returns [] on error
+    if len(command) < 3 or command[1] != ' ':
+        return []
+    kind, body = command[0], command[2:]
+    coords = []
+    try:
+        if kind == 'L':
+            for entry in body.rstrip(';').split(';'):
+                x, y = (int(v) for v in entry.split(','))
+                if not (0 <= x <= 127 and 0 <= y <= 127):
+                    return []
+                coords.append((x, y))
+        elif kind == 'M':
+            fields = body.split(',')
+            x_start, y_start, width, height = (int(v) for v in fields[:4])
+            if x_start < 0 or y_start < 0 or width < 1 or height < 1 or x_start + width > 128 or y_start + height > 128:
+                return []
+            bits = bin(int(fields[4], 16))[2:].zfill(len(fields[4]) * 4)
+            for k in range(width * height):
+                if bits[k] == '1':
+                    coords.append((x_start + k // height, y_start + k % height))
+    except (ValueError, IndexError):
+        return []
+    return coords
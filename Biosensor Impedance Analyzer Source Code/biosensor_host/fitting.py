@@ -0,0 +1,355 @@
+import argparse
+import csv
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from biosensor_host.parsing import complex_impedance
+
+# ------------------------
+# Equivalent-circuit fitting (complex nonlinear least squares)
+# ------------------------
+# Fits every coordinate's spectrum to a Randles (Rs + Rct || Cdl) or R-CPE
+# (Rs + Rct || CPE, Z_cpe = 1 / (Q (jw)^n)) model with Levenberg-Marquardt and
+# analytic Jacobians. Residuals are (Z_model - Z) / |Z| on the real and imaginary parts
+# (modulus weighting). Rct and the capacitance are fitted as log values so they stay
+# positive; Rs (>= 0) and n (within N_BOUNDS) are fitted as is, since a log Rs that runs
+# toward zero loses its gradient and drags the warm starts of its neighbours with it. Spectra are fitted in serpentine raster order, each one started
+# from its already fitted neighbour, in chunks spread over a process pool.
+
+MODELS = {
+    'randles': ['Rs', 'Rct', 'Cdl'],
+    'r_cpe': ['Rs', 'Rct', 'Q', 'n'],
+}
+PARAMETER_UNITS = {'Rs': 'Ohm', 'Rct': 'Ohm', 'Cdl': 'F', 'Q': 'S s^n', 'n': ''}
+
+N_BOUNDS = (0.3, 1.0)
+LOG_BOUNDS = (-40.0, 40.0)   # log parameters; Rs is clipped at zero only
+MAX_ITERATIONS = 100
+RETRY_RMSE = 0.05         # a warm start worse than this is retried from the initial guess
+MIN_POINTS = 5
+
+
+def model_impedance(model, params, freqs):
+    z, _ = _model_jacobian(model, _to_theta(model, params), np.asarray(freqs, dtype=np.float64))
+    return z
+
+
+def _to_theta(model, params):
+    params = np.asarray(params, dtype=np.float64)
+    theta = np.log(np.maximum(params, 1e-300))
+    theta[0] = params[0]
+    if model == 'r_cpe':
+        theta[3] = params[3]
+    return theta
+
+
+def _from_theta(model, theta):
+    params = np.exp(theta)
+    params[0] = theta[0]
+    if model == 'r_cpe':
+        params[3] = theta[3]
+    return params
+
+
+def _model_jacobian(model, theta, freqs):
+    # Z(f) and dZ/dtheta (parameters x points); d/dlog(p) = p * d/dp
+    w = 2 * np.pi * freqs
+    rs = theta[0]
+    if model == 'randles':
+        rct, cdl = np.exp(theta[1:])
+        d = 1.0 + 1j * w * rct * cdl
+        z = rs + rct / d
+        jac = np.array([
+            np.ones(len(w), dtype=np.complex128),
+            rct / (d * d),
+            -1j * w * rct * rct * cdl / (d * d),
+        ])
+        return z, jac
+    rct, q = np.exp(theta[1:3])
+    n = theta[3]
+    log_jw = np.log(w) + 0.5j * np.pi
+    y = q * np.exp(n * log_jw)          # Q (jw)^n
+    d = 1.0 + rct * y
+    z = rs + rct / d
+    jac = np.array([
+        np.ones(len(w), dtype=np.complex128),
+        rct / (d * d),
+        -rct * rct * y / (d * d),
+        -rct * rct * y * log_jw / (d * d),
+    ])
+    return z, jac
+
+
+def _at_bound(model, theta, g):
+    # Parameters held at a bound because the descent direction (-g) points out of it
+    held = np.zeros(len(theta), dtype=bool)
+    held[0] = theta[0] <= 0.0 and g[0] > 0
+    if model == 'r_cpe':
+        held[3] = (theta[3] <= N_BOUNDS[0] and g[3] > 0) or (theta[3] >= N_BOUNDS[1] and g[3] < 0)
+    return held
+
+
+def _clip_theta(model, theta):
+    theta = theta.copy()
+    theta[0] = max(theta[0], 0.0)
+    theta[1:] = np.clip(theta[1:], *LOG_BOUNDS)
+    if model == 'r_cpe':
+        theta[3] = min(max(theta[3], N_BOUNDS[0]), N_BOUNDS[1])
+    return theta
+
+
+def initial_guess(model, freqs, z):
+    # Rs from the high-frequency end, Rct from the low-frequency end, the capacitance
+    # from the -Im(Z) peak (w_peak = 1 / (Rct Cdl))
+    order = np.argsort(freqs)
+    freqs, z = freqs[order], z[order]
+    scale = np.max(np.abs(z))
+    rs = max(z.real[-1], 1e-3 * scale)
+    rct = max(z.real[0] - rs, 0.1 * rs, 1e-3 * scale)
+    peak = int(np.argmax(-z.imag))
+    cdl = 1.0 / (2 * np.pi * freqs[peak] * rct)
+    if model == 'randles':
+        return np.array([rs, rct, cdl])
+    return np.array([rs, rct, cdl, 0.9])
+
+
+def fit_spectrum(model, freqs, z, p0=None, max_iterations=MAX_ITERATIONS):
+    # (params, relative RMS residual, iterations, converged)
+    freqs = np.asarray(freqs, dtype=np.float64)
+    z = np.asarray(z, dtype=np.complex128)
+    weight = 1.0 / np.abs(z)
+    theta = _clip_theta(model, _to_theta(model, initial_guess(model, freqs, z) if p0 is None else p0))
+
+    def evaluate(theta):
+        z_model, jac = _model_jacobian(model, theta, freqs)
+        r = (z_model - z) * weight
+        return np.concatenate([r.real, r.imag]), jac * weight
+
+    residual, jac_c = evaluate(theta)
+    cost = residual @ residual
+    lam = 1e-3
+    converged = False
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        jac = np.concatenate([jac_c.real, jac_c.imag], axis=1).T
+        a = jac.T @ jac
+        g = jac.T @ residual
+        free = ~_at_bound(model, theta, g)
+        a_free = a[np.ix_(free, free)]
+        accepted = False
+        while lam <= 1e12:
+            step = np.zeros(len(theta))
+            try:
+                step[free] = np.linalg.solve(a_free + lam * np.diag(np.diag(a_free) + 1e-12), -g[free])
+            except np.linalg.LinAlgError:
+                lam *= 4.0
+                continue
+            trial = _clip_theta(model, theta + step)
+            trial_residual, trial_jac = evaluate(trial)
+            trial_cost = trial_residual @ trial_residual
+            if np.isfinite(trial_cost) and trial_cost <= cost:
+                accepted = True
+                break
+            lam *= 4.0
+        if not accepted:
+            converged = True   # no step lowers the cost any more
+            break
+        improvement = cost - trial_cost
+        theta, residual, jac_c, cost = trial, trial_residual, trial_jac, trial_cost
+        lam = max(lam / 3.0, 1e-9)
+        if improvement <= 1e-10 * max(cost, 1e-30) or np.max(np.abs(step)) < 1e-8:
+            converged = True
+            break
+    rmse = math.sqrt(cost / len(freqs))
+    return _from_theta(model, theta), rmse, iteration, converged
+
+
+# ------------------------
+# Spectra from the columnar store and batched fitting
+# ------------------------
+def spectra_from_columns(columns):
+    # [(group, x, y, freqs, z)] per coordinate, group by group in serpentine raster order;
+    # repeated sweeps of a coordinate are averaged, ovf (NaN) points dropped. Stores
+    # written before the group column existed come back as group 0.
+    groups = columns['group'] if 'group' in columns else np.zeros(len(columns['sweep']), dtype=np.int8)
+    by_coord = {}
+    for sweep in np.unique(columns['sweep']):
+        mask = columns['sweep'] == sweep
+        coord = (int(groups[mask][0]), int(columns['x'][mask][0]), int(columns['y'][mask][0]))
+        freqs = columns['freq'][mask].astype(np.float64)
+        z = complex_impedance(columns['resistance'][mask], columns['reactance'][mask])
+        valid = np.isfinite(z) & ~np.isnan(columns['impedance'][mask])
+        by_coord.setdefault(coord, []).append((freqs[valid], z[valid]))
+    rows = sorted({y for _, _, y in by_coord})
+    row_rank = {y: k for k, y in enumerate(rows)}
+    order = sorted(by_coord, key=lambda c: (c[0], row_rank[c[2]], c[1] if row_rank[c[2]] % 2 == 0 else -c[1]))
+    spectra = []
+    for coord in order:
+        sweeps = by_coord[coord]
+        freqs = sweeps[0][0]
+        same = [z for f, z in sweeps if len(f) == len(freqs) and np.array_equal(f, freqs)]
+        z = np.mean(same, axis=0)
+        if len(freqs) >= MIN_POINTS:
+            spectra.append((*coord, freqs, z))
+    return spectra
+
+
+def _fit_chunk(args):
+    # Fits consecutive (neighbouring) spectra, each warm-started from the previous fit
+    model, spectra, warm_start = args
+    results = []
+    previous = None
+    for group, x, y, freqs, z in spectra:
+        params, rmse, iterations, converged = fit_spectrum(model, freqs, z, previous)
+        if previous is not None and (not converged or rmse > RETRY_RMSE):
+            retry = fit_spectrum(model, freqs, z)
+            iterations += retry[2]
+            if retry[1] < rmse:
+                params, rmse, _, converged = retry
+        results.append((group, x, y, params, rmse, iterations, converged))
+        if warm_start and converged and rmse <= RETRY_RMSE:
+            previous = params
+    return results
+
+
+def fit_spectra(spectra, model='r_cpe', workers=None, warm_start=True, chunk_size=None):
+    # Result dicts (group, x, y, parameters, rmse, iterations, converged) in the order of spectra.
+    # workers=1 fits in this process; otherwise chunks of neighbouring spectra go to a pool.
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}' (expected one of {', '.join(MODELS)})")
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(16, math.ceil(len(spectra) / (4 * workers)))
+    chunks = [(model, spectra[k:k + chunk_size], warm_start) for k in range(0, len(spectra), chunk_size)]
+    if workers == 1 or len(chunks) == 1:
+        fitted = [result for chunk in chunks for result in _fit_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fitted = [result for chunk_results in pool.map(_fit_chunk, chunks) for result in chunk_results]
+    results = []
+    for group, x, y, params, rmse, iterations, converged in fitted:
+        result = {'group': group, 'x': x, 'y': y}
+        result.update({name: float(value) for name, value in zip(MODELS[model], params)})
+        result.update({'rmse': rmse, 'iterations': iterations, 'converged': bool(converged)})
+        results.append(result)
+    return results
+
+
+# ------------------------
+# Export and spatial maps
+# ------------------------
+def fit_headers(model):
+    return ['group', 'x', 'y'] + MODELS[model] + ['rmse', 'iterations', 'converged']
+
+
+def write_fit_csv(path, results, model):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(fit_headers(model))
+        for result in results:
+            writer.writerow([result[name] for name in fit_headers(model)])
+
+
+def read_fit_csv(path):
+    # (model, results) as written by write_fit_csv()
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    names = [name for name in (rows[0] if rows else {}) if name in PARAMETER_UNITS]
+    model = next((m for m, params in MODELS.items() if params == names), None)
+    results = []
+    for row in rows:
+        result = {'group': int(row.get('group') or 0), 'x': int(row['x']), 'y': int(row['y'])}
+        result.update({name: float(row[name]) for name in names + ['rmse']})
+        result['iterations'] = int(row['iterations'])
+        result['converged'] = row['converged'] == 'True'
+        results.append(result)
+    return model, results
+
+
+def parameter_maps(results, names):
+    # (xs, ys, {name: 2D array [y, x]}) with NaN where a coordinate was not measured
+    xs = sorted({r['x'] for r in results})
+    ys = sorted({r['y'] for r in results})
+    col = {x: k for k, x in enumerate(xs)}
+    row = {y: k for k, y in enumerate(ys)}
+    maps = {}
+    for name in names:
+        grid = np.full((len(ys), len(xs)), np.nan)
+        for r in results:
+            grid[row[r['y']], col[r['x']]] = r[name]
+        maps[name] = grid
+    return xs, ys, maps
+
+
+def parameter_map_figure(results, model, title=""):
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+
+    # One row of maps per MUX group
+    names = MODELS[model] + ['rmse']
+    groups = sorted({r.get('group', 0) for r in results})
+    fig, axs = plt.subplots(len(groups), len(names), figsize=(4 * len(names), 4 * len(groups)), squeeze=False)
+    for group, row_axs in zip(groups, axs):
+        xs, ys, maps = parameter_maps([r for r in results if r.get('group', 0) == group], names)
+        for ax, name in zip(row_axs, names):
+            grid = maps[name]
+            positive = name != 'n' and np.nanmin(grid) > 0
+            image = ax.pcolormesh(xs, ys, grid, shading='nearest', norm=LogNorm() if positive else None)
+            fig.colorbar(image, ax=ax)
+            unit = PARAMETER_UNITS.get(name, '')
+            ax.set_title(f"{name} ({unit})" if unit else ('relative RMSE' if name == 'rmse' else name))
+            ax.set_xlabel('X')
+            ax.set_ylabel(f"Group {group}: Y" if group else 'Y')
+            ax.set_aspect('equal')
+    fig.suptitle(title or f"{model} fit, {len(results)} coordinates")
+    fig.tight_layout()
+    return fig
+
+
+def plot_parameter_maps(results, model, title=""):
+    import matplotlib.pyplot as plt
+
+    parameter_map_figure(results, model, title)
+    plt.show()
+
+
+def summarize(results):
+    rmse = np.array([r['rmse'] for r in results])
+    failed = sum(1 for r in results if not r['converged'] or r['rmse'] > RETRY_RMSE)
+    return (f"{len(results)} spectra, median RMSE {np.median(rmse) * 100:.2f}%, "
+            f"max {np.max(rmse) * 100:.2f}%, {failed} not converged or above {RETRY_RMSE * 100:.0f}%")
+
+
+def main():
+    from biosensor_host.columnar_store import load_columns
+
+    parser = argparse.ArgumentParser(description="Fit an equivalent circuit to every coordinate of a sweep store.")
+    parser.add_argument('store', help=".npz written by biosensor_host.columnar_store")
+    parser.add_argument('--model', choices=sorted(MODELS), default='r_cpe')
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('--csv', default=None, help="output CSV (default: <store>_fit_<model>.csv)")
+    parser.add_argument('--plot', action='store_true', help="show the parameter maps")
+    args = parser.parse_args()
+
+    spectra = spectra_from_columns(load_columns(args.store))
+    if not spectra:
+        print(f"[ERROR] No spectra with at least {MIN_POINTS} valid points in '{args.store}'.")
+        return 1
+    t0 = time.perf_counter()
+    results = fit_spectra(spectra, args.model, args.workers)
+    elapsed = time.perf_counter() - t0
+    csv_path = args.csv or f"{os.path.splitext(args.store)[0]}_fit_{args.model}.csv"
+    write_fit_csv(csv_path, results, args.model)
+    print(f"[INFO] Fitted {summarize(results)} in {elapsed:.2f} s.")
+    print(f"[INFO] Fit parameters written to '{csv_path}'.")
+    if args.plot:
+        plot_parameter_maps(results, args.model)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,249 @@
+import numpy as np
+
+from biosensor_host.parsing import complex_impedance, coord_label, measurement_row_values, row_group
+
+# ------------------------
+# Nyquist / Bode views with level-of-detail decimation
+# ------------------------
+# Up to LINE_LIMIT coordinates are drawn as individual spectra with a legend. Beyond that
+# every view is decimated: a density image (2D histogram of all points, recomputed for the
+# visible range on zoom / pan) plus, on the Bode axes, the min/max envelope and mean per
+# frequency bin. The Nyquist view shows the mean spectrum over the density image.
+
+LINE_LIMIT = 10       # coordinates drawn as individual spectra
+FREQ_BINS = 256       # frequency bins of the Bode envelope (distinct frequencies if fewer)
+DENSITY_BINS = 200    # histogram bins per axis of the density image
+
+
+def point_arrays(rows):
+    # Measurement rows (Excel layout) -> (coordinate labels, coordinate index, freq, Z) per point
+    values = np.array([measurement_row_values(row) for row in rows], dtype=np.float64).reshape(-1, 7)
+    labels, coord = np.unique([coord_label(row[6], row[7], row_group(row)) for row in rows], return_inverse=True)
+    return _valid_points(labels, coord, values[:, 0], values[:, 3], values[:, 5], values[:, 6])
+
+
+def point_arrays_from_columns(columns):
+    # Same from the typed columns of biosensor_host.columnar_store
+    groups = columns['group'] if 'group' in columns else np.zeros(len(columns['x']))
+    keys = np.stack([groups, columns['x'], columns['y']], axis=1).astype(np.int32)
+    unique, coord = np.unique(keys, axis=0, return_inverse=True)
+    labels = np.array([coord_label(f"{x:07b}", f"{y:07b}", g) if x >= 0 else coord_label("N/A", "N/A", g)
+                       for g, x, y in unique])
+    coord = coord.reshape(-1)
+    return _valid_points(labels, coord, columns['freq'].astype(np.float64), columns['impedance'],
+                         columns['resistance'], columns['reactance'])
+
+
+def _valid_points(labels, coord, freqs, impedance, resistance, reactance):
+    # ovf points come through as NaN
+    z = complex_impedance(resistance, reactance)
+    valid = ~np.isnan(impedance) & np.isfinite(z) & (freqs > 0)
+    return labels, coord[valid], freqs[valid], z[valid]
+
+
+def frequency_envelope(freqs, values, max_bins=FREQ_BINS):
+    # (bin frequency, min, mean, max) per distinct frequency, or per log-spaced bin when
+    # there are more than max_bins distinct frequencies
+    distinct = np.unique(freqs)
+    if len(distinct) <= max_bins:
+        centers = distinct
+        index = np.searchsorted(distinct, freqs)
+    else:
+        edges = np.geomspace(distinct[0], distinct[-1], max_bins + 1)
+        centers = np.sqrt(edges[:-1] * edges[1:])
+        index = np.clip(np.searchsorted(edges, freqs, side='right') - 1, 0, max_bins - 1)
+    counts = np.bincount(index, minlength=len(centers))
+    lo = np.full(len(centers), np.inf)
+    hi = np.full(len(centers), -np.inf)
+    np.minimum.at(lo, index, values)
+    np.maximum.at(hi, index, values)
+    used = counts > 0
+    mean = np.bincount(index, weights=values, minlength=len(centers))[used] / counts[used]
+    return centers[used], lo[used], mean, hi[used]
+
+
+def bin_index(values, value_range, bins):
+    # Regular-grid bin of each value, -1 / bins outside; np.histogram2d bins with
+    # searchsorted and is several times slower on a million points
+    lo, hi = value_range
+    index = np.floor((values - lo) * (bins / (hi - lo))).astype(np.intp)
+    index[values == hi] = bins - 1
+    return index
+
+
+def column_edges(columns):
+    # Bin edges halfway between sorted column positions (half a step beyond the ends)
+    if len(columns) == 1:
+        return np.array([columns[0] - 0.5, columns[0] + 0.5])
+    middle = (columns[1:] + columns[:-1]) / 2.0
+    return np.concatenate([[2 * columns[0] - middle[0]], middle, [2 * columns[-1] - middle[-1]]])
+
+
+class DensityImage:
+    # 2D histogram of (x, y) as a pcolormesh; log axes are binned in log space. Recomputed
+    # for the visible range whenever the axis limits change, so zooming adds detail. With
+    # columns=True every distinct x (a sweep frequency) gets its own column of bins.
+    def __init__(self, ax, x, y, log_x=False, log_y=False, bins=DENSITY_BINS, columns=False, cmap='viridis'):
+        from matplotlib.colors import LogNorm
+
+        self.ax = ax
+        self.log_x, self.log_y = log_x, log_y
+        self.u = np.log10(x) if log_x else np.asarray(x)
+        self.v = np.log10(y) if log_y else np.asarray(y)
+        self.bins = bins
+        self.u_columns = None
+        if columns:
+            distinct, self.u_columns = np.unique(self.u, return_inverse=True)
+            self.u_edges = column_edges(distinct)
+        self.cmap = cmap
+        self.norm = LogNorm()
+        self.mesh = None
+        self.limits = None
+        self.draw(self._range(self.u), self._range(self.v))
+        ax.callbacks.connect('xlim_changed', self._on_limits)
+        ax.callbacks.connect('ylim_changed', self._on_limits)
+
+    @staticmethod
+    def _range(values):
+        lo, hi = float(np.min(values)), float(np.max(values))
+        return (lo, hi) if hi > lo else (lo - 0.5, hi + 0.5)
+
+    def _to_axis(self, edges, log):
+        return 10.0 ** edges if log else edges
+
+    def _from_axis(self, limits, log):
+        limits = sorted(limits)
+        if log:
+            if limits[0] <= 0:
+                return None
+            return tuple(np.log10(limits))
+        return tuple(limits)
+
+    def draw(self, u_range, v_range):
+        if self.u_columns is None:
+            iu = bin_index(self.u, u_range, self.bins)
+            u_edges = np.linspace(*u_range, self.bins + 1)
+        else:
+            iu = self.u_columns
+            u_edges = self.u_edges
+        nu = len(u_edges) - 1
+        iv = bin_index(self.v, v_range, self.bins)
+        inside = (iu >= 0) & (iu < nu) & (iv >= 0) & (iv < self.bins)
+        counts = np.bincount(iv[inside] * nu + iu[inside], minlength=nu * self.bins).reshape(self.bins, nu)
+        counts = np.ma.masked_equal(counts, 0)
+        if counts.count():
+            self.norm.vmin, self.norm.vmax = 1, max(counts.max(), 2)
+        x_edges = self._to_axis(u_edges, self.log_x)
+        y_edges = self._to_axis(np.linspace(*v_range, self.bins + 1), self.log_y)
+        options = dict(cmap=self.cmap, norm=self.norm, zorder=0, rasterized=True)
+        if self.mesh is None:
+            self.mesh = self.ax.pcolormesh(x_edges, y_edges, counts, **options)
+        else:
+            # A redraw covers the view, not the data: added without touching the autoscale
+            # limits, which would pull the view back out while zooming
+            from matplotlib.collections import QuadMesh
+
+            self.mesh.remove()
+            self.mesh = QuadMesh(np.stack(np.meshgrid(x_edges, y_edges), axis=-1), **options)
+            self.mesh.set_array(counts)
+            self.ax.add_collection(self.mesh, autolim=False)
+        self.limits = (u_range, v_range)
+
+    def _on_limits(self, ax):
+        u_range = self._from_axis(ax.get_xlim(), self.log_x)
+        v_range = self._from_axis(ax.get_ylim(), self.log_y)
+        if u_range is None or v_range is None:
+            return
+        if self.limits is None or np.allclose((u_range, v_range), self.limits):
+            return
+        self.draw(u_range, v_range)
+
+
+def density_bins(points):
+    # Fewer, larger bins for small sweeps so the image doesn't break up into single points
+    return int(min(DENSITY_BINS, max(20, np.sqrt(points) / 2)))
+
+
+def _coordinate_lines(ax, labels, coord, freqs, x, y):
+    # One line per coordinate, in frequency order
+    for k, label in enumerate(labels):
+        mask = coord == k
+        order = np.argsort(freqs[mask])
+        ax.plot(x[mask][order], y[mask][order], marker='o', markersize=3, linewidth=1, label=label)
+
+
+def _legend_location(labels):
+    # 'best' scans every drawn point, which is what makes a dense figure slow
+    return 'best' if len(labels) <= LINE_LIMIT else 'upper right'
+
+
+def draw_nyquist(ax, labels, coord, freqs, z):
+    # -X vs R with equal scaling
+    resistance, neg_reactance = z.real, -z.imag
+    if len(labels) <= LINE_LIMIT:
+        _coordinate_lines(ax, labels, coord, freqs, resistance, neg_reactance)
+    else:
+        # Kept on the axes: the limit callbacks only hold a weak reference
+        ax.density = DensityImage(ax, resistance, neg_reactance, bins=density_bins(len(freqs)))
+        _, _, r_mean, _ = frequency_envelope(freqs, resistance)
+        _, _, x_mean, _ = frequency_envelope(freqs, neg_reactance)
+        ax.plot(r_mean, x_mean, color='tab:red', linewidth=1.5, label=f"mean of {len(labels)} coordinates")
+    ax.set_title('Nyquist')
+    ax.set_xlabel('R (Ohm)')
+    ax.set_ylabel('-X (Ohm)')
+    ax.set_aspect('equal', adjustable='datalim')
+    ax.grid(True)
+    ax.legend(fontsize='small', loc=_legend_location(labels))
+
+
+def draw_bode(ax_mag, ax_phase, labels, coord, freqs, z):
+    # |Z| and phase of Z over log frequency
+    magnitude = np.abs(z)
+    phase = np.degrees(np.angle(z))
+    ax_mag.set_yscale('log')
+    for ax, values, log_y in ((ax_mag, magnitude, True), (ax_phase, phase, False)):
+        ax.set_xscale('log')
+        if len(labels) <= LINE_LIMIT:
+            _coordinate_lines(ax, labels, coord, freqs, freqs, values)
+        else:
+            columns = len(np.unique(freqs)) <= FREQ_BINS
+            ax.density = DensityImage(ax, freqs, values, log_x=True, log_y=log_y,
+                                      bins=density_bins(len(freqs)), columns=columns)
+            centers, lo, mean, hi = frequency_envelope(freqs, values)
+            ax.fill_between(centers, lo, hi, color='tab:orange', alpha=0.25, label='min / max')
+            ax.plot(centers, mean, color='tab:red', linewidth=1.5, label=f"mean of {len(labels)} coordinates")
+        ax.grid(True)
+    ax_mag.set_title('Bode')
+    ax_mag.set_ylabel('|Z| (Ohm)')
+    ax_phase.set_ylabel('Phase of Z (Degrees)')
+    ax_phase.set_xlabel('Frequency (Hz)')
+    ax_mag.legend(fontsize='small', loc=_legend_location(labels))
+
+
+def impedance_figure(points, title=""):
+    # points: (labels, coord, freqs, z) from point_arrays(); returns the figure
+    import matplotlib.pyplot as plt
+
+    labels, coord, freqs, z = points
+    fig = plt.figure(figsize=(16, 8))
+    grid = fig.add_gridspec(2, 2, width_ratios=[1, 1.2])
+    ax_nyquist = fig.add_subplot(grid[:, 0])
+    ax_mag = fig.add_subplot(grid[0, 1])
+    ax_phase = fig.add_subplot(grid[1, 1], sharex=ax_mag)
+    draw_nyquist(ax_nyquist, labels, coord, freqs, z)
+    draw_bode(ax_mag, ax_phase, labels, coord, freqs, z)
+    fig.suptitle(f"{title} - {len(labels)} coordinates, {len(freqs)} points" if title
+                 else f"{len(labels)} coordinates, {len(freqs)} points")
+    fig.tight_layout()
+    return fig
+
+
+def plot_impedance(rows, title=""):
+    import matplotlib.pyplot as plt
+
+    points = point_arrays(rows)
+    if len(points[2]) == 0:
+        print("No data to plot.")
+        return
+    impedance_figure(points, title)
+    plt.show()
@@ -0,0 +1,214 @@
+import os
+import threading
+
+import numpy as np
+
+from biosensor_host.parsing import coord_label, measurement_row_values
+
+# ------------------------
+# Kinetics time series (Mode 10)
+# ------------------------
+# The firmware loops a few electrodes at a set cadence for as long as a binding experiment
+# runs. Instead of a block of workbook rows per sweep, every sweep goes to:
+#   KineticsBuffer   fixed-size ring buffer per electrode: the last `capacity` sweeps as
+#                    (time, |Z| per frequency, phase per frequency). Appending is O(1) and the
+#                    memory use does not grow with the run; the live plot reads from it and
+#                    it is saved as an .npz snapshot when the run ends.
+#   KineticsArchive  append-only CSV of every electrode averaged over bin_s seconds (phase as
+#                    a circular mean), one row per electrode and bin, written when a bin closes:
+#   Time (s), X, Y, Group, Samples, |Z| <freq> Hz ..., Phase <freq> Hz ...
+# Points read as ovf (|Z| NaN) are no sample: each frequency is averaged over its own valid
+# points and left empty when a bin has none (Samples counts the sweeps of the bin). The
+# ring buffer holds them as NaN, |Z| and phase alike.
+# Times are board time (Kinetics_Time->ms) since the start of the run, so a replay gives the
+# same series.
+
+DEFAULT_CAPACITY = 4096
+DEFAULT_BIN_S = 60.0
+
+
+def archive_headers(freqs):
+    return (['Time (s)', 'X', 'Y', 'Group', 'Samples'] + [f'|Z| {int(freq)} Hz' for freq in freqs]
+            + [f'Phase {int(freq)} Hz' for freq in freqs])
+
+
+def sweep_values(rows):
+    # (freqs, |Z|, phase) of one sweep's measurement rows
+    values = np.array([measurement_row_values(row) for row in rows], dtype=np.float64).reshape(-1, 7)
+    return values[:, 0], values[:, 3], values[:, 4]
+
+
+class KineticsBuffer:
+    def __init__(self, freqs, max_electrodes, capacity=DEFAULT_CAPACITY):
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.capacity = capacity
+        self.electrodes = []   # (group, x, y) in order of first appearance
+        self._index = {}
+        self.times = np.full((max_electrodes, capacity), np.nan)
+        self.impedance = np.full((max_electrodes, capacity, len(self.freqs)), np.nan, dtype=np.float32)
+        self.phase = np.full((max_electrodes, capacity, len(self.freqs)), np.nan, dtype=np.float32)
+        self.count = np.zeros(max_electrodes, dtype=np.int64)   # sweeps written per electrode
+        self.lock = threading.Lock()
+
+    def append(self, electrode, t, impedance, phase):
+        # False when the buffer has no slot left for a new electrode
+        e = self._index.get(electrode)
+        if e is None:
+            if len(self.electrodes) == len(self.count):
+                return False
+            e = self._index[electrode] = len(self.electrodes)
+            self.electrodes.append(electrode)
+        slot = self.count[e] % self.capacity
+        valid = ~np.isnan(np.asarray(impedance, dtype=np.float64))
+        with self.lock:
+            self.times[e, slot] = t
+            self.impedance[e, slot] = np.where(valid, impedance, np.nan)
+            self.phase[e, slot] = np.where(valid, phase, np.nan)
+            self.count[e] += 1
+        return True
+
+    def series(self, e):
+        # (times, |Z| (n, freqs), phase (n, freqs)) of electrode index e, oldest first
+        with self.lock:
+            n = int(min(self.count[e], self.capacity))
+            head = int(self.count[e] % self.capacity)
+            order = np.arange(n) if self.count[e] <= self.capacity else np.r_[head:self.capacity, 0:head]
+            return self.times[e, order], self.impedance[e, order].copy(), self.phase[e, order].copy()
+
+    def save(self, path):
+        # Snapshot of the buffer, each electrode's series in time order (NaN padded)
+        n = len(self.electrodes)
+        times = np.full((n, self.capacity), np.nan)
+        impedance = np.full((n, self.capacity, len(self.freqs)), np.nan, dtype=np.float32)
+        phase = np.full_like(impedance, np.nan)
+        for e in range(n):
+            t, z, p = self.series(e)
+            times[e, :len(t)], impedance[e, :len(t)], phase[e, :len(t)] = t, z, p
+        np.savez_compressed(path, electrodes=np.array(self.electrodes, dtype=np.int64).reshape(-1, 3),
+                            freqs=self.freqs, times=times, impedance=impedance, phase=phase,
+                            count=self.count[:n])
+
+
+def load_snapshot(path):
+    # {'electrodes', 'freqs', 'times', 'impedance', 'phase', 'count'} of a saved buffer
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+class KineticsArchive:
+    def __init__(self, path, freqs, bin_s=DEFAULT_BIN_S):
+        self.path = path
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.bin_s = bin_s
+        self.rows = 0
+        self._bins = {}        # electrode -> [bin, sweeps, valid points, sum |Z|, sum of unit phasors]
+        new = not os.path.exists(path)
+        self._file = open(path, 'a', encoding='utf-8', newline='')
+        if new:
+            self._file.write(",".join(archive_headers(self.freqs)) + "\n")
+            self._file.flush()
+
+    def add(self, electrode, t, impedance, phase):
+        b = int(t // self.bin_s)
+        acc = self._bins.get(electrode)
+        if acc is not None and acc[0] != b:
+            self._write(electrode, acc)
+            acc = None
+        if acc is None:
+            n = len(self.freqs)
+            acc = self._bins[electrode] = [b, 0, np.zeros(n, dtype=np.int64), np.zeros(n), np.zeros(n, dtype=complex)]
+        impedance = np.asarray(impedance, dtype=np.float64)
+        valid = ~np.isnan(impedance)
+        acc[1] += 1
+        acc[2] += valid
+        acc[3] += np.where(valid, impedance, 0.0)
+        acc[4] += np.where(valid, np.exp(1j * np.radians(phase)), 0.0)
+
+    def _write(self, electrode, acc):
+        b, samples, valid, z_sum, phasor_sum = acc
+        group, x, y = electrode
+        impedance = [z / n if n else None for z, n in zip(z_sum, valid)]
+        phase = [np.degrees(np.angle(p)) if n else None for p, n in zip(phasor_sum, valid)]
+        self._file.write(",".join([f"{(b + 0.5) * self.bin_s:.1f}", f"{x:07b}", f"{y:07b}",
+                                   str(group) if group else "N/A", str(samples)]
+                                  + ["" if v is None else f"{v:.2f}" for v in impedance + phase]) + "\n")
+        self._file.flush()
+        self.rows += 1
+
+    def close(self):
+        # Writes the bins still open
+        for electrode, acc in self._bins.items():
+            self._write(electrode, acc)
+        self._bins = {}
+        self._file.close()
+
+
+def plot_freq_index(freqs, freq=None):
+    # Index of the frequency closest to freq, the middle of the sweep by default
+    if freq is None:
+        return len(freqs) // 2
+    return int(np.argmin(np.abs(np.asarray(freqs) - freq)))
+
+
+def kinetics_figure(snapshot, title="", freq=None):
+    import matplotlib.pyplot as plt
+
+    # |Z| and phase over time of every electrode at one frequency
+    k = plot_freq_index(snapshot['freqs'], freq)
+    fig, (ax_z, ax_p) = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
+    for e, (group, x, y) in enumerate(snapshot['electrodes']):
+        times = snapshot['times'][e]
+        valid = ~np.isnan(times)
+        label = coord_label(f"{x:07b}", f"{y:07b}", int(group))
+        ax_z.plot(times[valid] / 60.0, snapshot['impedance'][e][valid, k], label=label)
+        ax_p.plot(times[valid] / 60.0, snapshot['phase'][e][valid, k], label=label)
+    ax_z.set_ylabel('|Z| (Ohms)')
+    ax_p.set_ylabel('Phase (Degrees)')
+    ax_p.set_xlabel('Time (min)')
+    for ax in (ax_z, ax_p):
+        ax.grid(True)
+    if len(snapshot['electrodes']) <= 10:
+        ax_z.legend()
+    fig.suptitle(f"{title or 'Kinetics'} ({int(snapshot['freqs'][k])} Hz)")
+    fig.tight_layout()
+    return fig
+
+
+class KineticsLivePlot:
+    # Interactive |Z| / phase over time: new lines for new electrodes, otherwise only the line
+    # data changes and the canvas redraws when idle
+    def __init__(self, buffer, title="", freq=None):
+        import matplotlib.pyplot as plt
+
+        self.plt = plt
+        self.buffer = buffer
+        self.k = plot_freq_index(buffer.freqs, freq)
+        plt.ion()
+        self.fig, (self.ax_z, self.ax_p) = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
+        self.ax_z.set_ylabel('|Z| (Ohms)')
+        self.ax_p.set_ylabel('Phase (Degrees)')
+        self.ax_p.set_xlabel('Time (min)')
+        for ax in (self.ax_z, self.ax_p):
+            ax.grid(True)
+        self.fig.suptitle(f"{title or 'Kinetics'} ({int(buffer.freqs[self.k])} Hz, close to stop)")
+        self.lines = []
+
+    def is_open(self):
+        return self.plt.fignum_exists(self.fig.number)
+
+    def update(self):
+        for e in range(len(self.buffer.electrodes)):
+            if e == len(self.lines):
+                group, x, y = self.buffer.electrodes[e]
+                label = coord_label(f"{x:07b}", f"{y:07b}", group)
+                self.lines.append((self.ax_z.plot([], [], label=label)[0], self.ax_p.plot([], [], label=label)[0]))
+                if len(self.lines) <= 10:
+                    self.ax_z.legend()
+            times, impedance, phase = self.buffer.series(e)
+            self.lines[e][0].set_data(times / 60.0, impedance[:, self.k])
+            self.lines[e][1].set_data(times / 60.0, phase[:, self.k])
+        for ax in (self.ax_z, self.ax_p):
+            ax.relim()
+            ax.autoscale_view()
+        self.fig.canvas.draw_idle()
+        self.plt.pause(0.001)
@@ -0,0 +1,131 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# ------------------------
+# Per-stage latency metrics
+# ------------------------
+# StageMetrics keeps one latency histogram per pipeline stage:
+#   host_read       waiting for the next line (board work + serial transfer)
+#   prompt_wait     waiting for the line after a prompt (the user's answer and the board's reply)
+#   host_parse      decoding and classifying a line, splitting measurement lines
+#   host_excel      writing rows to the workbook (a range sweep's block, or a single-sweep point)
+#   host_ack        sending STORE_OK
+#   board_*         reported by the firmware: MUX settle, acquisition (board_conversion /
+#                   board_i2c_read are the AD5933 wait and block read inside it), printing
+#                   the measurement lines, and the board's wait for STORE_OK
+# MetricsServer serves the histograms in the Prometheus text format
+# (http://127.0.0.1:<port>/metrics). summary() totals every stage of the window (e.g. one range
+# sweep) against its wall clock; host and board stages overlap (host_read is mostly board time).
+
+BUCKETS_S = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+             0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_NAME = "biosensor_stage_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class StageMetrics:
+    def __init__(self, buckets=BUCKETS_S):
+        self.buckets = buckets
+        self.histograms = {}    # stage -> Histogram since start
+        self.window = {}        # stage -> [count, total s, max s] since start_window()
+        self.window_start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+                self.window[stage] = [0, 0.0, 0.0]
+            histogram.observe(seconds)
+            window = self.window[stage]
+            window[0] += 1
+            window[1] += seconds
+            if seconds > window[2]:
+                window[2] = seconds
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = [f"# HELP {METRIC_NAME} Time spent per acquisition pipeline stage.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        with self.lock:
+            for stage in sorted(self.histograms):
+                histogram = self.histograms[stage]
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def start_window(self):
+        with self.lock:
+            for window in self.window.values():
+                window[:] = [0, 0.0, 0.0]
+            self.window_start = time.perf_counter()
+
+    def summary(self):
+        # Lines describing the stages since start_window() / the previous summary(), largest
+        # total first; starts a new window
+        with self.lock:
+            wall = time.perf_counter() - self.window_start
+            rows = sorted(((stage, *window) for stage, window in self.window.items() if window[0]),
+                          key=lambda row: row[2], reverse=True)
+        self.start_window()
+        lines = [f"Stage timing over {wall:.2f} s wall clock (host and board stages overlap):"]
+        for stage, count, total, peak in rows:
+            share = 100.0 * total / wall if wall > 0 else 0.0
+            lines.append(f"  {stage:<18}{total:9.3f} s {share:6.1f}%  {count:>6} x, "
+                         f"avg {1000.0 * total / count:8.2f} ms, max {1000.0 * peak:8.2f} ms")
+        return lines
+
+
+class MetricsServer:
+    # GET /metrics on 127.0.0.1:<port>, served from a daemon thread
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/metrics"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,184 @@
+import math
+import re
+
+# ------------------------
+# Line parsers for the English firmware (BoardProgram_translated.ino); the Cal Point and
+# measurement lines are the same in the Korean firmware (MainPCB.ino / MainPCBPython.ino)
+# ------------------------
+
+
+def parse_calibration_line(line):
+    try:
+        pattern = r"Cal Point (\d+):\s+R=(-?\d+) / I=(-?\d+)\s+\|Z\|=([\d.]+)\s+System Phase=([\d.+-]+) degrees"
+        match = re.match(pattern, line)
+        if match:
+            cal_point = f"Cal Point {match.group(1)}"
+            r_i = f"R={match.group(2)} / I={match.group(3)}"
+            z = match.group(4)
+            phase = f"{match.group(5)} degrees"
+            return [cal_point, r_i, z, phase]
+        else:
+            return None
+    except Exception as e:
+        print(f"Calibration data parsing error: {e} - Line: {line}")
+        return None
+
+
+# Accepts either a floating point number, "ovf" (overflow) or "inf" (no signal at all, e.g. an
+# open electrode) for |Z|, resistance and reactance; the phase usually doesn't overflow.
+# "ovf" / "inf" parse to NaN (no value), never to a number a reduction could average in
+VALUE_PATTERN = r"([-+]?\d+\.\d+|ovf|inf)"
+MEASUREMENT_PATTERN = re.compile(
+    r"(\d+\.\d+)kHz:\s+R=(-?\d+)/I=(-?\d+)\s+"
+    rf"\|Z\|={VALUE_PATTERN}\s+"
+    r"Phase=([-+]?\d+\.\d+)\s+degrees\s+"
+    rf"Resistance={VALUE_PATTERN}\s+"
+    rf"Reactance={VALUE_PATTERN}"
+)
+
+
+def parse_value(v_str):
+    # "ovf" and "inf" are stored as NaN
+    return math.nan if v_str in ('ovf', 'inf', b'ovf', b'inf') else float(v_str)
+
+
+def measurement_row(groups):
+    # The 7 groups of MEASUREMENT_PATTERN -> [freq, r_i, |Z|, phase, resistance, reactance]
+    freq_khz, real, imag, impedance, phase, resistance, reactance = groups
+    return [f"{int(float(freq_khz) * 1000)} Hz", f"R={real} / I={imag}",
+            parse_value(impedance), float(phase), parse_value(resistance), parse_value(reactance)]
+
+
+# The same pattern over the raw bytes of a line: read_from_port() matches measurement lines
+# without decoding them
+MEASUREMENT_BYTES_PATTERN = re.compile(MEASUREMENT_PATTERN.pattern.encode())
+
+
+def measurement_row_bytes(groups):
+    # measurement_row() of the 7 groups of MEASUREMENT_BYTES_PATTERN
+    freq_khz, real, imag, impedance, phase, resistance, reactance = groups
+    return [f"{int(float(freq_khz) * 1000)} Hz", (b"R=%s / I=%s" % (real, imag)).decode(),
+            parse_value(impedance), float(phase), parse_value(resistance), parse_value(reactance)]
+
+
+def parse_measurement_line(line):
+    # This function is modified to handle "ovf" (overflow) values from the Arduino.
+    try:
+        match = MEASUREMENT_PATTERN.match(line)
+        if match:
+            return measurement_row(match.groups())
+        else:
+            return None
+    except (IndexError, ValueError) as e:
+        print(f"Measurement data parsing error: {e} - Line: {line}")
+        return None
+
+
+SWEEP_TIMING_PATTERN = re.compile(
+    r"\[INFO\] Sweep timing: (\d+) points in (\d+) ms \(([\d.]+|ovf|inf|nan) points/s\), "
+    r"wait avg (\d+) us max (\d+) us, read avg (\d+) us max (\d+) us")
+
+
+def parse_sweep_timing_line(line):
+    # "[INFO] Sweep timing: 21 points in 45 ms (466.67 points/s), wait avg 1650 us max 1702 us, read avg 412 us max 420 us"
+    match = SWEEP_TIMING_PATTERN.match(line)
+    if not match:
+        return None
+    return {
+        'points': int(match.group(1)),
+        'total_ms': int(match.group(2)),
+        'wait_avg_us': int(match.group(4)),
+        'wait_max_us': int(match.group(5)),
+        'read_avg_us': int(match.group(6)),
+        'read_max_us': int(match.group(7)),
+    }
+
+
+STAGE_TIMING_PATTERN = re.compile(
+    r"\[INFO\] Stage timing: settle (\d+) ms, acquire (\d+) ms, print (\d+) ms, ack (\d+) ms")
+
+
+def parse_stage_timing_line(line):
+    # "[INFO] Stage timing: settle 65 ms, acquire 48 ms, print 92 ms, ack 3 ms" (one framed sweep)
+    match = STAGE_TIMING_PATTERN.match(line)
+    if not match:
+        return None
+    return dict(zip(['settle_ms', 'acquire_ms', 'print_ms', 'ack_ms'], map(int, match.groups())))
+
+
+# ------------------------
+# Helpers for the measurement rows built by the data export scripts
+# ------------------------
+# A row is [freq, r_i, |Z|, phase, resistance, reactance, X, Y, Group, Temp] where freq is
+# "50000 Hz", r_i is "R=123 / I=-45", X/Y are 7-bit binary strings (or "N/A"), Group is the MUX
+# group 1~4 (or "N/A") and Temp the AD5933 die temperature in degrees C at the start of the
+# sweep (or "N/A"). Rows written before the Group / Temp columns existed end at Y / Group.
+# |Z|, resistance and reactance are NaN for points read as "ovf" / "inf"; those are written as
+# empty cells and come back from a workbook as None.
+
+
+def freq_hz(freq_str):
+    return int(str(freq_str).replace(' Hz', ''))
+
+
+def split_r_i(r_i_str):
+    r, i = r_i_str.split('/')
+    return int(r.replace('R=', '').strip()), int(i.replace('I=', '').strip())
+
+
+def coord_to_int(value):
+    # 7-bit binary string -> int, None for "N/A"
+    try:
+        return int(value, 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def row_group(row):
+    # MUX group of a row as int, None when unknown
+    try:
+        return int(row[8])
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def row_temperature(row):
+    # Die temperature of a row as float, None when unknown
+    try:
+        return float(row[9])
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def coord_label(x, y, group=None):
+    label = f"X={x},Y={y}"
+    return label if group in (None, 0, "N/A") else f"G{group} {label}"
+
+
+def cell_float(value):
+    # Number of a measurement cell, NaN for an empty (ovf) cell
+    return math.nan if value is None or value == '' else float(value)
+
+
+def cell_value(value):
+    # Value to write to a cell: NaN (ovf) as an empty cell
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def measurement_row_values(row):
+    # (freq_hz, real, imag, |Z|, phase, resistance, reactance) as numbers, NaN for ovf
+    real, imag = split_r_i(row[1])
+    return (freq_hz(row[0]), real, imag) + tuple(cell_float(value) for value in row[2:6])
+
+
+def complex_impedance(resistance, reactance):
+    # The firmware reports the admittance phase (capacitive loads read a positive phase and
+    # reactance), so the impedance is resistance - j * reactance
+    return resistance - 1j * reactance
+
+
+def format_measurement_row(freq, real, imag, impedance, phase, resistance, reactance, x, y, group="N/A",
+                           temperature="N/A"):
+    # Inverse of measurement_row_values(), in the layout written to Excel
+    return [f"{int(freq)} Hz", f"R={int(round(real))} / I={int(round(imag))}",
+            float(impedance), float(phase), float(resistance), float(reactance), x, y, group, temperature]
@@ -0,0 +1,118 @@
+import warnings
+
+import numpy as np
+
+from biosensor_host.parsing import format_measurement_row, measurement_row_values, row_temperature
+
+# ------------------------
+# Repeat-measurement reduction
+# ------------------------
+# Collects the N repeated sweeps of one coordinate and reduces them per frequency to
+# mean / std / median. Whole sweeps that deviate from the others are rejected first,
+# using the median over frequencies of a robust z-score (median absolute deviation)
+# on |Z| and phase. Rejection needs at least 3 repeats.
+# Points read as ovf are NaN and left out of every statistic (nanmean / nanmedian / nanstd);
+# a frequency where no kept repeat has a value reduces to NaN.
+
+OUTLIER_THRESHOLD = 3.5   # modified z-score (Iglewicz & Hoaglin)
+MAD_SCALE = 1.4826        # MAD -> standard deviation for normal data
+
+QUANTITIES = ['|Z|', 'Phase (Degrees)', 'Resistance', 'Reactance']
+
+STATS_HEADERS = ['X', 'Y', 'Group', 'Freq (Hz)', 'Repeats Kept', 'Repeats Rejected']
+for _quantity in QUANTITIES:
+    STATS_HEADERS += [f"{_quantity} Mean", f"{_quantity} Std", f"{_quantity} Median"]
+
+
+def wrap_degrees(angle):
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+def _robust_z(values, center):
+    mad = np.nanmedian(np.abs(values - center), axis=0)
+    scale = MAD_SCALE * mad
+    # Floor the spread so identical repeats don't turn rounding noise into outliers
+    floor = 1e-6 * np.maximum(np.abs(center), 1.0)
+    return np.abs(values - center) / np.maximum(scale, floor)
+
+
+class RepeatReducer:
+    def __init__(self, repeats, outlier_threshold=OUTLIER_THRESHOLD):
+        self.repeats = repeats
+        self.outlier_threshold = outlier_threshold
+        self.coord = None
+        self.freqs = None
+        self._sweeps = []
+        self._temperatures = []
+
+    def __len__(self):
+        return len(self._sweeps)
+
+    def is_complete(self):
+        return len(self._sweeps) >= self.repeats
+
+    def add_sweep(self, rows):
+        values = np.array([measurement_row_values(row) for row in rows], dtype=np.float64)
+        if self.freqs is None:
+            self.freqs = values[:, 0]
+            self.coord = (rows[0][6], rows[0][7], rows[0][8] if len(rows[0]) > 8 else "N/A")
+        elif len(values) != len(self.freqs):
+            print(f"[WARNING] Repeat has {len(values)} points, expected {len(self.freqs)}. Skipped.")
+            return
+        self._sweeps.append(values[:, 1:])
+        self._temperatures.append(row_temperature(rows[0]))
+
+    def reduce(self):
+        # Returns (rows, stats_rows, rejected): mean rows in the Excel layout, per-frequency
+        # statistics rows (STATS_HEADERS) and the 1-based indices of rejected repeats.
+        data = np.stack(self._sweeps)  # (repeats, points, [real, imag, |Z|, phase, res, react])
+        rejected = self.find_outliers(data)
+        kept = np.setdiff1d(np.arange(len(data)), rejected)
+        data = data[kept]
+
+        with warnings.catch_warnings():
+            # All-NaN frequencies (ovf in every repeat) come out as NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            # Phase is averaged on the circle so repeats around +-180 degrees don't cancel out
+            phase = data[:, :, 3]
+            phase_mean = np.degrees(np.angle(np.nanmean(np.exp(1j * np.radians(phase)), axis=0)))
+            phase_dev = wrap_degrees(phase - phase_mean)
+
+            mean = np.nanmean(data, axis=0)
+            median = np.nanmedian(data, axis=0)
+            std = np.nanstd(data, axis=0, ddof=1) if len(data) > 1 else np.zeros_like(mean)
+            mean[:, 3] = phase_mean
+            median[:, 3] = wrap_degrees(phase_mean + np.nanmedian(phase_dev, axis=0))
+            std[:, 3] = np.nanstd(phase_dev, axis=0, ddof=1) if len(data) > 1 else 0.0
+
+        x, y, group = self.coord
+        # Reduced rows carry the mean die temperature of the kept repeats
+        temperatures = [self._temperatures[r] for r in kept if self._temperatures[r] is not None]
+        temperature = round(float(np.mean(temperatures)), 2) if temperatures else "N/A"
+        rows = []
+        stats_rows = []
+        for k, freq in enumerate(self.freqs):
+            rows.append(format_measurement_row(freq, *mean[k], x, y, group, temperature))
+            stats = [x, y, group, int(freq), len(kept), len(rejected)]
+            for col in range(2, 6):
+                stats += [float(mean[k, col]), float(std[k, col]), float(median[k, col])]
+            stats_rows.append(stats)
+        return rows, stats_rows, [int(r) + 1 for r in rejected]
+
+    def find_outliers(self, data):
+        if len(data) < 3:
+            return np.array([], dtype=int)
+        magnitude = data[:, :, 2]
+        phase = data[:, :, 3]
+        with warnings.catch_warnings():
+            # A sweep with no value at all scores NaN and is not rejected
+            warnings.simplefilter('ignore', RuntimeWarning)
+            z_mag = _robust_z(magnitude, np.nanmedian(magnitude, axis=0))
+            phase_center = np.degrees(np.angle(np.nanmedian(np.cos(np.radians(phase)), axis=0)
+                                               + 1j * np.nanmedian(np.sin(np.radians(phase)), axis=0)))
+            z_phase = _robust_z(wrap_degrees(phase - phase_center), 0.0)
+            score = np.nanmedian(np.fmax(z_mag, z_phase), axis=1)
+        rejected = np.flatnonzero(score > self.outlier_threshold)
+        if len(data) - len(rejected) < 2:
+            return np.array([], dtype=int)  # Don't reject down to a single sweep
+        return rejected
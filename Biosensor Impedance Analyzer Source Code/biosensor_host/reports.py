@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from biosensor_host.impedance_plots import point_arrays
+
+# ------------------------
+# Headless report export
+# ------------------------
+# ReportWriter (host side) hands every finished sweep to a worker process as an .npz and
+# returns at once; the worker (python -m biosensor_host.reports) renders it with the Agg
+# backend to PNG / SVG / PDF files and, when the session ends, writes one multi-page PDF
+# with a summary page and every sweep and fit. Jobs are JSON lines on the worker's stdin:
+#   {"kind": "sweep" | "fit" | "delta" | "kinetics", "name": ..., "title": ...,
+#    "data": <.npz | fit .csv | delta .npz | kinetics snapshot .npz>}
+#   {"kind": "finish"}
+# The worker is a separate interpreter rather than a multiprocessing child, since spawning
+# one re-imports the host script (and with it the serial port) on Windows.
+
+DEFAULT_FORMATS = ['png']
+REPORT_FORMATS = ['png', 'svg', 'pdf']
+
+FONT_CANDIDATES = ['C:/Windows/Fonts/malgun.ttf']   # Korean plot labels (Malgun Gothic)
+FALLBACK_FONT = 'DejaVu Sans'
+
+
+def resolve_font_family(candidates=FONT_CANDIDATES, cache_path=None):
+    # Family name of the first candidate font file that exists, else FALLBACK_FONT. The
+    # result is cached with the files' modification times, so later starts read one small
+    # JSON file instead of probing and parsing font files.
+    stamp = [os.path.getmtime(path) if os.path.exists(path) else None for path in candidates]
+    key = "|".join(candidates)
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+    entry = cache.get(key)
+    if entry and entry['stamp'] == stamp:
+        return entry['family']
+
+    from matplotlib import font_manager
+
+    family = FALLBACK_FONT
+    for path, mtime in zip(candidates, stamp):
+        if mtime is None:
+            continue
+        try:
+            family = font_manager.FontProperties(fname=path).get_name()
+            break
+        except (OSError, RuntimeError) as e:
+            print(f"[WARNING] Could not read font '{path}': {e}")
+    if cache_path:
+        cache[key] = {'stamp': stamp, 'family': family}
+        try:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"[WARNING] Could not write font cache '{cache_path}': {e}")
+    return family
+
+
+class ReportWriter:
+    def __init__(self, directory, formats=DEFAULT_FORMATS, session_name="session", font_family=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.count = 0
+        command = [sys.executable, '-m', 'biosensor_host.reports', directory,
+                   '--formats', ",".join(formats), '--session', session_name]
+        if font_family:
+            command += ['--font', font_family]
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, text=True, cwd=package_root)
+
+    def _send(self, job):
+        if self.process.poll() is not None:
+            print(f"[WARNING] Report worker has exited (code {self.process.returncode}). '{job.get('name')}' not rendered.")
+            return False
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            print(f"[WARNING] Could not reach the report worker: {e}")
+            return False
+        return True
+
+    def _next_name(self, kind):
+        self.count += 1
+        return f"{self.count:03d}_{kind}"
+
+    def submit_sweep(self, rows, title):
+        # Measurement rows (Excel layout) of one sweep or range sweep; returns the report name
+        labels, coord, freqs, z = point_arrays(rows)
+        if len(freqs) == 0:
+            return None
+        name = self._next_name('sweep')
+        path = os.path.join(self.directory, name + ".npz")
+        np.savez(path, labels=labels, coord=coord, freqs=freqs, z=z)
+        return name if self._send({'kind': 'sweep', 'name': name, 'title': title, 'data': path}) else None
+
+    def submit_fit(self, csv_path, title):
+        name = self._next_name('fit')
+        return name if self._send({'kind': 'fit', 'name': name, 'title': title, 'data': csv_path}) else None
+
+    def submit_delta(self, npz_path, title):
+        # Deltas of a range sweep against the chip baseline (see biosensor_host.baseline)
+        name = self._next_name('delta')
+        return name if self._send({'kind': 'delta', 'name': name, 'title': title, 'data': npz_path}) else None
+
+    def submit_kinetics(self, npz_path, title):
+        # Ring buffer snapshot of a kinetics run (see biosensor_host.kinetics)
+        name = self._next_name('kinetics')
+        return name if self._send({'kind': 'kinetics', 'name': name, 'title': title, 'data': npz_path}) else None
+
+    def finish(self, timeout=600):
+        # Ask for the session report and wait for the worker to write it
+        self._send({'kind': 'finish'})
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            print(f"[WARNING] Report worker still busy after {timeout} s; leaving it running.")
+
+
+# ------------------------
+# Worker process
+# ------------------------
+def render_job(job):
+    from biosensor_host.baseline import DELTA_COLUMNS, delta_map_figure
+    from biosensor_host.fitting import parameter_map_figure, read_fit_csv
+    from biosensor_host.impedance_plots import impedance_figure
+    from biosensor_host.kinetics import kinetics_figure, load_snapshot
+
+    if job['kind'] == 'sweep':
+        with np.load(job['data']) as data:
+            points = (data['labels'], data['coord'], data['freqs'], data['z'])
+        return impedance_figure(points, job['title']), f"{len(points[0])} coordinates, {len(points[2])} points"
+    if job['kind'] == 'delta':
+        with np.load(job['data']) as data:
+            columns = {name: data[name] for name in DELTA_COLUMNS}
+        electrodes = len(np.unique(np.stack([columns['group'], columns['x'], columns['y']]), axis=1).T)
+        return delta_map_figure(columns, job['title']), f"{electrodes} electrodes against baseline"
+    if job['kind'] == 'kinetics':
+        snapshot = load_snapshot(job['data'])
+        return (kinetics_figure(snapshot, job['title']),
+                f"{len(snapshot['electrodes'])} electrodes, {int(snapshot['count'].sum())} sweeps")
+    model, results = read_fit_csv(job['data'])
+    return parameter_map_figure(results, model, job['title']), f"{model} fit, {len(results)} coordinates"
+
+
+def write_session_report(directory, session_name, entries, started):
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    path = os.path.join(directory, f"{session_name}_report.pdf")
+    with PdfPages(path) as pdf:
+        fig = plt.figure(figsize=(11.7, 8.3))
+        lines = [f"Session {session_name}",
+                 f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(started))} - "
+                 f"{time.strftime('%Y-%m-%d %H:%M')}, {len(entries)} report(s)", ""]
+        lines += [f"{entry['name']:<12} {entry['title']:<48} {entry['summary']}" for entry in entries]
+        fig.text(0.05, 0.95, "\n".join(lines), family='monospace', fontsize=9, va='top')
+        pdf.savefig(fig)
+        plt.close(fig)
+        for entry in entries:
+            try:
+                fig, _ = render_job(entry)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WARNING] {entry['name']} left out of the session report: {e}", flush=True)
+                continue
+            pdf.savefig(fig)
+            plt.close(fig)
+    return path
+
+
+def serve(directory, formats, session_name, font_family=None):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if font_family:
+        plt.rcParams['font.family'] = font_family
+    plt.rcParams['axes.unicode_minus'] = False
+    started = time.time()
+    entries = []
+    for line in sys.stdin:
+        try:
+            job = json.loads(line)
+        except ValueError:
+            continue
+        if job.get('kind') == 'finish':
+            break
+        t0 = time.perf_counter()
+        try:
+            fig, summary = render_job(job)
+            paths = []
+            for fmt in formats:
+                paths.append(os.path.join(directory, f"{job['name']}.{fmt}"))
+                fig.savefig(paths[-1])
+            plt.close(fig)
+        except Exception as e:
+            print(f"[ERROR] Report {job.get('name')} failed: {e}", flush=True)
+            continue
+        entries.append(dict(job, summary=summary))
+        print(f"[INFO] Report {job['name']} written ({', '.join(os.path.basename(p) for p in paths)}, "
+              f"{time.perf_counter() - t0:.1f} s).", flush=True)
+    if entries:
+        path = write_session_report(directory, session_name, entries, started)
+        print(f"[INFO] Session report written to '{path}'.", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render sweep reports sent as JSON lines on stdin.")
+    parser.add_argument('directory')
+    parser.add_argument('--formats', default=",".join(DEFAULT_FORMATS), help="comma-separated: png,svg,pdf")
+    parser.add_argument('--session', default="session")
+    parser.add_argument('--font', default=None, help="font family for the plot labels")
+    args = parser.parse_args()
+    formats = [fmt for fmt in args.formats.split(",") if fmt in REPORT_FORMATS]
+    serve(args.directory, formats or DEFAULT_FORMATS, args.session, args.font)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# ------------------------
+# Scan orders used by the firmware for Modes 4, 5, 6 (mask) and 8
+# ------------------------
+# Mirrors orderCoordinateList() / runCoordinateList() in BoardProgram_translated.ino so the
+# host can predict the visiting sequence, map results back onto the grid and estimate
+# how long a sweep will take. Sequences are (x, y) or (x, y, group) tuples; a group change
+# settles like the first coordinate (all address lines).
+
+SCAN_ORDERS = ['Raster', 'Serpentine', 'Gray-code', 'Hilbert']
+
+# Must match MUX_SETTLE_* in the firmware
+MUX_SETTLE_BASE_MS = 20
+MUX_SETTLE_PER_LINE_MS = 15
+MUX_SETTLE_MAX_MS = 200
+ADDRESS_LINES = 14  # 7 X + 7 Y
+
+
+def gray_code(i):
+    return i ^ (i >> 1)
+
+
+def hilbert_index(x, y, n=128):
+    d = 0
+    s = n // 2
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+            x, y = y, x
+        s //= 2
+    return d
+
+
+def _axis_ranks(values, order):
+    present = set(values)
+    sequence = [gray_code(i) for i in range(128)] if order == 'Gray-code' else range(128)
+    ranks = {}
+    for value in sequence:
+        if value in present:
+            ranks[value] = len(ranks)
+    return ranks
+
+
+def order_coordinates(coords, order):
+    if order not in SCAN_ORDERS:
+        raise ValueError(f"Unknown scan order: {order}")
+    rank_x = _axis_ranks([x for x, _ in coords], order)
+    rank_y = _axis_ranks([y for _, y in coords], order)
+
+    def key(coord):
+        rx, ry = rank_x[coord[0]], rank_y[coord[1]]
+        if order in ('Serpentine', 'Gray-code'):
+            return rx * 128 + (127 - ry if rx & 1 else ry)
+        if order == 'Hilbert':
+            return hilbert_index(rx, ry)
+        return rx * 128 + ry
+
+    return sorted(set(coords), key=key)
+
+
+def toggled_lines(prev, coord):
+    if prev is None or prev[2:] != coord[2:]:
+        return ADDRESS_LINES
+    return bin(prev[0] ^ coord[0]).count('1') + bin(prev[1] ^ coord[1]).count('1')
+
+
+def settle_delay_ms(toggled):
+    return min(MUX_SETTLE_BASE_MS + MUX_SETTLE_PER_LINE_MS * toggled, MUX_SETTLE_MAX_MS)
+
+
+def scan_cost(sequence):
+    # (total toggled address lines, total settle time in ms) for a visiting sequence
+    total_toggles = 0
+    total_settle_ms = 0
+    prev = None
+    for coord in sequence:
+        toggled = toggled_lines(prev, coord)
+        total_toggles += toggled
+        total_settle_ms += settle_delay_ms(toggled)
+        prev = coord
+    return total_toggles, total_settle_ms
+
+
+def visit_index(sequence):
+    # coordinate -> position in the scan, to map streamed results back to the grid
+    return {coord: k for k, coord in enumerate(sequence)}
+
+
+# ------------------------
+# Multi-group scheduling (Mode 8)
+# ------------------------
+# schedule_targets() turns (group, x, y) targets into one segment per MUX group, so the
+# groups switch the fewest possible times. Groups follow GROUP_ORDER, the Gray-code order
+# of their MUX select codes (1: 00, 2: 01, 4: 11, 3: 10), so each switch flips one select
+# line per MUX. Within a group the coordinates take whichever scan order toggles the
+# fewest address lines.
+
+GROUP_ORDER = [1, 2, 4, 3]
+
+
+def schedule_targets(targets, orders=SCAN_ORDERS):
+    # [(group, order, sequence)] with sequence the group's (x, y) in visiting order
+    by_group = {}
+    for group, x, y in targets:
+        by_group.setdefault(group, []).append((x, y))
+    segments = []
+    for group in sorted(by_group, key=GROUP_ORDER.index):
+        candidates = [(order, order_coordinates(by_group[group], order)) for order in orders]
+        order, sequence = min(candidates, key=lambda candidate: scan_cost(candidate[1]))
+        segments.append((group, order, sequence))
+    return segments
+
+
+def schedule_sequence(segments):
+    # The whole job as (x, y, group) in visiting order
+    return [(x, y, group) for group, _, sequence in segments for x, y in sequence]
+
+
+def group_switches(sequence):
+    return sum(1 for prev, coord in zip(sequence, sequence[1:]) if prev[2:] != coord[2:])
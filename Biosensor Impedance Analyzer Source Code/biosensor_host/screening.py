@@ -0,0 +1,130 @@
+import numpy as np
+
+from biosensor_host.autorange import RAW_MAX_MAGNITUDE
+from biosensor_host.coordinates import ADDRESS_MAX, GROUPS
+from biosensor_host.parsing import coord_label, freq_hz, split_r_i
+
+# ------------------------
+# Electrode screening (Mode 9)
+# ------------------------
+# The firmware measures every coordinate of the screening segments at the first and the last
+# point of the calibrated sweep ("Screen->X=...,Y=... <measurement line>") instead of taking
+# the whole sweep. ElectrodeScreen collects those points and classifies all coordinates at
+# once, on (coordinates, frequencies) arrays:
+#   open     |Z| above open_ohms at every screening frequency ("ovf" / "inf" count as infinite)
+#   short    |Z| below short_ohms at every screening frequency, or the ADC still clipped after
+#            auto-ranging (the firmware already tried the lower steps)
+#   nominal  anything else
+# A clipped reading without auto-ranging only bounds |Z| from above, so it is not enough to
+# call an electrode shorted: only electrodes that are clearly bad are left out of a scan.
+# The thresholds default to OPEN_FACTOR / SHORT_FACTOR x the calibration impedance.
+#
+# The skip mask is a boolean (group, X, Y) array, group 0 for coordinates measured without a
+# known MUX group. split_targets() drops the masked coordinates from a Coordinate List Sweep
+# (Mode 6) or Multi-Group Scan (Mode 8) before they are sent to the board.
+
+OPEN_FACTOR = 100.0
+SHORT_FACTOR = 0.01
+STATUSES = ['nominal', 'open', 'short']
+
+
+def empty_skip_mask():
+    return np.zeros((len(GROUPS) + 1, ADDRESS_MAX + 1, ADDRESS_MAX + 1), dtype=bool)
+
+
+def health_headers(freqs):
+    headers = ['X', 'Y', 'Group', 'Status']
+    for freq in freqs:
+        headers += [f'|Z| {int(freq)} Hz', f'Phase {int(freq)} Hz']
+    return headers
+
+
+class ElectrodeScreen:
+    def __init__(self):
+        self._points = []   # (group, x, y, freq, raw magnitude, |Z|, phase)
+
+    def __len__(self):
+        return len(self._points)
+
+    def add_point(self, group, x, y, row):
+        # row: measurement row (see biosensor_host.parsing) of one screening point
+        real, imag = split_r_i(row[1])
+        self._points.append((group or 0, x, y, freq_hz(row[0]), float(np.hypot(real, imag)), row[2], row[3]))
+
+    def classify(self, rcal, auto_ranged=False, open_ohms=None, short_ohms=None):
+        # {'group', 'x', 'y', 'status'} per coordinate (in the order they were screened) and
+        # 'freq', 'impedance', 'phase' with impedance / phase (coordinates, frequencies), NaN
+        # for points that never arrived or read as ovf
+        open_ohms = OPEN_FACTOR * rcal if open_ohms is None else open_ohms
+        short_ohms = SHORT_FACTOR * rcal if short_ohms is None else short_ohms
+        points = np.array(self._points, dtype=np.float64).reshape(-1, 7)
+        keys = (points[:, 0] * 128 + points[:, 1]) * 128 + points[:, 2]
+        unique_keys, first, coord_index = np.unique(keys, return_index=True, return_inverse=True)
+        freqs, freq_index = np.unique(points[:, 3], return_inverse=True)
+        shape = (len(unique_keys), len(freqs))
+        magnitude, impedance, phase = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+        measured = np.zeros(shape, dtype=bool)
+        magnitude[coord_index, freq_index] = points[:, 4]
+        impedance[coord_index, freq_index] = points[:, 5]
+        phase[coord_index, freq_index] = points[:, 6]
+        measured[coord_index, freq_index] = True
+
+        # "ovf" / "inf" are stored as NaN
+        with np.errstate(invalid='ignore'):
+            z = np.where(np.isnan(impedance), np.inf, impedance)
+            is_open = (z > open_ohms) | ~measured
+            is_short = (z < short_ohms) | (auto_ranged & (magnitude > RAW_MAX_MAGNITUDE)) | ~measured
+        status = np.select([is_open.all(axis=1), is_short.all(axis=1)], ['open', 'short'], 'nominal')
+
+        order = np.argsort(first, kind='stable')
+        return {
+            'group': (unique_keys[order] // (128 * 128)).astype(np.int64),
+            'x': (unique_keys[order] // 128 % 128).astype(np.int64),
+            'y': (unique_keys[order] % 128).astype(np.int64),
+            'status': status[order],
+            'freq': freqs.astype(np.int64),
+            'impedance': impedance[order],
+            'phase': phase[order],
+        }
+
+
+def update_skip_mask(mask, result):
+    # Screened coordinates take their new status; the rest of the mask stays as it was
+    mask[result['group'], result['x'], result['y']] = result['status'] != 'nominal'
+    return mask
+
+
+def split_targets(mask, targets):
+    # targets: (group, x, y) -> (kept, skipped), both in the given order
+    if not len(targets):
+        return [], []
+    index = np.array(targets, dtype=np.int64)
+    skip = mask[index[:, 0], index[:, 1], index[:, 2]]
+    return ([t for t, s in zip(targets, skip) if not s], [t for t, s in zip(targets, skip) if s])
+
+
+def health_rows(result):
+    # Rows in the health_headers(result['freq']) layout, one per coordinate
+    rows = []
+    for c, status in enumerate(result['status']):
+        row = [f"{int(result['x'][c]):07b}", f"{int(result['y'][c]):07b}",
+               int(result['group'][c]) or "N/A", str(status)]
+        for p in range(len(result['freq'])):
+            impedance, phase = result['impedance'][c, p], result['phase'][c, p]
+            row += [None if np.isnan(impedance) else float(impedance), None if np.isnan(phase) else float(phase)]
+        rows.append(row)
+    return rows
+
+
+def screening_summary(result):
+    # "14 nominal, 1 open, 1 short" and the bad coordinates by status
+    counts = ", ".join(f"{int(np.sum(result['status'] == status))} {status}" for status in STATUSES)
+    lines = []
+    for status in STATUSES[1:]:
+        bad = np.flatnonzero(result['status'] == status)
+        if len(bad):
+            labels = [coord_label(f"{int(result['x'][c]):07b}", f"{int(result['y'][c]):07b}", int(result['group'][c]))
+                      for c in bad[:20]]
+            more = f" and {len(bad) - 20} more" if len(bad) > 20 else ""
+            lines.append(f"{status}: " + "; ".join(labels) + more)
+    return counts, lines
@@ -0,0 +1,78 @@
+# ------------------------
+# Bulk serial line reader
+# ------------------------
+# pyserial's readline() reads the port one byte at a time (a select() and a read() per
+# byte), and the host then decoded and stripped every line into a new str. LineReader
+# instead drains everything the port has waiting (in_waiting, or one blocking read of up to
+# the port timeout) into one reusable bytearray and splits it on b"\n" in place:
+# read_line() returns a memoryview of the next line, without its line ending and
+# surrounding whitespace, so the caller can match it with bytes patterns and decode only
+# the lines it handles as text. The view points into the buffer and is valid until the
+# next read_line().
+#
+# Timeouts behave like readline(): when a read times out with part of a line buffered
+# (the firmware's prompts end without a newline), that part is returned as a line. A
+# wrapped CapturingSerial records each returned line as readline() did, so captures keep
+# one record per line and replay the same way.
+
+BUFFER_SIZE = 64 * 1024
+WHITESPACE = frozenset(b" \t\r\n\x0b\x0c")
+
+
+class LineReader:
+    def __init__(self, port, size=BUFFER_SIZE):
+        self.port = port
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0   # first byte not returned yet
+        self.end = 0     # end of the buffered bytes
+        self.record = getattr(port, 'record_received', None)
+        self.reads = 0
+        self.lines = 0
+
+    def _fill(self):
+        # One read of what the port has waiting; False if it timed out with nothing
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buffer):
+            # Keep the partial line, at the front of the buffer
+            size = self.end - self.start
+            self.buffer[:size] = bytes(self.view[self.start:self.end])
+            self.start, self.end = 0, size
+        data = self.port.read(min(max(self.port.in_waiting, 1), len(self.buffer) - self.end))
+        if not data:
+            return False
+        self.reads += 1
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+        return True
+
+    def _take(self, stop):
+        start = self.start
+        self.start = stop
+        self.lines += 1
+        if self.record:
+            self.record(self.view[start:stop])
+        buffer = self.buffer
+        while stop > start and buffer[stop - 1] in WHITESPACE:
+            stop -= 1
+        while start < stop and buffer[start] in WHITESPACE:
+            start += 1
+        return self.view[start:stop]
+
+    def read_line(self):
+        # Next line (memoryview), None if the port timed out without one
+        while True:
+            newline = self.buffer.find(b"\n", self.start, self.end)
+            if newline >= 0:
+                return self._take(newline + 1)
+            if self.start == 0 and self.end == len(self.buffer):
+                return self._take(self.end)   # a "line" longer than the buffer
+            if not self._fill():
+                return self._take(self.end) if self.end > self.start else None
+
+    def reset_input_buffer(self):
+        # Drops the buffered bytes along with the port's own input buffer
+        self.start = self.end = 0
+        self.port.reset_input_buffer()
+
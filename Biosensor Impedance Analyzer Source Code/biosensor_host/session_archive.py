@@ -0,0 +1,386 @@
+import argparse
+import bz2
+import json
+import lzma
+import os
+import re
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from biosensor_host.columnar_store import COLUMNS
+
+# ------------------------
+# Session archive
+# ------------------------
+# Compact archival copy of a session workbook (measurement_data_N.xlsx). The workbook keeps
+# every value of a measurement row in its own cell, the raw data as text ("R=123 / I=-45",
+# "50000 Hz"). The archive keeps the measurement rows of the "Measurement Data" sheet as
+# columns with one entry per point. A sweep is a run of consecutive rows of one coordinate.
+#   freq, real, imag            Hz and the raw AD5933 registers
+#   impedance, phase,           as printed (2 decimals), stored x 100 as integers; a column
+#   resistance, reactance       that isn't exactly 2 decimals is kept as float64
+# Every integer column is delta-encoded along frequency within a sweep ('frequency'), or in
+# addition against the previous sweep when that one has as many points ('frequency+sweep').
+# The previous sweep is the neighbouring coordinate, so similar electrodes leave residuals
+# close to zero; noisy or open electrodes don't, and each column takes whichever of the two
+# leaves the fewer estimated bits. The residuals go in the smallest integer type that holds
+# them, byte-shuffled, and all columns are compressed as one stream (lzma, zlib or bz2).
+# The derived values are kept as printed rather than recomputed from R / I: that would need
+# the calibration, the host's temperature compensation and the firmware's float arithmetic.
+# Coordinates, group and temperature go to a per-sweep table. Every other cell of the workbook
+# is kept as it is: labels, headers, calibration points and the other sheets. The round trip
+# is lossless for cell values (styles are not kept): restore_workbook() writes the same values.
+#
+# File layout:
+#   b"BIOSENSOR-ARCHIVE 1\n", one JSON header line (compressor, source, counts), then the
+#   compressed payload <meta length:u32> <meta JSON> <array bytes ...>
+#
+#   python -m biosensor_host.session_archive pack measurement_data_3.xlsx
+#   python -m biosensor_host.session_archive unpack measurement_data_3.bsa
+
+MAGIC = b"BIOSENSOR-ARCHIVE 1\n"
+ARCHIVE_EXTENSION = ".bsa"
+MEASUREMENT_SHEET = "Measurement Data"
+ROW_WIDTH = 10             # HEADER_FIELDS of the host script
+COMPRESSORS = {
+    'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+    'bz2': (lambda data: bz2.compress(data, 9), bz2.decompress),
+}
+DEFAULT_COMPRESSOR = 'lzma'
+POINT_COLUMNS = ['freq', 'real', 'imag', 'impedance', 'phase', 'resistance', 'reactance']
+SCALED_COLUMNS = ['impedance', 'phase', 'resistance', 'reactance']
+# Per sweep: position in the sheet, points, coordinate (-1: "N/A"), group (0: "N/A", -1: no
+# cell), temperature (NaN: "N/A") and how many of the ROW_WIDTH cells the rows have
+SWEEP_COLUMNS = ['sheet_row', 'sheet_col', 'points', 'x', 'y', 'group', 'temperature', 'width']
+
+FREQ_PATTERN = re.compile(r"(\d+) Hz$")
+R_I_PATTERN = re.compile(r"R=(-?\d+) / I=(-?\d+)$")
+COORD_PATTERN = re.compile(r"[01]{7}$")
+
+
+def _number(value):
+    return type(value) in (int, float)
+
+
+def _coordinate(value):
+    # 7-bit string -> int, "N/A" -> -1, None for anything else
+    if value == "N/A":
+        return -1
+    if isinstance(value, str) and COORD_PATTERN.match(value):
+        return int(value, 2)
+    return None
+
+
+def parse_point(cells):
+    # (freq, real, imag, |Z|, phase, resistance, reactance) and (x, y, group, temperature, width)
+    # of a measurement row whose cells format back exactly, None for any other row
+    cells = list(cells[:ROW_WIDTH]) + [None] * (ROW_WIDTH - len(cells))
+    freq, r_i, impedance, phase, resistance, reactance, x, y, group, temperature = cells
+    if not (isinstance(freq, str) and isinstance(r_i, str)):
+        return None
+    freq_match, r_i_match = FREQ_PATTERN.match(freq), R_I_PATTERN.match(r_i)
+    if not (freq_match and r_i_match):
+        return None
+    values = (int(freq_match.group(1)), int(r_i_match.group(1)), int(r_i_match.group(2)))
+    if f"{values[0]} Hz" != freq or f"R={values[1]} / I={values[2]}" != r_i:
+        return None
+    if not all(_number(v) for v in (impedance, phase, resistance, reactance)):
+        return None
+    x, y = _coordinate(x), _coordinate(y)
+    if x is None or y is None:
+        return None
+    width = ROW_WIDTH if temperature is not None else 9 if group is not None else 8
+    if group is None:
+        if width != 8:
+            return None
+        group = -1
+    elif group == "N/A":
+        group = 0
+    elif not (type(group) is int and 1 <= group <= 127):
+        return None
+    if temperature is None or temperature == "N/A":
+        temperature = float('nan')
+    elif not _number(temperature):
+        return None
+    return values + (impedance, phase, resistance, reactance), (x, y, group, float(temperature), width)
+
+
+def workbook_values(source):
+    # {sheet name: [row tuples]} of a workbook path or an open openpyxl Workbook, in sheet order
+    import openpyxl
+
+    workbook = source
+    if isinstance(source, (str, os.PathLike)):
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        return {ws.title: list(ws.iter_rows(values_only=True)) for ws in workbook.worksheets}
+    finally:
+        if workbook is not source:
+            workbook.close()
+
+
+def split_session(sheets):
+    # Measurement points, sweep table and the remaining cells of workbook_values() output
+    measurement_sheet = MEASUREMENT_SHEET if MEASUREMENT_SHEET in sheets else next(iter(sheets), None)
+    points, sweeps = [], []
+    consumed = set()           # (row, block column) of the measurement rows
+    rows = sheets.get(measurement_sheet, [])
+    # Calibration runs sit side by side, ROW_WIDTH columns each: one block at a time
+    for c in range(0, max((len(row) for row in rows), default=0), ROW_WIDTH):
+        for r, row in enumerate(rows):
+            point = parse_point(row[c:c + ROW_WIDTH]) if c < len(row) else None
+            if point is None:
+                continue
+            values, sweep = point
+            last = sweeps[-1] if sweeps else None
+            if (last is not None and last[1] == c + 1 and last[0] + last[2] == r + 1
+                    and tuple(last[3:6]) == sweep[:3] and last[7] == sweep[4]
+                    and (last[6] == sweep[3] or (np.isnan(last[6]) and np.isnan(sweep[3])))
+                    and points[-1][0] < values[0]):
+                last[2] += 1
+            else:
+                sweeps.append([r + 1, c + 1, 1, *sweep])
+            points.append(values)
+            consumed.add((r, c))
+    cells = {}
+    for name, rows in sheets.items():
+        kept = cells[name] = []
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                if value is None or (name == measurement_sheet and (r, c - c % ROW_WIDTH) in consumed):
+                    continue
+                kept.append([r + 1, c + 1, value if isinstance(value, (str, int, float, bool)) else str(value)])
+    return measurement_sheet, points, sweeps, cells
+
+
+def sweep_segments(points_per_sweep):
+    # [start point, sweeps, points per sweep] of the runs of consecutive sweeps with as many points
+    segments = []
+    start = 0
+    for n in points_per_sweep:
+        n = int(n)
+        if segments and segments[-1][2] == n:
+            segments[-1][1] += 1
+        else:
+            segments.append([start, 1, n])
+        start += n
+    return segments
+
+
+def delta_encode(values, segments, across_sweeps=True):
+    # Along frequency within a sweep, then against the previous sweep of the segment
+    out = np.empty_like(values)
+    for start, sweeps, n in segments:
+        block = np.diff(values[start:start + sweeps * n].reshape(sweeps, n), axis=1, prepend=0)
+        if across_sweeps:
+            block = np.diff(block, axis=0, prepend=0)
+        out[start:start + sweeps * n] = block.ravel()
+    return out
+
+
+def delta_decode(values, segments, across_sweeps=True):
+    out = np.empty_like(values)
+    for start, sweeps, n in segments:
+        block = values[start:start + sweeps * n].reshape(sweeps, n)
+        if across_sweeps:
+            block = block.cumsum(axis=0)
+        out[start:start + sweeps * n] = block.cumsum(axis=1).ravel()
+    return out
+
+
+def estimated_bits(residuals):
+    return float(np.log2(1.0 + np.abs(residuals.astype(np.float64))).sum())
+
+
+def scaled_integers(values, scale=100):
+    # values x scale as int64 when that is exact (numbers printed with 2 decimals), else None
+    scaled = np.round(values * scale)
+    if len(values) and (np.abs(scaled).max() >= 2 ** 53 or not np.array_equal(scaled / scale, values)):
+        return None
+    return scaled.astype(np.int64)
+
+
+def narrow(values):
+    # Smallest little-endian integer type that holds the values
+    for dtype in ('<i1', '<i2', '<i4'):
+        info = np.iinfo(dtype)
+        if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values.astype('<i8')
+
+
+def shuffle(array):
+    # Byte planes one after the other: the high bytes of small residuals are runs of 0x00 / 0xff
+    array = np.ascontiguousarray(array)
+    return np.ascontiguousarray(array.view(np.uint8).reshape(-1, array.dtype.itemsize).T).tobytes()
+
+
+def unshuffle(data, dtype):
+    itemsize = np.dtype(dtype).itemsize
+    return np.frombuffer(data, np.uint8).reshape(itemsize, -1).T.copy().view(dtype).ravel()
+
+
+def encode_session(sheets, compressor=DEFAULT_COMPRESSOR, source=None):
+    # Archive bytes of workbook_values() output
+    measurement_sheet, points, sweeps, cells = split_session(sheets)
+    point_values = np.array(points, dtype=np.float64).reshape(-1, len(POINT_COLUMNS))
+    sweep_values = np.array(sweeps, dtype=np.float64).reshape(-1, len(SWEEP_COLUMNS))
+    segments = sweep_segments(sweep_values[:, 2])
+    arrays, blobs = [], []
+
+    def add(name, values, encoding, scale=1):
+        blobs.append(shuffle(values))
+        arrays.append({'name': name, 'dtype': values.dtype.str, 'encoding': encoding, 'scale': scale})
+
+    for k, name in enumerate(POINT_COLUMNS):
+        values = point_values[:, k]
+        scale = 100 if name in SCALED_COLUMNS else 1
+        integers = scaled_integers(values, scale)
+        if integers is None:
+            add(name, values.astype('<f8'), 'float64')
+            continue
+        along = delta_encode(integers, segments, across_sweeps=False)
+        both = delta_encode(integers, segments)
+        if estimated_bits(both) < estimated_bits(along):
+            add(name, narrow(both), 'frequency+sweep', scale)
+        else:
+            add(name, narrow(along), 'frequency', scale)
+    for k, name in enumerate(SWEEP_COLUMNS):
+        if name == 'temperature':
+            add(name, sweep_values[:, k].astype('<f8'), 'float64')
+        else:
+            add(name, narrow(np.diff(sweep_values[:, k].astype(np.int64), prepend=0)), 'sequence')
+
+    meta = json.dumps({'sheets': list(sheets), 'measurement_sheet': measurement_sheet, 'cells': cells,
+                       'sweeps': len(sweeps), 'points': len(points), 'arrays': arrays}).encode()
+    payload = COMPRESSORS[compressor][0](struct.pack('<I', len(meta)) + meta + b"".join(blobs))
+    header = {'compressor': compressor, 'source': source, 'created': time.time(), 'sweeps': len(sweeps),
+              'points': len(points), 'cells': sum(len(kept) for kept in cells.values())}
+    return MAGIC + json.dumps(header).encode() + b"\n" + payload
+
+
+def decode_session(data):
+    # {'header', 'sheets', 'measurement_sheet', 'cells', 'sweeps': SWEEP_COLUMNS arrays,
+    #  'columns': biosensor_host.columnar_store COLUMNS of every point}
+    if not data.startswith(MAGIC):
+        raise ValueError("not a session archive")
+    newline = data.index(b"\n", len(MAGIC))
+    header = json.loads(data[len(MAGIC):newline])
+    payload = COMPRESSORS[header['compressor']][1](data[newline + 1:])
+    meta_length, = struct.unpack_from('<I', payload)
+    meta = json.loads(payload[4:4 + meta_length])
+    offset = 4 + meta_length
+    raw = {}
+    for spec in meta['arrays']:
+        count = meta['sweeps'] if spec['name'] in SWEEP_COLUMNS else meta['points']
+        nbytes = count * np.dtype(spec['dtype']).itemsize
+        raw[spec['name']] = (unshuffle(payload[offset:offset + nbytes], spec['dtype']), spec)
+        offset += nbytes
+
+    sweeps = {}
+    for name in SWEEP_COLUMNS:
+        values, spec = raw[name]
+        sweeps[name] = values.astype(np.float64) if spec['encoding'] == 'float64' else np.cumsum(values, dtype=np.int64)
+    segments = sweep_segments(sweeps['points'])
+    points = {}
+    for name in POINT_COLUMNS:
+        values, spec = raw[name]
+        if spec['encoding'] == 'float64':
+            points[name] = values.astype(np.float64)
+        else:
+            values = delta_decode(values.astype(np.int64), segments, spec['encoding'] == 'frequency+sweep')
+            points[name] = values / spec['scale'] if spec['scale'] != 1 else values
+
+    index = np.repeat(np.arange(meta['sweeps']), sweeps['points'])
+    columns = {
+        'sweep': index,
+        'x': sweeps['x'][index],
+        'y': sweeps['y'][index],
+        'group': np.maximum(sweeps['group'], 0)[index],
+        'repeat': np.zeros(len(index)),
+        'temperature': sweeps['temperature'][index],
+    }
+    columns.update(points)
+    columns = {name: np.asarray(columns[name]).astype(dtype) for name, dtype in COLUMNS.items()}
+    return {'header': header, 'sheets': meta['sheets'], 'measurement_sheet': meta['measurement_sheet'],
+            'cells': meta['cells'], 'sweeps': sweeps, 'columns': columns}
+
+
+def write_archive(source, path=None, compressor=DEFAULT_COMPRESSOR):
+    # Archive a workbook (path or open Workbook); returns the archive path
+    if path is None:
+        path = os.path.splitext(source)[0] + ARCHIVE_EXTENSION
+    label = os.path.basename(source) if isinstance(source, (str, os.PathLike)) else None
+    data = encode_session(workbook_values(source), compressor, source=label)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_archive(path):
+    with open(path, 'rb') as f:
+        return decode_session(f.read())
+
+
+def archive_rows(archive):
+    # (sheet row, sheet column, cells) of every measurement row, in the layout of the workbook
+    sweeps, columns = archive['sweeps'], archive['columns']
+    scaled = {name: columns[name].tolist() for name in SCALED_COLUMNS}
+    freq, real, imag = columns['freq'].tolist(), columns['real'].tolist(), columns['imag'].tolist()
+    rows = []
+    p = 0
+    for s in range(len(sweeps['points'])):
+        x, y, group, width = (int(sweeps[name][s]) for name in ('x', 'y', 'group', 'width'))
+        temperature = float(sweeps['temperature'][s])
+        tail = ["N/A" if x < 0 else f"{x:07b}", "N/A" if y < 0 else f"{y:07b}",
+                None if group < 0 else group or "N/A", "N/A" if np.isnan(temperature) else temperature][:width - 6]
+        row, col = int(sweeps['sheet_row'][s]), int(sweeps['sheet_col'][s])
+        for k in range(int(sweeps['points'][s])):
+            rows.append((row + k, col, [f"{freq[p]} Hz", f"R={real[p]} / I={imag[p]}"]
+                         + [scaled[name][p] for name in SCALED_COLUMNS] + tail))
+            p += 1
+    return rows
+
+
+def restore_workbook(archive, path):
+    # Write the archived cell values back to an .xlsx
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for name in archive['sheets']:
+        ws = workbook.create_sheet(name)
+        for row, col, value in archive['cells'][name]:
+            ws.cell(row=row, column=col, value=value)
+        if name == archive['measurement_sheet']:
+            for row, col, cells in archive_rows(archive):
+                for i, value in enumerate(cells):
+                    ws.cell(row=row, column=col + i, value=value)
+    workbook.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack a session workbook into an archive, or restore it.")
+    parser.add_argument('command', choices=['pack', 'unpack'])
+    parser.add_argument('path')
+    parser.add_argument('-o', '--output')
+    parser.add_argument('--compressor', choices=sorted(COMPRESSORS), default=DEFAULT_COMPRESSOR)
+    args = parser.parse_args()
+    if args.command == 'pack':
+        path = write_archive(args.path, args.output, args.compressor)
+        print(f"{args.path} ({os.path.getsize(args.path)} bytes) -> {path} ({os.path.getsize(path)} bytes)")
+    else:
+        archive = read_archive(args.path)
+        path = restore_workbook(archive, args.output or os.path.splitext(args.path)[0] + "_restored.xlsx")
+        print(f"{args.path}: {archive['header']['sweeps']} sweeps, {archive['header']['points']} points -> {path}")
+
+
+if __name__ == '__main__':
+    main()
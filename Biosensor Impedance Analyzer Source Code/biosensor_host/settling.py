@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import re
+import time
+
+# ------------------------
+# Settling-cycle auto-tuning (firmware Mode 7)
+# ------------------------
+# Mode 7 sweeps Rcal once per candidate in TUNE_CANDIDATES (longest first), each sweep
+# framed by "Settling_Cycles->N". The longest candidate is the reference: a frequency
+# point has converged at N cycles when every candidate >= N agrees with the reference
+# within the |Z| and phase tolerances. Converged points are grouped into at most
+# MAX_SETTLING_BANDS bands and sent back as "S freq:cycles,freq:cycles,...".
+
+TUNE_CANDIDATES = [511, 255, 127, 63, 31, 15, 7, 3, 0]   # SETTLING_CANDIDATES in the firmware
+MAX_SETTLING_BANDS = 8
+
+DEFAULT_MAG_TOL = 0.002       # relative |Z| deviation from the reference sweep
+DEFAULT_PHASE_TOL_DEG = 0.2
+
+DFT_TIME_S = 1024 * 16 / 16776000.0   # 1024 samples at MCLK/16
+PROFILE_KEY_FIELDS = ['start_freq', 'freq_increment', 'num_increments', 'board_id']  # known before the settling prompt
+
+CANDIDATE_PATTERN = re.compile(r"^Settling_Cycles->(\d+)")
+PROFILE_PATTERN = re.compile(r"^\[INFO\] Settling profile: (.*) cycles$")
+
+
+def parse_candidate_line(line):
+    match = CANDIDATE_PATTERN.match(line)
+    return int(match.group(1)) if match else None
+
+
+def parse_profile_line(line):
+    # "[INFO] Settling profile: 50000 Hz:127, 58000 Hz:31 cycles" -> [(50000, 127), (58000, 31)]
+    match = PROFILE_PATTERN.match(line)
+    if not match:
+        return None
+    bands = []
+    for entry in match.group(1).split(','):
+        freq, cycles = entry.split('Hz:')
+        bands.append((int(freq.strip()), int(cycles.strip())))
+    return bands
+
+
+def format_profile_command(bands):
+    return "S " + ",".join(f"{int(freq)}:{int(cycles)}" for freq, cycles in bands)
+
+
+def point_time_s(freq, cycles):
+    return cycles / freq + DFT_TIME_S
+
+
+def sweep_time_s(freqs, cycles_per_point):
+    return sum(point_time_s(f, c) for f, c in zip(freqs, cycles_per_point))
+
+
+def converged_cycles(spectra, mag_tol=DEFAULT_MAG_TOL, phase_tol_deg=DEFAULT_PHASE_TOL_DEG):
+    # spectra: {cycles: [(freq, real, imag), ...]} from one tune run.
+    # Returns (freqs, required cycles per point).
+    candidates = sorted(spectra, reverse=True)
+    reference = spectra[candidates[0]]
+    freqs = [freq for freq, _, _ in reference]
+    required = []
+    for k, (_, ref_real, ref_imag) in enumerate(reference):
+        ref = complex(ref_real, ref_imag)
+        needed = candidates[0]
+        for cycles in candidates[1:]:
+            points = spectra[cycles]
+            if k >= len(points) or abs(ref) == 0:
+                break
+            value = complex(points[k][1], points[k][2])
+            if value == 0:
+                break
+            mag_error = abs(abs(value) / abs(ref) - 1.0)
+            phase_error = abs(math.degrees(math.atan2((value / ref).imag, (value / ref).real)))
+            if mag_error > mag_tol or phase_error > phase_tol_deg:
+                break
+            needed = cycles
+        required.append(needed)
+    return freqs, required
+
+
+def band_profile(freqs, required, max_bands=MAX_SETTLING_BANDS):
+    # Runs of equal required cycles, then merge the neighbouring pair that costs the least
+    # extra sweep time until at most max_bands remain. Returns [(start_freq, cycles), ...].
+    bands = []   # [first index, last index, cycles]
+    for k, cycles in enumerate(required):
+        if bands and bands[-1][2] == cycles:
+            bands[-1][1] = k
+        else:
+            bands.append([k, k, cycles])
+
+    def extra_time(band, cycles):
+        return sum((cycles - required[k]) / freqs[k] for k in range(band[0], band[1] + 1))
+
+    while len(bands) > max_bands:
+        best = None
+        for b in range(len(bands) - 1):
+            merged_cycles = max(bands[b][2], bands[b + 1][2])
+            cost = extra_time(bands[b], merged_cycles) + extra_time(bands[b + 1], merged_cycles)
+            if best is None or cost < best[0]:
+                best = (cost, b, merged_cycles)
+        _, b, merged_cycles = best
+        bands[b:b + 2] = [[bands[b][0], bands[b + 1][1], merged_cycles]]
+    return [(freqs[first], cycles) for first, _, cycles in bands]
+
+
+def profile_cycles(freqs, bands):
+    # Settling cycles the firmware applies to each point for a band profile
+    cycles = []
+    for freq in freqs:
+        current = bands[0][1]
+        for start, band_cycles in bands:
+            if freq >= start:
+                current = band_cycles
+        cycles.append(current)
+    return cycles
+
+
+class SettlingTuner:
+    # Collects the Mode 7 sweeps from the serial stream
+    def __init__(self, mag_tol=DEFAULT_MAG_TOL, phase_tol_deg=DEFAULT_PHASE_TOL_DEG):
+        self.mag_tol = mag_tol
+        self.phase_tol_deg = phase_tol_deg
+        self.spectra = {}
+        self.current = None
+
+    def start_candidate(self, cycles):
+        self.current = cycles
+        self.spectra[cycles] = []
+
+    def add_point(self, freq, real, imag):
+        if self.current is not None:
+            self.spectra[self.current].append((freq, real, imag))
+
+    def result(self, max_bands=MAX_SETTLING_BANDS):
+        # (bands, summary dict) or (None, None) without usable sweeps
+        if len(self.spectra) < 2 or not self.spectra[max(self.spectra)]:
+            return None, None
+        freqs, required = converged_cycles(self.spectra, self.mag_tol, self.phase_tol_deg)
+        bands = band_profile(freqs, required, max_bands)
+        reference = max(self.spectra)
+        summary = {
+            'points': len(freqs),
+            'profile_time_s': sweep_time_s(freqs, profile_cycles(freqs, bands)),
+            'reference_time_s': sweep_time_s(freqs, [reference] * len(freqs)),
+            'uniform_cycles': max(required),
+            'uniform_time_s': sweep_time_s(freqs, [max(required)] * len(freqs)),
+        }
+        return bands, summary
+
+
+def profile_key(settings):
+    if any(settings.get(field) is None for field in PROFILE_KEY_FIELDS if field != 'board_id'):
+        return None
+    return "|".join(str(settings.get(field) or 'unknown') for field in PROFILE_KEY_FIELDS)
+
+
+class SettlingProfileStore:
+    # Tuned profiles on disk, keyed by the sweep points and board
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Could not read settling profiles '{path}': {e}")
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def store(self, settings, bands, mag_tol=None, phase_tol_deg=None):
+        key = profile_key(settings)
+        if key is None:
+            return None
+        entry = {
+            'settings': {field: settings.get(field) for field in PROFILE_KEY_FIELDS},
+            'bands': [[int(freq), int(cycles)] for freq, cycles in bands],
+            'mag_tol': mag_tol,
+            'phase_tol_deg': phase_tol_deg,
+            'timestamp': time.time(),
+        }
+        self.entries[key] = entry
+        self.save()
+        return entry
+
+    def lookup(self, settings):
+        # [(start_freq, cycles), ...] for these settings, or None
+        key = profile_key(settings)
+        entry = self.entries.get(key) if key else None
+        if entry is None:
+            return None
+        return [tuple(band) for band in entry['bands']]
@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+
+from biosensor_host.calibration_cache import gain_phase
+from biosensor_host.parsing import freq_hz, split_r_i
+from biosensor_host.repeats import wrap_degrees
+
+# ------------------------
+# Temperature-compensated calibration
+# ------------------------
+# The firmware samples the AD5933 die temperature at every calibration ("[INFO] Calibration
+# temperature: 25.31 C") and at the start of every framed sweep ("Temperature->25.31"); N/A
+# when the read failed, which the host takes as no temperature.
+#
+# TemperatureGainModel takes calibrations of the same settings (calibration key) taken at
+# different temperatures and interpolates gain factor and system phase of every frequency
+# point across temperature: piecewise linear between the calibration temperatures, extended
+# linearly up to MAX_EXTRAPOLATION_C beyond them. compensate_rows() then moves a sweep measured
+# at temperature T from the calibration in use (taken at T_cal) to the model's prediction:
+#   gain(T)  = gain_cal * model_gain(T) / model_gain(T_cal)
+#   phase(T) = phase_cal + model_phase(T) - model_phase(T_cal)
+# and recomputes |Z|, phase, R and X from the raw R/I exactly as printMeasurement() does. The
+# calibration in use keeps its own point-to-point detail; only the temperature trend comes
+# from the model. The board can keep measuring while it warms up instead of recalibrating.
+
+TEMPERATURE_BIN_C = 0.5     # calibrations closer together than this are averaged
+MIN_SPAN_C = 1.0            # the model needs calibrations at least this far apart
+MAX_EXTRAPOLATION_C = 3.0
+MIN_CORRECTION_C = 0.1      # sweeps this close to the calibration temperature stay as measured
+
+
+class TemperatureGainModel:
+    def __init__(self, runs, rcal, start_freq, freq_increment):
+        # runs: [(temperature, points)] of one calibration key (same point count), points the
+        # raw (R, I) per point
+        runs = sorted((float(t), points) for t, points in runs if t is not None)
+        self.rcal = rcal
+        self.start_freq = start_freq
+        self.freq_increment = freq_increment
+        # Runs within TEMPERATURE_BIN_C of the first run of a bin are averaged into one node
+        bins = []
+        for temperature, points in runs:
+            if not bins or temperature - bins[-1][0][0] >= TEMPERATURE_BIN_C:
+                bins.append([])
+            bins[-1].append((temperature, *gain_phase(points, rcal)))
+        self.temperatures = np.array([np.mean([run[0] for run in b]) for b in bins])
+        self.gains = np.array([np.mean([run[1] for run in b], axis=0) for b in bins])
+        phases = np.array([np.mean([run[2] for run in b], axis=0) for b in bins])
+        # System phases are 0~360; keep the nodes on one branch before interpolating
+        self.phases = phases[0] + wrap_degrees(phases - phases[0]) if len(phases) else phases
+
+    def usable(self):
+        return len(self.temperatures) >= 2 and np.ptp(self.temperatures) >= MIN_SPAN_C
+
+    def covers(self, temperature):
+        return (self.usable() and self.temperatures[0] - MAX_EXTRAPOLATION_C <= temperature
+                <= self.temperatures[-1] + MAX_EXTRAPOLATION_C)
+
+    def at(self, temperature):
+        # (gain factors, system phases) predicted at temperature, per frequency point
+        i = int(np.clip(np.searchsorted(self.temperatures, temperature) - 1, 0, len(self.temperatures) - 2))
+        t0, t1 = self.temperatures[i], self.temperatures[i + 1]
+        w = (temperature - t0) / (t1 - t0)
+        return ((1.0 - w) * self.gains[i] + w * self.gains[i + 1],
+                (1.0 - w) * self.phases[i] + w * self.phases[i + 1])
+
+    def point_index(self, freq):
+        return int(round((freq - self.start_freq) / self.freq_increment))
+
+
+def model_spec(settings, runs, active_temperature, active_points):
+    # JSON-able inputs of a model and the calibration in use (a capture note for replays)
+    return {
+        'rcal': settings['rcal'],
+        'start_freq': settings['start_freq'],
+        'freq_increment': settings['freq_increment'],
+        'runs': [[run['temperature'], run['points']] for run in runs if run.get('temperature') is not None],
+        'active': [active_temperature, [list(p) for p in active_points]],
+    }
+
+
+def model_from_spec(spec):
+    # (model, active temperature, active points)
+    model = TemperatureGainModel(spec['runs'], spec['rcal'], spec['start_freq'], spec['freq_increment'])
+    return model, spec['active'][0], spec['active'][1]
+
+
+def compensate_rows(rows, temperature, model, active_temperature, active_points, skip=()):
+    # Rewrites |Z|, phase, R and X of measurement rows swept at temperature in place. skip holds
+    # (start Hz, end Hz) ranges measured with another calibration (auto-ranged segments).
+    # Returns (|Z| scale, phase shift in degrees) at the first corrected point, None if the
+    # rows were left as measured.
+    if active_temperature is None or abs(temperature - active_temperature) < MIN_CORRECTION_C:
+        return None
+    if not model.covers(temperature) or not model.covers(active_temperature):
+        return None
+    active_gains, active_phases = gain_phase(active_points, model.rcal)
+    gains_t, phases_t = model.at(temperature)
+    gains_cal, phases_cal = model.at(active_temperature)
+    gains = np.asarray(active_gains) * gains_t / gains_cal
+    phases = np.asarray(active_phases) + phases_t - phases_cal
+    first = None
+    for row in rows:
+        freq = freq_hz(row[0])
+        k = model.point_index(freq)
+        if not 0 <= k < len(gains) or any(start <= freq <= end for start, end in skip):
+            continue
+        real, imag = split_r_i(row[1])
+        magnitude = math.sqrt(real * real + imag * imag)
+        if magnitude == 0:
+            continue
+        impedance = float(1.0 / (magnitude * gains[k]))
+        raw_phase = math.degrees(math.atan2(imag, real))
+        if raw_phase < 0:
+            raw_phase += 360.0
+        phase = float(wrap_degrees(raw_phase - phases[k]))
+        if first is None:
+            first = (float(active_gains[k] / gains[k]), float(phases[k] - active_phases[k]))
+        row[2] = round(impedance, 2)
+        row[3] = round(phase, 2)
+        row[4] = round(impedance * math.cos(math.radians(phase)), 2)
+        row[5] = round(impedance * math.sin(math.radians(phase)), 2)
+    return first
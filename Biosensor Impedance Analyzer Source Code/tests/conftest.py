@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The host package lives next to the host scripts, not in an installed distribution
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import random
+
+from biosensor_host.anomaly import AnomalyDetector
+
+FREQS = [50000 + 1000 * k for k in range(20)]
+
+
+def row(freq, impedance, phase=-45.0):
+    return [f"{freq} Hz", "R=12000 / I=-9000", impedance, phase, 0.0, 0.0]
+
+
+def sweep(detector, impedances):
+    detector.start_sweep(None)
+    for freq, impedance in zip(FREQS, impedances):
+        detector.check(row(freq, impedance))
+    return detector.anomalies()
+
+
+def warmed_up(sweeps=10):
+    detector = AnomalyDetector()
+    noise = random.Random(0)
+    for _ in range(sweeps):
+        assert sweep(detector, [1000.0 * (1 + noise.gauss(0, 0.005)) for _ in FREQS]) == []
+        detector.keep_sweep()
+    return detector
+
+
+def test_glitch_on_first_point_is_flagged_alone():
+    detector = warmed_up()
+    impedances = [1000.0] * len(FREQS)
+    impedances[0] = 3000.0
+    assert sweep(detector, impedances) == [(0, FREQS[0], ['outlier'])]
+
+
+def test_glitch_mid_sweep_is_flagged_alone():
+    detector = warmed_up()
+    impedances = [1000.0] * len(FREQS)
+    impedances[5] = 3000.0
+    assert sweep(detector, impedances) == [(5, FREQS[5], ['outlier'])]
+
+
+def test_offset_of_whole_spectrum_is_not_flagged():
+    detector = warmed_up()
+    assert sweep(detector, [2500.0] * len(FREQS)) == []
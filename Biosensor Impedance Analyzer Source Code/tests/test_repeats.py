@@ -0,0 +1,26 @@
+import math
+
+from biosensor_host.parsing import cell_value, parse_measurement_line
+from biosensor_host.repeats import RepeatReducer
+
+
+def row(freq, impedance, phase=-45.0):
+    return [f"{freq} Hz", "R=12000 / I=-9000", impedance, phase, impedance, impedance,
+            "0000001", "0000010", 1, 25.0]
+
+
+def test_ovf_parses_as_nan():
+    parsed = parse_measurement_line("50.000kHz: R=32000/I=-5 |Z|=ovf Phase=-0.01 degrees "
+                                    "Resistance=inf Reactance=ovf")
+    assert math.isnan(parsed[2]) and math.isnan(parsed[4]) and math.isnan(parsed[5])
+    assert [cell_value(value) for value in parsed[2:6]] == [None, -0.01, None, None]
+
+
+def test_ovf_repeat_is_left_out_of_the_mean():
+    reducer = RepeatReducer(3)
+    for impedance in (1000.0, 1100.0, math.nan):
+        reducer.add_sweep([row(50000, impedance), row(60000, math.nan)])
+    rows, stats_rows, rejected = reducer.reduce()
+    assert rejected == []
+    assert rows[0][2] == 1050.0
+    assert math.isnan(rows[1][2]) and rows[1][3] == -45.0